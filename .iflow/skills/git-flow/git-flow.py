@@ -12,9 +12,8 @@ import sys
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Any
 from enum import Enum
-from pipeline_manager import PipelineUpdateManager
 
 # Import shared git command utility
 sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
@@ -25,8 +24,15 @@ from git_command import (
     GitCommandError,
     GitCommandTimeout
 )
-from file_lock import write_locked_json, read_locked_json, FileLockError
-from schema_validator import validate_workflow_state, validate_branch_state, SchemaValidationError
+from file_lock import write_locked_json, locked_file, FileLockError
+from schema_validator import validate_workflow_state, SchemaValidator, SchemaValidationError
+from content_hash import hash_bytes
+
+if TYPE_CHECKING:
+    from pipeline_manager import PipelineUpdateManager
+
+# PipelineUpdateManager.JOURNAL_FILE, checked without importing pipeline_manager
+UPDATE_JOURNAL_FILE = 'update.journal'
 
 
 class BranchStatus(Enum):
@@ -155,7 +161,7 @@ class Phase:
     @classmethod
     def from_dict(cls, data: Dict) -> 'Phase':
         phase = cls(data["name"], data["role"], data["order"], data["required"])
-        phase.status = PhaseStatus(data["status"])
+        phase.status = PhaseStatus(data.get("status", PhaseStatus.PENDING.value))
         phase.branch = data.get("branch")
         phase.dependencies = data.get("dependencies", [])
         phase.started_at = data.get("started_at")
@@ -243,13 +249,73 @@ class GitFlow:
         self.branch_states_file = self.skill_dir / 'branch-states.json'
         self.git_manage_path = self.skill_dir / '..' / 'git-manage' / 'git-manage.py'
         
-        self.load_config()
-        self.load_phases()
-        self.workflow_state: Optional[WorkflowState] = None
+        # Content hashes of what each state file last held, to skip no-op saves
+        self.saved_hashes: Dict[Path, str] = {}
+        # Bytes of state files read but not yet hashed (see _saved_hash)
+        self._loaded_bytes: Dict[Path, bytes] = {}
+        
+        # An update interrupted mid-commit leaves config and state files half swapped,
+        # so finish it before any of them is read. Only then is pipeline_manager needed.
+        if (self.skill_dir / UPDATE_JOURNAL_FILE).exists():
+            from pipeline_manager import PipelineUpdateManager
+            PipelineUpdateManager.recover_update(self.skill_dir)
+        
+        # Each subsystem is loaded on first use (see COMMAND_SUBSYSTEMS)
+        self._config: Optional[Dict] = None
+        self._phases: Optional[List[Phase]] = None
+        self._workflow_state: Optional[WorkflowState] = None
+        self._workflow_loaded = False
+        self._pipeline_update_manager: Optional['PipelineUpdateManager'] = None
         self.dependency_graph = DependencyGraph()
-        self.load_workflow_state()
-        self.load_branch_states()
-        self.pipeline_update_manager = PipelineUpdateManager('git-flow', self.skill_dir)
+    
+    @property
+    def config(self) -> Dict:
+        if self._config is None:
+            self.load_config()
+        return self._config
+    
+    @config.setter
+    def config(self, config: Dict):
+        self._config = config
+    
+    @property
+    def phases(self) -> List[Phase]:
+        if self._phases is None:
+            self.load_phases()
+        return self._phases
+    
+    @phases.setter
+    def phases(self, phases: List[Phase]):
+        self._phases = phases
+    
+    @property
+    def workflow_state(self) -> Optional[WorkflowState]:
+        """Workflow state with its branch states, read and validated on first use."""
+        if not self._workflow_loaded:
+            self._workflow_loaded = True
+            self.load_workflow_state()
+            self.load_branch_states()
+        return self._workflow_state
+    
+    @workflow_state.setter
+    def workflow_state(self, workflow_state: Optional[WorkflowState]):
+        self._workflow_loaded = True
+        self._workflow_state = workflow_state
+    
+    @property
+    def pipeline_update_manager(self) -> 'PipelineUpdateManager':
+        if self._pipeline_update_manager is None:
+            # Imported on first use; most commands never touch pipeline versions
+            from pipeline_manager import PipelineUpdateManager
+            self._pipeline_update_manager = PipelineUpdateManager(
+                'git-flow', self.skill_dir, async_backups=self.config.get("backups", {}).get("async", False)
+            )
+        return self._pipeline_update_manager
+    
+    def load(self, subsystems: Tuple[str, ...]):
+        """Load the named subsystems (property names) now rather than on first use."""
+        for name in subsystems:
+            getattr(self, name)
     
     def load_config(self):
         default_config = {
@@ -284,6 +350,9 @@ class GitFlow:
             },
             "branch_protection": {
                 "protected_branches": ["main", "master", "production"]
+            },
+            "backups": {
+                "async": False
             }
         }
         
@@ -338,7 +407,8 @@ class GitFlow:
         """Load workflow state with file locking and schema validation."""
         if self.workflow_state_file.exists():
             try:
-                data = read_locked_json(self.workflow_state_file)
+                raw = self._read_locked_bytes(self.workflow_state_file)
+                data = json.loads(raw)
                 
                 # Validate against schema
                 schema_dir = self.repo_root / '.iflow' / 'schemas'
@@ -349,6 +419,7 @@ class GitFlow:
                     # Continue loading despite validation errors for backward compatibility
                 
                 self.workflow_state = WorkflowState.from_dict(data)
+                self._loaded_bytes[self.workflow_state_file] = raw
             except (json.JSONDecodeError, IOError, FileLockError):
                 self.workflow_state = None
     
@@ -356,43 +427,116 @@ class GitFlow:
         """Load branch states with file locking and schema validation."""
         if self.workflow_state and self.branch_states_file.exists():
             try:
-                data = read_locked_json(self.branch_states_file)
+                raw = self._read_locked_bytes(self.branch_states_file)
+                data = json.loads(raw)
                 
-                # Validate against schema
-                schema_dir = self.repo_root / '.iflow' / 'schemas'
+                # Validate against schema, loaded once for all branches
+                validator = SchemaValidator(self.repo_root / '.iflow' / 'schemas')
+                if data and validator.load_schema('branch-state') is None:
+                    print("Warning: Branch state validation failed: ['Schema \"branch-state\" not found']")
+                    validator = None
                 
                 for branch_name, branch_data in data.items():
-                    is_valid, errors = validate_branch_state(branch_data, schema_dir)
-                    
-                    if not is_valid:
-                        print(f"Warning: Branch state validation failed for {branch_name}: {errors}")
-                        # Continue loading despite validation errors for backward compatibility
+                    if validator is not None:
+                        is_valid, errors = validator.validate(branch_data, 'branch-state')
+                        
+                        if not is_valid:
+                            print(f"Warning: Branch state validation failed for {branch_name}: {errors}")
+                            # Continue loading despite validation errors for backward compatibility
                     
                     branch = BranchState.from_dict(branch_data)
                     self.workflow_state.branches[branch_name] = branch
+                self._loaded_bytes[self.branch_states_file] = raw
             except (json.JSONDecodeError, IOError, FileLockError):
                 pass
     
+    def _read_locked_bytes(self, path: Path) -> bytes:
+        with locked_file(path, 'rb') as f:
+            return f.read()
+    
+    @staticmethod
+    def _content_hash(data: Dict) -> str:
+        """
+        Hash of a state's serialization.
+        
+        The loaded objects share lists with each other and are mutated in
+        place, so hashes cached by object identity would go stale; one
+        json.dumps runs in C and is cheaper than an uncached Merkle hash.
+        """
+        return hash_bytes(json.dumps(data, sort_keys=True).encode())
+    
+    def _workflow_hash(self, data: Dict) -> str:
+        """Hash workflow state, ignoring the timestamp a save would bump."""
+        return self._content_hash({**data, "updated_at": None})
+    
+    def _saved_hash(self, path: Path) -> Optional[str]:
+        """
+        Hash of what a state file last held.
+        
+        Files are hashed on the first save rather than on load, so commands
+        that only read state never pay for it. The loaded objects share
+        lists with the parsed data and may have changed since, so the hash
+        is taken from the bytes read.
+        """
+        raw = self._loaded_bytes.pop(path, None)
+        if raw is not None:
+            data = json.loads(raw)
+            if path == self.workflow_state_file:
+                self.saved_hashes[path] = self._workflow_hash(WorkflowState.from_dict(data).to_dict())
+            else:
+                self.saved_hashes[path] = self._content_hash({k: BranchState.from_dict(v).to_dict() for k, v in data.items()})
+        return self.saved_hashes.get(path)
+    
     def save_workflow_state(self):
-        """Save workflow state with file locking."""
+        """Save workflow state with file locking, skipping unchanged state."""
         if self.workflow_state:
-            self.workflow_state.updated_at = datetime.now().isoformat()
+            data = self.workflow_state.to_dict()
+            content_hash = self._workflow_hash(data)
+            if self._saved_hash(self.workflow_state_file) == content_hash:
+                return
+            self.workflow_state.updated_at = data["updated_at"] = datetime.now().isoformat()
             try:
-                write_locked_json(self.workflow_state_file, self.workflow_state.to_dict())
+                write_locked_json(self.workflow_state_file, data)
+                self.saved_hashes[self.workflow_state_file] = content_hash
             except FileLockError as e:
                 print(f"Warning: Failed to save workflow state: {e}")
     
     def save_branch_states(self):
-        """Save branch states with file locking."""
+        """Save branch states with file locking, skipping unchanged state."""
         if self.workflow_state:
+            data = {k: v.to_dict() for k, v in self.workflow_state.branches.items()}
+            content_hash = self._content_hash(data)
+            if self._saved_hash(self.branch_states_file) == content_hash:
+                return
             try:
-                write_locked_json(
-                    self.branch_states_file,
-                    {k: v.to_dict() for k, v in self.workflow_state.branches.items()}
-                )
+                write_locked_json(self.branch_states_file, data)
+                self.saved_hashes[self.branch_states_file] = content_hash
             except FileLockError as e:
                 print(f"Warning: Failed to save branch states: {e}")
     
+    def read_pipeline_state(self) -> Tuple[Dict, Dict[Path, Optional[str]]]:
+        """
+        Read workflow state as stored, for pipeline updates and rollbacks.
+        
+        The files are read directly rather than through WorkflowState, which
+        drops fields it does not model, such as ones a migration added.
+        
+        Returns:
+            The state with its branches, and the state files to write it back
+            to (see PipelineUpdateManager.update_to_version); both empty if
+            there is no workflow state
+        
+        Raises:
+            json.JSONDecodeError, OSError, FileLockError: If a state file
+                cannot be read
+        """
+        if not self.workflow_state_file.exists():
+            return {}, {}
+        state = json.loads(self._read_locked_bytes(self.workflow_state_file))
+        if self.branch_states_file.exists():
+            state['branches'] = json.loads(self._read_locked_bytes(self.branch_states_file))
+        return state, {self.workflow_state_file: None, self.branch_states_file: 'branches'}
+    
     def run_git_command(self, command: List[str], timeout: Optional[int] = 120) -> Tuple[int, str, str]:
         """Run a git command with timeout handling."""
         try:
@@ -755,7 +899,7 @@ class GitFlow:
             f'✓ Changes requested: {branch_name}',
             f'💬 Comment: "{comment}"',
             '',
-            f'To fix:')
+            f'To fix:']
         output.append(f'1. git checkout {branch_name}')
         output.append('2. Make changes')
         output.append('3. /git-flow commit <files>')
@@ -829,7 +973,7 @@ class GitFlow:
             if code != 0:
                 return f'Failed to checkout main: {stderr}'
             
-            revert_msg = f'Revert "Merge {branch_name}"\n\n" \
+            revert_msg = f'Revert "Merge {branch_name}"\n\n' \
                         f"Original approval: {branch.approved_at}\n" \
                         f"Approver: {branch.approved_by}\n" \
                         f"Unapproved at: {datetime.now().isoformat()}"
@@ -1005,7 +1149,28 @@ class GitFlow:
         return 0, '\n'.join(output)
 
 
-def main():
+# Subsystems each command uses, loaded before it runs; everything else stays
+# unloaded, so read-only commands only pay for what they read
+COMMAND_SUBSYSTEMS = {
+    'start': ('config', 'phases', 'workflow_state'),
+    'commit': ('config', 'phases', 'workflow_state'),
+    'review': ('workflow_state',),
+    'approve': ('config', 'phases', 'workflow_state'),
+    'reject': ('config', 'workflow_state'),
+    'request-changes': ('config', 'workflow_state'),
+    'unapprove': ('config', 'workflow_state'),
+    'status': ('workflow_state',),
+    'phase-next': ('config', 'phases', 'workflow_state'),
+    'history': ('workflow_state',),
+    'check-updates': ('config', 'pipeline_update_manager'),
+    'update': ('config', 'pipeline_update_manager'),
+    'rollback': ('config', 'pipeline_update_manager'),
+    'versions': ('config', 'pipeline_update_manager'),
+    'backups': ('config', 'pipeline_update_manager'),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description='Git-Flow Skill - Workflow Orchestration',
         formatter_class=argparse.RawDescriptionHelpFormatter
@@ -1050,6 +1215,13 @@ def main():
     update_parser = subparsers.add_parser('update', help='Update pipeline to new version')
     update_parser.add_argument('--to', help='Target version')
     update_parser.add_argument('--dry-run', action='store_true', help='Preview changes without applying')
+    update_parser.add_argument('--debug', action='store_true', help='Validate the state after every migration hop')
+    update_parser.add_argument('--simulate', action='store_true',
+                               help='With --dry-run, run the migrations and report time, memory, size and validation')
+    update_parser.add_argument('--states', nargs='+', help='State files or directories to simulate (default: current state)')
+    update_parser.add_argument('--sample', type=int, help='Simulate only this many randomly chosen states')
+    update_parser.add_argument('--workers', type=int, help='Worker processes for the simulation')
+    update_parser.add_argument('--json', action='store_true', help='Print the simulation report as JSON')
     
     rollback_parser = subparsers.add_parser('rollback', help='Rollback pipeline to previous version')
     rollback_parser.add_argument('--to', required=True, help='Target version')
@@ -1060,14 +1232,19 @@ def main():
     backups_parser = subparsers.add_parser('backups', help='List available backups')
     backups_parser.add_argument('--delete', help='Delete specific backup')
     backups_parser.add_argument('--cleanup', type=int, help='Delete old backups keeping N most recent')
+    backups_parser.add_argument('--limit', type=int, help='Show at most N backups')
+    backups_parser.add_argument('--offset', type=int, default=0, help='Skip the N most recent backups')
     
-    args = parser.parse_args()
-    
-    if not args.command:
-        parser.print_help()
-        return 0
-    
-    git_flow = GitFlow()
+    return parser
+
+
+def run_command(git_flow: GitFlow, args: argparse.Namespace) -> Tuple[int, str]:
+    """Run a parsed command; the subsystems it declares should already be loaded."""
+    if args.command in ('update', 'rollback'):
+        try:
+            state, state_files = git_flow.read_pipeline_state()
+        except (json.JSONDecodeError, OSError, FileLockError) as e:
+            return 1, f'Failed to read workflow state: {e}'
     
     if args.command == 'start':
         code, output = git_flow.start_workflow(args.feature)
@@ -1095,13 +1272,32 @@ def main():
             code, output = 0, f'Update available: {latest}\nCurrent version: {git_flow.pipeline_update_manager.get_current_version()}'
         else:
             code, output = 0, f'No updates available. Current version: {git_flow.pipeline_update_manager.get_current_version()}'
+    elif args.command == 'update' and args.simulate:
+        target_version = args.to or git_flow.pipeline_update_manager.list_versions()[-1]
+        states = {}
+        if not args.states and state:
+            states[str(git_flow.workflow_state_file)] = state
+        report = git_flow.pipeline_update_manager.simulate_update(
+            target_version, args.states or [], states, args.sample, args.workers
+        )
+        if not report['states']:
+            code, output = 1, 'No workflow states to simulate'
+        else:
+            from pipeline_manager import MigrationSimulator
+            output = json.dumps(report, indent=2) if args.json else MigrationSimulator.format_table(report)
+            code = 0 if report['summary']['ok'] + report['summary']['skipped'] == report['summary']['total'] else 1
     elif args.command == 'update':
         target_version = args.to or git_flow.pipeline_update_manager.list_versions()[-1]
-        state = git_flow.workflow_state.to_dict() if git_flow.workflow_state else {}
-        code, output = git_flow.pipeline_update_manager.update_to_version(target_version, state, args.dry_run)
+        # Migrated state is written back in the same transaction as the version bump
+        success, output = git_flow.pipeline_update_manager.update_to_version(
+            target_version, state, args.dry_run, state_files, args.debug
+        )
+        code = 0 if success else 1
     elif args.command == 'rollback':
-        state = git_flow.workflow_state.to_dict() if git_flow.workflow_state else {}
-        code, output = git_flow.pipeline_update_manager.rollback_to_version(args.to, state, args.backup)
+        success, output = git_flow.pipeline_update_manager.rollback_to_version(
+            args.to, state, args.backup, state_files
+        )
+        code = 0 if success else 1
     elif args.command == 'versions':
         versions = git_flow.pipeline_update_manager.list_versions()
         current = git_flow.pipeline_update_manager.get_current_version()
@@ -1121,7 +1317,7 @@ def main():
             deleted = git_flow.pipeline_update_manager.backup_manager.cleanup_old_backups(args.cleanup)
             code, output = 0, f'Cleaned up {deleted} old backups'
         else:
-            backups = git_flow.pipeline_update_manager.backup_manager.list_backups()
+            backups = git_flow.pipeline_update_manager.backup_manager.list_backups(args.offset, args.limit)
             output_lines = ['Available backups:']
             for backup in backups:
                 output_lines.append(f"  - {backup['backup_id']}")
@@ -1131,6 +1327,24 @@ def main():
     else:
         code, output = 1, f'Unknown command: {args.command}'
     
+    return code, output
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    if not args.command:
+        parser.print_help()
+        return 0
+    
+    if args.command == 'update' and args.simulate and not args.dry_run:
+        parser.error('--simulate requires --dry-run')
+    
+    git_flow = GitFlow()
+    git_flow.load(COMMAND_SUBSYSTEMS.get(args.command, ()))
+    code, output = run_command(git_flow, args)
+    
     print(output)
     return code
 
@@ -4,18 +4,45 @@ Pipeline Version Manager
 Handles pipeline versioning, migrations, and updates with rollback support.
 """
 
+import itertools
 import json
+import os
+import random
 import shutil
 import subprocess
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from copy import deepcopy
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Callable, Any
-from copy import deepcopy
-import hashlib
+from typing import Dict, List, Optional, Tuple, Callable, Any, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+from versioning import Version, SortedVersions, compare_versions
+from migration_loader import MigrationIndex, load_migration, uses_copy_on_write
+from json_migration import DeclarativeMigration, group_migrations
+from chunk_store import ChunkStore
+from backup_catalog import BackupCatalog
+from json_diff import diff, apply_patch
+from cow_state import cow, thaw
+from merkle import MerkleHasher, merkle_hash
+from atomic_file import atomic_write_bytes, atomic_write_json
+from file_lock import FileLock, FileLockError
+from file_transaction import FileTransaction
+from migration_planner import MigrationPlanner
 
 
 class PipelineVersionManager:
-    """Manages pipeline versions and updates."""
+    """
+    Manages pipeline versions and updates.
+    
+    Construction touches no files: the current version, the version
+    directories and the migration index are each loaded on first use, so
+    commands that never ask about versions pay nothing for them.
+    """
     
     def __init__(self, pipeline_name: str, skill_dir: Path):
         self.pipeline_name = pipeline_name
@@ -24,9 +51,66 @@ class PipelineVersionManager:
         self.backups_dir = skill_dir / 'backups'
         self.config_file = skill_dir / 'config.json'
         
-        self.current_version = self.load_current_version()
-        self.available_versions = self.load_available_versions()
-        self.migrations = self.load_migrations()
+        self._current_version: Optional[str] = None
+        self._versions: Optional[SortedVersions] = None
+        self._version_names: Dict[Version, str] = {}
+        self._available_versions: Optional[List[str]] = None
+        self._migration_index: Optional[MigrationIndex] = None
+        self._migration_planner: Optional[MigrationPlanner] = None
+        self._state_validator: Optional[StateValidator] = None
+    
+    @property
+    def current_version(self) -> str:
+        """Current pipeline version from config.json, read on first use."""
+        if self._current_version is None:
+            self._current_version = self.load_current_version()
+        return self._current_version
+    
+    @current_version.setter
+    def current_version(self, version: str):
+        self._current_version = version
+    
+    @property
+    def available_versions(self) -> List[str]:
+        """Version directory names in ascending order, discovered on first use."""
+        if self._available_versions is None:
+            self._available_versions = self.load_available_versions()
+        return self._available_versions
+    
+    @property
+    def versions(self) -> SortedVersions:
+        """Sorted array of available versions."""
+        if self._versions is None:
+            self._available_versions = self.load_available_versions()
+        return self._versions
+    
+    @property
+    def version_names(self) -> Dict[Version, str]:
+        """Directory name of each available version."""
+        if self._versions is None:
+            self._available_versions = self.load_available_versions()
+        return self._version_names
+    
+    @property
+    def migration_index(self) -> MigrationIndex:
+        """Directory index of migration files, built on first use."""
+        if self._migration_index is None:
+            self._migration_index = self.load_migrations()
+        return self._migration_index
+    
+    @property
+    def migration_planner(self) -> MigrationPlanner:
+        """Shortest-path planner over the pipeline's migration edges."""
+        if self._migration_planner is None:
+            self._migration_planner = MigrationPlanner(self.migration_index)
+        return self._migration_planner
+    
+    @property
+    def state_validator(self) -> 'StateValidator':
+        """Validator for the schemas of this pipeline's versions, compiled on demand."""
+        if self._state_validator is None:
+            self._state_validator = StateValidator(self.versions_dir)
+        return self._state_validator
     
     def load_current_version(self) -> str:
         """Load current pipeline version from config."""
@@ -40,106 +124,73 @@ class PipelineVersionManager:
         return '1.0.0'
     
     def load_available_versions(self) -> List[str]:
-        """Load all available pipeline versions."""
-        versions = []
+        """Load all available pipeline versions into the sorted version array."""
+        version_names = {}
         if self.versions_dir.exists():
             for version_dir in self.versions_dir.iterdir():
-                if version_dir.is_dir():
-                    versions.append(version_dir.name)
-        return sorted(versions, key=self._parse_version)
-    
-    def load_migrations(self) -> Dict[str, Dict[str, Callable]]:
-        """Load migration scripts."""
-        migrations = {}
-        
-        if not self.versions_dir.exists():
-            return migrations
+                if not version_dir.is_dir():
+                    continue
+                try:
+                    version = Version.parse(version_dir.name)
+                except ValueError:
+                    continue
+                version_names[version] = version_dir.name
         
-        for version_dir in self.versions_dir.iterdir():
-            if not version_dir.is_dir():
-                continue
-            
-            migrations_dir = version_dir / 'migrations'
-            if not migrations_dir.exists():
-                continue
-            
-            version = version_dir.name
-            if version not in migrations:
-                migrations[version] = {}
-            
-            for migration_file in migrations_dir.glob('from_*.py'):
-                from_version = migration_file.stem.replace('from_', '')
-                migrations[version][from_version] = self._load_migration(migration_file)
-        
-        return migrations
-    
-    def _load_migration(self, migration_file: Path) -> Callable:
-        """Load a migration function from a file."""
-        spec = {}
-        with open(migration_file, 'r') as f:
-            exec(f.read(), spec)
-        
-        if 'migrate' in spec:
-            return spec['migrate']
-        elif 'migrate_state' in spec:
-            return spec['migrate_state']
-        else:
-            raise ValueError(f"No migration function found in {migration_file}")
+        self._version_names = version_names
+        self._versions = SortedVersions(version_names)
+        return [version_names[v] for v in self._versions]
+    
+    def _version_name(self, version: Optional[Version]) -> Optional[str]:
+        """Map a Version back to its directory name."""
+        if version is None:
+            return None
+        return self.version_names.get(version, str(version))
+    
+    def load_migrations(self) -> MigrationIndex:
+        """Index migration scripts without importing them."""
+        return MigrationIndex(self.versions_dir)
+    
+    def has_migration(self, from_version: str, to_version: str) -> bool:
+        """Check whether a migration file exists without loading it."""
+        return self.migration_index.has_migration(from_version, to_version)
+    
+    def get_migration(self, from_version: str, to_version: str) -> Optional[Callable]:
+        """Load a migration function, reusing the process-wide module cache."""
+        migration_file = self.migration_index.get_path(from_version, to_version)
+        if migration_file is None:
+            return None
+        return load_migration(migration_file)
     
     def _parse_version(self, version_str: str) -> Tuple[int, int, int]:
         """Parse semantic version string."""
-        parts = version_str.split('.')
-        major = int(parts[0]) if len(parts) > 0 else 0
-        minor = int(parts[1]) if len(parts) > 1 else 0
-        patch = int(parts[2]) if len(parts) > 2 else 0
-        return (major, minor, patch)
+        return Version.parse(version_str).release
     
     def _compare_versions(self, v1: str, v2: str) -> int:
         """Compare two versions. Returns -1 if v1 < v2, 0 if equal, 1 if v1 > v2."""
-        v1_parts = self._parse_version(v1)
-        v2_parts = self._parse_version(v2)
-        
-        if v1_parts < v2_parts:
-            return -1
-        elif v1_parts > v2_parts:
-            return 1
-        else:
-            return 0
+        return compare_versions(v1, v2)
+    
+    def latest_version(self) -> Optional[str]:
+        """Get the latest available version."""
+        return self._version_name(self.versions.latest())
     
     def check_updates(self) -> Tuple[bool, Optional[str]]:
         """Check if updates are available."""
-        if not self.available_versions:
-            return False, None
-        
-        latest = max(self.available_versions, key=self._parse_version)
-        if self._compare_versions(latest, self.current_version) > 0:
+        latest = self.latest_version()
+        if latest and self._compare_versions(latest, self.current_version) > 0:
             return True, latest
         return False, None
     
-    def get_migration_path(self, target_version: str) -> List[str]:
-        """Get the path of versions to migrate through."""
-        if self._compare_versions(target_version, self.current_version) <= 0:
-            raise ValueError(f"Target version {target_version} is not newer than current {self.current_version}")
-        
-        path = []
-        current = self.current_version
+    def get_migration_path(self, target_version: str, from_version: Optional[str] = None) -> List[str]:
+        """Get the cheapest path of versions to migrate through, including skip-version edges."""
+        from_version = from_version or self.current_version
+        if self._compare_versions(target_version, from_version) <= 0:
+            raise ValueError(f"Target version {target_version} is not newer than current {from_version}")
         
-        while self._compare_versions(current, target_version) < 0:
-            # Find next version
-            next_versions = [
-                v for v in self.available_versions
-                if self._compare_versions(v, current) > 0
-            ]
-            
-            if not next_versions:
-                raise ValueError(f"No migration path from {current} to {target_version}")
-            
-            # Get the closest next version
-            next_version = min(next_versions, key=lambda v: self._parse_version(v))
-            path.append(next_version)
-            current = next_version
+        path = self.migration_planner.plan(from_version, target_version)
+        if path is None:
+            raise ValueError(f"No migration path from {from_version} to {target_version}")
         
-        return path
+        return [self._version_name(version) for version in path]
     
     def get_rollback_path(self, target_version: str) -> List[str]:
         """Get the path of versions to rollback through."""
@@ -150,62 +201,110 @@ class PipelineVersionManager:
         current = self.current_version
         
         while self._compare_versions(current, target_version) > 0:
-            # Find previous version
-            prev_versions = [
-                v for v in self.available_versions
-                if self._compare_versions(v, current) < 0
-            ]
+            prev_version = self.versions.previous_before(current)
             
-            if not prev_versions:
+            if prev_version is None:
                 raise ValueError(f"No rollback path from {current} to {target_version}")
             
-            # Get the closest previous version
-            prev_version = max(prev_versions, key=lambda v: self._parse_version(v))
-            path.append(prev_version)
-            current = prev_version
+            current = self._version_name(prev_version)
+            path.append(current)
         
         return path
 
 
 class MigrationExecutor:
-    """Executes state migrations with rollback support."""
+    """
+    Executes state migrations with rollback support.
+    
+    States are treated as immutable: declarative migrations copy only the
+    paths they change, and Python migrations that opt in with
+    COPY_ON_WRITE = True (see uses_copy_on_write) receive a copy-on-write
+    view, so intermediate states share their untouched subtrees with the
+    one before. Other Python migrations get a deep copy, since they may
+    rely on real dicts and lists. A backup is therefore just a reference
+    and a rollback a pointer swap. The state passed in is never modified.
+    
+    For the same reason state hashes are Merkle hashes with cached
+    subtrees: once the input is hashed, hashing a migrated state that
+    shares structure with it costs only its changed paths.
+    """
+    
+    # Process-wide, so backups taken within the same microsecond differ
+    _backup_ids = itertools.count()
     
     def __init__(self, state: Dict, version_manager: PipelineVersionManager):
-        self.state = deepcopy(state)
+        self.state = state
         self.version_manager = version_manager
         self.backup: Optional[Dict] = None
+        self.hasher = MerkleHasher()
+    
+    @property
+    def state_hash(self) -> str:
+        """Merkle hash of the current state."""
+        return self.hasher.hash(self.state)
+    
+    @property
+    def changed(self) -> bool:
+        """Whether the current state differs from the backup."""
+        if self.backup is None or self.backup is self.state:
+            return False
+        return self.hasher.hash(self.backup) != self.state_hash
     
     def create_backup(self) -> str:
         """Create a backup of the current state."""
-        self.backup = deepcopy(self.state)
+        self.backup = self.state
         backup_id = self._generate_backup_id()
         return backup_id
     
     def _generate_backup_id(self) -> str:
-        """Generate a unique backup ID."""
+        """
+        Generate a unique backup ID.
+        
+        The state is not hashed here: the ID only has to be unique, and
+        callers that need the hash read state_hash on demand.
+        """
         timestamp = datetime.now().isoformat()
-        state_hash = hashlib.md5(json.dumps(self.state, sort_keys=True).encode()).hexdigest()[:8]
-        return f"{timestamp}_{state_hash}"
+        return f"{timestamp}_{next(self._backup_ids):08x}"
+    
+    def _run(self, migration_func: Callable) -> Dict:
+        """Run one migration against the current state without modifying it."""
+        if isinstance(migration_func, DeclarativeMigration):
+            return migration_func(self.state)
+        
+        if uses_copy_on_write(migration_func):
+            result = thaw(migration_func(cow(self.state)))
+        else:
+            result = migration_func(deepcopy(self.state))
+        if not isinstance(result, dict):
+            raise ValueError("Migration function must return a dictionary")
+        return result
+    
+    def _set_version(self, state: Dict, version: str) -> Dict:
+        """Record the schema version, copying only the top level."""
+        if 'version' in state and state['version'] != version:
+            return {**state, 'version': version}
+        return state
     
     def apply_migration(self, from_version: str, to_version: str) -> Tuple[bool, str]:
         """Apply a migration from one version to another."""
-        if not self.backup:
+        if self.backup is None:
             self.create_backup()
         
-        # Get migration function
-        migrations = self.version_manager.migrations
-        if to_version not in migrations or from_version not in migrations[to_version]:
-            return False, f"No migration found from {from_version} to {to_version}"
-        
-        migration_func = migrations[to_version][from_version]
-        
         try:
+            # Get migration function
+            migration_func = self.version_manager.get_migration(from_version, to_version)
+            if migration_func is None:
+                return False, f"No migration found from {from_version} to {to_version}"
+            
             # Apply migration
-            self.state = migration_func(self.state)
+            started = time.perf_counter()
+            new_state = self._run(migration_func)
+            self.version_manager.migration_planner.record_timing(
+                from_version, to_version, time.perf_counter() - started
+            )
             
             # Update version in state
-            if 'version' in self.state:
-                self.state['version'] = to_version
+            self.state = self._set_version(new_state, to_version)
             
             # Validate new state
             self.validate_state(to_version)
@@ -213,310 +312,1268 @@ class MigrationExecutor:
             return True, f"Successfully migrated from {from_version} to {to_version}"
         except Exception as e:
             # Restore from backup
-            self.state = deepcopy(self.backup)
+            self.state = self.backup
             return False, f"Migration failed: {str(e)}"
     
+    def apply_migrations(self, from_version: str, migration_path: List[str], validate_each: bool = True,
+                         on_hop: Optional[Callable[[str, Dict], None]] = None,
+                         validate: bool = True) -> Tuple[bool, str]:
+        """
+        Apply the migrations along a path of versions.
+        
+        Runs of consecutive declarative (.json) migrations are fused and
+        applied as a single pass; other migrations are applied one hop at
+        a time.
+        
+        Args:
+            from_version: Version of the current state
+            migration_path: Versions to migrate through, ending at the target
+            validate_each: Validate after every hop (or fused run) rather
+                than once against the target version
+            on_hop: Called with (version, state) after each hop or fused run
+            validate: Validate at all; callers that check states themselves
+                turn this off
+        """
+        if self.backup is None:
+            self.create_backup()
+        
+        hops = list(itertools.pairwise([from_version, *migration_path]))
+        migrations = []
+        for hop_from, hop_to in hops:
+            migration_func = self.version_manager.get_migration(hop_from, hop_to)
+            if migration_func is None:
+                return False, f"No migration found from {hop_from} to {hop_to}"
+            migrations.append(migration_func)
+        
+        first_hop = 0
+        for hop_count, migration_func in group_migrations(migrations):
+            group = hops[first_hop:first_hop + hop_count]
+            first_hop += hop_count
+            group_from, group_to = group[0][0], group[-1][1]
+            
+            try:
+                started = time.perf_counter()
+                new_state = self._run(migration_func)
+                elapsed = time.perf_counter() - started
+                for hop_from, hop_to in group:
+                    self.version_manager.migration_planner.record_timing(hop_from, hop_to, elapsed / hop_count)
+                
+                self.state = self._set_version(new_state, group_to)
+                
+                if validate and (validate_each or first_hop == len(hops)):
+                    self.validate_state(group_to)
+                if on_hop is not None:
+                    on_hop(group_to, self.state)
+            except Exception as e:
+                self.state = self.backup
+                return False, f"Migration from {group_from} to {group_to} failed: {str(e)}"
+        
+        return True, f"Successfully migrated from {from_version} to {migration_path[-1]}"
+    
     def validate_state(self, schema_version: str) -> bool:
-        """Validate state against schema version."""
-        # Load schema
-        schema = self._load_schema(schema_version)
-        
-        # Validate required fields
-        if 'required' in schema:
-            for field in schema['required']:
-                if field not in self.state:
-                    raise ValueError(f"Missing required field: {field}")
-        
-        # Validate field types
-        if 'fields' in schema:
-            for field, field_type in schema['fields'].items():
-                if field in self.state:
-                    if not isinstance(self.state[field], field_type):
-                        raise ValueError(f"Field {field} should be {field_type}, got {type(self.state[field])}")
+        """
+        Validate state against schema version.
         
+        Raises:
+            ValueError: Listing every problem found
+        """
+        check = self.version_manager.state_validator.get_check(schema_version)
+        # A version without a schema places no constraints on the state
+        if check is not None:
+            errors: List[str] = []
+            check(self.state, '', errors)
+            if errors:
+                raise ValueError('; '.join(errors))
         return True
     
-    def _load_schema(self, version: str) -> Dict:
-        """Load schema for a specific version."""
-        schema_file = self.version_manager.versions_dir / version / 'schema.json'
-        if schema_file.exists():
-            with open(schema_file, 'r') as f:
-                return json.load(f)
-        return {}
-    
     def rollback(self) -> bool:
         """Rollback to backup state."""
-        if self.backup:
-            self.state = deepcopy(self.backup)
+        if self.backup is not None:
+            self.state = self.backup
             return True
         return False
 
 
+# Schema type names and the JSON value types they accept; bool is not an integer
+SCHEMA_TYPES = {
+    'string': (str,),
+    'integer': (int,),
+    'float': (float,),
+    'number': (int, float),
+    'boolean': (bool,),
+    'array': (list,),
+    'object': (dict,)
+}
+
+# Appends the errors found in a value, prefixed with its path
+SchemaCheck = Callable[[Any, str, List[str]], None]
+
+
 class StateValidator:
-    """Validates workflow state integrity."""
+    """
+    Validates workflow state integrity.
+    
+    Schemas use the pipeline dialect of versions/<v>/schema.json:
+    `required` field names, `fields` mapping names to a `type` and an
+    optional `enum`, and `nested` mapping a field to the schema of its
+    records. A nested list is validated item by item. A nested dict is
+    validated as one record if it has any of the schema's fields, and
+    otherwise as a map of records (such as branches by name).
+    
+    Each schema is compiled into a check function once and cached until
+    its file's modification time or size changes, so validating a large
+    state costs one stat() plus the checks themselves.
+    """
     
     def __init__(self, schema_dir: Optional[Path] = None):
         self.schema_dir = schema_dir
+        # version -> ((mtime_ns, size), compiled check)
+        self._compiled: Dict[str, Tuple[Tuple[int, int], SchemaCheck]] = {}
     
     def validate(self, state: Dict, schema_version: str) -> Tuple[bool, List[str]]:
         """Validate state against schema version."""
-        errors = []
-        
-        # Load schema
-        schema = self._load_schema(schema_version)
-        
-        if not schema:
-            errors.append(f"No schema found for version {schema_version}")
-            return False, errors
-        
-        # Validate required fields
-        if 'required' in schema:
-            for field in schema['required']:
-                if field not in state:
-                    errors.append(f"Missing required field: {field}")
-        
-        # Validate field types
-        if 'fields' in schema:
-            for field, field_config in schema['fields'].items():
-                if field in state:
-                    expected_type = field_config.get('type')
-                    if expected_type:
-                        if not self._check_type(state[field], expected_type):
-                            errors.append(f"Field {field} should be {expected_type}, got {type(state[field]).__name__}")
-                    
-                    # Validate enum values
-                    if 'enum' in field_config and field in state:
-                        if state[field] not in field_config['enum']:
-                            errors.append(f"Field {field} has invalid value: {state[field]}")
-        
-        # Validate nested structures
-        if 'nested' in schema:
-            for nested_field, nested_schema in schema['nested'].items():
-                if nested_field in state and isinstance(state[nested_field], dict):
-                    nested_valid, nested_errors = self.validate(state[nested_field], nested_schema)
-                    errors.extend([f"{nested_field}.{err}" for err in nested_errors])
+        check = self.get_check(schema_version)
+        if check is None:
+            return False, [f"No schema found for version {schema_version}"]
         
+        errors: List[str] = []
+        check(state, '', errors)
         return len(errors) == 0, errors
     
+    def get_check(self, version: str) -> Optional[SchemaCheck]:
+        """Compiled check for a version's schema, or None if it has no schema."""
+        if self.schema_dir is None:
+            return None
+        schema_file = self.schema_dir / version / 'schema.json'
+        try:
+            stat = schema_file.stat()
+        except OSError:
+            self._compiled.pop(version, None)
+            return None
+        
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._compiled.get(version)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        
+        check = self.compile(self._load_schema(version))
+        self._compiled[version] = (signature, check)
+        return check
+    
     def _load_schema(self, version: str) -> Dict:
         """Load schema for a specific version."""
         if self.schema_dir:
             schema_file = self.schema_dir / version / 'schema.json'
-            if schema_file.exists():
+            try:
                 with open(schema_file, 'r') as f:
                     return json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
         return {}
     
-    def _check_type(self, value: Any, expected_type: str) -> bool:
-        """Check if value matches expected type."""
-        type_map = {
-            'string': str,
-            'integer': int,
-            'float': float,
-            'boolean': bool,
-            'array': list,
-            'object': dict
-        }
+    @classmethod
+    def compile(cls, schema: Dict) -> SchemaCheck:
+        """Compile a schema into a function checking one record."""
+        required = tuple(schema.get('required', ()))
+        fields = {}
+        for field, field_config in schema.get('fields', {}).items():
+            expected_type = field_config.get('type')
+            enum = field_config.get('enum')
+            if enum is not None:
+                try:
+                    enum = frozenset(enum)
+                except TypeError:
+                    enum = tuple(enum)
+            fields[field] = (expected_type, SCHEMA_TYPES.get(expected_type), enum)
+        field_spec = fields.get
+        nested = tuple(
+            (field, cls._compile_nested(nested_schema, cls.compile(nested_schema)))
+            for field, nested_schema in schema.get('nested', {}).items()
+        )
         
-        python_type = type_map.get(expected_type)
-        if python_type:
-            return isinstance(value, python_type)
-        return True
+        def check(record: Any, prefix: str, errors: List[str]):
+            if type(record) is not dict:
+                errors.append(f"{prefix}should be object, got {type(record).__name__}")
+                return
+            for field in required:
+                if field not in record:
+                    errors.append(f"{prefix}Missing required field: {field}")
+            # Records usually carry a few of many declared fields; visit only those present
+            for field, value in record.items():
+                spec = field_spec(field)
+                if spec is None:
+                    continue
+                expected_type, python_types, enum = spec
+                if python_types is not None and type(value) not in python_types:
+                    errors.append(f"{prefix}Field {field} should be {expected_type}, got {type(value).__name__}")
+                elif enum is not None:
+                    try:
+                        valid = value in enum
+                    except TypeError:
+                        valid = False
+                    if not valid:
+                        errors.append(f"{prefix}Field {field} has invalid value: {value}")
+            for field, check_nested in nested:
+                if field in record:
+                    check_nested(record[field], f"{prefix}{field}", errors)
+        
+        return check
+    
+    @staticmethod
+    def _compile_nested(schema: Dict, check_record: SchemaCheck) -> SchemaCheck:
+        """Wrap a record check to also accept lists and maps of records."""
+        record_keys = frozenset(schema.get('required', ())) | frozenset(schema.get('fields', {}))
+        
+        def check(value: Any, path: str, errors: List[str]):
+            if type(value) is list:
+                for index, item in enumerate(value):
+                    check_record(item, f"{path}[{index}].", errors)
+            elif type(value) is dict and value and record_keys.isdisjoint(value):
+                for key, item in value.items():
+                    check_record(item, f"{path}.{key}.", errors)
+            elif type(value) is dict:
+                check_record(value, f"{path}.", errors)
+            else:
+                errors.append(f"Field {path} should be object or array, got {type(value).__name__}")
+        
+        return check
 
 
 class BackupManager:
-    """Manages state backups for rollback."""
+    """
+    Manages state backups for rollback.
+    
+    States are stored in a shared chunk store under backups/chunks: the
+    compactly serialized state is split into content-defined chunks at
+    object boundaries, each stored once and compressed, so near-identical
+    backups cost only their changed chunks. A backup directory holds
+    metadata.json and a manifest.json of chunk hashes. Backups written as
+    a plain state.json remain readable.
+    
+    Every backup is recorded in an append-only catalog (catalog.jsonl), so
+    listing and retention never open per-backup files. Backup IDs embed a
+    sequence number from the catalog and cannot collide.
+    
+    Most backups are deltas: a structural diff against the previous backup.
+    A full snapshot is written every `full_every` deltas, or when the delta
+    is larger than `delta_ratio` of the full state. Restoring replays the
+    chain from the nearest full snapshot, with recently materialized states
+    cached; pruning a delta's base turns the delta into a full snapshot.
     
-    def __init__(self, backups_dir: Path):
+    create_backup_async() serializes the state on the calling thread and
+    moves chunking, delta encoding, compressing and fsyncing onto a
+    background thread. Backups are written one at a time in submission
+    order, and every other method first waits for pending writes, so reads
+    always see them. Under the GIL only compression, file writes and fsync
+    run in parallel with the caller, so the gain grows with the storage's
+    sync latency: small on a page-cached disk, most of the backup's cost on
+    slow or networked storage.
+    """
+    
+    MANIFEST_FORMAT = 1
+    DELETE_WORKERS = 8
+    FULL_EVERY = 16
+    DELTA_RATIO = 0.5
+    CACHE_SIZE = 8
+    
+    def __init__(self, backups_dir: Path, compression: str = 'zlib',
+                 full_every: Optional[int] = None, delta_ratio: Optional[float] = None):
+        """
+        Args:
+            backups_dir: Directory holding backups
+            compression: Chunk compression ('zlib', 'lzma' or 'none')
+            full_every: Deltas between full snapshots (0 disables deltas)
+            delta_ratio: Largest delta, relative to the full state, worth storing
+        """
         self.backups_dir = backups_dir
         self.backups_dir.mkdir(parents=True, exist_ok=True)
+        self.store = ChunkStore(backups_dir / 'chunks', compression, delimiter=b'}')
+        self.catalog = BackupCatalog(backups_dir / 'catalog.jsonl')
+        self.full_every = self.FULL_EVERY if full_every is None else full_every
+        self.delta_ratio = self.DELTA_RATIO if delta_ratio is None else delta_ratio
+        self._snapshots: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._pending: Optional[Future] = None
+        if not self.catalog.exists():
+            self._rebuild_catalog()
     
-    def create_backup(self, state: Dict, metadata: Optional[Dict] = None) -> str:
-        """Create a backup of the state."""
-        backup_id = self._generate_backup_id()
-        backup_dir = self.backups_dir / backup_id
-        backup_dir.mkdir(exist_ok=True)
-        
-        # Save state
-        state_file = backup_dir / 'state.json'
-        with open(state_file, 'w') as f:
-            json.dump(state, f, indent=2)
-        
-        # Save metadata
-        metadata_file = backup_dir / 'metadata.json'
-        metadata_data = {
-            'backup_id': backup_id,
-            'timestamp': datetime.now().isoformat(),
-            'state_version': state.get('version', 'unknown'),
-            **(metadata or {})
-        }
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata_data, f, indent=2)
+    def create_backup_async(self, state: Dict, metadata: Optional[Dict] = None,
+                            state_hash: Optional[str] = None) -> Future:
+        """
+        Start backing up the state on the background writer thread.
+        
+        The state is serialized before this returns, so the caller may
+        modify it, nested containers included, right away. The writer
+        parses its own copy for delta encoding.
         
+        Returns:
+            Future resolving to the backup ID (see create_backup) once the
+            backup is on disk
+        """
+        data = json.dumps(state, separators=(',', ':')).encode()
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup-writer')
+        self._pending = self._writer.submit(self._create_backup, None, metadata, state_hash, data)
+        return self._pending
+    
+    def flush(self):
+        """Wait for pending background backups; their errors are left to their futures."""
+        pending = self._pending
+        if pending is not None:
+            wait([pending])
+    
+    def create_backup(self, state: Dict, metadata: Optional[Dict] = None,
+                      state_hash: Optional[str] = None) -> str:
+        """
+        Create a backup of the state.
+        
+        Args:
+            state: State to back up
+            metadata: Extra fields recorded with the backup
+            state_hash: Merkle hash of the state (see MerkleHasher), if the
+                caller has one. It is recorded with the backup, and a state
+                whose hash and metadata match the latest backup's is not
+                backed up again.
+        
+        Returns:
+            The new backup's ID, or the latest backup's if it is identical
+        """
+        self.flush()
+        return self._create_backup(state, metadata, state_hash)
+    
+    def _create_backup(self, state: Optional[Dict], metadata: Optional[Dict], state_hash: Optional[str],
+                       data: Optional[bytes] = None) -> str:
+        """Write a backup of the state, or of its serialization `data` when the state is None."""
+        previous = self.catalog.entries(limit=1)
+        if state_hash is not None and previous and self._is_same_backup(previous[0], state_hash, metadata):
+            return previous[0]['backup_id']
+        
+        owned = state is None
+        if owned:
+            state = json.loads(data)
+        else:
+            # Compact JSON uses the C encoder and chunks at object ends
+            data = json.dumps(state, separators=(',', ':')).encode()
+        kind, base, depth, payload = 'full', None, 0, data
+        snapshot = None
+        
+        if self.full_every and previous and previous[0].get('depth', 0) < self.full_every:
+            base_state = self._materialize(previous[0]['backup_id'])
+            if base_state is not None:
+                ops = diff(base_state, state)
+                patch = json.dumps(ops, separators=(',', ':')).encode()
+                if len(patch) <= self.delta_ratio * len(data):
+                    kind, base, depth, payload = 'delta', previous[0]['backup_id'], previous[0].get('depth', 0) + 1, patch
+                    # A private copy of the new state that shares unchanged subtrees with its base
+                    snapshot = apply_patch(base_state, ops)
+        
+        def write(seq: int) -> Dict:
+            # Chunks are stored under the catalog lock, so garbage collection
+            # never sees them before the backup that uses them is cataloged.
+            # Only chunks not already stored are written.
+            chunks = self.store.put(payload)
+            backup_id = self._generate_backup_id(seq)
+            backup_dir = self.backups_dir / backup_id
+            backup_dir.mkdir()
+            self._write_manifest(backup_id, kind, base, len(data), chunks)
+            
+            # Save metadata
+            metadata_data = {
+                'backup_id': backup_id,
+                'timestamp': datetime.now().isoformat(),
+                'state_version': state.get('version', 'unknown'),
+                **(metadata or {}),
+                'size': len(data),
+                'stored_size': len(payload),
+                'kind': kind,
+                'base': base,
+                'depth': depth
+            }
+            if state_hash is not None:
+                metadata_data['state_hash'] = state_hash
+            atomic_write_json(backup_dir / 'metadata.json', metadata_data)
+            return metadata_data
+        
+        backup_id = self.catalog.add(write)['backup_id']
+        if self.full_every:
+            # The next delta diffs against this state; keep a private copy
+            if snapshot is None:
+                snapshot = state if owned else json.loads(data)
+            self._remember(backup_id, snapshot)
         return backup_id
     
-    def _generate_backup_id(self) -> str:
-        """Generate a unique backup ID."""
+    @staticmethod
+    def _is_same_backup(record: Dict, state_hash: str, metadata: Optional[Dict]) -> bool:
+        """Whether a backup record already holds this state with this metadata."""
+        if record.get('state_hash') != state_hash:
+            return False
+        return all(record.get(key) == value for key, value in (metadata or {}).items())
+    
+    def _write_manifest(self, backup_id: str, kind: str, base: Optional[str], size: int, chunks: List[str]):
+        atomic_write_json(self.backups_dir / backup_id / 'manifest.json', {
+            'format': self.MANIFEST_FORMAT,
+            'kind': kind,
+            'base': base,
+            'size': size,
+            'chunks': chunks
+        }, indent=None)
+    
+    def _remember(self, backup_id: str, state: Dict):
+        """Cache a materialized state; cached states are never mutated."""
+        self._snapshots[backup_id] = state
+        self._snapshots.move_to_end(backup_id)
+        while len(self._snapshots) > self.CACHE_SIZE:
+            self._snapshots.popitem(last=False)
+    
+    def _materialize(self, backup_id: str) -> Optional[Dict]:
+        """
+        Reconstruct a backup's state, replaying deltas from the nearest full
+        snapshot or cached state. The result is shared with the cache.
+        """
+        chain = []
+        current = backup_id
+        while current not in self._snapshots:
+            manifest = self._load_manifest(current)
+            if manifest is None:
+                state_file = self.backups_dir / current / 'state.json'
+                if not state_file.exists():
+                    return None
+                with open(state_file, 'r') as f:
+                    state = json.load(f)
+                break
+            if manifest.get('kind', 'full') == 'full':
+                # Chunks may split a multi-byte character, so join before decoding
+                state = json.loads(self.store.read(manifest['chunks']))
+                break
+            chain.append(manifest)
+            current = manifest['base']
+        else:
+            state = self._snapshots[current]
+            self._snapshots.move_to_end(current)
+        
+        for manifest in reversed(chain):
+            state = apply_patch(state, json.loads(self.store.read(manifest['chunks'])))
+        
+        self._remember(backup_id, state)
+        return state
+    
+    def _rebase(self, backup_id: str):
+        """Rewrite a delta backup as a full snapshot, before its base is deleted."""
+        state = self._materialize(backup_id)
+        if state is None:
+            return
+        data = json.dumps(state, separators=(',', ':')).encode()
+        
+        def rewrite() -> Dict:
+            self._write_manifest(backup_id, 'full', None, len(data), self.store.put(data))
+            return {'kind': 'full', 'base': None, 'depth': 0, 'stored_size': len(data)}
+        
+        self.catalog.update(backup_id, rewrite)
+    
+    def _generate_backup_id(self, seq: int) -> str:
+        """Generate a unique backup ID from a catalog sequence number."""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        return f"backup_{timestamp}"
+        return f"backup_{timestamp}_{seq:06d}"
+    
+    def _rebuild_catalog(self):
+        """Catalog backups that predate the catalog, oldest first."""
+        backups = []
+        for backup_dir in self.backups_dir.iterdir():
+            metadata_file = backup_dir / 'metadata.json'
+            if backup_dir.is_dir() and metadata_file.exists():
+                try:
+                    with open(metadata_file, 'r') as f:
+                        backups.append(json.load(f))
+                except (json.JSONDecodeError, IOError):
+                    continue
+        
+        if backups:
+            self.catalog.rebuild(sorted(backups, key=lambda x: x.get('timestamp', '')))
     
     def restore_backup(self, backup_id: str) -> Optional[Dict]:
         """Restore state from backup."""
+        self.flush()
         backup_dir = self.backups_dir / backup_id
         
         if not backup_dir.exists():
             return None
         
-        state_file = backup_dir / 'state.json'
-        if state_file.exists():
-            with open(state_file, 'r') as f:
-                return json.load(f)
-        
-        return None
+        state = self._materialize(backup_id)
+        if state is None:
+            return None
+        # The materialized state is cached, so hand out an independent copy
+        return json.loads(json.dumps(state))
     
-    def list_backups(self) -> List[Dict]:
-        """List all available backups."""
-        backups = []
+    def iter_backup_bytes(self, backup_id: str):
+        """Yield a backup's serialized state piece by piece, e.g. to stream it to a file."""
+        self.flush()
+        manifest = self._load_manifest(backup_id)
+        if manifest is not None:
+            if manifest.get('kind', 'full') == 'full':
+                yield from self.store.iter_data(manifest['chunks'])
+            else:
+                yield json.dumps(self._materialize(backup_id), separators=(',', ':')).encode()
+            return
         
-        if not self.backups_dir.exists():
-            return backups
+        state_file = self.backups_dir / backup_id / 'state.json'
+        with open(state_file, 'rb') as f:
+            yield from iter(lambda: f.read(1 << 16), b'')
+    
+    def _load_manifest(self, backup_id: str) -> Optional[Dict]:
+        """Load a chunked backup's manifest, or None for legacy backups."""
+        manifest_file = self.backups_dir / backup_id / 'manifest.json'
+        try:
+            with open(manifest_file, 'r') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
         
-        for backup_dir in self.backups_dir.iterdir():
-            if not backup_dir.is_dir():
-                continue
-            
-            metadata_file = backup_dir / 'metadata.json'
-            if metadata_file.exists():
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
-                    backups.append(metadata)
+        if manifest.get('format') != self.MANIFEST_FORMAT:
+            raise ValueError(f"Unsupported backup manifest format: {manifest.get('format')}")
+        return manifest
+    
+    def list_backups(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        List available backups, newest first, from the catalog.
         
-        return sorted(backups, key=lambda x: x['timestamp'], reverse=True)
+        Args:
+            offset: Backups to skip
+            limit: Maximum backups to return (None for all)
+        """
+        self.flush()
+        return [
+            {key: value for key, value in record.items() if key not in ('op', 'seq')}
+            for record in self.catalog.entries(offset, limit)
+        ]
     
     def delete_backup(self, backup_id: str) -> bool:
         """Delete a backup."""
+        self.flush()
         backup_dir = self.backups_dir / backup_id
         
-        if backup_dir.exists():
-            shutil.rmtree(backup_dir)
+        if backup_dir.exists() or self.catalog.get(backup_id):
+            for record in self.catalog.entries():
+                if record.get('base') == backup_id:
+                    self._rebase(record['backup_id'])
+            shutil.rmtree(backup_dir, ignore_errors=True)
+            self.catalog.remove([backup_id])
+            self._snapshots.pop(backup_id, None)
             return True
         
         return False
     
     def cleanup_old_backups(self, keep_count: int = 10) -> int:
-        """Delete old backups, keeping only the most recent."""
-        backups = self.list_backups()
+        """
+        Delete old backups, keeping only the most recent.
         
-        if len(backups) <= keep_count:
+        Expired backups are taken from the catalog in one pass, their
+        directories are removed in parallel, and the removals are recorded
+        with a single catalog append. Kept deltas whose base expires are
+        rebased to full snapshots first.
+        """
+        self.flush()
+        to_delete = [record['backup_id'] for record in self.catalog.entries(offset=keep_count)]
+        if not to_delete:
             return 0
         
-        to_delete = backups[keep_count:]
-        deleted_count = 0
+        expired = set(to_delete)
+        for record in self.catalog.entries(limit=keep_count):
+            if record.get('base') in expired:
+                self._rebase(record['backup_id'])
+        for backup_id in to_delete:
+            self._snapshots.pop(backup_id, None)
         
-        for backup in to_delete:
-            if self.delete_backup(backup['backup_id']):
-                deleted_count += 1
+        with ThreadPoolExecutor(max_workers=self.DELETE_WORKERS) as executor:
+            list(executor.map(lambda backup_id: shutil.rmtree(self.backups_dir / backup_id, ignore_errors=True),
+                              to_delete))
         
+        deleted_count = self.catalog.remove(to_delete)
+        self.collect_garbage()
         return deleted_count
+    
+    def collect_garbage(self) -> int:
+        """
+        Delete chunks no remaining backup refers to.
+        
+        Returns:
+            Number of chunks deleted
+        """
+        self.flush()
+        # Chunks are only stored under the catalog lock, so holding it means
+        # every chunk on disk belongs to a cataloged backup or to none
+        with self.catalog.locked() as catalog:
+            live = set()
+            for record in catalog.entries():
+                manifest = self._load_manifest(record['backup_id'])
+                if manifest is not None:
+                    live.update(manifest['chunks'])
+            return self.store.collect_garbage(live)
+
+
+def _state_size(state: Dict) -> int:
+    """Size of a state as written compactly to disk, in bytes."""
+    return len(json.dumps(state, separators=(',', ':')).encode())
+
+
+def _simulate_state(source: str, state: Optional[Dict], pipeline_name: str, skill_dir: str,
+                    from_version: str, migration_path: List[str], trace_memory: bool) -> Dict:
+    """
+    Run a migration chain against one state without writing anything.
+    
+    Runs in a worker process, so everything it needs is passed as plain
+    picklable values and every failure is reported rather than raised. The
+    chain runs once untraced for wall times, sizes and validation, then
+    again under tracemalloc for peak memory, which tracing would otherwise
+    inflate the times of.
+    
+    Returns:
+        Result dict with source, status, error, sizes and per-hop reports
+    """
+    result = {'source': source, 'from_version': from_version, 'status': 'failed', 'error': None,
+              'size_before': None, 'size_after': None, 'seconds': 0.0, 'hops': []}
+    # Importing a migration must not leave bytecode behind either
+    dont_write_bytecode, sys.dont_write_bytecode = sys.dont_write_bytecode, True
+    
+    try:
+        if state is None:
+            with open(source, 'r') as f:
+                state = json.load(f)
+        result['size_before'] = _state_size(state)
+        version_manager = PipelineVersionManager(pipeline_name, Path(skill_dir))
+        
+        hops = result['hops']
+        previous = {'version': from_version, 'size': result['size_before']}
+        # Backed up before the clock starts, so the first hop is timed like the rest
+        executor = MigrationExecutor(state, version_manager)
+        executor.create_backup()
+        mark = [time.perf_counter()]
+        
+        def measure(version: str, hop_state: Dict):
+            seconds = time.perf_counter() - mark[0]
+            size = _state_size(hop_state)
+            errors: List[str] = []
+            check = version_manager.state_validator.get_check(version)
+            if check is not None:
+                check(hop_state, '', errors)
+            hops.append({
+                'from_version': previous['version'],
+                'to_version': version,
+                'seconds': seconds,
+                'peak_bytes': None,
+                'size': size,
+                'size_delta': size - previous['size'],
+                'errors': errors
+            })
+            previous.update(version=version, size=size)
+            mark[0] = time.perf_counter()
+        
+        success, message = executor.apply_migrations(from_version, migration_path, on_hop=measure, validate=False)
+        result['seconds'] = sum(hop['seconds'] for hop in hops)
+        if not success:
+            result['error'] = message
+            return result
+        result['size_after'] = previous['size']
+        
+        if trace_memory:
+            peaks = iter(hops)
+            
+            def trace(_version: str, _hop_state: Dict):
+                next(peaks)['peak_bytes'] = tracemalloc.get_traced_memory()[1] - baseline[0]
+                tracemalloc.reset_peak()
+                baseline[0] = tracemalloc.get_traced_memory()[0]
+            
+            was_tracing = tracemalloc.is_tracing()
+            if not was_tracing:
+                tracemalloc.start()
+            try:
+                executor = MigrationExecutor(state, version_manager)
+                executor.create_backup()
+                tracemalloc.reset_peak()
+                baseline = [tracemalloc.get_traced_memory()[0]]
+                executor.apply_migrations(from_version, migration_path, on_hop=trace, validate=False)
+            finally:
+                if not was_tracing:
+                    tracemalloc.stop()
+        
+        result['status'] = 'invalid' if any(hop['errors'] for hop in hops) else 'ok'
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        sys.dont_write_bytecode = dont_write_bytecode
+    
+    return result
+
+
+class MigrationSimulator:
+    """
+    Dry-runs a pipeline update against real workflow states.
+    
+    Each state is migrated along the path the update would take from its
+    recorded version, in a process pool, and nothing is written: not the
+    states, the config, backups or bytecode caches. The report gives each
+    hop's wall time, tracemalloc peak, change in serialized size and
+    validation failures against the hop's schema, per state and totalled
+    per hop, to judge whether an upgrade fits a maintenance window.
+    """
+    
+    # Validation errors kept per hop in a report; the rest are only counted
+    MAX_ERRORS = 20
+    
+    def __init__(self, version_manager: PipelineVersionManager, target_version: str,
+                 workers: Optional[int] = None, trace_memory: bool = True):
+        self.version_manager = version_manager
+        self.target_version = target_version
+        self.workers = workers or os.cpu_count() or 1
+        self.trace_memory = trace_memory
+    
+    def collect_files(self, paths: List[Union[str, Path]]) -> List[Path]:
+        """Expand files and directories (searched recursively for *.json) into state files."""
+        files = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                files.extend(sorted(path.rglob('*.json')))
+            else:
+                files.append(path)
+        return files
+    
+    def simulate(self, paths: List[Union[str, Path]] = (), states: Optional[Dict[str, Dict]] = None,
+                 sample: Optional[int] = None) -> Dict:
+        """
+        Simulate the update for state files and in-memory states.
+        
+        Args:
+            paths: State files or directories containing them
+            states: In-memory states by label, such as the loaded workflow state
+            sample: Simulate only this many randomly chosen states
+            
+        Returns:
+            Report with per-state results, per-hop totals and a summary
+        """
+        started = time.perf_counter()
+        sources: List[Tuple[str, Optional[Dict]]] = list((states or {}).items())
+        sources.extend((str(path), None) for path in self.collect_files(paths))
+        if sample is not None and sample < len(sources):
+            sources = random.sample(sources, sample)
+        
+        results = []
+        pending = []
+        plans: Dict[str, Union[List[str], str]] = {}
+        for source, state in sources:
+            try:
+                from_version = self._source_version(source, state)
+            except (OSError, json.JSONDecodeError) as e:
+                results.append(self._failed(source, None, f"{type(e).__name__}: {e}"))
+                continue
+            
+            if self.version_manager._compare_versions(from_version, self.target_version) >= 0:
+                results.append({**self._failed(source, from_version, None), 'status': 'skipped'})
+                continue
+            
+            if from_version not in plans:
+                try:
+                    plans[from_version] = self.version_manager.get_migration_path(self.target_version, from_version)
+                except ValueError as e:
+                    plans[from_version] = str(e)
+            
+            plan = plans[from_version]
+            if isinstance(plan, str):
+                results.append(self._failed(source, from_version, plan))
+            else:
+                pending.append((source, state, from_version, plan))
+        
+        results.extend(self._run(pending))
+        results.sort(key=lambda result: result['source'])
+        for result in results:
+            for hop in result.get('hops', ()):
+                hop['error_count'] = len(hop['errors'])
+                del hop['errors'][self.MAX_ERRORS:]
+        
+        return {
+            'pipeline': self.version_manager.pipeline_name,
+            'target_version': self.target_version,
+            'summary': self._summarize(results, time.perf_counter() - started),
+            'hops': self._hop_totals(results),
+            'states': results
+        }
+    
+    def _run(self, pending: List[Tuple[str, Optional[Dict], str, List[str]]]):
+        """Yield worker results as states finish."""
+        args = (self.version_manager.pipeline_name, str(self.version_manager.skill_dir))
+        
+        if self.workers <= 1 or len(pending) <= 1:
+            for source, state, from_version, plan in pending:
+                yield _simulate_state(source, state, *args, from_version, plan, self.trace_memory)
+            return
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(_simulate_state, source, state, *args, from_version, plan, self.trace_memory):
+                    (source, from_version)
+                for source, state, from_version, plan in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield self._failed(*futures[future], f"Worker failed: {e}")
+    
+    def _source_version(self, source: str, state: Optional[Dict]) -> str:
+        """Version a state was written with, defaulting to the pipeline's current version."""
+        if state is None:
+            with open(source, 'r') as f:
+                state = json.load(f)
+        version = state.get('version') if isinstance(state, dict) else None
+        return version if isinstance(version, str) else self.version_manager.current_version
+    
+    @staticmethod
+    def _failed(source: str, from_version: Optional[str], error: Optional[str]) -> Dict:
+        return {'source': source, 'from_version': from_version, 'status': 'failed', 'error': error,
+                'size_before': None, 'size_after': None, 'seconds': 0.0, 'hops': []}
+    
+    @staticmethod
+    def _summarize(results: List[Dict], elapsed: float) -> Dict:
+        summary = {status: sum(1 for r in results if r['status'] == status)
+                   for status in ('ok', 'invalid', 'failed', 'skipped')}
+        summary['total'] = len(results)
+        migrated = [r for r in results if r['size_after'] is not None]
+        # Time a serial update of every state would take, and of the slowest one
+        summary['migration_seconds'] = sum(r['seconds'] for r in results)
+        summary['slowest_seconds'] = max((r['seconds'] for r in results), default=0.0)
+        summary['size_before'] = sum(r['size_before'] for r in migrated)
+        summary['size_after'] = sum(r['size_after'] for r in migrated)
+        summary['elapsed'] = elapsed
+        summary['failures'] = {r['source']: r['error'] for r in results if r['status'] == 'failed'}
+        return summary
+    
+    @staticmethod
+    def _hop_totals(results: List[Dict]) -> List[Dict]:
+        totals: Dict[Tuple[str, str], Dict] = {}
+        for result in results:
+            for hop in result['hops']:
+                total = totals.setdefault((hop['from_version'], hop['to_version']), {
+                    'from_version': hop['from_version'], 'to_version': hop['to_version'], 'states': 0,
+                    'seconds': 0.0, 'max_seconds': 0.0, 'peak_bytes': None, 'size_delta': 0, 'invalid_states': 0
+                })
+                total['states'] += 1
+                total['seconds'] += hop['seconds']
+                total['max_seconds'] = max(total['max_seconds'], hop['seconds'])
+                if hop['peak_bytes'] is not None:
+                    total['peak_bytes'] = max(total['peak_bytes'] or 0, hop['peak_bytes'])
+                total['size_delta'] += hop['size_delta']
+                total['invalid_states'] += 1 if hop['error_count'] else 0
+        return list(totals.values())
+    
+    @staticmethod
+    def format_table(report: Dict) -> str:
+        """Render a simulation report as a plain-text table."""
+        rows = [('Hop', 'States', 'Total s', 'Max s', 'Peak KiB', 'Size delta', 'Invalid')]
+        for hop in report['hops']:
+            peak = hop['peak_bytes']
+            rows.append((
+                f"{hop['from_version']} -> {hop['to_version']}",
+                str(hop['states']),
+                f"{hop['seconds']:.3f}",
+                f"{hop['max_seconds']:.3f}",
+                '-' if peak is None else f"{peak / 1024:.1f}",
+                f"{hop['size_delta']:+d}",
+                str(hop['invalid_states'])
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = [f"Simulated update of {report['pipeline']} to {report['target_version']}", '']
+        for index, row in enumerate(rows):
+            lines.append('  '.join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                                   for i, (cell, width) in enumerate(zip(row, widths))))
+            if index == 0:
+                lines.append('  '.join('-' * width for width in widths))
+        
+        summary = report['summary']
+        lines.append('')
+        lines.append(f"States: {summary['total']} ({summary['ok']} ok, {summary['invalid']} invalid, "
+                     f"{summary['failed']} failed, {summary['skipped']} skipped)")
+        lines.append(f"Migration time: {summary['migration_seconds']:.3f}s serial, "
+                     f"slowest state {summary['slowest_seconds']:.3f}s")
+        lines.append(f"Size: {summary['size_before']} -> {summary['size_after']} bytes")
+        for result in report['states']:
+            for hop in result['hops']:
+                for error in hop['errors']:
+                    lines.append(f"Invalid at {hop['to_version']}: {result['source']}: {error}")
+                if hop['error_count'] > len(hop['errors']):
+                    lines.append(f"Invalid at {hop['to_version']}: {result['source']}: "
+                                 f"... {hop['error_count'] - len(hop['errors'])} more")
+        for source, error in summary['failures'].items():
+            lines.append(f"Failed: {source}: {error}")
+        return '\n'.join(lines)
 
 
 class PipelineUpdateManager:
-    """High-level manager for pipeline updates."""
+    """
+    High-level manager for pipeline updates.
     
-    def __init__(self, pipeline_name: str, skill_dir: Path):
+    Cheap to construct: versions and migrations are discovered by the
+    version manager on first use, and the backups directory is only
+    created once a command needs backups.
+    
+    With `async_backups`, the backup taken before an update or rollback is
+    written on the backup manager's background thread while the command
+    migrates or patches the state; the command waits for the backup to be
+    durable before it commits anything or reports success. This pays off on
+    storage with slow fsyncs; on a fast local disk the writer mostly competes
+    with the migration for the GIL and both modes take about as long (see
+    the async-backup benchmark).
+    """
+    
+    LOCK_FILE = '.update.lock'
+    JOURNAL_FILE = 'update.journal'
+    CHECKPOINT_FILE = 'update-checkpoint.json'
+    INVERSES_FILE = 'migration-inverses.json'
+    # Inverse patches kept for rollback, newest last
+    INVERSE_LIMIT = 64
+    
+    def __init__(self, pipeline_name: str, skill_dir: Path, async_backups: bool = False):
         self.pipeline_name = pipeline_name
         self.skill_dir = skill_dir
+        self.async_backups = async_backups
         self.version_manager = PipelineVersionManager(pipeline_name, skill_dir)
-        self.backup_manager = BackupManager(skill_dir / 'backups')
-        self.validator = StateValidator(skill_dir / 'versions')
+        self._backup_manager: Optional[BackupManager] = None
+    
+    @property
+    def validator(self) -> StateValidator:
+        """State validator shared with the version manager's migrations."""
+        return self.version_manager.state_validator
+    
+    @property
+    def backup_manager(self) -> BackupManager:
+        """Backup store, opened (and its directory created) on first use."""
+        if self._backup_manager is None:
+            self._backup_manager = BackupManager(self.skill_dir / 'backups')
+        return self._backup_manager
+    
+    def _start_backup(self, state: Dict, metadata: Dict, state_hash: str) -> Future:
+        """Back up a state, in the background if async backups are enabled."""
+        if self.async_backups:
+            return self.backup_manager.create_backup_async(state, metadata, state_hash)
+        backup: Future = Future()
+        try:
+            backup.set_result(self.backup_manager.create_backup(state, metadata, state_hash))
+        except (OSError, FileLockError, ValueError) as e:
+            backup.set_exception(e)
+        return backup
+    
+    @staticmethod
+    def _finish_backup(backup: Future) -> Tuple[Optional[str], str]:
+        """Wait until a backup is durable; returns its ID, or None and the reason it failed."""
+        try:
+            return backup.result(), ''
+        except (OSError, FileLockError, ValueError) as e:
+            return None, f"Backup failed: {e}"
+    
+    @staticmethod
+    def _discard_backup(backup: Future):
+        """Drop a backup that is no longer needed, waiting for it if it is already being written."""
+        if not backup.cancel():
+            wait([backup])
     
     def check_for_updates(self) -> Tuple[bool, Optional[str]]:
         """Check if updates are available."""
         return self.version_manager.check_updates()
     
-    def update_to_version(self, target_version: str, state: Dict, dry_run: bool = False) -> Tuple[bool, str]:
-        """Update pipeline to target version."""
+    def update_to_version(self, target_version: str, state: Dict, dry_run: bool = False,
+                          state_files: Optional[Dict[Path, Optional[str]]] = None,
+                          debug: bool = False) -> Tuple[bool, str]:
+        """
+        Update pipeline to target version.
+        
+        The migrated state files and the new config version are committed
+        as one transaction: each is staged beside its file and all are
+        swapped in together, so a failure at any point leaves the old
+        state and version in place. Every completed hop is checkpointed,
+        and rerunning an interrupted update with the same state resumes
+        after the last completed hop.
+        
+        Args:
+            target_version: Version to migrate to
+            state: Current state; it is not modified
+            dry_run: Only report the migration path
+            state_files: Files to write the migrated state to, each mapped
+                to the top-level key it holds (None for the whole state)
+            debug: Validate after every hop instead of once at the end
+        """
+        if dry_run:
+            migration_path, error = self._plan_update(target_version)
+            if migration_path is None:
+                return False, error
+            return True, f"Would migrate through: {' -> '.join(migration_path)}"
+        
+        with FileLock(self.skill_dir / self.LOCK_FILE):
+            if self._recover_update(self.skill_dir):
+                self.version_manager.current_version = self.version_manager.load_current_version()
+            
+            migration_path, error = self._plan_update(target_version)
+            if migration_path is None:
+                return False, error
+            return self._migrate_and_commit(target_version, migration_path, state, state_files or {}, debug)
+    
+    def simulate_update(self, target_version: str, paths: List[Union[str, Path]] = (),
+                        states: Optional[Dict[str, Dict]] = None, sample: Optional[int] = None,
+                        workers: Optional[int] = None) -> Dict:
+        """
+        Dry-run an update against workflow states and report its cost.
+        
+        See MigrationSimulator; nothing is locked or written.
+        """
+        simulator = MigrationSimulator(self.version_manager, target_version, workers)
+        return simulator.simulate(paths, states, sample)
+    
+    def _plan_update(self, target_version: str) -> Tuple[Optional[List[str]], str]:
+        """Get the migration path to a version, or None and the reason there is none."""
         # Check if update is needed
         if self.version_manager._compare_versions(target_version, self.version_manager.current_version) <= 0:
-            return False, f"Already at version {target_version} or newer"
+            return None, f"Already at version {target_version} or newer"
         
         # Get migration path
         try:
-            migration_path = self.version_manager.get_migration_path(target_version)
+            return self.version_manager.get_migration_path(target_version), ''
         except ValueError as e:
-            return False, str(e)
-        
-        if dry_run:
-            return True, f"Would migrate through: {' -> '.join(migration_path)}"
+            return None, str(e)
+    
+    def _migrate_and_commit(self, target_version: str, migration_path: List[str], state: Dict,
+                            state_files: Dict[Path, Optional[str]], debug: bool) -> Tuple[bool, str]:
+        """Run the migrations, checkpointing each hop, then commit all files at once; call under the lock."""
+        from_version = self.version_manager.current_version
+        executor = MigrationExecutor(state, self.version_manager)
+        source_hash = executor.state_hash
         
-        # Create backup
-        backup_id = self.backup_manager.create_backup(state, {
+        # Create backup; a retry with the same state reuses the earlier one
+        backup = self._start_backup(state, {
             'pipeline': self.pipeline_name,
-            'from_version': self.version_manager.current_version,
+            'from_version': from_version,
             'to_version': target_version
-        })
+        }, source_hash)
         
-        # Execute migrations
-        executor = MigrationExecutor(state, self.version_manager)
-        current_version = self.version_manager.current_version
+        # Inverse patches of this update's hops, oldest first
+        inverses: List[Dict] = []
+        
+        # Resume after the last hop an interrupted run of this same update completed
+        resumed_at = None
+        full_path = list(migration_path)
+        checkpoint = self._load_checkpoint()
+        if (checkpoint and checkpoint.get('source_hash') == source_hash
+                and checkpoint.get('from_version') == from_version
+                and checkpoint.get('target_version') == target_version
+                and checkpoint.get('migration_path') == full_path
+                and checkpoint.get('version') in migration_path[:-1]):
+            resumed_at = checkpoint['version']
+            migration_path = migration_path[migration_path.index(resumed_at) + 1:]
+            executor = MigrationExecutor(checkpoint['state'], self.version_manager)
+            inverses = checkpoint.get('inverses', [])
+        else:
+            # A checkpoint left by a different update, or an unreadable one, can never be resumed
+            (self.skill_dir / self.CHECKPOINT_FILE).unlink(missing_ok=True)
+        
+        previous = {'version': resumed_at or from_version, 'state': executor.state}
+        
+        def after_hop(version: str, hop_state: Dict):
+            # States share unchanged subtrees, so the diff only walks what the hop changed
+            inverses.append({
+                'from_version': previous['version'],
+                'to_version': version,
+                'inverse': diff(hop_state, previous['state'])
+            })
+            previous.update(version=version, state=hop_state)
+            
+            # The final state is committed right away and needs no checkpoint
+            if version != target_version:
+                atomic_write_bytes(self.skill_dir / self.CHECKPOINT_FILE, json.dumps({
+                    'source_hash': source_hash,
+                    'from_version': from_version,
+                    'target_version': target_version,
+                    'migration_path': full_path,
+                    'version': version,
+                    'state': hop_state,
+                    'inverses': inverses
+                }, separators=(',', ':')).encode())
         
-        for next_version in migration_path:
-            success, message = executor.apply_migration(current_version, next_version)
-            if not success:
-                return False, f"Migration failed: {message}\nBackup available: {backup_id}"
-            current_version = next_version
+        success, message = executor.apply_migrations(
+            resumed_at or from_version, migration_path, validate_each=debug, on_hop=after_hop
+        )
+        # Nothing is committed or reported before the backup is durable
+        backup_id, backup_error = self._finish_backup(backup)
+        if not success:
+            return False, f"Migration failed: {message}\n" + (backup_error or f"Backup available: {backup_id}")
+        if backup_error:
+            return False, f"{backup_error}\nThe update was not applied"
         
-        # Update config version
-        self._update_config_version(target_version)
+        try:
+            self._commit(executor.state, target_version, state_files, self._load_inverses() + inverses)
+        except (OSError, FileLockError) as e:
+            return False, f"Failed to save migrated state: {e}\nBackup available: {backup_id}"
+        
+        (self.skill_dir / self.CHECKPOINT_FILE).unlink(missing_ok=True)
         
-        return True, f"Successfully updated to version {target_version}\nBackup: {backup_id}"
+        message = f"Successfully updated to version {target_version}\nBackup: {backup_id}"
+        if resumed_at:
+            message += f"\nResumed after version {resumed_at}"
+        return True, message
+    
+    def _commit(self, state: Dict, version: str, state_files: Dict[Path, Optional[str]], inverses: List[Dict]):
+        """Write the state files, the inverse-patch log and the config version as one transaction."""
+        config = self._load_config()
+        config['version'] = version
+        with FileTransaction(self.skill_dir / self.JOURNAL_FILE) as transaction:
+            for path, key in state_files.items():
+                if key is None:
+                    transaction.stage_json(path, state)
+                elif key in state:
+                    transaction.stage_json(path, state[key])
+            transaction.stage_json(self.skill_dir / self.INVERSES_FILE,
+                                   {'inverses': inverses[-self.INVERSE_LIMIT:]}, indent=None)
+            transaction.stage_json(self.skill_dir / 'config.json', config)
+            transaction.commit()
+        self.version_manager.current_version = version
     
-    def rollback_to_version(self, target_version: str, state: Dict, backup_id: Optional[str] = None) -> Tuple[bool, str]:
-        """Rollback pipeline to target version."""
-        # If backup_id provided, restore from backup
-        if backup_id:
-            restored_state = self.backup_manager.restore_backup(backup_id)
-            if restored_state:
+    def _load_inverses(self) -> List[Dict]:
+        """Load the recorded inverse patches of past migration hops, oldest first."""
+        try:
+            with open(self.skill_dir / self.INVERSES_FILE, 'r') as f:
+                return json.load(f).get('inverses', [])
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+    
+    def _load_checkpoint(self) -> Optional[Dict]:
+        """Load the hop checkpoint of an interrupted update, if any."""
+        try:
+            with open(self.skill_dir / self.CHECKPOINT_FILE, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+    
+    @classmethod
+    def recover_update(cls, skill_dir: Path) -> bool:
+        """
+        Finish committing an update that was interrupted mid-commit.
+        
+        Takes the update lock, so a commit still in progress in another
+        process is never rolled forward under it. Without a journal there
+        is nothing to recover and no lock is taken.
+        
+        Returns:
+            True if an interrupted commit was completed
+        
+        Raises:
+            FileLockError: If the update lock cannot be acquired
+        """
+        if not (skill_dir / cls.JOURNAL_FILE).exists():
+            return False
+        with FileLock(skill_dir / cls.LOCK_FILE):
+            return cls._recover_update(skill_dir)
+    
+    @classmethod
+    def _recover_update(cls, skill_dir: Path) -> bool:
+        """recover_update for callers already holding the update lock."""
+        return FileTransaction.recover(skill_dir / cls.JOURNAL_FILE)
+    
+    def rollback_to_version(self, target_version: str, state: Dict, backup_id: Optional[str] = None,
+                            state_files: Optional[Dict[Path, Optional[str]]] = None) -> Tuple[bool, str]:
+        """
+        Rollback pipeline to target version.
+        
+        Without a backup ID, the inverse patches recorded by earlier updates
+        are applied newest first, undoing each hop without reading a full
+        backup or running migrations. Changes made to the state since the
+        update are kept unless they touch the same paths. With a backup ID,
+        the backup is restored instead.
+        
+        The rolled-back state is written to `state_files` (see
+        update_to_version) together with the config version, and `state`
+        is updated in place.
+        """
+        with FileLock(self.skill_dir / self.LOCK_FILE):
+            if self._recover_update(self.skill_dir):
+                self.version_manager.current_version = self.version_manager.load_current_version()
+            inverses = self._load_inverses()
+            
+            # If backup_id provided, restore from backup
+            if backup_id:
+                restored_state = self.backup_manager.restore_backup(backup_id)
+                if not restored_state:
+                    return False, f"Backup {backup_id} not found"
+                version = restored_state.get('version', target_version)
+                # Inverse patches of hops past the restored version no longer apply
+                kept = [entry for entry in inverses
+                        if self.version_manager._compare_versions(entry['to_version'], version) <= 0]
+                try:
+                    self._commit(restored_state, version, state_files or {}, kept)
+                except (OSError, FileLockError) as e:
+                    return False, f"Failed to save restored state: {e}"
                 state.clear()
                 state.update(restored_state)
-                self._update_config_version(state.get('version', '1.0.0'))
                 return True, f"Restored from backup {backup_id}"
-            else:
-                return False, f"Backup {backup_id} not found"
-        
-        # Otherwise, rollback through versions
-        try:
-            rollback_path = self.version_manager.get_rollback_path(target_version)
-        except ValueError as e:
-            return False, str(e)
-        
-        # Create backup before rollback
-        backup_id = self.backup_manager.create_backup(state, {
-            'pipeline': self.pipeline_name,
-            'from_version': self.version_manager.current_version,
-            'to_version': target_version,
-            'operation': 'rollback'
-        })
+            
+            # Otherwise, rollback through versions
+            try:
+                self.version_manager.get_rollback_path(target_version)
+            except ValueError as e:
+                return False, str(e)
+            
+            # Create backup before rollback; an async backup is written while the patches apply
+            backup = self._start_backup(state, {
+                'pipeline': self.pipeline_name,
+                'from_version': self.version_manager.current_version,
+                'to_version': target_version,
+                'operation': 'rollback'
+            }, merkle_hash(state))
+            
+            rolled_back, error = self._apply_inverses(state, target_version, inverses)
+            if rolled_back is None:
+                self._discard_backup(backup)
+                return False, error
+            backup_id, backup_error = self._finish_backup(backup)
+            if backup_error:
+                return False, f"{backup_error}\nThe rollback was not applied"
+            
+            try:
+                self._commit(rolled_back, target_version, state_files or {}, inverses)
+            except (OSError, FileLockError) as e:
+                return False, f"Failed to save rolled back state: {e}\nBackup available: {backup_id}"
+            state.clear()
+            state.update(rolled_back)
+            
+            return True, f"Rolled back to version {target_version}\nBackup: {backup_id}"
+    
+    def _apply_inverses(self, state: Dict, target_version: str,
+                        inverses: List[Dict]) -> Tuple[Optional[Dict], str]:
+        """
+        Undo recorded hops, newest first, down to the target version.
         
-        # Rollback (simplified - would need rollback migrations)
-        self._update_config_version(target_version)
+        Entries used are popped from `inverses`.
         
-        return True, f"Rolled back to version {target_version}\nBackup: {backup_id}"
+        Returns:
+            The rolled back state, or None and the reason it cannot be reached
+        """
+        rolled_back, current = state, self.version_manager.current_version
+        while self.version_manager._compare_versions(current, target_version) > 0:
+            if not inverses or inverses[-1]['to_version'] != current:
+                return None, (f"No recorded inverse migration from {current}; "
+                              f"restore a backup with --backup instead")
+            entry = inverses.pop()
+            try:
+                # A field the hop added may have been removed since; it is gone either way
+                rolled_back = apply_patch(rolled_back, entry['inverse'], missing_ok=True)
+            except ValueError as e:
+                return None, f"Cannot undo the migration to {current}: {e}"
+            current = entry['from_version']
+        if current != target_version:
+            return None, f"Version {target_version} was skipped by a recorded migration; roll back to {current}"
+        return rolled_back, ''
     
-    def _update_config_version(self, version: str):
-        """Update version in config file."""
+    def _load_config(self) -> Dict:
+        """Load the pipeline config file."""
         config_file = self.skill_dir / 'config.json'
         
         if config_file.exists():
             with open(config_file, 'r') as f:
-                config = json.load(f)
-        else:
-            config = {}
-        
-        config['version'] = version
-        
-        with open(config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+                return json.load(f)
+        return {}
     
     def list_versions(self) -> List[str]:
         """List all available versions."""
@@ -13,12 +13,17 @@ from typing import Optional
 # Import skill manager classes
 sys.path.insert(0, str(Path(__file__).parent))
 from skill_manager import (
-    SkillVersionManager,
     SkillRegistry,
     SkillDependencyResolver,
-    SkillCompatibilityChecker
+    SkillCompatibilityChecker,
+    SkillLockfile,
+    BulkStateMigrator
 )
 
+sys.path.insert(0, str(Path(__file__).parent / 'utils'))
+from skill_archive import pack_skills
+from skill_repository import SkillRepository, SkillRepositoryError
+
 
 class SkillCLI:
     """CLI for skill management."""
@@ -110,6 +115,7 @@ class SkillCLI:
         print(f"Versions for {skill_name}:")
         print()
         
+        previous = None
         for version in skill.available_versions:
             info = skill.get_version_info(version)
             if info:
@@ -122,10 +128,11 @@ class SkillCLI:
                 if len(caps) > 3:
                     print(f"      ... and {len(caps) - 3} more")
                 
-                breaking = info.get('breaking_changes', [])
+                breaking = skill.breaking_changes.count_between(previous or '0.0.0', version)
                 if breaking:
-                    print(f"    Breaking Changes: {len(breaking)}")
+                    print(f"    Breaking Changes: {breaking}")
                 print()
+            previous = version
         
         return 0
     
@@ -143,12 +150,14 @@ class SkillCLI:
             if not skill:
                 continue
             
-            if skill.available_versions:
-                latest = max(skill.available_versions, key=skill._parse_version)
+            latest = skill.latest_version()
+            if latest:
                 if skill._compare_versions(latest, skill.current_version) > 0:
                     print(f"Update available for {skill_name}:")
                     print(f"  Current: {skill.current_version}")
                     print(f"  Latest: {latest}")
+                    for change in skill.breaking_changes.between(skill.current_version, latest):
+                        print(f"  ! {change['version']}: {change['description']}")
                     updates_found = True
         
         if not updates_found:
@@ -159,19 +168,32 @@ class SkillCLI:
         
         return 0
     
-    def check_compatibility(self, pipeline_config_path: str) -> int:
-        """Check pipeline compatibility with available skills."""
-        config_path = Path(pipeline_config_path)
-        
-        if not config_path.exists():
-            print(f"Pipeline config not found: {pipeline_config_path}")
-            return 1
+    def check_compatibility(self, pipeline_config_paths: list, workers: Optional[int] = None) -> int:
+        """Check compatibility of one or more pipelines with available skills."""
+        pipeline_configs = []
         
-        with open(config_path, 'r') as f:
-            pipeline_config = json.load(f)
+        for pipeline_config_path in pipeline_config_paths:
+            config_path = Path(pipeline_config_path)
+            
+            if not config_path.exists():
+                print(f"Pipeline config not found: {pipeline_config_path}")
+                return 1
+            
+            with open(config_path, 'r') as f:
+                pipeline_configs.append(json.load(f))
         
-        report = self.checker.generate_compatibility_report(pipeline_config)
+        reports = self.checker.generate_compatibility_reports(pipeline_configs, workers, persist=True)
         
+        exit_code = 0
+        for index, report in enumerate(reports):
+            if index:
+                print()
+            if self._print_compatibility_report(report):
+                exit_code = 1
+        return exit_code
+    
+    def _print_compatibility_report(self, report: dict) -> int:
+        """Print a compatibility report, returning 1 if it is incompatible."""
         print(f"Compatibility Report for: {report['pipeline']}")
         print(f"Overall Status: {'✓ Compatible' if report['compatible'] else '✗ Incompatible'}")
         print()
@@ -211,14 +233,18 @@ class SkillCLI:
         return 0 if report['compatible'] else 1
     
     def find_skill_for_capability(self, capability: str) -> int:
-        """Find skills that provide a specific capability."""
-        results = self.registry.find_skill_for_capability(capability)
+        """Find skills that provide a capability or match a boolean query."""
+        try:
+            results = self.registry.query(capability)
+        except ValueError as e:
+            print(f"Invalid query: {e}")
+            return 1
         
         if not results:
-            print(f"No skills found providing capability: {capability}")
+            print(f"No skills found matching: {capability}")
             return 0
         
-        print(f"Skills providing '{capability}':")
+        print(f"Skills matching '{capability}':")
         print()
         
         for skill_name, version in results:
@@ -226,6 +252,152 @@ class SkillCLI:
         
         return 0
     
+    def lock(self, pipeline_config_path: str, output: Optional[str] = None) -> int:
+        """Resolve a pipeline config and write its skills.lock."""
+        lockfile = SkillLockfile(self.skills_dir, Path(pipeline_config_path), Path(output) if output else None)
+        success, skill_versions, errors = lockfile.generate(self.registry)
+        
+        if not success:
+            print("✗ Failed to resolve pipeline skills:")
+            for error in errors:
+                print(f"  - {error}")
+            return 1
+        
+        print(f"✓ Wrote {lockfile.lock_path}")
+        for skill_name, version in sorted(skill_versions.items()):
+            print(f"  {skill_name} v{version}")
+        return 0
+    
+    def verify_lock(self, pipeline_config_path: str, lock_path: Optional[str] = None) -> int:
+        """Verify a skills.lock against the pipeline config and installed skills."""
+        lockfile = SkillLockfile(self.skills_dir, Path(pipeline_config_path), Path(lock_path) if lock_path else None)
+        is_valid, errors = lockfile.verify()
+        
+        if is_valid:
+            print(f"✓ {lockfile.lock_path} is up to date.")
+            return 0
+        
+        print(f"✗ {lockfile.lock_path} is stale:")
+        for error in errors:
+            print(f"  - {error}")
+        return 1
+    
+    def resolve(self, pipeline_config_path: str, lock_path: Optional[str] = None) -> int:
+        """
+        Resolve a pipeline's skill versions at startup.
+        
+        A current skills.lock is trusted after verifying its hashes; only a
+        missing or stale lock runs full resolution, which rewrites it.
+        """
+        lockfile = SkillLockfile(self.skills_dir, Path(pipeline_config_path), Path(lock_path) if lock_path else None)
+        success, skill_versions, errors = lockfile.resolve(self.registry)
+        
+        if not success:
+            print("✗ Failed to resolve pipeline skills:")
+            for error in errors:
+                print(f"  - {error}")
+            return 1
+        
+        print(f"✓ Pipeline skills locked in {lockfile.lock_path}:")
+        for skill_name, version in sorted(skill_versions.items()):
+            print(f"  {skill_name} v{version}")
+        return 0
+    
+    def migrate_states(self, skill_name: str, to_version: str, paths: list,
+                       from_version: Optional[str] = None, workers: Optional[int] = None,
+                       checkpoint: Optional[str] = None) -> int:
+        """Migrate workflow state files to a new skill version."""
+        skill = self.registry.get_skill(skill_name)
+        
+        if not skill:
+            print(f"Skill not found: {skill_name}")
+            return 1
+        
+        if to_version not in skill.versions:
+            print(f"Version {to_version} of {skill_name} not found")
+            return 1
+        
+        migrator = BulkStateMigrator(
+            skill, to_version, workers=workers,
+            checkpoint_path=Path(checkpoint) if checkpoint else None,
+            default_from_version=from_version
+        )
+        
+        symbols = {'migrated': '✓', 'skipped': '-', 'resumed': '↻', 'failed': '✗'}
+        
+        def report(result):
+            line = f"  {symbols[result['status']]} {result['path']}"
+            if result['error']:
+                line += f": {result['error']}"
+            print(line, flush=True)
+        
+        print(f"Migrating states to {skill_name} v{to_version}...")
+        summary = migrator.migrate(paths, on_progress=report)
+        
+        print(f"\n{summary['migrated']} migrated, {summary['skipped']} already current, "
+              f"{summary['resumed']} resumed, {summary['failed']} failed "
+              f"({summary['total']} files in {summary['elapsed']:.2f}s)")
+        
+        if summary['failed'] and checkpoint:
+            print(f"Rerun with --checkpoint {checkpoint} to retry failed files.")
+        
+        return 1 if summary['failed'] else 0
+    
+    def pack(self, skill_names: list, output: str) -> int:
+        """Pack skills into a single zip archive with a central index."""
+        if self.registry.archive is not None:
+            print("Cannot pack from a skill archive; use a skills directory.")
+            return 1
+        
+        try:
+            index = pack_skills(self.skills_dir, Path(output), skill_names or None)
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+        
+        print(f"✓ Packed {len(index['skills'])} skill(s) into {output}")
+        return 0
+    
+    def publish(self, repository: str, skill_names: list) -> int:
+        """Publish skill versions to a repository."""
+        try:
+            repo = SkillRepository(repository)
+            published = repo.publish(self.skills_dir, skill_names or None)
+        except SkillRepositoryError as e:
+            print(f"✗ {e}")
+            return 1
+        
+        for skill_name, version in published:
+            print(f"  ✓ {skill_name} v{version}")
+        print(f"Published {len(published)} new or changed version(s) to {repo.path}")
+        return 0
+    
+    def sync(self, repository: str, skill_names: list, workers: Optional[int] = None) -> int:
+        """Sync new or changed skill versions from a repository."""
+        if self.registry.archive is not None:
+            print("Cannot sync into a skill archive; use a skills directory.")
+            return 1
+        
+        try:
+            repo = SkillRepository(repository)
+            summary = repo.sync(self.skills_dir, skill_names or None, workers)
+        except SkillRepositoryError as e:
+            print(f"✗ {e}")
+            return 1
+        
+        for skill_name, version in summary['synced']:
+            print(f"  ✓ {skill_name} {'v' + version if version else '(new skill)'}")
+        for item, error in summary['failed'].items():
+            print(f"  ✗ {item}: {error}")
+        
+        # Update the registry and its persisted index for the skills that changed
+        for skill_name in sorted({skill_name for skill_name, _ in summary['synced']}):
+            self.registry.reload_skill(skill_name)
+        self.registry.get_compatibility_index().refresh()
+        
+        print(f"\n{len(summary['synced'])} synced, {summary['unchanged']} unchanged, {len(summary['failed'])} failed")
+        return 1 if summary['failed'] else 0
+    
     def validate_workflow_state(self, state_path: str) -> int:
         """Validate workflow state against current skill versions."""
         state_file = Path(state_path)
@@ -255,6 +427,8 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
+    parser.add_argument('--skills-dir', help='Skills directory or packed skill archive (default: .iflow/skills)')
+    
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # List commands
@@ -275,23 +449,62 @@ def main():
     
     # Compatibility command
     compat_parser = subparsers.add_parser('check-compatibility', help='Check pipeline compatibility')
-    compat_parser.add_argument('config', help='Pipeline config file path')
+    compat_parser.add_argument('config', nargs='+', help='Pipeline config file paths')
+    compat_parser.add_argument('--workers', type=int, help='Threads used to build reports')
     
     # Find capability command
-    find_parser = subparsers.add_parser('find', help='Find skills by capability')
-    find_parser.add_argument('capability', help='Capability to search for')
+    find_parser = subparsers.add_parser('find', help='Find skills by capability or query')
+    find_parser.add_argument('capability', nargs='+',
+                             help='Capability or query, e.g. "capability:rest AND version>=2.0.0"')
     
     # Validate state command
     validate_parser = subparsers.add_parser('validate-state', help='Validate workflow state')
     validate_parser.add_argument('state', help='Workflow state file path')
     
+    # Lockfile commands
+    lock_parser = subparsers.add_parser('lock', help='Resolve a pipeline and write skills.lock')
+    lock_parser.add_argument('config', help='Pipeline config file path')
+    lock_parser.add_argument('--output', help='Lockfile path (default: skills.lock next to config)')
+    
+    verify_lock_parser = subparsers.add_parser('verify-lock', help='Verify skills.lock by content hashes')
+    verify_lock_parser.add_argument('config', help='Pipeline config file path')
+    verify_lock_parser.add_argument('--lock', help='Lockfile path (default: skills.lock next to config)')
+    
+    resolve_parser = subparsers.add_parser('resolve', help='Resolve pipeline skills at startup, from skills.lock when current')
+    resolve_parser.add_argument('config', help='Pipeline config file path')
+    resolve_parser.add_argument('--lock', help='Lockfile path (default: skills.lock next to config)')
+    
+    # Bulk state migration
+    migrate_parser = subparsers.add_parser('migrate-states', help='Migrate workflow state files to a skill version')
+    migrate_parser.add_argument('skill', help='Skill name')
+    migrate_parser.add_argument('to_version', help='Target skill version')
+    migrate_parser.add_argument('paths', nargs='+', help='State files or directories of state files')
+    migrate_parser.add_argument('--from', dest='from_version', help='Source version for states that do not record one')
+    migrate_parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    migrate_parser.add_argument('--checkpoint', help='Checkpoint file for resuming an interrupted run')
+    
+    # Pack command
+    pack_parser = subparsers.add_parser('pack', help='Bundle skills into a single zip archive')
+    pack_parser.add_argument('skills', nargs='*', help='Skills to pack (default: all)')
+    pack_parser.add_argument('--output', default='skills.zip', help='Archive path (default: skills.zip)')
+    
+    # Repository commands
+    sync_parser = subparsers.add_parser('sync', help='Sync skill versions from a repository')
+    sync_parser.add_argument('repository', help='Repository directory or file:// URL')
+    sync_parser.add_argument('skills', nargs='*', help='Skills to sync (default: all)')
+    sync_parser.add_argument('--workers', type=int, help='Parallel copy threads')
+    
+    publish_parser = subparsers.add_parser('publish', help='Publish skill versions to a repository')
+    publish_parser.add_argument('repository', help='Repository directory or file:// URL')
+    publish_parser.add_argument('skills', nargs='*', help='Skills to publish (default: all)')
+    
     args = parser.parse_args()
     
     if not args.command:
         parser.print_help()
         return 0
     
-    cli = SkillCLI()
+    cli = SkillCLI(Path(args.skills_dir) if args.skills_dir else None)
     
     if args.command == 'list':
         return cli.list_skills(args.details)
@@ -302,11 +515,26 @@ def main():
     elif args.command == 'check-updates':
         return cli.check_updates(args.skill)
     elif args.command == 'check-compatibility':
-        return cli.check_compatibility(args.config)
+        return cli.check_compatibility(args.config, args.workers)
     elif args.command == 'find':
-        return cli.find_skill_for_capability(args.capability)
+        return cli.find_skill_for_capability(' '.join(args.capability))
     elif args.command == 'validate-state':
         return cli.validate_workflow_state(args.state)
+    elif args.command == 'lock':
+        return cli.lock(args.config, args.output)
+    elif args.command == 'verify-lock':
+        return cli.verify_lock(args.config, args.lock)
+    elif args.command == 'resolve':
+        return cli.resolve(args.config, args.lock)
+    elif args.command == 'sync':
+        return cli.sync(args.repository, args.skills, args.workers)
+    elif args.command == 'publish':
+        return cli.publish(args.repository, args.skills)
+    elif args.command == 'pack':
+        return cli.pack(args.skills, args.output)
+    elif args.command == 'migrate-states':
+        return cli.migrate_states(args.skill, args.to_version, args.paths,
+                                  args.from_version, args.workers, args.checkpoint)
     else:
         print(f"Unknown command: {args.command}")
         return 1
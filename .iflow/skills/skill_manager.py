@@ -4,13 +4,32 @@ Skill Version Manager
 Manages skill versioning, capabilities, and compatibility with pipelines.
 """
 
+import hashlib
 import json
+import os
+import re
 import shutil
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from itertools import pairwise
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Set, Any, Callable, Union
 from copy import deepcopy
 
+sys.path.insert(0, str(Path(__file__).parent / 'utils'))
+from versioning import Version, SortedVersions, compare_versions
+from migration_loader import MigrationIndex, load_migration
+from json_migration import DeclarativeMigration, run_migrations
+from migration_planner import MigrationPlanner
+from content_hash import hash_directory, hash_file
+from atomic_file import atomic_write_json
+from inotify import Inotify, inotify_available
+from skill_archive import SkillArchive, is_skill_archive
+
 
 class SkillVersionManager:
     """Manages versioning for individual skills."""
@@ -22,8 +41,13 @@ class SkillVersionManager:
         self.config_file = self.skill_dir / 'config.json'
         
         self.current_version = self.load_current_version()
+        self.versions = SortedVersions()
+        self.version_names: Dict[Version, str] = {}
         self.available_versions = self.load_available_versions()
         self.capabilities = self.load_capabilities()
+        self._migration_index: Optional[MigrationIndex] = None
+        self._migration_planner: Optional[MigrationPlanner] = None
+        self._breaking_changes: Optional['BreakingChangesIndex'] = None
     
     def load_current_version(self) -> str:
         """Load current skill version from config."""
@@ -37,13 +61,46 @@ class SkillVersionManager:
         return '1.0.0'
     
     def load_available_versions(self) -> List[str]:
-        """Load all available skill versions."""
-        versions = []
+        """Load all available skill versions into the sorted version array."""
+        self.version_names = {}
         if self.versions_dir.exists():
             for version_dir in self.versions_dir.iterdir():
-                if version_dir.is_dir():
-                    versions.append(version_dir.name)
-        return sorted(versions, key=self._parse_version)
+                if not version_dir.is_dir():
+                    continue
+                try:
+                    version = Version.parse(version_dir.name)
+                except ValueError:
+                    continue
+                self.version_names[version] = version_dir.name
+        
+        self.versions = SortedVersions(self.version_names)
+        return [self.version_names[v] for v in self.versions]
+    
+    def _version_name(self, version: Optional[Version]) -> Optional[str]:
+        """Map a Version back to its directory name."""
+        if version is None:
+            return None
+        return self.version_names.get(version, str(version))
+    
+    def latest_version(self) -> Optional[str]:
+        """Get the latest available version."""
+        return self._version_name(self.versions.latest())
+    
+    def next_version(self, version: str) -> Optional[str]:
+        """Get the closest available version newer than `version`."""
+        return self._version_name(self.versions.next_after(version))
+    
+    def previous_version(self, version: str) -> Optional[str]:
+        """Get the closest available version older than `version`."""
+        return self._version_name(self.versions.previous_before(version))
+    
+    def versions_in_range(self, min_version: Optional[str] = None, max_version: Optional[str] = None,
+                          include_min: bool = True, include_max: bool = True) -> List[str]:
+        """Get available versions within a range, in ascending order."""
+        return [
+            self._version_name(v)
+            for v in self.versions.in_range(min_version, max_version, include_min, include_max)
+        ]
     
     def load_capabilities(self) -> Dict[str, Dict]:
         """Load capabilities for all versions."""
@@ -67,23 +124,11 @@ class SkillVersionManager:
     
     def _parse_version(self, version_str: str) -> Tuple[int, int, int]:
         """Parse semantic version string."""
-        parts = version_str.split('.')
-        major = int(parts[0]) if len(parts) > 0 else 0
-        minor = int(parts[1]) if len(parts) > 1 else 0
-        patch = int(parts[2]) if len(parts) > 2 else 0
-        return (major, minor, patch)
+        return Version.parse(version_str).release
     
     def _compare_versions(self, v1: str, v2: str) -> int:
         """Compare two versions. Returns -1 if v1 < v2, 0 if equal, 1 if v1 > v2."""
-        v1_parts = self._parse_version(v1)
-        v2_parts = self._parse_version(v2)
-        
-        if v1_parts < v2_parts:
-            return -1
-        elif v1_parts > v2_parts:
-            return 1
-        else:
-            return 0
+        return compare_versions(v1, v2)
     
     def get_capabilities(self, version: str) -> Optional[Dict]:
         """Get capabilities for a specific version."""
@@ -106,20 +151,8 @@ class SkillVersionManager:
     
     def find_compatible_version(self, min_version: Optional[str] = None, 
                                max_version: Optional[str] = None) -> Optional[str]:
-        """Find a compatible version within range."""
-        candidates = self.available_versions
-        
-        if min_version:
-            candidates = [v for v in candidates if self._compare_versions(v, min_version) >= 0]
-        
-        if max_version:
-            candidates = [v for v in candidates if self._compare_versions(v, max_version) <= 0]
-        
-        if not candidates:
-            return None
-        
-        # Return the latest compatible version
-        return max(candidates, key=self._parse_version)
+        """Find the latest compatible version within range."""
+        return self._version_name(self.versions.latest_in_range(min_version or None, max_version or None))
     
     def get_version_info(self, version: str) -> Optional[Dict]:
         """Get detailed info about a version."""
@@ -141,10 +174,46 @@ class SkillVersionManager:
         
         return info
     
+    def load_breaking_changes(self, version: str) -> Any:
+        """Load a version's raw breaking_changes.json, or None if absent or unreadable."""
+        try:
+            with open(self.versions_dir / version / 'breaking_changes.json', 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, IOError):
+            return None
+    
+    @property
+    def breaking_changes(self) -> 'BreakingChangesIndex':
+        """Cumulative breaking-changes index, built on first use."""
+        if self._breaking_changes is None:
+            self._breaking_changes = BreakingChangesIndex(self)
+        return self._breaking_changes
+    
+    @property
+    def migration_index(self) -> MigrationIndex:
+        """Directory index of migration files, built on first use."""
+        if self._migration_index is None:
+            self._migration_index = MigrationIndex(self.versions_dir)
+        return self._migration_index
+    
+    @property
+    def migration_planner(self) -> MigrationPlanner:
+        """Shortest-path planner over this skill's migration edges."""
+        if self._migration_planner is None:
+            self._migration_planner = MigrationPlanner(self.migration_index)
+        return self._migration_planner
+    
+    def has_migration(self, from_version: str, to_version: str) -> bool:
+        """Check whether a migration file exists without loading it."""
+        return self.migration_index.has_migration(from_version, to_version)
+    
     def get_migration(self, from_version: str, to_version: str) -> Optional[Callable]:
         """
         Load a migration function from a migration file.
         
+        Migrations are imported once per file revision and shared across
+        all managers in the process.
+        
         Args:
             from_version: Source version
             to_version: Target version
@@ -152,28 +221,14 @@ class SkillVersionManager:
         Returns:
             Migration function or None if not found
         """
-        migration_dir = self.versions_dir / to_version / 'migrations'
-        if not migration_dir.exists():
-            return None
-        
-        migration_file = migration_dir / f'from_{from_version.replace(".", "_")}.py'
-        if not migration_file.exists():
+        migration_file = self.migration_index.get_path(from_version, to_version)
+        if migration_file is None:
             return None
         
         try:
-            spec: Dict[str, Any] = {}
-            with open(migration_file, 'r') as f:
-                exec(f.read(), spec)
-            
-            # Look for migrate or migrate_state function
-            if 'migrate' in spec:
-                return spec['migrate']
-            elif 'migrate_state' in spec:
-                return spec['migrate_state']
+            return load_migration(migration_file)
         except Exception:
-            pass
-        
-        return None
+            return None
     
     def execute_migration(self, state: Dict, from_version: str, to_version: str) -> Tuple[bool, Union[Dict, str]]:
         """
@@ -193,8 +248,13 @@ class SkillVersionManager:
             return False, f"No migration found from {from_version} to {to_version}"
         
         try:
-            # Execute migration
-            new_state = migration_func(deepcopy(state))
+            # Execute migration; declarative migrations copy only what they touch
+            started = time.perf_counter()
+            if isinstance(migration_func, DeclarativeMigration):
+                new_state = migration_func(state)
+            else:
+                new_state = migration_func(deepcopy(state))
+            self.migration_planner.record_timing(from_version, to_version, time.perf_counter() - started)
             
             # Validate migration output
             if not isinstance(new_state, dict):
@@ -204,9 +264,49 @@ class SkillVersionManager:
         except Exception as e:
             return False, f"Migration failed: {str(e)}"
     
+    def execute_migration_path(self, state: Dict, from_version: str, to_version: str) -> Tuple[bool, Union[Dict, str]]:
+        """
+        Migrate a state across every hop from one version to another.
+        
+        Consecutive declarative (.json) hops are fused and applied as one
+        pass; the input state is never modified.
+        
+        Args:
+            state: Current state dictionary
+            from_version: Source version
+            to_version: Target version
+            
+        Returns:
+            Tuple of (success, result) where result is new state dict on success or error message on failure
+        """
+        try:
+            path = self.get_migration_path(from_version, to_version)
+        except ValueError as e:
+            return False, str(e)
+        
+        hops = list(pairwise([from_version, *path]))
+        migrations = []
+        for hop_from, hop_to in hops:
+            migration_func = self.get_migration(hop_from, hop_to)
+            if migration_func is None:
+                return False, f"No migration found from {hop_from} to {hop_to}"
+            migrations.append(migration_func)
+        
+        def record(first_hop: int, hop_count: int, seconds: float):
+            for hop_from, hop_to in hops[first_hop:first_hop + hop_count]:
+                self.migration_planner.record_timing(hop_from, hop_to, seconds / hop_count)
+        
+        try:
+            return True, run_migrations(state, migrations, on_group=record)
+        except Exception as e:
+            return False, f"Migration failed: {str(e)}"
+    
     def get_migration_path(self, from_version: str, to_version: str) -> List[str]:
         """
-        Get the path of versions to migrate through.
+        Get the cheapest path of versions to migrate through.
+        
+        Skip-version migrations (e.g. versions/3.0.0/migrations/from_1_0_0.py)
+        are used when they make the path cheaper.
         
         Args:
             from_version: Starting version
@@ -221,55 +321,494 @@ class SkillVersionManager:
         if self._compare_versions(from_version, to_version) >= 0:
             raise ValueError(f"Target version {to_version} is not newer than {from_version}")
         
-        path: List[str] = []
-        current = from_version
+        path = self.migration_planner.plan(from_version, to_version)
+        if path is None:
+            raise ValueError(f"No migration path from {from_version} to {to_version}")
         
-        while self._compare_versions(current, to_version) < 0:
-            # Find next version
-            next_versions = [
-                v for v in self.available_versions
-                if self._compare_versions(v, current) > 0
-            ]
-            
-            if not next_versions:
-                raise ValueError(f"No migration path from {current} to {to_version}")
-            
-            # Get the closest next version
-            next_version = min(next_versions, key=lambda v: self._parse_version(v))
-            
-            # Check if migration exists
-            if self.get_migration(current, next_version) is None:
-                raise ValueError(f"No migration from {current} to {next_version}")
-            
-            path.append(next_version)
-            current = next_version
+        return [self._version_name(version) for version in path]
+
+
+class BreakingChangesIndex:
+    """
+    Breaking changes of one skill, flattened in version order.
+    
+    `offsets[i]` is the number of changes introduced by the versions before
+    `versions[i]`, so the changes between two versions are one slice of
+    `entries` found by two bisections.
+    
+    Each entry is a dict with `version`, `description`, `affected_capability`
+    and `migration_hint`. breaking_changes.json may be a list of strings or
+    change objects, or an object with a `breaking_changes` list and a
+    `migration_guide` used as the default hint.
+    """
+    
+    def __init__(self, skill: 'SkillVersionManager'):
+        self.versions: List[Version] = list(skill.versions)
+        self.offsets: List[int] = []
+        self.entries: List[Dict] = []
+        
+        for version in self.versions:
+            self.offsets.append(len(self.entries))
+            name = skill.version_names[version]
+            self.entries.extend(self.parse_entries(skill.load_breaking_changes(name), name))
+        self.offsets.append(len(self.entries))
+    
+    @staticmethod
+    def parse_entries(data: Any, version: str) -> List[Dict]:
+        """Parse breaking_changes.json content into structured entries."""
+        default_hint = None
+        if isinstance(data, dict):
+            default_hint = data.get('migration_guide')
+            data = data.get('breaking_changes', [])
+        if not isinstance(data, list):
+            return []
         
-        return path
+        entries = []
+        for change in data:
+            if isinstance(change, dict):
+                entries.append({
+                    'version': version,
+                    'description': change.get('description') or change.get('change', ''),
+                    'affected_capability': change.get('affected_capability') or change.get('capability'),
+                    'migration_hint': change.get('migration_hint') or change.get('migration') or default_hint
+                })
+            else:
+                entries.append({
+                    'version': version,
+                    'description': str(change),
+                    'affected_capability': None,
+                    'migration_hint': default_hint
+                })
+        return entries
+    
+    def between(self, from_version: Union[str, Version], to_version: Union[str, Version]) -> List[Dict]:
+        """Breaking changes introduced after `from_version` up to and including `to_version`."""
+        start = bisect_right(self.versions, Version.parse(from_version))
+        end = bisect_right(self.versions, Version.parse(to_version))
+        if end <= start:
+            return []
+        return self.entries[self.offsets[start]:self.offsets[end]]
+    
+    def count_between(self, from_version: Union[str, Version], to_version: Union[str, Version]) -> int:
+        """Number of breaking changes between two versions, without slicing."""
+        start = bisect_right(self.versions, Version.parse(from_version))
+        end = bisect_right(self.versions, Version.parse(to_version))
+        return max(0, self.offsets[end] - self.offsets[start])
+    
+    def affected_capabilities(self, from_version: Union[str, Version],
+                              to_version: Union[str, Version]) -> Set[str]:
+        """Capabilities named by breaking changes between two versions."""
+        return {
+            entry['affected_capability'] for entry in self.between(from_version, to_version)
+            if entry['affected_capability']
+        }
+
+
+class ArchivedSkillVersionManager(SkillVersionManager):
+    """
+    SkillVersionManager backed by a packed skill archive.
+    
+    Versions, capabilities and breaking changes come from the archive's
+    central index, so loading a skill touches no other files. Migrations
+    are extracted to a per-user cache directory, and verified against the
+    skill's digest, the first time they are needed.
+    """
+    
+    def __init__(self, skill_name: str, archive: SkillArchive):
+        self.archive = archive
+        self.entry = archive.skills[skill_name]
+        super().__init__(skill_name, archive.path)
+    
+    def load_current_version(self) -> str:
+        return self.entry.get('current_version', '1.0.0')
+    
+    def load_available_versions(self) -> List[str]:
+        self.version_names = {}
+        for name in self.entry.get('versions', {}):
+            try:
+                self.version_names[Version.parse(name)] = name
+            except ValueError:
+                continue
+        
+        self.versions = SortedVersions(self.version_names)
+        return [self.version_names[v] for v in self.versions]
+    
+    def load_capabilities(self) -> Dict[str, Dict]:
+        return {
+            version: metadata['capabilities']
+            for version, metadata in self.entry.get('versions', {}).items()
+            if metadata.get('capabilities') is not None
+        }
+    
+    def load_breaking_changes(self, version: str) -> Any:
+        return self.entry.get('versions', {}).get(version, {}).get('breaking_changes')
+    
+    def get_version_info(self, version: str) -> Optional[Dict]:
+        if version not in self.entry.get('versions', {}):
+            return None
+        return {
+            'version': version,
+            'capabilities': self.capabilities.get(version, {}),
+            'breaking_changes': self.load_breaking_changes(version) or []
+        }
+    
+    @property
+    def migration_index(self) -> MigrationIndex:
+        """Index over migrations extracted from the archive on first use."""
+        if self._migration_index is None:
+            self._migration_index = MigrationIndex(self.archive.extract_skill(self.skill_name) / 'versions')
+        return self._migration_index
+
+
+class SkillQueryIndex:
+    """
+    Bitset index over (skill, version) rows for multi-criteria queries.
+
+    Every (skill, version) pair gets a row id, and every capability, domain
+    and domain feature keeps one integer whose set bits are the rows that
+    provide it. Boolean queries are answered with bitwise operations:
+
+        capability:rest AND domain.ml.frameworks:pytorch AND version>=2.0.0
+
+    Supported terms:
+        capability:<name>        Flat capability from the `capabilities` list
+        domain:<name>            Domain marked as supported
+        domain.<d>.<key>:<value> Value listed under a supported domain's key
+        skill:<name>             All versions of a skill
+        pipeline:<name>          Versions compatible with a pipeline
+        version<op><version>     Version comparison (>=, <=, >, <, ==, !=)
+        <name>                   Shorthand for capability:<name>
+
+    Terms combine with AND, OR, NOT (or !) and parentheses.
+
+    Version terms are answered from prefix bitsets over the indexed
+    versions in sorted order, found by bisection.
+    """
+
+    # Lone = and ! are tokens too, so findall never skips a character
+    _TOKEN_PATTERN = re.compile(r'\(|\)|>=|<=|==|!=|>|<|!|=|[^\s()<>=!]+')
+    _VERSION_OPERATORS = ('>=', '<=', '==', '!=', '>', '<')
+
+    def __init__(self):
+        self.rows: List[Optional[Tuple[str, str]]] = []
+        self.row_ids: Dict[Tuple[str, str], int] = {}
+        self.bitsets: Dict[str, int] = {}
+        self.skill_rows: Dict[str, int] = {}
+        self.all_rows = 0
+        self._free_rows: List[int] = []
+        self._version_keys: List[Optional[Version]] = []
+        # Sorted distinct versions and their prefix bitsets (see _version_prefixes)
+        self._version_order: Optional[Tuple[SortedVersions, List[int]]] = None
+
+    def add_skill(self, skill: 'SkillVersionManager'):
+        """Index every version of a skill, replacing any previous rows."""
+        self.remove_skill(skill.skill_name)
+
+        for version in skill.available_versions:
+            row = self._allocate_row(skill.skill_name, version, Version.parse(version))
+            bit = 1 << row
+            self._set(f'skill:{skill.skill_name}', bit)
+
+            caps = skill.get_capabilities(version) or {}
+            for capability in caps.get('capabilities', []):
+                self._set(f'capability:{capability}', bit)
+
+            for pipeline in caps.get('compatible_pipelines', ['*']):
+                self._set(f'pipeline:{pipeline}', bit)
+
+            domains = caps.get('domains', {})
+            if isinstance(domains, list):
+                domains = {name: {'supported': True} for name in domains}
+
+            for domain, info in domains.items():
+                if not isinstance(info, dict) or not info.get('supported', False):
+                    continue
+                self._set(f'domain:{domain}', bit)
+
+                for key, values in info.items():
+                    if key in ('supported', 'reason'):
+                        continue
+                    if not isinstance(values, list):
+                        values = [values]
+                    for value in values:
+                        if isinstance(value, bool):
+                            value = str(value).lower()
+                        self._set(f'domain.{domain}.{key}:{value}', bit)
+
+    def copy(self) -> 'SkillQueryIndex':
+        """Copy the index so it can be updated while readers use this one."""
+        index = SkillQueryIndex.__new__(SkillQueryIndex)
+        index.rows = list(self.rows)
+        index.row_ids = dict(self.row_ids)
+        index.bitsets = dict(self.bitsets)
+        index.skill_rows = dict(self.skill_rows)
+        index.all_rows = self.all_rows
+        index._free_rows = list(self._free_rows)
+        index._version_keys = list(self._version_keys)
+        index._version_order = self._version_order
+        return index
+
+    def remove_skill(self, skill_name: str):
+        """Drop all rows belonging to a skill."""
+        mask = self.skill_rows.pop(skill_name, 0)
+        if not mask:
+            return
+
+        self.bitsets = {
+            key: bits & ~mask
+            for key, bits in self.bitsets.items()
+            if bits & ~mask
+        }
+        self.all_rows &= ~mask
+        self._version_order = None
+
+        row = 0
+        while mask:
+            if mask & 1:
+                del self.row_ids[self.rows[row]]
+                self.rows[row] = None
+                self._version_keys[row] = None
+                self._free_rows.append(row)
+            mask >>= 1
+            row += 1
+
+    def query(self, expression: str) -> List[Tuple[str, str]]:
+        """
+        Evaluate a boolean query and return matching (skill, version) pairs.
+
+        Raises:
+            ValueError: If the expression cannot be parsed
+        """
+        return self.rows_for(self.evaluate(expression))
+
+    def evaluate(self, expression: str) -> int:
+        """Evaluate a boolean query to a row bitset."""
+        tokens = self._TOKEN_PATTERN.findall(expression)
+        if not tokens:
+            raise ValueError("Empty query")
+
+        position, bits = self._parse_or(tokens, 0)
+        if position != len(tokens):
+            raise ValueError(f"Unexpected token in query: {tokens[position]}")
+        return bits
+
+    def rows_for(self, bits: int) -> List[Tuple[str, str]]:
+        """Decode a row bitset into sorted (skill, version) pairs."""
+        results = []
+        row = 0
+        while bits:
+            if bits & 1:
+                results.append((self.rows[row], self._version_keys[row]))
+            bits >>= 1
+            row += 1
+
+        results.sort(key=lambda item: (item[0][0], item[1]))
+        return [pair for pair, _ in results]
+
+    def _allocate_row(self, skill_name: str, version: str, version_key: Version) -> int:
+        """Assign a row id to a (skill, version) pair, reusing freed rows."""
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self.rows[row] = (skill_name, version)
+            self._version_keys[row] = version_key
+        else:
+            row = len(self.rows)
+            self.rows.append((skill_name, version))
+            self._version_keys.append(version_key)
+
+        self.row_ids[(skill_name, version)] = row
+        self._version_order = None
+        self.skill_rows[skill_name] = self.skill_rows.get(skill_name, 0) | (1 << row)
+        self.all_rows |= 1 << row
+        return row
+
+    def _set(self, key: str, bit: int):
+        self.bitsets[key] = self.bitsets.get(key, 0) | bit
+
+    def _parse_or(self, tokens: List[str], position: int) -> Tuple[int, int]:
+        position, bits = self._parse_and(tokens, position)
+        while position < len(tokens) and tokens[position].upper() == 'OR':
+            position, right = self._parse_and(tokens, position + 1)
+            bits |= right
+        return position, bits
+
+    def _parse_and(self, tokens: List[str], position: int) -> Tuple[int, int]:
+        position, bits = self._parse_not(tokens, position)
+        while position < len(tokens) and tokens[position].upper() == 'AND':
+            position, right = self._parse_not(tokens, position + 1)
+            bits &= right
+        return position, bits
+
+    def _parse_not(self, tokens: List[str], position: int) -> Tuple[int, int]:
+        if position < len(tokens) and tokens[position].upper() in ('NOT', '!'):
+            position, bits = self._parse_not(tokens, position + 1)
+            return position, self.all_rows & ~bits
+        return self._parse_term(tokens, position)
+
+    def _parse_term(self, tokens: List[str], position: int) -> Tuple[int, int]:
+        if position >= len(tokens):
+            raise ValueError("Unexpected end of query")
+
+        token = tokens[position]
+
+        if token == '(':
+            position, bits = self._parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ')':
+                raise ValueError("Missing closing parenthesis in query")
+            return position + 1, bits
+
+        if token in (')', '=') or token in self._VERSION_OPERATORS or token.upper() in ('AND', 'OR', 'NOT'):
+            raise ValueError(f"Unexpected token in query: {token}")
+
+        if token.lower() == 'version':
+            if position + 2 >= len(tokens) or tokens[position + 1] not in self._VERSION_OPERATORS:
+                raise ValueError("Version terms must look like version>=1.0.0")
+            return position + 3, self._version_bits(tokens[position + 1], tokens[position + 2])
+
+        key = token if ':' in token else f'capability:{token}'
+        if key.startswith('pipeline:') and key != 'pipeline:*':
+            return position + 1, self.bitsets.get(key, 0) | self.bitsets.get('pipeline:*', 0)
+        return position + 1, self.bitsets.get(key, 0)
+
+    def _version_prefixes(self) -> Tuple[SortedVersions, List[int]]:
+        """
+        Sorted distinct versions, and for each position the bitset of rows
+        whose version sorts before it; the last entry holds every row.
+
+        Built on the first version term after rows change.
+        """
+        if self._version_order is None:
+            order = SortedVersions(key for key in self._version_keys if key is not None)
+            positions = {version: index for index, version in enumerate(order)}
+            buckets = [0] * len(order)
+            for row, version_key in enumerate(self._version_keys):
+                if version_key is not None:
+                    buckets[positions[version_key]] |= 1 << row
+
+            prefixes = [0]
+            for bucket in buckets:
+                prefixes.append(prefixes[-1] | bucket)
+            self._version_order = (order, prefixes)
+        return self._version_order
+
+    def _version_bits(self, operator: str, version: str) -> int:
+        order, prefixes = self._version_prefixes()
+        target = Version.parse(version)
+        below = prefixes[bisect_left(order.versions, target)]
+        through = prefixes[bisect_right(order.versions, target)]
+
+        if operator == '<':
+            return below
+        if operator == '<=':
+            return through
+        if operator == '>':
+            return self.all_rows & ~through
+        if operator == '>=':
+            return self.all_rows & ~below
+        if operator == '==':
+            return through & ~below
+        return self.all_rows & ~(through & ~below)
 
 
 class SkillRegistry:
-    """Central registry for all skills and their versions."""
+    """
+    Central registry for all skills and their versions.
+    
+    `skills_dir` is normally the skills directory; a packed archive written
+    by `skill_cli.py pack` can be given instead, in which case all skill
+    metadata is read from the archive's index with a single open.
+    
+    `skills` and the query index are never mutated once published: a reload
+    builds new ones and swaps them in under the reload lock, so readers on
+    other threads iterate a consistent snapshot.
+    """
     
     def __init__(self, skills_dir: Path):
         self.skills_dir = skills_dir
+        self.archive: Optional[SkillArchive] = SkillArchive(skills_dir) if is_skill_archive(skills_dir) else None
         self.skills: Dict[str, SkillVersionManager] = {}
+        self._query_index: Optional[SkillQueryIndex] = None
+        self._compatibility_matrix: Optional['CompatibilityMatrix'] = None
+        self._listeners: List[Callable[[str, str], None]] = []
+        self._reload_lock = threading.RLock()
         self.load_all_skills()
     
     def load_all_skills(self):
         """Load all available skills."""
-        if not self.skills_dir.exists():
-            return
+        skills: Dict[str, SkillVersionManager] = {}
+        if self.archive is not None:
+            for skill_name in self.archive.skills:
+                skills[skill_name] = ArchivedSkillVersionManager(skill_name, self.archive)
+        elif self.skills_dir.exists():
+            for skill_dir in self.skills_dir.iterdir():
+                if self.is_skill_dir(skill_dir):
+                    skills[skill_dir.name] = SkillVersionManager(skill_dir.name, self.skills_dir)
         
-        for skill_dir in self.skills_dir.iterdir():
-            if not skill_dir.is_dir():
-                continue
+        with self._reload_lock:
+            self.skills = skills
+            self._query_index = None
+    
+    @staticmethod
+    def is_skill_dir(skill_dir: Path) -> bool:
+        """A skill is a directory with a SKILL.md or config.json."""
+        return skill_dir.is_dir() and ((skill_dir / 'SKILL.md').exists() or (skill_dir / 'config.json').exists())
+    
+    def add_listener(self, callback: Callable[[str, str], None]):
+        """
+        Register a callback for skill reloads.
+        
+        The callback receives the skill name and one of 'added', 'changed'
+        or 'removed', after the registry's own indexes have been updated.
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[str, str], None]):
+        """Unregister a reload callback."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def reload_skill(self, skill_name: str) -> Optional[str]:
+        """
+        Reload one skill from disk and update dependent indexes.
+        
+        Returns:
+            'added', 'changed' or 'removed', or None if nothing was loaded
+            before or after
+        """
+        with self._reload_lock:
+            skills = dict(self.skills)
+            previous = skills.get(skill_name)
             
-            skill_name = skill_dir.name
-            # Skip if not a skill (no SKILL.md or config.json)
-            if not (skill_dir / 'SKILL.md').exists() and not (skill_dir / 'config.json').exists():
-                continue
+            if self.archive is not None:
+                # Archives are immutable; reloading only restores the packed state
+                if skill_name not in self.archive.skills:
+                    return None
+                skills[skill_name] = ArchivedSkillVersionManager(skill_name, self.archive)
+                event = 'changed' if previous else 'added'
+            elif self.is_skill_dir(self.skills_dir / skill_name):
+                skills[skill_name] = SkillVersionManager(skill_name, self.skills_dir)
+                event = 'changed' if previous else 'added'
+            elif previous is not None:
+                del skills[skill_name]
+                event = 'removed'
+            else:
+                return None
             
-            self.skills[skill_name] = SkillVersionManager(skill_name, self.skills_dir)
+            query_index = self._query_index
+            if query_index is not None:
+                query_index = query_index.copy()
+                query_index.remove_skill(skill_name)
+                if event != 'removed':
+                    query_index.add_skill(skills[skill_name])
+            
+            self.skills, self._query_index = skills, query_index
+            
+            if self._compatibility_matrix is not None:
+                self._compatibility_matrix.update_skill(skill_name)
+        
+        for listener in list(self._listeners):
+            listener(skill_name, event)
+        return event
     
     def get_skill(self, skill_name: str) -> Optional[SkillVersionManager]:
         """Get a skill manager by name."""
@@ -298,116 +837,499 @@ class SkillRegistry:
         
         return results
     
+    def get_query_index(self) -> SkillQueryIndex:
+        """Get the bitset query index, building it on first use."""
+        with self._reload_lock:
+            if self._query_index is None:
+                query_index = SkillQueryIndex()
+                for skill in self.skills.values():
+                    query_index.add_skill(skill)
+                self._query_index = query_index
+            return self._query_index
+    
+    def query(self, expression: str) -> List[Tuple[str, str]]:
+        """
+        Find (skill, version) pairs matching a boolean capability query.
+        
+        Args:
+            expression: Query such as "capability:rest AND version>=2.0.0"
+            
+        Returns:
+            Matching (skill, version) pairs sorted by skill and version
+            
+        Raises:
+            ValueError: If the expression cannot be parsed
+        """
+        return self.get_query_index().query(expression)
+    
+    def get_compatibility_index(self) -> 'CompatibilityMatrix':
+        """
+        Get the persisted compatibility matrix, refreshing stale skills on
+        first use. The refreshed matrix is only written back when a caller
+        saves it.
+        """
+        with self._reload_lock:
+            if self._compatibility_matrix is None:
+                matrix = CompatibilityMatrix(self)
+                matrix.refresh(save=False)
+                self._compatibility_matrix = matrix
+            return self._compatibility_matrix
+    
     def get_compatibility_matrix(self) -> Dict[str, Dict[str, List[str]]]:
         """Get compatibility matrix for all skills."""
-        matrix = {}
-        
-        for skill_name, skill in self.skills.items():
-            matrix[skill_name] = {}
-            for version, caps in skill.capabilities.items():
-                matrix[skill_name][version] = caps.get('compatible_pipelines', ['*'])
-        
-        return matrix
+        matrix = self.get_compatibility_index()
+        with matrix._lock:
+            skills = dict(matrix.skills)
+        return {
+            skill_name: {version: list(pipelines) for version, pipelines in entry['versions'].items()}
+            for skill_name, entry in skills.items()
+        }
 
 
-class SkillDependencyResolver:
-    """Resolves skill version requirements and dependencies."""
+class RegistryWatcher:
+    """
+    Opt-in hot reloading for a SkillRegistry in a long-running process.
     
-    def __init__(self, registry: SkillRegistry):
+    Changes are detected by an os.scandir stat sweep over each skill's
+    config, version directories and their files. When inotify is available
+    it only serves as a wake-up, so the sweep runs as soon as something
+    changes instead of every `interval`. A skill is reloaded once its
+    signature has been stable for `debounce` seconds, so a burst of writes
+    causes one reload.
+    
+    Usage:
+        watcher = RegistryWatcher(registry)
+        watcher.start()
+        ...
+        watcher.stop()
+    """
+    
+    # Safety sweep interval when inotify is driving the watcher
+    INOTIFY_RESYNC = 30.0
+    
+    def __init__(self, registry: SkillRegistry, interval: float = 1.0,
+                 debounce: float = 0.25, use_inotify: bool = True):
+        if registry.archive is not None:
+            raise ValueError("Cannot watch a registry loaded from a skill archive")
         self.registry = registry
+        self.interval = interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify and inotify_available()
+        self.signatures: Dict[str, Tuple] = self.snapshot()
+        self._pending: Dict[str, float] = {}
+        self._inotify: Optional[Inotify] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
     
-    def resolve_pipeline_requirements(self, pipeline_config: Dict) -> Tuple[bool, Dict[str, str], List[str]]:
+    def snapshot(self) -> Dict[str, Tuple]:
+        """Stat signature of every skill directory."""
+        signatures = {}
+        for entry in self._scandir(self.registry.skills_dir):
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                signature = self.skill_signature(Path(entry.path))
+                if signature is not None:
+                    signatures[entry.name] = signature
+        return signatures
+    
+    def skill_signature(self, skill_dir: Path) -> Optional[Tuple]:
+        """Stat signature of one skill, or None if the directory is not a skill."""
+        if not self.registry.is_skill_dir(skill_dir):
+            return None
+        
+        parts = [self._stat(skill_dir / 'config.json'), self._stat(skill_dir / 'SKILL.md')]
+        for version_entry in sorted(self._scandir(skill_dir / 'versions'), key=lambda e: e.name):
+            parts.append(version_entry.name)
+            for entry in sorted(self._scandir(version_entry.path), key=lambda e: e.name):
+                parts.append((entry.name, self._stat(entry.path)))
+                if entry.name == 'migrations':
+                    parts.extend((e.name, self._stat(e.path)) for e in self._scandir(entry.path))
+        return tuple(parts)
+    
+    def poll(self) -> Dict[str, str]:
         """
-        Resolve skill versions required by a pipeline.
-        Returns (success, skill_versions, errors)
+        Sweep once and reload skills whose changes have settled.
+        
+        Returns:
+            Mapping of reloaded skill names to their reload events
         """
-        skill_versions = {}
-        errors = []
+        now = time.monotonic()
+        current = self.snapshot()
         
-        skills_config = pipeline_config.get('skills', {})
+        for skill_name in set(current) | set(self.signatures):
+            if current.get(skill_name) != self.signatures.get(skill_name):
+                self._pending[skill_name] = now
+        self.signatures = current
         
-        for skill_name, skill_req in skills_config.items():
-            skill = self.registry.get_skill(skill_name)
-            
-            if not skill:
-                errors.append(f"Skill '{skill_name}' not found")
-                continue
-            
-            min_version = skill_req.get('min_version')
-            max_version = skill_req.get('max_version')
-            preferred_version = skill_req.get('version')
-            
-            # Try preferred version first
-            if preferred_version:
-                if preferred_version in skill.available_versions:
-                    skill_versions[skill_name] = preferred_version
-                    continue
-                else:
-                    errors.append(f"Preferred version {preferred_version} not available for {skill_name}")
-            
-            # Find compatible version
-            compatible = skill.find_compatible_version(min_version, max_version)
-            
-            if compatible:
-                skill_versions[skill_name] = compatible
-            else:
-                errors.append(f"No compatible version found for {skill_name} (min: {min_version}, max: {max_version})")
+        events = {}
+        for skill_name, changed_at in list(self._pending.items()):
+            if now - changed_at >= self.debounce:
+                del self._pending[skill_name]
+                event = self.registry.reload_skill(skill_name)
+                if event:
+                    events[skill_name] = event
+        return events
+    
+    def start(self):
+        """Start watching in a daemon thread."""
+        if self._thread is not None:
+            return
         
-        # Check skill dependencies
-        dependency_errors = self._check_skill_dependencies(skill_versions)
-        errors.extend(dependency_errors)
+        self._stop.clear()
+        if self.use_inotify:
+            try:
+                self._inotify = Inotify()
+                self._update_watches()
+            except OSError:
+                self._inotify = None
         
-        return (len(errors) == 0, skill_versions, errors)
+        self._thread = threading.Thread(target=self._run, name='registry-watcher', daemon=True)
+        self._thread.start()
     
-    def _check_skill_dependencies(self, skill_versions: Dict[str, str]) -> List[str]:
-        """Check if selected skill versions have compatible dependencies."""
-        errors = []
-        
-        for skill_name, version in skill_versions.items():
-            skill = self.registry.get_skill(skill_name)
-            if not skill:
-                continue
+    def stop(self):
+        """Stop watching and wait for the thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+    
+    def _run(self):
+        while not self._stop.is_set():
+            if self._pending:
+                timeout = self.debounce
+            elif self._inotify is not None:
+                timeout = self.INOTIFY_RESYNC
+            else:
+                timeout = self.interval
             
-            capabilities = skill.get_capabilities(version)
-            if not capabilities:
-                continue
+            if self._inotify is not None:
+                # Wake on the first event, then sweep; stop() is noticed within a second
+                deadline = time.monotonic() + timeout
+                while not self._stop.is_set() and time.monotonic() < deadline:
+                    if self._inotify.read(timeout=min(1.0, max(0.0, deadline - time.monotonic()))):
+                        break
+            elif self._stop.wait(timeout):
+                break
             
-            dependencies = capabilities.get('dependencies', {})
+            if self._stop.is_set():
+                break
             
-            for dep_skill, dep_req in dependencies.items():
-                if dep_skill not in skill_versions:
-                    errors.append(f"{skill_name}@{version} requires {dep_skill}")
-                    continue
-                
-                dep_version = skill_versions[dep_skill]
-                dep_manager = self.registry.get_skill(dep_skill)
-                
-                if not dep_manager:
-                    continue
-                
-                min_version = dep_req.get('min_version')
-                if min_version and dep_manager._compare_versions(dep_version, min_version) < 0:
-                    errors.append(f"{skill_name}@{version} requires {dep_skill}>={min_version}, but {dep_version} is selected")
-        
-        return errors
+            try:
+                self.poll()
+                if self._inotify is not None:
+                    self._update_watches()
+            except Exception:
+                # A failed reload must not kill the watcher; retry on the next change
+                continue
     
-    def validate_workflow_state_compatibility(self, workflow_state: Dict) -> Tuple[bool, List[str]]:
-        """Validate if workflow state is compatible with current skill versions."""
-        errors = []
-        
-        skills_used = workflow_state.get('skills_used', {})
-        
-        for skill_name, version in skills_used.items():
-            skill = self.registry.get_skill(skill_name)
-            
-            if not skill:
-                errors.append(f"Skill {skill_name}@{version} no longer exists")
+    def _update_watches(self):
+        """Watch every directory the signature covers; existing watches are reused."""
+        directories = [self.registry.skills_dir]
+        for skill_entry in self._scandir(self.registry.skills_dir):
+            if not skill_entry.is_dir(follow_symlinks=False):
                 continue
-            
-            if version not in skill.available_versions:
-                errors.append(f"Version {version} of {skill_name} no longer available")
+            versions_dir = Path(skill_entry.path) / 'versions'
+            directories.extend([Path(skill_entry.path), versions_dir])
+            for version_entry in self._scandir(versions_dir):
+                directories.extend([Path(version_entry.path), Path(version_entry.path) / 'migrations'])
         
-        return (len(errors) == 0, errors)
+        for directory in directories:
+            try:
+                self._inotify.add_watch(directory)
+            except OSError:
+                continue
+    
+    @staticmethod
+    def _scandir(path) -> List[os.DirEntry]:
+        try:
+            with os.scandir(path) as entries:
+                return [entry for entry in entries if entry.is_dir() or entry.is_file()]
+        except OSError:
+            return []
+    
+    @staticmethod
+    def _stat(path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+
+class SkillVersionSolver:
+    """
+    Backtracking solver for skill versions and their transitive dependencies.
+    
+    Each skill is a variable whose domain is its available versions, narrowed
+    by the min_version/max_version/version constraints placed on it by the
+    pipeline and by the dependencies of already chosen versions. The solver
+    picks the most constrained skill first, tries versions newest first, and
+    on failure backjumps to the most recent choice that contributed to the
+    conflict, recording the conflicting assignments as a learned nogood so
+    the same combination is never explored twice.
+    """
+    
+    PIPELINE = 'pipeline'
+    
+    def __init__(self, registry: 'SkillRegistry'):
+        self.registry = registry
+        self.assignment: Dict[str, Version] = {}
+        self.constraints: Dict[str, List[Tuple[str, Optional[Version], Optional[Version]]]] = {}
+        self.missing: Set[str] = set()
+        self.nogoods: Dict[Tuple[str, Version], List[frozenset]] = {}
+        self.last_conflict: Optional[Tuple[str, List[Tuple[str, Optional[Version], Optional[Version]]]]] = None
+        self._dependency_cache: Dict[Tuple[str, Version], Optional[List[Tuple[str, Optional[Version], Optional[Version]]]]] = {}
+    
+    def add_requirement(self, skill_name: str, min_version: Optional[str] = None,
+                        max_version: Optional[str] = None, version: Optional[str] = None):
+        """Add a root requirement, e.g. from a pipeline config."""
+        low, high = self._bounds(min_version, max_version, version)
+        self.constraints.setdefault(skill_name, []).append((self.PIPELINE, low, high))
+    
+    def solve(self) -> Optional[Dict[str, str]]:
+        """
+        Find versions satisfying every requirement.
+        
+        Returns:
+            Mapping of skill name to version name, or None if unsatisfiable
+        """
+        solution, _ = self._search()
+        if solution is None:
+            return None
+        return {
+            name: self.registry.get_skill(name)._version_name(version)
+            for name, version in solution.items()
+        }
+    
+    def domain(self, skill_name: str) -> List[Version]:
+        """Versions of a skill allowed by the current constraints, newest first."""
+        skill = self.registry.get_skill(skill_name)
+        if skill is None:
+            return []
+        
+        low, high = None, None
+        for _, c_low, c_high in self.constraints.get(skill_name, ()):
+            if c_low is not None and (low is None or c_low > low):
+                low = c_low
+            if c_high is not None and (high is None or c_high < high):
+                high = c_high
+        
+        if low is not None and high is not None and low > high:
+            return []
+        
+        candidates = skill.versions.in_range(low, high)
+        candidates.reverse()
+        return candidates
+    
+    def dependencies(self, skill_name: str, version: Version) -> Optional[List[Tuple[str, Optional[Version], Optional[Version]]]]:
+        """Parsed dependency bounds of a skill version, or None if a dependency is not installed."""
+        key = (skill_name, version)
+        if key not in self._dependency_cache:
+            skill = self.registry.get_skill(skill_name)
+            caps = skill.get_capabilities(skill._version_name(version)) or {}
+            parsed: Optional[List[Tuple[str, Optional[Version], Optional[Version]]]] = []
+            
+            for dep_skill, dep_req in caps.get('dependencies', {}).items():
+                if self.registry.get_skill(dep_skill) is None:
+                    self.missing.add(dep_skill)
+                    parsed = None
+                    break
+                dep_req = dep_req or {}
+                low, high = self._bounds(dep_req.get('min_version'), dep_req.get('max_version'), dep_req.get('version'))
+                parsed.append((dep_skill, low, high))
+            
+            self._dependency_cache[key] = parsed
+        return self._dependency_cache[key]
+    
+    def _bounds(self, min_version: Optional[str], max_version: Optional[str],
+                version: Optional[str]) -> Tuple[Optional[Version], Optional[Version]]:
+        if version:
+            exact = Version.parse(version)
+            return exact, exact
+        return (
+            Version.parse(min_version) if min_version else None,
+            Version.parse(max_version) if max_version else None,
+        )
+    
+    def _reasons(self, skill_name: str) -> Set[str]:
+        """Assigned skills whose choices placed constraints on `skill_name`."""
+        return {source for source, _, _ in self.constraints.get(skill_name, ()) if source != self.PIPELINE}
+    
+    def _select(self) -> Optional[Tuple[str, List[Version]]]:
+        """Pick the unassigned required skill with the fewest remaining versions."""
+        best: Optional[Tuple[str, List[Version]]] = None
+        for skill_name in self.constraints:
+            if skill_name in self.assignment:
+                continue
+            candidates = self.domain(skill_name)
+            if best is None or len(candidates) < len(best[1]):
+                best = (skill_name, candidates)
+                if not candidates:
+                    break
+        return best
+    
+    def _search(self) -> Tuple[Optional[Dict[str, Version]], Set[str]]:
+        selected = self._select()
+        if selected is None:
+            return dict(self.assignment), set()
+        
+        skill_name, candidates = selected
+        conflict = self._reasons(skill_name)
+        if not candidates:
+            self.last_conflict = (skill_name, list(self.constraints.get(skill_name, ())))
+        
+        for version in candidates:
+            solution, value_conflict = self._try(skill_name, version)
+            if solution is not None:
+                return solution, set()
+            
+            if skill_name not in value_conflict:
+                # This choice was irrelevant to the failure: jump straight back
+                return None, value_conflict
+            conflict |= value_conflict - {skill_name}
+        
+        self._learn(conflict)
+        return None, conflict
+    
+    def _try(self, skill_name: str, version: Version) -> Tuple[Optional[Dict[str, Version]], Set[str]]:
+        for nogood in self.nogoods.get((skill_name, version), ()):
+            if all(self.assignment.get(name) == value for name, value in nogood if name != skill_name):
+                return None, {name for name, _ in nogood}
+        
+        dependencies = self.dependencies(skill_name, version)
+        if dependencies is None:
+            return None, {skill_name}
+        
+        for dep_skill, low, high in dependencies:
+            assigned = self.assignment.get(dep_skill)
+            if assigned is not None and ((low is not None and assigned < low) or (high is not None and assigned > high)):
+                return None, {skill_name, dep_skill}
+        
+        added = []
+        self.assignment[skill_name] = version
+        try:
+            for dep_skill, low, high in dependencies:
+                self.constraints.setdefault(dep_skill, []).append((skill_name, low, high))
+                added.append(dep_skill)
+                
+                if dep_skill not in self.assignment and not self.domain(dep_skill):
+                    self.last_conflict = (dep_skill, list(self.constraints[dep_skill]))
+                    return None, {skill_name} | self._reasons(dep_skill)
+            
+            return self._search()
+        finally:
+            del self.assignment[skill_name]
+            for dep_skill in added:
+                self.constraints[dep_skill].pop()
+                if not self.constraints[dep_skill]:
+                    del self.constraints[dep_skill]
+    
+    def _learn(self, conflict: Set[str]):
+        """Record the assignments in a conflict set as a nogood."""
+        nogood = frozenset((name, self.assignment[name]) for name in conflict if name in self.assignment)
+        for pair in nogood:
+            self.nogoods.setdefault(pair, []).append(nogood)
+    
+    def describe_conflict(self) -> Optional[str]:
+        """Human-readable explanation of the last domain wipe-out."""
+        if self.last_conflict is None:
+            return None
+        
+        skill_name, constraints = self.last_conflict
+        parts = []
+        for source, low, high in constraints:
+            if low is not None and low == high:
+                bound = f"=={low}"
+            else:
+                bound = ', '.join(b for b in (f">={low}" if low else '', f"<={high}" if high else '') if b) or 'any version'
+            parts.append(f"{source} requires {bound}")
+        
+        return f"No version of {skill_name} satisfies all requirements: {'; '.join(parts)}"
+
+
+class SkillDependencyResolver:
+    """Resolves skill version requirements and dependencies."""
+    
+    def __init__(self, registry: SkillRegistry):
+        self.registry = registry
+    
+    def resolve_pipeline_requirements(self, pipeline_config: Dict) -> Tuple[bool, Dict[str, str], List[str]]:
+        """
+        Resolve skill versions required by a pipeline.
+        
+        Versions are chosen jointly with a backtracking solver, so a skill
+        is downgraded when its latest version conflicts with a dependency
+        bound, and transitive dependencies are resolved and included.
+        
+        Returns (success, skill_versions, errors)
+        """
+        errors = []
+        solver = SkillVersionSolver(self.registry)
+        
+        skills_config = pipeline_config.get('skills', {})
+        
+        for skill_name, skill_req in skills_config.items():
+            skill = self.registry.get_skill(skill_name)
+            
+            if not skill:
+                errors.append(f"Skill '{skill_name}' not found")
+                continue
+            
+            min_version = skill_req.get('min_version')
+            max_version = skill_req.get('max_version')
+            preferred_version = skill_req.get('version')
+            
+            # A preferred version pins the skill when it is available
+            if preferred_version:
+                if preferred_version in skill.versions:
+                    solver.add_requirement(skill_name, version=preferred_version)
+                    continue
+                else:
+                    errors.append(f"Preferred version {preferred_version} not available for {skill_name}")
+            
+            if skill.find_compatible_version(min_version, max_version) is None:
+                errors.append(f"No compatible version found for {skill_name} (min: {min_version}, max: {max_version})")
+                continue
+            
+            solver.add_requirement(skill_name, min_version, max_version)
+        
+        skill_versions = solver.solve()
+        
+        if skill_versions is None:
+            skill_versions = {}
+            for dep_skill in sorted(solver.missing):
+                errors.append(f"Required dependency '{dep_skill}' not found")
+            conflict = solver.describe_conflict()
+            if conflict:
+                errors.append(conflict)
+            elif not solver.missing:
+                errors.append("No combination of skill versions satisfies all dependencies")
+        
+        return (len(errors) == 0, skill_versions, errors)
+    
+    def validate_workflow_state_compatibility(self, workflow_state: Dict) -> Tuple[bool, List[str]]:
+        """Validate if workflow state is compatible with current skill versions."""
+        errors = []
+        
+        skills_used = workflow_state.get('skills_used', {})
+        
+        for skill_name, version in skills_used.items():
+            skill = self.registry.get_skill(skill_name)
+            
+            if not skill:
+                errors.append(f"Skill {skill_name}@{version} no longer exists")
+                continue
+            
+            if version not in skill.versions:
+                errors.append(f"Version {version} of {skill_name} no longer available")
+        
+        return (len(errors) == 0, errors)
     
     def suggest_upgrade_path(self, current_versions: Dict[str, str], 
                            target_requirements: Dict[str, str]) -> Optional[Dict[str, str]]:
@@ -432,8 +1354,7 @@ class SkillDependencyResolver:
             # Check if upgrade needed
             if skill._compare_versions(target_version, current_version) > 0:
                 # Check if upgrade path exists (through intermediate versions)
-                available = skill.available_versions
-                if current_version in available and target_version in available:
+                if current_version in skill.versions and target_version in skill.versions:
                     upgrade_path[skill_name] = target_version
                 else:
                     return None
@@ -444,6 +1365,272 @@ class SkillDependencyResolver:
         return upgrade_path
 
 
+class CompatibilityMatrix:
+    """
+    Materialized skill x version x pipeline compatibility.
+    
+    Per-skill facts (current and latest version, compatible pipelines per
+    version) and per-pipeline report rows are persisted in the registry
+    index file. Each skill is fingerprinted by the stat of its config and
+    version metadata files, so only skills that changed on disk are
+    recomputed; a pipeline row is reused while both the skill fingerprint
+    and the pipeline's requirement for it are unchanged.
+    """
+    
+    INDEX_FILENAME = '.registry-index.json'
+    INDEX_FORMAT = 1
+    METADATA_FILES = ('capabilities.json', 'breaking_changes.json')
+    
+    def __init__(self, registry: SkillRegistry, index_path: Optional[Path] = None):
+        self.registry = registry
+        if index_path is None:
+            base = registry.skills_dir
+            # Keep the index beside an archive rather than inside it
+            index_path = base.with_name(base.name + self.INDEX_FILENAME) if registry.archive else base / self.INDEX_FILENAME
+        self.index_path = index_path
+        self.skills: Dict[str, Dict] = {}
+        self.rows: Dict[str, Dict[str, Dict]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+    
+    def load(self):
+        """Load the persisted matrix, ignoring an unreadable or outdated index."""
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, IOError):
+            return
+        
+        compatibility = index.get('compatibility', {}) if isinstance(index, dict) else {}
+        if compatibility.get('format') != self.INDEX_FORMAT:
+            return
+        self.skills = compatibility.get('skills', {})
+        self.rows = compatibility.get('rows', {})
+    
+    def save(self):
+        """Persist the matrix into the registry index if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                with open(self.index_path, 'r') as f:
+                    index = json.load(f)
+                if not isinstance(index, dict):
+                    index = {}
+            except (FileNotFoundError, json.JSONDecodeError, IOError):
+                index = {}
+            
+            index['compatibility'] = {
+                'format': self.INDEX_FORMAT,
+                'skills': self.skills,
+                'rows': self.rows
+            }
+            try:
+                atomic_write_json(self.index_path, index, indent=None, fsync=False)
+            except OSError:
+                return
+            self._dirty = False
+    
+    def refresh(self, save: bool = True) -> List[str]:
+        """
+        Bring the matrix up to date with the registry.
+        
+        Args:
+            save: Persist the index if anything changed
+        
+        Returns:
+            Names of skills that were recomputed or dropped
+        """
+        skills = self.registry.skills
+        changed = [name for name in skills if self.update_skill(name, save=False)]
+        
+        with self._lock:
+            dropped = [name for name in self.skills if name not in skills]
+        for skill_name in dropped:
+            self.remove_skill(skill_name, save=False)
+            changed.append(skill_name)
+        
+        if save:
+            self.save()
+        return changed
+    
+    def update_skill(self, skill_name: str, save: bool = True) -> bool:
+        """
+        Recompute one skill's entry if its files changed.
+        
+        Returns:
+            True if the entry was recomputed
+        """
+        skill = self.registry.get_skill(skill_name)
+        if skill is None:
+            return self.remove_skill(skill_name, save=save)
+        
+        fingerprint = self.fingerprint(skill)
+        entry = self.skills.get(skill_name)
+        if entry is not None and entry['fingerprint'] == fingerprint:
+            return False
+        
+        with self._lock:
+            self.skills[skill_name] = {
+                'fingerprint': fingerprint,
+                'current_version': skill.current_version,
+                'latest_version': skill.latest_version(),
+                'versions': {
+                    version: caps.get('compatible_pipelines', ['*'])
+                    for version, caps in skill.capabilities.items()
+                }
+            }
+            self._dirty = True
+        
+        if save:
+            self.save()
+        return True
+    
+    def remove_skill(self, skill_name: str, save: bool = True) -> bool:
+        """Drop a skill's entry. Returns True if it was present."""
+        with self._lock:
+            if self.skills.pop(skill_name, None) is None:
+                return False
+            self._dirty = True
+        if save:
+            self.save()
+        return True
+    
+    def fingerprint(self, skill: SkillVersionManager) -> str:
+        """Cheap change fingerprint from the stat of a skill's metadata files."""
+        if isinstance(skill, ArchivedSkillVersionManager):
+            return skill.entry['digest']
+        
+        parts = []
+        paths = [skill.config_file] + [
+            skill.versions_dir / name / filename
+            for name in sorted(skill.version_names.values())
+            for filename in self.METADATA_FILES
+        ]
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                parts.append(f'{path.name}:{stat.st_mtime_ns}:{stat.st_size}')
+            except OSError:
+                parts.append(f'{path.name}:-')
+        parts.extend(sorted(skill.version_names.values()))
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+    
+    def compatible_versions(self, skill_name: str, pipeline_name: str) -> List[str]:
+        """Versions of a skill that declare compatibility with a pipeline."""
+        with self._lock:
+            entry = self.skills.get(skill_name, {})
+        return [
+            version for version, pipelines in entry.get('versions', {}).items()
+            if '*' in pipelines or pipeline_name in pipelines
+        ]
+    
+    def skill_row(self, pipeline_name: str, skill_name: str, skill_req: Dict) -> Optional[Dict]:
+        """
+        Get the report row for one skill in one pipeline, reusing the cached row.
+        
+        Returns:
+            Row dict, or None if the skill is not installed
+        """
+        with self._lock:
+            entry = self.skills.get(skill_name)
+            if entry is None:
+                return None
+            key = entry['fingerprint'] + json.dumps(skill_req, sort_keys=True)
+            cached = self.rows.get(pipeline_name, {}).get(skill_name)
+        if cached is not None and cached['key'] == key:
+            return cached['row']
+        
+        current = entry['current_version']
+        row = {
+            'current_version': current,
+            'required_version': skill_req.get('version'),
+            'min_version': skill_req.get('min_version'),
+            'max_version': skill_req.get('max_version'),
+            'status': 'compatible',
+            'warnings': [],
+            'errors': []
+        }
+        
+        min_version = skill_req.get('min_version')
+        if min_version and compare_versions(current, min_version) < 0:
+            row['status'] = 'incompatible'
+            row['errors'].append(f"Current version too old (requires >={min_version})")
+        
+        max_version = skill_req.get('max_version')
+        if max_version and compare_versions(current, max_version) > 0:
+            row['warnings'].append(f"Current version newer than required (requires <={max_version})")
+        
+        latest = entry['latest_version']
+        if latest and compare_versions(latest, current) > 0:
+            row['update_available'] = latest
+        
+        with self._lock:
+            self.rows.setdefault(pipeline_name, {})[skill_name] = {'key': key, 'row': row}
+            self._dirty = True
+        return row
+    
+    def report(self, pipeline_config: Dict) -> Dict:
+        """Build a compatibility report for one pipeline from matrix rows."""
+        pipeline_name = pipeline_config.get('pipeline', 'unknown')
+        report = {
+            'pipeline': pipeline_name,
+            'compatible': True,
+            'skills': {},
+            'warnings': [],
+            'errors': []
+        }
+        
+        for skill_name, skill_req in pipeline_config.get('skills', {}).items():
+            row = self.skill_row(pipeline_name, skill_name, skill_req)
+            
+            if row is None:
+                report['skills'][skill_name] = {
+                    'status': 'missing',
+                    'error': 'Skill not found'
+                }
+                report['compatible'] = False
+                report['errors'].append(f"Skill {skill_name} not found")
+                continue
+            
+            skill_report = deepcopy(row)
+            if skill_report['status'] != 'compatible':
+                report['compatible'] = False
+            if 'update_available' in skill_report:
+                report['warnings'].append(
+                    f"Update available for {skill_name}: {skill_report['current_version']} → {skill_report['update_available']}"
+                )
+            report['skills'][skill_name] = skill_report
+        
+        with self._lock:
+            stale = set(self.rows.get(pipeline_name, ())) - set(pipeline_config.get('skills', {}))
+            for skill_name in stale:
+                self.rows[pipeline_name].pop(skill_name, None)
+            if stale:
+                self._dirty = True
+        
+        return report
+    
+    def reports(self, pipeline_configs: List[Dict], workers: Optional[int] = None,
+                save: bool = False) -> List[Dict]:
+        """
+        Build reports for many pipelines in one pass.
+        
+        Reports are built concurrently. With save, the index is persisted
+        once at the end.
+        """
+        if workers == 1 or len(pipeline_configs) <= 1:
+            results = [self.report(config) for config in pipeline_configs]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self.report, pipeline_configs))
+        
+        if save:
+            self.save()
+        return results
+
+
 class SkillCompatibilityChecker:
     """Checks compatibility between skills and pipelines."""
     
@@ -490,75 +1677,399 @@ class SkillCompatibilityChecker:
         if not skill:
             return [f"Skill {skill_name} not found"]
         
-        from_info = skill.get_version_info(from_version)
-        to_info = skill.get_version_info(to_version)
-        
-        if not from_info or not to_info:
+        if from_version not in skill.versions or to_version not in skill.versions:
             return [f"One or both versions not found"]
         
-        # Get breaking changes from all versions between from and to
-        breaking_changes = []
+        return [entry['description'] for entry in skill.breaking_changes.between(from_version, to_version)]
+    
+    def get_breaking_changes(self, upgrades: Dict[str, Tuple[str, str]]) -> Dict[str, List[Dict]]:
+        """
+        Get structured breaking changes for many skill upgrades at once.
         
-        for version in skill.available_versions:
-            if skill._compare_versions(version, from_version) > 0 and skill._compare_versions(version, to_version) <= 0:
-                version_info = skill.get_version_info(version)
-                if version_info:
-                    breaking_changes.extend(version_info.get('breaking_changes', []))
+        Args:
+            upgrades: Mapping of skill name to (from_version, to_version)
+            
+        Returns:
+            Mapping of skill name to breaking-change entries; skills that are
+            not installed are omitted
+        """
+        changes = {}
+        for skill_name, (from_version, to_version) in upgrades.items():
+            skill = self.registry.get_skill(skill_name)
+            if skill:
+                changes[skill_name] = skill.breaking_changes.between(from_version, to_version)
+        return changes
+    
+    def generate_compatibility_report(self, pipeline_config: Dict, persist: bool = False) -> Dict:
+        """
+        Generate a comprehensive compatibility report.
         
-        return breaking_changes
+        Args:
+            pipeline_config: Pipeline configuration
+            persist: Write the updated matrix to the registry index
+        """
+        matrix = self.registry.get_compatibility_index()
+        report = matrix.report(pipeline_config)
+        if persist:
+            matrix.save()
+        return report
     
-    def generate_compatibility_report(self, pipeline_config: Dict) -> Dict:
-        """Generate a comprehensive compatibility report."""
-        report = {
-            'pipeline': pipeline_config.get('pipeline', 'unknown'),
-            'compatible': True,
-            'skills': {},
-            'warnings': [],
-            'errors': []
+    def generate_compatibility_reports(self, pipeline_configs: List[Dict],
+                                       workers: Optional[int] = None,
+                                       persist: bool = False) -> List[Dict]:
+        """Generate compatibility reports for many pipelines in one pass, optionally persisting the matrix."""
+        return self.registry.get_compatibility_index().reports(pipeline_configs, workers, save=persist)
+
+
+class SkillLockfile:
+    """
+    Resolved-skills lockfile for a pipeline config.
+    
+    Records the chosen version of every skill, a content hash of each
+    skill's version directory and a hash of the pipeline config. Verifying
+    the lock only recomputes hashes; full resolution through
+    SkillDependencyResolver and SkillCompatibilityChecker runs only when
+    the config or a locked version directory has changed.
+    """
+    
+    LOCK_FORMAT = 1
+    LOCK_FILENAME = 'skills.lock'
+    
+    def __init__(self, skills_dir: Path, pipeline_config_path: Path, lock_path: Optional[Path] = None):
+        self.skills_dir = skills_dir
+        self.pipeline_config_path = Path(pipeline_config_path)
+        self.lock_path = lock_path or self.pipeline_config_path.parent / self.LOCK_FILENAME
+    
+    def load(self) -> Optional[Dict]:
+        """Load the lockfile, or None if it is missing or unreadable."""
+        try:
+            with open(self.lock_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, IOError):
+            return None
+    
+    def verify(self) -> Tuple[bool, List[str]]:
+        """
+        Verify the lock against the pipeline config and skill directories.
+        
+        Returns:
+            Tuple of (is_valid, reasons the lock is stale)
+        """
+        lock = self.load()
+        if lock is None:
+            return False, [f"Lockfile not found: {self.lock_path}"]
+        
+        if lock.get('lock_format') != self.LOCK_FORMAT:
+            return False, ["Lockfile format is outdated"]
+        
+        errors = []
+        
+        if not self.pipeline_config_path.exists():
+            errors.append(f"Pipeline config not found: {self.pipeline_config_path}")
+        elif hash_file(self.pipeline_config_path) != lock.get('config_hash'):
+            errors.append("Pipeline config changed since lock was generated")
+        
+        for skill_name, entry in lock.get('skills', {}).items():
+            version_dir = self.skills_dir / skill_name / 'versions' / entry.get('version', '')
+            if not version_dir.is_dir():
+                errors.append(f"{skill_name}@{entry.get('version')} is no longer installed")
+            elif hash_directory(version_dir) != entry.get('hash'):
+                errors.append(f"{skill_name}@{entry.get('version')} changed since lock was generated")
+        
+        return (len(errors) == 0, errors)
+    
+    def generate(self, registry: Optional['SkillRegistry'] = None) -> Tuple[bool, Dict[str, str], List[str]]:
+        """
+        Resolve the pipeline from scratch and write the lockfile.
+        
+        The lockfile is only written when resolution and compatibility
+        checks succeed.
+        
+        Returns:
+            Tuple of (success, skill_versions, errors)
+        """
+        try:
+            with open(self.pipeline_config_path, 'r') as f:
+                pipeline_config = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, IOError) as e:
+            return False, {}, [f"Cannot read pipeline config {self.pipeline_config_path}: {e}"]
+        
+        registry = registry or SkillRegistry(self.skills_dir)
+        requirements = self.pipeline_requirements(pipeline_config)
+        
+        success, skill_versions, errors = SkillDependencyResolver(registry).resolve_pipeline_requirements(requirements)
+        
+        pipeline_name = pipeline_config.get('pipeline') or pipeline_config.get('name') or self.pipeline_config_path.parent.name
+        compatible, compatibility_errors = SkillCompatibilityChecker(registry).check_pipeline_compatibility(
+            pipeline_name, requirements
+        )
+        errors.extend(e for e in compatibility_errors if e not in errors)
+        
+        if not success or not compatible:
+            return False, skill_versions, errors
+        
+        lock = {
+            'lock_format': self.LOCK_FORMAT,
+            'pipeline': pipeline_name,
+            'generated_at': datetime.now().isoformat(),
+            'config_hash': hash_file(self.pipeline_config_path),
+            'skills': {
+                skill_name: {
+                    'version': version,
+                    'hash': hash_directory(self.skills_dir / skill_name / 'versions' / version)
+                }
+                for skill_name, version in sorted(skill_versions.items())
+            }
         }
+        atomic_write_json(self.lock_path, lock)
         
-        skills_config = pipeline_config.get('skills', {})
+        return True, skill_versions, []
+    
+    def resolve(self, registry: Optional['SkillRegistry'] = None) -> Tuple[bool, Dict[str, str], List[str]]:
+        """
+        Get locked skill versions, regenerating the lock only if it is stale.
         
-        for skill_name, skill_req in skills_config.items():
-            skill = self.registry.get_skill(skill_name)
+        Returns:
+            Tuple of (success, skill_versions, errors)
+        """
+        is_valid, _ = self.verify()
+        if is_valid:
+            lock = self.load()
+            return True, {name: entry['version'] for name, entry in lock['skills'].items()}, []
+        return self.generate(registry)
+    
+    @staticmethod
+    def pipeline_requirements(pipeline_config: Dict) -> Dict:
+        """
+        Normalize a pipeline config to the resolver's {'skills': {...}} form.
+        
+        Team pipeline configs declare their skills under
+        capabilities.dependencies rather than a top-level `skills` map.
+        """
+        if 'skills' in pipeline_config:
+            return pipeline_config
+        
+        capabilities = pipeline_config.get('capabilities', {})
+        dependencies = capabilities.get('dependencies', {}) if isinstance(capabilities, dict) else {}
+        return {**pipeline_config, 'skills': dependencies}
+
+
+def _migrate_state_file(state_path: str, skill_name: str, to_version: str,
+                        hops: List[Tuple[str, str, str]]) -> Dict:
+    """
+    Migrate one workflow state file in place.
+    
+    Runs in a worker process, so everything it needs is passed as plain
+    picklable values and every failure is reported rather than raised.
+    
+    Returns:
+        Result dict with path, status, error and per-hop timings
+    """
+    result = {'path': state_path, 'status': 'failed', 'error': None, 'timings': []}
+    
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        
+        def record(first_hop: int, hop_count: int, seconds: float):
+            for from_version, hop_version, _ in hops[first_hop:first_hop + hop_count]:
+                result['timings'].append((from_version, hop_version, seconds / hop_count))
+        
+        # The state was just read from disk, so every hop may work in place
+        migrations = [load_migration(Path(migration_file)) for _, _, migration_file in hops]
+        state = run_migrations(state, migrations, owned=True, on_group=record)
+        
+        state.setdefault('skills_used', {})[skill_name] = to_version
+        # Synced before the checkpoint can record the file as migrated
+        atomic_write_json(state_path, state)
+        result['status'] = 'migrated'
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    
+    return result
+
+
+class BulkStateMigrator:
+    """
+    Migrates many workflow state files to a new skill version.
+    
+    Each file's source version is read from its `skills_used` entry for the
+    skill. Migration paths are planned once per distinct source version, and
+    files are migrated in a process pool so one bad file only fails itself.
+    Completed files are recorded in a checkpoint, so rerunning an
+    interrupted migration skips them.
+    """
+    
+    CHECKPOINT_INTERVAL = 32
+    
+    def __init__(self, version_manager: SkillVersionManager, to_version: str,
+                 workers: Optional[int] = None, checkpoint_path: Optional[Path] = None,
+                 default_from_version: Optional[str] = None):
+        self.version_manager = version_manager
+        self.to_version = to_version
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_path = checkpoint_path
+        self.default_from_version = default_from_version
+        self.completed: Dict[str, str] = {}
+    
+    def collect_files(self, paths: List[Union[str, Path]]) -> List[Path]:
+        """
+        Expand files and directories (searched recursively for *.json) into
+        state files, leaving out the checkpoint.
+        """
+        checkpoint = self.checkpoint_path.resolve() if self.checkpoint_path else None
+        files = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                files.extend(sorted(path.rglob('*.json')))
+            else:
+                files.append(path)
+        return [f for f in files if checkpoint is None or f.resolve() != checkpoint]
+    
+    def plan(self, from_version: str) -> List[Tuple[str, str, str]]:
+        """
+        Plan the migration hops from a source version.
+        
+        Returns:
+            List of (from_version, to_version, migration_file) hops
             
-            if not skill:
-                report['skills'][skill_name] = {
-                    'status': 'missing',
-                    'error': 'Skill not found'
-                }
-                report['compatible'] = False
-                report['errors'].append(f"Skill {skill_name} not found")
-                continue
+        Raises:
+            ValueError: If no migration path exists
+        """
+        hops = []
+        current = from_version
+        for hop_version in self.version_manager.get_migration_path(from_version, self.to_version):
+            migration_file = self.version_manager.migration_index.get_path(current, hop_version)
+            hops.append((current, hop_version, str(migration_file)))
+            current = hop_version
+        return hops
+    
+    def migrate(self, paths: List[Union[str, Path]],
+                on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Migrate every state file under the given paths.
+        
+        Args:
+            paths: State files or directories containing them
+            on_progress: Called with each file's result as it completes
             
-            skill_report = {
-                'current_version': skill.current_version,
-                'required_version': skill_req.get('version'),
-                'min_version': skill_req.get('min_version'),
-                'max_version': skill_req.get('max_version'),
-                'status': 'compatible',
-                'warnings': [],
-                'errors': []
-            }
+        Returns:
+            Summary with counts, failures and elapsed time
+        """
+        started = time.perf_counter()
+        self.completed = self._load_checkpoint()
+        
+        results = []
+        pending: List[Tuple[str, List[Tuple[str, str, str]]]] = []
+        plans: Dict[str, Union[List[Tuple[str, str, str]], str]] = {}
+        
+        for state_file in self.collect_files(paths):
+            key = str(state_file)
+            if key in self.completed:
+                results.append(self._report({'path': key, 'status': 'resumed', 'error': None}, on_progress))
+                continue
             
-            # Check version compatibility
-            min_version = skill_req.get('min_version')
-            if min_version and skill._compare_versions(skill.current_version, min_version) < 0:
-                skill_report['status'] = 'incompatible'
-                skill_report['errors'].append(f"Current version too old (requires >={min_version})")
-                report['compatible'] = False
+            from_version = self._source_version(state_file)
+            if from_version is None:
+                results.append(self._report({'path': key, 'status': 'failed',
+                                             'error': f"No {self.version_manager.skill_name} version recorded"}, on_progress))
+                continue
             
-            max_version = skill_req.get('max_version')
-            if max_version and skill._compare_versions(skill.current_version, max_version) > 0:
-                skill_report['warnings'].append(f"Current version newer than required (requires <={max_version})")
+            if compare_versions(from_version, self.to_version) == 0:
+                results.append(self._report({'path': key, 'status': 'skipped', 'error': None}, on_progress))
+                self.completed[key] = 'skipped'
+                continue
             
-            # Check for updates available
-            if skill.available_versions:
-                latest = max(skill.available_versions, key=skill._parse_version)
-                if skill._compare_versions(latest, skill.current_version) > 0:
-                    skill_report['update_available'] = latest
-                    report['warnings'].append(f"Update available for {skill_name}: {skill.current_version} → {latest}")
+            if from_version not in plans:
+                try:
+                    plans[from_version] = self.plan(from_version)
+                except ValueError as e:
+                    plans[from_version] = str(e)
             
-            report['skills'][skill_name] = skill_report
+            plan = plans[from_version]
+            if isinstance(plan, str):
+                results.append(self._report({'path': key, 'status': 'failed', 'error': plan}, on_progress))
+            else:
+                pending.append((key, plan))
+        
+        try:
+            for result in self._run(pending):
+                for from_version, hop_version, seconds in result.get('timings', ()):
+                    self.version_manager.migration_planner.record_timing(from_version, hop_version, seconds)
+                if result['status'] == 'migrated':
+                    self.completed[result['path']] = 'migrated'
+                    if len(self.completed) % self.CHECKPOINT_INTERVAL == 0:
+                        self._save_checkpoint()
+                results.append(self._report(result, on_progress))
+        finally:
+            self._save_checkpoint()
+        
+        summary = {status: sum(1 for r in results if r['status'] == status)
+                   for status in ('migrated', 'skipped', 'resumed', 'failed')}
+        summary['total'] = len(results)
+        summary['failures'] = {r['path']: r['error'] for r in results if r['status'] == 'failed'}
+        summary['elapsed'] = time.perf_counter() - started
+        
+        if not summary['failures'] and self.checkpoint_path and self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+        
+        return summary
+    
+    def _run(self, pending: List[Tuple[str, List[Tuple[str, str, str]]]]):
+        """Yield worker results as files finish."""
+        skill_name = self.version_manager.skill_name
+        
+        if self.workers <= 1 or len(pending) <= 1:
+            for key, hops in pending:
+                yield _migrate_state_file(key, skill_name, self.to_version, hops)
+            return
         
-        return report
\ No newline at end of file
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(_migrate_state_file, key, skill_name, self.to_version, hops): key
+                for key, hops in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield {'path': futures[future], 'status': 'failed', 'error': f"Worker failed: {e}"}
+    
+    def _source_version(self, state_file: Path) -> Optional[str]:
+        """Read the skill version a state file was written with."""
+        try:
+            with open(state_file, 'r') as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return self.default_from_version
+        
+        skills_used = state.get('skills_used', {}) if isinstance(state, dict) else {}
+        return skills_used.get(self.version_manager.skill_name, self.default_from_version)
+    
+    def _report(self, result: Dict, on_progress: Optional[Callable[[Dict], None]]) -> Dict:
+        if on_progress:
+            on_progress(result)
+        return result
+    
+    def _load_checkpoint(self) -> Dict[str, str]:
+        """Load completed files from a checkpoint for the same skill and target."""
+        if not self.checkpoint_path or not self.checkpoint_path.exists():
+            return {}
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+        
+        if checkpoint.get('skill') != self.version_manager.skill_name or checkpoint.get('to_version') != self.to_version:
+            return {}
+        return checkpoint.get('completed', {})
+    
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        atomic_write_json(self.checkpoint_path, {
+            'skill': self.version_manager.skill_name,
+            'to_version': self.to_version,
+            'completed': self.completed
+        }, indent=None)
@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner for the skill tooling.
+Builds synthetic registries and states at realistic scale and reports timings.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from copy import deepcopy
+from pathlib import Path
+from typing import Callable, Dict
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from skill_manager import SkillRegistry, SkillDependencyResolver, SkillVersionManager, BulkStateMigrator
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+from skill_archive import pack_skills
+from skill_repository import SkillRepository
+from merkle import MerkleHasher
+from json_diff import apply_patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'git-flow'))
+from pipeline_manager import BackupManager, MigrationExecutor, PipelineVersionManager, PipelineUpdateManager, StateValidator
+
+
+BENCHMARKS: Dict[str, Callable[[], Dict]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark function under a name."""
+    def decorator(func: Callable[[], Dict]) -> Callable[[], Dict]:
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def build_synthetic_registry(skills_dir: Path, skill_count: int, version_count: int, seed: int = 7) -> Dict:
+    """
+    Create a registry of skills whose newer versions tighten dependency bounds.
+
+    Skill i depends on up to three lower-numbered skills. Its newest versions
+    cap those dependencies below their newest versions, so picking the latest
+    version of everything is inconsistent and the solver has to backtrack.
+    """
+    rng = random.Random(seed)
+    pipeline = {"pipeline": "synthetic", "skills": {}}
+
+    for i in range(skill_count):
+        name = f"skill-{i:04d}"
+        skill_dir = skills_dir / name
+        skill_dir.mkdir(parents=True)
+        (skill_dir / 'SKILL.md').write_text(f"# {name}")
+        (skill_dir / 'config.json').write_text(json.dumps({"version": f"{version_count}.0.0"}))
+
+        deps = rng.sample(range(i), min(i, 3)) if i else []
+        for v in range(1, version_count + 1):
+            version_dir = skill_dir / 'versions' / f"{v}.0.0"
+            version_dir.mkdir(parents=True)
+            dependencies = {}
+            for j in deps:
+                low = max(1, v // 3)
+                high = version_count - 1 if v > version_count // 2 else version_count
+                dependencies[f"skill-{j:04d}"] = {"min_version": f"{low}.0.0", "max_version": f"{high}.0.0"}
+            (version_dir / 'capabilities.json').write_text(json.dumps({
+                "capabilities": [f"{name}-capability", f"group-{i % 10}"],
+                "dependencies": dependencies
+            }))
+
+        pipeline["skills"][name] = {"min_version": "1.0.0"}
+
+    return pipeline
+
+
+@benchmark('resolver')
+def bench_resolver(skill_count: int = 300, version_count: int = 30) -> Dict:
+    """Resolve a pipeline requiring hundreds of skills with dozens of versions each."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        pipeline = build_synthetic_registry(temp_dir, skill_count, version_count)
+
+        started = time.perf_counter()
+        registry = SkillRegistry(temp_dir)
+        load_time = time.perf_counter() - started
+
+        resolver = SkillDependencyResolver(registry)
+        started = time.perf_counter()
+        success, versions, errors = resolver.resolve_pipeline_requirements(pipeline)
+        resolve_time = time.perf_counter() - started
+
+        return {
+            'skills': skill_count,
+            'versions_per_skill': version_count,
+            'resolved': success,
+            'resolved_skills': len(versions),
+            'errors': len(errors),
+            'registry_load_s': round(load_time, 4),
+            'resolve_s': round(resolve_time, 4),
+        }
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('registry-load')
+def bench_registry_load(skill_count: int = 300, version_count: int = 30) -> Dict:
+    """Cold-load a large registry from the directory layout and from a packed archive."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        skills_dir = temp_dir / 'skills'
+        build_synthetic_registry(skills_dir, skill_count, version_count)
+        archive_path = temp_dir / 'skills.zip'
+        pack_skills(skills_dir, archive_path)
+        
+        started = time.perf_counter()
+        SkillRegistry(skills_dir)
+        directory_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        SkillRegistry(archive_path)
+        archive_time = time.perf_counter() - started
+        
+        return {
+            'skills': skill_count,
+            'versions_per_skill': version_count,
+            'archive_bytes': archive_path.stat().st_size,
+            'directory_load_s': round(directory_time, 4),
+            'archive_load_s': round(archive_time, 4),
+        }
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('repository-sync')
+def bench_repository_sync(skill_count: int = 100, version_count: int = 5) -> Dict:
+    """Sync hundreds of versions from a local repository, then resync with nothing changed."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        source_dir = temp_dir / 'source'
+        checkout_dir = temp_dir / 'checkout'
+        checkout_dir.mkdir()
+        build_synthetic_registry(source_dir, skill_count, version_count)
+        
+        repo = SkillRepository(temp_dir / 'repo')
+        started = time.perf_counter()
+        repo.publish(source_dir)
+        publish_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        first = repo.sync(checkout_dir)
+        sync_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        repo.sync(checkout_dir)
+        resync_time = time.perf_counter() - started
+        
+        return {
+            'versions': skill_count * version_count,
+            'synced': len(first['synced']),
+            'publish_s': round(publish_time, 4),
+            'sync_s': round(sync_time, 4),
+            'resync_s': round(resync_time, 4),
+        }
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('bulk-migration')
+def bench_bulk_migration(file_count: int = 2000, version_count: int = 4) -> Dict:
+    """Migrate thousands of workflow state files spread over several source versions."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        versions_dir = temp_dir / 'skills' / 'bench-skill' / 'versions'
+        for v in range(1, version_count + 1):
+            (versions_dir / f"{v}.0.0").mkdir(parents=True)
+            if v > 1:
+                migrations_dir = versions_dir / f"{v}.0.0" / 'migrations'
+                migrations_dir.mkdir()
+                (migrations_dir / f"from_{v - 1}_0_0.py").write_text(
+                    f"def migrate(state):\n    state['v{v}'] = len(state['history'])\n    return state\n"
+                )
+        
+        states_dir = temp_dir / 'states'
+        states_dir.mkdir()
+        for i in range(file_count):
+            (states_dir / f"state-{i:05d}.json").write_text(json.dumps({
+                "skills_used": {"bench-skill": f"{i % (version_count - 1) + 1}.0.0"},
+                "history": [{"step": n} for n in range(50)]
+            }))
+        
+        manager = SkillVersionManager('bench-skill', temp_dir / 'skills')
+        target = f"{version_count}.0.0"
+        results = {}
+        for label, workers in (('serial', 1), ('parallel', None)):
+            for state_file in states_dir.iterdir():
+                state = json.loads(state_file.read_text())
+                state['skills_used']['bench-skill'] = f"{int(state_file.stem[-5:]) % (version_count - 1) + 1}.0.0"
+                state_file.write_text(json.dumps(state))
+            
+            migrator = BulkStateMigrator(manager, target, workers=workers)
+            summary = migrator.migrate([states_dir])
+            results[f"{label}_s"] = round(summary['elapsed'], 4)
+            results[f"{label}_workers"] = migrator.workers
+            results['migrated'] = summary['migrated']
+        
+        return {'files': file_count, **results}
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('backup-store')
+def bench_backup_store(branch_count: int = 20000, backup_count: int = 20) -> Dict:
+    """Back up a large workflow state repeatedly, changing one branch between backups."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        state = {
+            "version": "1.0.0",
+            "branches": {f"feature-{i:05d}": {"status": "active", "phase": i % 12, "commits": [f"{i:x}"] * 3}
+                         for i in range(branch_count)}
+        }
+        
+        # Baseline: one full indent=2 JSON copy per backup, as before the chunk store
+        legacy_dir = temp_dir / 'legacy'
+        started = time.perf_counter()
+        for n in range(backup_count):
+            state["branches"][f"feature-{n:05d}"]["status"] = "merged"
+            backup_dir = legacy_dir / f"backup_{n:03d}"
+            backup_dir.mkdir(parents=True)
+            with open(backup_dir / 'state.json', 'w') as f:
+                json.dump(state, f, indent=2)
+        legacy_time = time.perf_counter() - started
+        legacy_bytes = sum(p.stat().st_size for p in legacy_dir.rglob('*') if p.is_file())
+        
+        results = {'backups': backup_count, 'legacy_s': round(legacy_time, 4), 'legacy_bytes': legacy_bytes}
+        for label, full_every in (('chunked', 0), ('delta', None)):
+            backups_dir = temp_dir / label
+            manager = BackupManager(backups_dir, full_every=full_every)
+            started = time.perf_counter()
+            for n in range(backup_count):
+                state["branches"][f"feature-{n:05d}"]["status"] = label
+                last_id = manager.create_backup(state)
+            results[f'{label}_s'] = round(time.perf_counter() - started, 4)
+            results[f'{label}_bytes'] = sum(p.stat().st_size for p in backups_dir.rglob('*') if p.is_file())
+            
+            started = time.perf_counter()
+            BackupManager(backups_dir).restore_backup(last_id)
+            results[f'{label}_restore_s'] = round(time.perf_counter() - started, 4)
+        
+        return results
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('backup-catalog')
+def bench_backup_catalog(backup_count: int = 2000, keep_count: int = 100) -> Dict:
+    """List and prune thousands of backups: per-backup metadata scan versus the catalog."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        manager = BackupManager(temp_dir / 'backups')
+        for n in range(backup_count):
+            manager.create_backup({"version": "1.0.0", "n": n}, {"pipeline": "bench"})
+        
+        # Baseline: open and parse every metadata.json, then sort
+        started = time.perf_counter()
+        scanned = []
+        for backup_dir in manager.backups_dir.iterdir():
+            metadata_file = backup_dir / 'metadata.json'
+            if metadata_file.exists():
+                scanned.append(json.loads(metadata_file.read_text()))
+        scanned.sort(key=lambda x: x['timestamp'], reverse=True)
+        scan_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        listed = BackupManager(manager.backups_dir).list_backups(limit=50)
+        catalog_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        deleted = manager.cleanup_old_backups(keep_count)
+        cleanup_time = time.perf_counter() - started
+        
+        return {
+            'backups': backup_count,
+            'metadata_scan_s': round(scan_time, 4),
+            'catalog_list_s': round(catalog_time, 4),
+            'listed': len(listed),
+            'cleanup_s': round(cleanup_time, 4),
+            'deleted': deleted,
+        }
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('executor-memory')
+def bench_executor_memory(branch_count: int = 20000) -> Dict:
+    """Run one small in-place migration on a large state: three deep copies versus copy-on-write."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        skill_dir = temp_dir / 'bench-pipeline'
+        migrations_dir = skill_dir / 'versions' / '2.0.0' / 'migrations'
+        migrations_dir.mkdir(parents=True)
+        (skill_dir / 'versions' / '1.0.0').mkdir()
+        (skill_dir / 'config.json').write_text(json.dumps({"version": "1.0.0"}))
+        (migrations_dir / 'from_1_0_0.py').write_text(
+            "COPY_ON_WRITE = True\n\n"
+            "def migrate(state):\n"
+            "    state['branches']['feature-00000']['status'] = 'merged'\n"
+            "    state['migrated'] = True\n"
+            "    return state\n"
+        )
+        manager = PipelineVersionManager('bench-pipeline', skill_dir)
+        migration = manager.get_migration('1.0.0', '2.0.0')
+        state = {
+            "version": "1.0.0",
+            "branches": {f"feature-{i:05d}": {"status": "active", "phase": i % 12, "commits": [f"{i:x}"] * 3}
+                         for i in range(branch_count)}
+        }
+        
+        def measure(run: Callable[[], object]):
+            tracemalloc.start()
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return result, elapsed, peak
+        
+        # Baseline: copy on construction, on backup and again to migrate in place
+        def legacy():
+            working = deepcopy(state)
+            backup = deepcopy(working)
+            migrated = migration(deepcopy(working))
+            return migrated, backup
+        
+        def copy_on_write():
+            executor = MigrationExecutor(state, manager)
+            executor.apply_migration('1.0.0', '2.0.0')
+            return executor.state
+        
+        _, legacy_time, legacy_peak = measure(legacy)
+        migrated, cow_time, cow_peak = measure(copy_on_write)
+        
+        return {
+            'branches': branch_count,
+            'deepcopy_s': round(legacy_time, 4),
+            'deepcopy_peak_bytes': legacy_peak,
+            'cow_s': round(cow_time, 4),
+            'cow_peak_bytes': cow_peak,
+            'migrated': migrated.get('migrated', False),
+        }
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('state-hash')
+def bench_state_hash(branch_count: int = 20000) -> Dict:
+    """Detect state changes: hashing the serialized state versus cached Merkle hashes."""
+    import hashlib
+    state = {
+        "version": "1.0.0",
+        "branches": {f"feature-{i:05d}": {"status": "active", "phase": i % 12, "commits": [f"{i:x}"] * 3}
+                     for i in range(branch_count)}
+    }
+    changed = apply_patch(state, [{"op": "set", "path": ["branches", "feature-00042", "status"], "value": "merged"}])
+    
+    # Baseline: serialize and hash the whole state on every check
+    started = time.perf_counter()
+    hashlib.md5(json.dumps(state, sort_keys=True).encode()).hexdigest()
+    serialized_time = time.perf_counter() - started
+    
+    hasher = MerkleHasher()
+    started = time.perf_counter()
+    original = hasher.hash(state)
+    first_time = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    unchanged = hasher.hash(state) == original
+    noop_time = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    detected = hasher.hash(changed) != original
+    incremental_time = time.perf_counter() - started
+    
+    return {
+        'branches': branch_count,
+        'serialized_hash_s': round(serialized_time, 4),
+        'merkle_first_s': round(first_time, 4),
+        'merkle_noop_us': round(noop_time * 1e6, 1),
+        'merkle_one_change_s': round(incremental_time, 4),
+        'detected': unchanged and detected,
+    }
+
+
+@benchmark('pipeline-startup')
+def bench_pipeline_startup(version_count: int = 300, runs: int = 20) -> Dict:
+    """Construct the pipeline update manager as every git-flow command does, eagerly versus lazily."""
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        skill_dir = temp_dir / 'bench-pipeline'
+        (skill_dir / 'versions' / '1.0.0').mkdir(parents=True)
+        (skill_dir / 'config.json').write_text(json.dumps({"version": "1.0.0"}))
+        for v in range(2, version_count + 1):
+            migrations_dir = skill_dir / 'versions' / f"{v}.0.0" / 'migrations'
+            migrations_dir.mkdir(parents=True)
+            (migrations_dir / f"from_{v - 1}_0_0.py").write_text("def migrate(state):\n    return state\n")
+        
+        # Baseline: everything the constructor used to load up front
+        started = time.perf_counter()
+        for _ in range(runs):
+            manager = PipelineUpdateManager('bench-pipeline', skill_dir)
+            manager.version_manager.available_versions
+            manager.version_manager.migration_planner
+            manager.backup_manager
+        eager_time = (time.perf_counter() - started) / runs
+        shutil.rmtree(skill_dir / 'backups')
+        
+        # A read-only command such as status only constructs the manager
+        started = time.perf_counter()
+        for _ in range(runs):
+            PipelineUpdateManager('bench-pipeline', skill_dir)
+        lazy_time = (time.perf_counter() - started) / runs
+        
+        started = time.perf_counter()
+        for _ in range(runs):
+            PipelineUpdateManager('bench-pipeline', skill_dir).check_for_updates()
+        check_time = (time.perf_counter() - started) / runs
+        
+        return {
+            'versions': version_count,
+            'eager_ms': round(eager_time * 1000, 3),
+            'lazy_ms': round(lazy_time * 1000, 3),
+            'check_updates_ms': round(check_time * 1000, 3),
+            'backups_dir_created': (skill_dir / 'backups').exists(),
+        }
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('state-validation')
+def bench_state_validation(branch_count: int = 10000, runs: int = 20) -> Dict:
+    """Validate a workflow state with many branches against the git-flow schema, cold versus cached."""
+    schema_dir = Path(__file__).parent.parent / 'git-flow' / 'versions'
+    state = {
+        "feature": "bench",
+        "status": "in_progress",
+        "current_phase": 3,
+        "phases": [
+            {"name": f"phase-{i}", "role": "engineer", "order": i, "required": True, "status": "active"}
+            for i in range(10)
+        ],
+        "branches": {
+            f"feature-{i}": {"name": f"feature-{i}", "role": "engineer", "status": "reviewing",
+                             "phase": i % 10, "created_at": "2024-01-01T00:00:00"}
+            for i in range(branch_count)
+        }
+    }
+    
+    # A fresh validator per call loads and compiles the schema every time
+    started = time.perf_counter()
+    for _ in range(runs):
+        valid, _ = StateValidator(schema_dir).validate(state, '1.0.0')
+    cold_time = (time.perf_counter() - started) / runs
+    
+    validator = StateValidator(schema_dir)
+    validator.validate(state, '1.0.0')
+    started = time.perf_counter()
+    for _ in range(runs):
+        validator.validate(state, '1.0.0')
+    cached_time = (time.perf_counter() - started) / runs
+    
+    state["branches"]["feature-7"]["status"] = "lost"
+    _, errors = validator.validate(state, '1.0.0')
+    
+    return {
+        'branches': branch_count,
+        'valid': valid,
+        'cold_ms': round(cold_time * 1000, 3),
+        'cached_ms': round(cached_time * 1000, 3),
+        'errors_found': errors,
+    }
+
+
+@contextlib.contextmanager
+def slow_fsync(latency_s: float):
+    """Add a fixed latency to every fsync, like a slow or networked disk; the wait releases the GIL."""
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        time.sleep(latency_s)
+        real_fsync(fd)
+
+    with mock.patch('os.fsync', fsync):
+        yield
+
+
+@benchmark('async-backup')
+def bench_async_backup(branch_count: int = 20000, runs: int = 3, fsync_latency_ms: float = 2.0) -> Dict:
+    """
+    Update a large state with the backup written before the migration versus alongside it.
+
+    Under the GIL only the backup's compression, writes and fsyncs overlap the
+    migration, so each mode is timed on local storage and again with every
+    fsync slowed down by `fsync_latency_ms`. `overlap_ms` is the backup time
+    the async mode hid behind the migration.
+    """
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        state = {
+            "version": "1.0.0",
+            "branches": {f"feature-{i}": {"status": "active", "notes": f"note {i}" * 4} for i in range(branch_count)}
+        }
+        results = {'branches': branch_count, 'slow_fsync_latency_ms': fsync_latency_ms}
+        for label, latency_ms in (('', 0.0), ('slow_', fsync_latency_ms)):
+            timings = {}
+            with slow_fsync(latency_ms / 1000):
+                started = time.perf_counter()
+                BackupManager(temp_dir / f"{label}backup-only").create_backup(state)
+                timings['backup'] = time.perf_counter() - started
+                
+                for mode in ('sync', 'async'):
+                    total = 0.0
+                    for run in range(runs):
+                        skill_dir = temp_dir / f"{label}{mode}-{run}"
+                        migrations_dir = skill_dir / 'versions' / '2.0.0' / 'migrations'
+                        migrations_dir.mkdir(parents=True)
+                        (skill_dir / 'versions' / '1.0.0').mkdir()
+                        (skill_dir / 'config.json').write_text(json.dumps({"version": "1.0.0"}))
+                        # A migration that reworks every branch, long enough for the backup to overlap
+                        (migrations_dir / 'from_1_0_0.py').write_text(
+                            "import hashlib\n\n"
+                            "def migrate(state):\n"
+                            "    for name, branch in state['branches'].items():\n"
+                            "        branch['status'] = branch['status'].upper()\n"
+                            "        branch['words'] = sorted(set(branch['notes'].split()))\n"
+                            "        branch['id'] = hashlib.sha1(name.encode()).hexdigest()[:12]\n"
+                            "    return state\n"
+                        )
+                        manager = PipelineUpdateManager('bench-pipeline', skill_dir, async_backups=(mode == 'async'))
+                        started = time.perf_counter()
+                        success, message = manager.update_to_version('2.0.0', state)
+                        total += time.perf_counter() - started
+                        assert success, message
+                    timings[mode] = total / runs
+            
+            results.update({
+                f'{label}backup_ms': round(timings['backup'] * 1000, 1),
+                f'{label}sync_ms': round(timings['sync'] * 1000, 1),
+                f'{label}async_ms': round(timings['async'] * 1000, 1),
+                f'{label}overlap_ms': round((timings['sync'] - timings['async']) * 1000, 1),
+            })
+        return results
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+@benchmark('gitflow-startup')
+def bench_gitflow_startup(branch_count: int = 2000, version_count: int = 200, runs: int = 5) -> Dict:
+    """Start each git-flow command, loading every subsystem versus only those it declares."""
+    from test_git_flow import git_flow, write_git_flow_repo
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        write_git_flow_repo(temp_dir, branch_count, version_count)
+        everything = ('config', 'phases', 'workflow_state', 'pipeline_update_manager')
+        
+        def startup_ms(subsystems) -> float:
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    git_flow.GitFlow(temp_dir).load(subsystems)
+                timings.append(time.perf_counter() - started)
+            return round(min(timings) * 1000, 2)
+        
+        result = {'branches': branch_count, 'versions': version_count, 'eager_ms': startup_ms(everything)}
+        for command, subsystems in git_flow.COMMAND_SUBSYSTEMS.items():
+            result[f'{command}_ms'] = startup_ms(subsystems)
+        return result
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def run_benchmarks(names=None) -> int:
+    """Run the selected benchmarks and print their results."""
+    selected = names or sorted(BENCHMARKS)
+
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name}")
+            return 1
+        result = BENCHMARKS[name]()
+        print(f"{name}:")
+        for key, value in result.items():
+            print(f"  {key}: {value}")
+
+    return 0
+
+
+def main():
+    """Main entry point."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run skill tooling benchmarks')
+    parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all)')
+    parser.add_argument('--list', action='store_true', help='List available benchmarks')
+
+    args = parser.parse_args()
+
+    if args.list:
+        for name in sorted(BENCHMARKS):
+            print(name)
+        return 0
+
+    return run_benchmarks(args.names)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Test runner for skill_manager tests.
+Test runner for skill_manager, pipeline_manager, git-flow and utils tests.
 Provides convenient command-line interface for running tests.
 """
 
@@ -15,7 +15,36 @@ from test_skill_manager import (
     TestSkillVersionManager,
     TestSkillRegistry,
     TestSkillDependencyResolver,
-    TestSkillCompatibilityChecker
+    TestSkillCompatibilityChecker,
+    TestBreakingChangesIndex,
+    TestCompatibilityMatrix,
+    TestSkillQueryIndex,
+    TestSkillLockfile,
+    TestBulkStateMigrator,
+    TestRegistryWatcher,
+    TestSkillArchive
+)
+from test_pipeline_manager import (
+    TestPipelineVersionManager,
+    TestPipelineUpdateManager,
+    TestStateValidator,
+    TestMigrationSimulator,
+    TestBackupManager
+)
+from test_git_flow import TestGitFlowStartup
+from test_utils import (
+    TestVersion,
+    TestSortedVersions,
+    TestMigrationPlanner,
+    TestDeclarativeMigration,
+    TestChunkStore,
+    TestBackupCatalog,
+    TestJsonDiff,
+    TestCowState,
+    TestMerkleHasher,
+    TestFileTransaction,
+    TestInotify,
+    TestSkillRepository
 )
 
 
@@ -30,6 +59,31 @@ def run_tests(verbosity=2):
     suite.addTests(loader.loadTestsFromTestCase(TestSkillRegistry))
     suite.addTests(loader.loadTestsFromTestCase(TestSkillDependencyResolver))
     suite.addTests(loader.loadTestsFromTestCase(TestSkillCompatibilityChecker))
+    suite.addTests(loader.loadTestsFromTestCase(TestBreakingChangesIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestCompatibilityMatrix))
+    suite.addTests(loader.loadTestsFromTestCase(TestSkillQueryIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestSkillLockfile))
+    suite.addTests(loader.loadTestsFromTestCase(TestBulkStateMigrator))
+    suite.addTests(loader.loadTestsFromTestCase(TestRegistryWatcher))
+    suite.addTests(loader.loadTestsFromTestCase(TestSkillArchive))
+    suite.addTests(loader.loadTestsFromTestCase(TestPipelineVersionManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestPipelineUpdateManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestStateValidator))
+    suite.addTests(loader.loadTestsFromTestCase(TestMigrationSimulator))
+    suite.addTests(loader.loadTestsFromTestCase(TestBackupManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestGitFlowStartup))
+    suite.addTests(loader.loadTestsFromTestCase(TestVersion))
+    suite.addTests(loader.loadTestsFromTestCase(TestSortedVersions))
+    suite.addTests(loader.loadTestsFromTestCase(TestMigrationPlanner))
+    suite.addTests(loader.loadTestsFromTestCase(TestDeclarativeMigration))
+    suite.addTests(loader.loadTestsFromTestCase(TestChunkStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestBackupCatalog))
+    suite.addTests(loader.loadTestsFromTestCase(TestJsonDiff))
+    suite.addTests(loader.loadTestsFromTestCase(TestCowState))
+    suite.addTests(loader.loadTestsFromTestCase(TestMerkleHasher))
+    suite.addTests(loader.loadTestsFromTestCase(TestFileTransaction))
+    suite.addTests(loader.loadTestsFromTestCase(TestInotify))
+    suite.addTests(loader.loadTestsFromTestCase(TestSkillRepository))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=verbosity)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test suite for git-flow/git-flow.py
+Tests lazy construction and per-command startup of GitFlow.
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / 'git-flow'))
+
+# The script's name is not a valid module name
+_spec = importlib.util.spec_from_file_location('git_flow', Path(__file__).parent.parent / 'git-flow' / 'git-flow.py')
+git_flow = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(git_flow)
+
+
+def write_git_flow_repo(repo_root: Path, branch_count: int, version_count: int) -> Path:
+    """Write a git-flow skill directory with a workflow in progress; returns the skill directory."""
+    skill_dir = repo_root / '.iflow' / 'skills' / 'git-flow'
+    (skill_dir / 'versions' / '1.0.0').mkdir(parents=True)
+    (skill_dir / 'config.json').write_text(json.dumps({"version": "1.0.0"}))
+    for v in range(2, version_count + 1):
+        migrations_dir = skill_dir / 'versions' / f"{v}.0.0" / 'migrations'
+        migrations_dir.mkdir(parents=True)
+        (migrations_dir / f"from_{v - 1}_0_0.py").write_text("def migrate(state):\n    return state\n")
+
+    phases = [
+        {"name": f"Phase {i}", "role": "Software Engineer", "order": i, "required": True, "status": "active"}
+        for i in range(1, 9)
+    ]
+    branches = {
+        f"feature-{i}": {"name": f"feature-{i}", "role": "Software Engineer", "status": "merged",
+                         "phase": i % 8 + 1, "created_at": "2024-01-01T00:00:00", "commits": []}
+        for i in range(branch_count)
+    }
+    (skill_dir / 'workflow-state.json').write_text(json.dumps({
+        "feature": "bench", "status": "in_progress", "current_phase": 3, "phases": phases,
+        "branches": {}, "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00"
+    }))
+    (skill_dir / 'branch-states.json').write_text(json.dumps(branches))
+    return skill_dir
+
+
+def loaded_subsystems(flow) -> set:
+    """Names of the GitFlow subsystems that have been loaded."""
+    loaded = {
+        'config': flow._config is not None,
+        'phases': flow._phases is not None,
+        'workflow_state': flow._workflow_loaded,
+        'pipeline_update_manager': flow._pipeline_update_manager is not None,
+    }
+    return {name for name, is_loaded in loaded.items() if is_loaded}
+
+
+class TestGitFlowStartup(unittest.TestCase):
+    """Test GitFlow loads only what each command declares."""
+
+    READ_ONLY_COMMANDS = [
+        ['status'], ['history'], ['review'], ['versions'], ['check-updates'], ['backups'],
+        ['update', '--dry-run']
+    ]
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.repo_root = Path(self.temp_dir)
+        self.skill_dir = write_git_flow_repo(self.repo_root, branch_count=500, version_count=100)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def _run(self, argv):
+        args = git_flow.build_parser().parse_args(argv)
+        with contextlib.redirect_stdout(io.StringIO()):
+            flow = git_flow.GitFlow(self.repo_root)
+            code, output = git_flow.run_command(flow, args)
+        return flow, code, output
+
+    def test_construction_loads_nothing(self):
+        """Test constructing GitFlow reads no config, state or pipeline data."""
+        flow = git_flow.GitFlow(self.repo_root)
+
+        self.assertEqual(loaded_subsystems(flow), set())
+
+    def test_commands_load_only_declared_subsystems(self):
+        """Test read-only commands touch no subsystem they do not declare."""
+        for argv in self.READ_ONLY_COMMANDS:
+            with self.subTest(command=' '.join(argv)):
+                flow, code, output = self._run(argv)
+                self.assertEqual(code, 0, output)
+                self.assertLessEqual(loaded_subsystems(flow), set(git_flow.COMMAND_SUBSYSTEMS[argv[0]]))
+
+        self.assertEqual(len(flow.workflow_state.branches), 500)
+        # Listing versions never creates the backup store
+        shutil.rmtree(self.skill_dir / 'backups')
+        self._run(['versions'])
+        self.assertFalse((self.skill_dir / 'backups').exists())
+
+    def test_commands_without_pipeline_skip_its_import(self):
+        """Test pipeline_manager is imported only by commands that use pipeline versions."""
+        script = (
+            "import importlib.util, sys\n"
+            f"spec = importlib.util.spec_from_file_location('git_flow', {str(_spec.origin)!r})\n"
+            "git_flow = importlib.util.module_from_spec(spec)\n"
+            "spec.loader.exec_module(git_flow)\n"
+            "for subsystems in git_flow.COMMAND_SUBSYSTEMS.values():\n"
+            "    if 'pipeline_update_manager' not in subsystems:\n"
+            f"        git_flow.GitFlow(git_flow.Path({str(self.repo_root)!r})).load(subsystems)\n"
+            "print('pipeline_manager' in sys.modules)\n"
+        )
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.splitlines()[-1], 'False')
+
+        from pipeline_manager import PipelineUpdateManager
+        self.assertEqual(git_flow.UPDATE_JOURNAL_FILE, PipelineUpdateManager.JOURNAL_FILE)
+
+    def test_startup_loads_only_declared_subsystems(self):
+        """Test each command's startup loads exactly the subsystems it declares and creates no files."""
+        for command, subsystems in git_flow.COMMAND_SUBSYSTEMS.items():
+            with self.subTest(command=command):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    flow = git_flow.GitFlow(self.repo_root)
+                    flow.load(subsystems)
+                self.assertEqual(loaded_subsystems(flow), set(subsystems))
+                self.assertFalse((self.skill_dir / 'backups').exists())
+
+    def test_saves_skip_unchanged_state_only(self):
+        """Test saves are skipped for unchanged state, and in-place edits to loaded state are saved."""
+        branches_file = self.skill_dir / 'branch-states.json'
+        with contextlib.redirect_stdout(io.StringIO()):
+            flow = git_flow.GitFlow(self.repo_root)
+            self.assertIsNotNone(flow.workflow_state)
+        branches_file.write_text('{}')
+
+        flow.save_branch_states()
+        self.assertEqual(branches_file.read_text(), '{}')
+
+        # Loaded branches share their lists with the parsed file
+        flow.workflow_state.branches['feature-1'].commits.append({"message": "fix"})
+        flow.save_branch_states()
+        self.assertEqual(json.loads(branches_file.read_text())['feature-1']['commits'], [{"message": "fix"}])
+
+    def test_interrupted_update_recovered_before_state_loads(self):
+        """Test an update interrupted mid-commit is finished before the workflow state is read."""
+        state_file = self.skill_dir / 'workflow-state.json'
+        staged = state_file.with_name(f'.{state_file.name}.staged')
+        migrated = dict(json.loads(state_file.read_text()), feature="migrated")
+        staged.write_text(json.dumps(migrated))
+        (self.skill_dir / 'update.journal').write_text(json.dumps({"files": [[str(staged), str(state_file)]]}))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            flow = git_flow.GitFlow(self.repo_root)
+            self.assertEqual(flow.workflow_state.feature, "migrated")
+        self.assertFalse((self.skill_dir / 'update.journal').exists())
+
+    def test_rollback_undoes_fields_workflow_state_does_not_model(self):
+        """Test update and rollback work on the stored state, keeping fields WorkflowState drops."""
+        state_file = self.skill_dir / 'workflow-state.json'
+        original = json.loads(state_file.read_text())
+        migrations_dir = self.skill_dir / 'versions' / '101.0.0' / 'migrations'
+        migrations_dir.mkdir(parents=True)
+        (migrations_dir / 'from_100_0_0.py').write_text(
+            "def migrate(state):\n    state['schema_note'] = 'added'\n    return state\n"
+        )
+        (self.skill_dir / 'config.json').write_text(json.dumps({"version": "100.0.0"}))
+
+        _, code, output = self._run(['update', '--to', '101.0.0'])
+        self.assertEqual(code, 0, output)
+        self.assertEqual(json.loads(state_file.read_text())['schema_note'], 'added')
+
+        _, code, output = self._run(['rollback', '--to', '100.0.0'])
+        self.assertEqual(code, 0, output)
+        rolled_back = json.loads(state_file.read_text())
+        self.assertNotIn('schema_note', rolled_back)
+        self.assertEqual({**rolled_back, 'branches': {}}, original)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,728 @@
+#!/usr/bin/env python3
+"""
+Test suite for git-flow/pipeline_manager.py
+Tests pipeline versioning, migrations, backups and updates.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / 'git-flow'))
+from pipeline_manager import (
+    PipelineVersionManager,
+    MigrationExecutor,
+    PipelineUpdateManager,
+    BackupManager,
+    StateValidator,
+    MigrationSimulator,
+    _simulate_state
+)
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+from merkle import merkle_hash
+from file_lock import FileLock
+from file_transaction import FileTransaction
+
+
+class PipelineTestCase(unittest.TestCase):
+    """Shared fixtures for pipeline tests."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skill_dir = Path(self.temp_dir) / 'test-pipeline'
+        self.versions_dir = self.skill_dir / 'versions'
+        self.versions_dir.mkdir(parents=True)
+        (self.skill_dir / 'config.json').write_text(json.dumps({"version": "1.0.0"}))
+        (self.versions_dir / '1.0.0').mkdir()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def _write_migration(self, from_version, to_version, body):
+        """Helper to write a migration file."""
+        migrations_dir = self.versions_dir / to_version / 'migrations'
+        migrations_dir.mkdir(parents=True, exist_ok=True)
+        migration_file = migrations_dir / f'from_{from_version.replace(".", "_")}.py'
+        migration_file.write_text(body)
+        return migration_file
+
+
+class TestPipelineVersionManager(PipelineTestCase):
+    """Test PipelineVersionManager class."""
+
+    def test_migrations_are_indexed_not_executed(self):
+        """Test construction indexes migrations without importing them."""
+        self._write_migration("1.0.0", "2.0.0", "raise RuntimeError('must not be imported')\n")
+
+        manager = PipelineVersionManager('test-pipeline', self.skill_dir)
+
+        self.assertEqual(manager.available_versions, ["1.0.0", "2.0.0"])
+        self.assertTrue(manager.has_migration("1.0.0", "2.0.0"))
+        self.assertEqual(manager.check_updates(), (True, "2.0.0"))
+
+    def test_migration_executes(self):
+        """Test a migration is found by dotted version and applied."""
+        self._write_migration(
+            "1.0.0", "2.0.0",
+            "def migrate(state):\n    state['migrated'] = True\n    return state\n"
+        )
+
+        manager = PipelineVersionManager('test-pipeline', self.skill_dir)
+        executor = MigrationExecutor({"version": "1.0.0"}, manager)
+        success, message = executor.apply_migration("1.0.0", "2.0.0")
+
+        self.assertTrue(success, message)
+        self.assertEqual(executor.state, {"version": "2.0.0", "migrated": True})
+
+    def test_declarative_migrations_fused(self):
+        """Test consecutive .json migrations run as one fused pass before a Python hop."""
+        for from_version, to_version, ops in [
+                ("1.0.0", "2.0.0", [{"op": "rename", "path": "branches.*.state", "to": "status"}]),
+                ("2.0.0", "3.0.0", [{"op": "map-enum", "path": "branches.*.status", "map": {"done": "complete"}}])]:
+            migration_file = self._write_migration(from_version, to_version, "")
+            migration_file.unlink()
+            migration_file.with_suffix('.json').write_text(json.dumps({"ops": ops}))
+        self._write_migration(
+            "3.0.0", "4.0.0",
+            "def migrate(state):\n    state['statuses'] = sorted(b['status'] for b in state['branches'].values())\n    return state\n"
+        )
+
+        manager = PipelineVersionManager('test-pipeline', self.skill_dir)
+        executor = MigrationExecutor({"version": "1.0.0", "branches": {"a": {"state": "done"}}}, manager)
+        success, message = executor.apply_migrations("1.0.0", manager.get_migration_path("4.0.0"))
+
+        self.assertTrue(success, message)
+        self.assertEqual(executor.state["version"], "4.0.0")
+        self.assertEqual(executor.state["statuses"], ["complete"])
+        self.assertEqual(executor.backup["branches"], {"a": {"state": "done"}})
+
+    def test_executor_never_modifies_input(self):
+        """Test opted-in migrations see a copy-on-write view and rollback is a pointer swap."""
+        self._write_migration(
+            "1.0.0", "2.0.0",
+            "COPY_ON_WRITE = True\n\n"
+            "def migrate(state):\n    state['branches']['a']['status'] = 'merged'\n    return state\n"
+        )
+        self._write_migration(
+            "2.0.0", "3.0.0",
+            "def migrate(state):\n    state['branches']['a']['status'] = 'broken'\n    raise RuntimeError('boom')\n"
+        )
+        state = {"version": "1.0.0", "branches": {"a": {"status": "active"}}, "other": {"k": [1]}}
+        snapshot = json.loads(json.dumps(state))
+
+        manager = PipelineVersionManager('test-pipeline', self.skill_dir)
+        executor = MigrationExecutor(state, manager)
+        success, message = executor.apply_migration("1.0.0", "2.0.0")
+        self.assertTrue(success, message)
+        self.assertEqual(executor.state["branches"]["a"]["status"], "merged")
+        self.assertIs(executor.state["other"], state["other"])
+
+        success, _ = executor.apply_migration("2.0.0", "3.0.0")
+        self.assertFalse(success)
+        self.assertIs(executor.state, state)
+        self.assertEqual(state, snapshot)
+
+    def test_plain_migrations_get_plain_state(self):
+        """Test migrations that do not opt in to copy-on-write get real dicts and lists."""
+        self._write_migration(
+            "1.0.0", "2.0.0",
+            "import json\n\n"
+            "def migrate(state):\n"
+            "    assert isinstance(state['branches'], dict) and isinstance(state['branches']['a']['tags'], list)\n"
+            "    state['copy'] = state['branches'].copy()\n"
+            "    state['dump'] = json.dumps(state['branches'])\n"
+            "    state['branches']['a']['tags'].append('y')\n"
+            "    return state\n"
+        )
+        state = {"branches": {"a": {"tags": ["x"]}}}
+        snapshot = json.loads(json.dumps(state))
+
+        manager = PipelineVersionManager('test-pipeline', self.skill_dir)
+        executor = MigrationExecutor(state, manager)
+        success, message = executor.apply_migration("1.0.0", "2.0.0")
+
+        self.assertTrue(success, message)
+        self.assertEqual(executor.state["branches"]["a"]["tags"], ["x", "y"])
+        self.assertEqual(json.loads(executor.state["dump"]), {"a": {"tags": ["x"]}})
+        self.assertEqual(state, snapshot)
+
+    def test_executor_state_hash(self):
+        """Test the executor hashes states incrementally and detects no-op migrations."""
+        self._write_migration("1.0.0", "2.0.0", "def migrate(state):\n    return state\n")
+        self._write_migration(
+            "2.0.0", "3.0.0",
+            "def migrate(state):\n    state['branches']['a']['status'] = 'merged'\n    return state\n"
+        )
+        state = {"branches": {"a": {"status": "active"}}}
+
+        manager = PipelineVersionManager('test-pipeline', self.skill_dir)
+        executor = MigrationExecutor(state, manager)
+        with mock.patch.object(executor.hasher, 'hash') as hash_state:
+            backup_id = executor.create_backup()
+        hash_state.assert_not_called()
+        self.assertNotEqual(MigrationExecutor(state, manager).create_backup(), backup_id)
+
+        self.assertTrue(executor.apply_migration("1.0.0", "2.0.0")[0])
+        self.assertFalse(executor.changed)
+        self.assertTrue(executor.apply_migration("2.0.0", "3.0.0")[0])
+        self.assertTrue(executor.changed)
+        self.assertEqual(executor.state_hash, MigrationExecutor(executor.state, manager).state_hash)
+
+
+class TestPipelineUpdateManager(PipelineTestCase):
+    """Test PipelineUpdateManager class."""
+
+    def test_construction_is_lazy(self):
+        """Test read-only queries pay no migration or backup cost."""
+        self._write_migration("1.0.0", "2.0.0", "raise RuntimeError('must not be imported')\n")
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        self.assertIsNone(manager.version_manager._available_versions)
+        self.assertIsNone(manager.version_manager._migration_index)
+
+        self.assertEqual(manager.check_for_updates(), (True, "2.0.0"))
+        self.assertEqual(manager.get_current_version(), "1.0.0")
+        self.assertIsNone(manager.version_manager._migration_index)
+
+        success, message = manager.update_to_version("2.0.0", {"version": "1.0.0"}, dry_run=True)
+        self.assertTrue(success, message)
+        self.assertFalse((self.skill_dir / 'backups').exists())
+
+        self.assertEqual(manager.backup_manager.list_backups(), [])
+        self.assertTrue((self.skill_dir / 'backups').exists())
+
+    def test_update_persists_state_and_config_together(self):
+        """Test the migrated state files and the version bump are written in one commit."""
+        self._write_migration(
+            "1.0.0", "2.0.0",
+            "def migrate(state):\n    state['branches']['a']['status'] = 'merged'\n    return state\n"
+        )
+        workflow_file = self.skill_dir / 'workflow-state.json'
+        branches_file = self.skill_dir / 'branch-states.json'
+        state = {"feature": "x", "branches": {"a": {"status": "active"}}}
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, message = manager.update_to_version(
+            "2.0.0", state, state_files={workflow_file: None, branches_file: 'branches'}
+        )
+
+        self.assertTrue(success, message)
+        self.assertEqual(json.loads(workflow_file.read_text())["branches"]["a"]["status"], "merged")
+        self.assertEqual(json.loads(branches_file.read_text()), {"a": {"status": "merged"}})
+        self.assertEqual(json.loads((self.skill_dir / 'config.json').read_text())["version"], "2.0.0")
+        self.assertEqual(state["branches"]["a"]["status"], "active")
+        self.assertFalse((self.skill_dir / PipelineUpdateManager.CHECKPOINT_FILE).exists())
+
+    def test_recover_waits_for_update_lock(self):
+        """Test recovery does not roll a journal forward while an update holds the lock."""
+        config_file = self.skill_dir / 'config.json'
+        staged = FileTransaction.staged_path(config_file)
+        staged.write_text(json.dumps({"version": "2.0.0"}))
+        (self.skill_dir / PipelineUpdateManager.JOURNAL_FILE).write_text(
+            json.dumps({"files": [[str(staged), str(config_file)]]})
+        )
+
+        results = []
+        with FileLock(self.skill_dir / PipelineUpdateManager.LOCK_FILE):
+            recovery = threading.Thread(
+                target=lambda: results.append(PipelineUpdateManager.recover_update(self.skill_dir))
+            )
+            recovery.start()
+            recovery.join(0.3)
+            self.assertTrue(recovery.is_alive())
+            self.assertEqual(json.loads(config_file.read_text())["version"], "1.0.0")
+        recovery.join()
+
+        self.assertEqual(results, [True])
+        self.assertEqual(json.loads(config_file.read_text())["version"], "2.0.0")
+        self.assertFalse(PipelineUpdateManager.recover_update(self.skill_dir))
+
+    def test_interrupted_update_resumes_after_last_hop(self):
+        """Test a failed hop keeps the checkpoint and a rerun skips completed hops."""
+        runs_file = Path(self.temp_dir) / 'runs.txt'
+        fixed_file = Path(self.temp_dir) / 'fixed'
+        self._write_migration(
+            "1.0.0", "2.0.0",
+            f"def migrate(state):\n    open({str(runs_file)!r}, 'a').write('run\\n')\n"
+            f"    state['hops'] = ['2']\n    return state\n"
+        )
+        self._write_migration(
+            "2.0.0", "3.0.0",
+            f"import os\ndef migrate(state):\n    if not os.path.exists({str(fixed_file)!r}):\n"
+            f"        raise RuntimeError('broken')\n    state['hops'].append('3')\n    return state\n"
+        )
+        state_file = self.skill_dir / 'workflow-state.json'
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, _ = manager.update_to_version("3.0.0", {"feature": "x"}, state_files={state_file: None})
+        self.assertFalse(success)
+        self.assertFalse(state_file.exists())
+        self.assertEqual(json.loads((self.skill_dir / 'config.json').read_text())["version"], "1.0.0")
+
+        fixed_file.touch()
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, message = manager.update_to_version("3.0.0", {"feature": "x"}, state_files={state_file: None})
+
+        self.assertTrue(success, message)
+        self.assertIn("Resumed after version 2.0.0", message)
+        self.assertEqual(json.loads(state_file.read_text())["hops"], ["2", "3"])
+        self.assertEqual(runs_file.read_text().count('run'), 1)
+        self.assertEqual(len(manager.backup_manager.list_backups()), 1)
+
+    def test_stale_checkpoint_is_discarded(self):
+        """Test an update with a different source state drops another update's checkpoint."""
+        self._write_migration(
+            "1.0.0", "2.0.0",
+            "def migrate(state):\n    if state['feature'] == 'z':\n        raise RuntimeError('broken')\n    return state\n"
+        )
+        self._write_migration("2.0.0", "3.0.0", "def migrate(state):\n    raise RuntimeError('broken')\n")
+        checkpoint_file = self.skill_dir / PipelineUpdateManager.CHECKPOINT_FILE
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, _ = manager.update_to_version("3.0.0", {"feature": "x"})
+        self.assertFalse(success)
+        self.assertEqual(json.loads(checkpoint_file.read_text())["state"]["feature"], "x")
+
+        success, _ = manager.update_to_version("3.0.0", {"feature": "y"})
+        self.assertFalse(success)
+        self.assertEqual(json.loads(checkpoint_file.read_text())["state"]["feature"], "y")
+
+        success, _ = manager.update_to_version("3.0.0", {"feature": "z"})
+        self.assertFalse(success)
+        self.assertFalse(checkpoint_file.exists())
+
+    def test_validation_once_unless_debug(self):
+        """Test intermediate states are validated only in debug mode."""
+        for from_version, to_version in [("1.0.0", "2.0.0"), ("2.0.0", "3.0.0")]:
+            self._write_migration(from_version, to_version, "def migrate(state):\n    return state\n")
+        (self.versions_dir / '2.0.0' / 'schema.json').write_text(json.dumps({"required": ["legacy_only"]}))
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, message = manager.update_to_version("3.0.0", {"feature": "x"}, debug=True)
+        self.assertFalse(success)
+        self.assertIn("legacy_only", message)
+
+        success, message = manager.update_to_version("3.0.0", {"feature": "x"})
+        self.assertTrue(success, message)
+
+    def test_rollback_applies_recorded_inverses(self):
+        """Test rollback undoes each hop from its recorded inverse without running migrations."""
+        self._write_migration(
+            "1.0.0", "2.0.0",
+            "def migrate(state):\n    state['branches']['a']['status'] = 'merged'\n    return state\n"
+        )
+        self._write_migration(
+            "2.0.0", "3.0.0",
+            "def migrate(state):\n    del state['legacy']\n    state['hops'] = 2\n    return state\n"
+        )
+        workflow_file = self.skill_dir / 'workflow-state.json'
+        branches_file = self.skill_dir / 'branch-states.json'
+        state_files = {workflow_file: None, branches_file: 'branches'}
+        original = {"version": "1.0.0", "legacy": [1, 2], "branches": {"a": {"status": "active"}}}
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, message = manager.update_to_version("3.0.0", original, state_files=state_files)
+        self.assertTrue(success, message)
+
+        # Migrations must not be touched on the way back
+        for migration in self.versions_dir.glob('*/migrations/*.py'):
+            migration.write_text("raise RuntimeError('must not be imported')\n")
+
+        state = json.loads(workflow_file.read_text())
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, message = manager.rollback_to_version("1.0.0", state, state_files=state_files)
+
+        self.assertTrue(success, message)
+        self.assertEqual(state, original)
+        self.assertEqual(json.loads(workflow_file.read_text()), original)
+        self.assertEqual(json.loads(branches_file.read_text()), original["branches"])
+        self.assertEqual(json.loads((self.skill_dir / 'config.json').read_text())["version"], "1.0.0")
+        self.assertEqual(manager._load_inverses(), [])
+
+    def test_async_backup_durable_before_commit(self):
+        """Test an update with async backups commits only after its backup is written."""
+        self._write_migration("1.0.0", "2.0.0", "def migrate(state):\n    state['migrated'] = True\n    return state\n")
+        state_file = self.skill_dir / 'workflow-state.json'
+        state = {"version": "1.0.0", "feature": "x"}
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir, async_backups=True)
+        with mock.patch.object(BackupManager, '_create_backup', side_effect=OSError('disk full')):
+            success, message = manager.update_to_version("2.0.0", state, state_files={state_file: None})
+        self.assertFalse(success)
+        self.assertIn("disk full", message)
+        self.assertFalse(state_file.exists())
+        self.assertEqual(json.loads((self.skill_dir / 'config.json').read_text())["version"], "1.0.0")
+
+        success, message = manager.update_to_version("2.0.0", state, state_files={state_file: None})
+        self.assertTrue(success, message)
+        backup_id = message.split("Backup: ")[1]
+        self.assertEqual(manager.backup_manager.restore_backup(backup_id), state)
+        self.assertTrue(json.loads(state_file.read_text())["migrated"])
+
+    def test_rollback_without_recorded_inverse_fails(self):
+        """Test rollback refuses to guess when no inverse was recorded for a hop."""
+        self._write_migration("1.0.0", "2.0.0", "def migrate(state):\n    return state\n")
+        (self.skill_dir / 'config.json').write_text(json.dumps({"version": "2.0.0"}))
+        state = {"version": "2.0.0", "feature": "x"}
+
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+        success, message = manager.rollback_to_version("1.0.0", state)
+
+        self.assertFalse(success)
+        self.assertIn("--backup", message)
+        self.assertEqual(state, {"version": "2.0.0", "feature": "x"})
+        self.assertEqual(json.loads((self.skill_dir / 'config.json').read_text())["version"], "2.0.0")
+
+
+class TestStateValidator(PipelineTestCase):
+    """Test the compiled pipeline schema validator."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        super().setUp()
+        self.schema_file = self.versions_dir / '1.0.0' / 'schema.json'
+        self.schema_file.write_text(json.dumps({
+            "required": ["feature", "phases"],
+            "fields": {"feature": {"type": "string"}, "current_phase": {"type": "integer"}},
+            "nested": {
+                "phases": {"required": ["name"], "fields": {"status": {"type": "string", "enum": ["pending", "complete"]}}},
+                "branches": {"fields": {"phase": {"type": "integer"}}},
+                "skills_used": {"fields": {"tester": {"type": "string"}}}
+            }
+        }))
+        self.validator = StateValidator(self.versions_dir)
+
+    def test_nested_lists_and_maps(self):
+        """Test nested lists, maps of records and single records are each validated."""
+        state = {
+            "feature": "x",
+            "current_phase": True,
+            "phases": [{"name": "a", "status": "pending"}, {"status": "done"}],
+            "branches": {"feature-a": {"phase": 1}, "feature-b": {"phase": "1"}},
+            "skills_used": {"tester": 3}
+        }
+
+        valid, errors = self.validator.validate(state, "1.0.0")
+
+        self.assertFalse(valid)
+        self.assertEqual(sorted(errors), sorted([
+            "Field current_phase should be integer, got bool",
+            "phases[1].Missing required field: name",
+            "phases[1].Field status has invalid value: done",
+            "branches.feature-b.Field phase should be integer, got str",
+            "skills_used.Field tester should be string, got int"
+        ]))
+        self.assertEqual(self.validator.validate({"feature": "x", "phases": []}, "1.0.0"), (True, []))
+
+    def test_compiled_once_until_schema_changes(self):
+        """Test a schema is compiled once and recompiled when its file changes."""
+        check = self.validator.get_check("1.0.0")
+        self.assertIs(self.validator.get_check("1.0.0"), check)
+
+        self.schema_file.write_text(json.dumps({"required": ["owner"]}))
+        os.utime(self.schema_file, ns=(0, 0))
+
+        self.assertIsNot(self.validator.get_check("1.0.0"), check)
+        self.assertEqual(self.validator.validate({}, "1.0.0"), (False, ["Missing required field: owner"]))
+        self.assertEqual(self.validator.validate({}, "9.0.0"), (False, ["No schema found for version 9.0.0"]))
+
+    def test_executor_uses_field_schemas(self):
+        """Test migrations are validated against field types and enums, not just required fields."""
+        self._write_migration("1.0.0", "2.0.0", "def migrate(state):\n    state['status'] = 'lost'\n    return state\n")
+        (self.versions_dir / '2.0.0' / 'schema.json').write_text(json.dumps(
+            {"fields": {"status": {"type": "string", "enum": ["active"]}}}
+        ))
+
+        manager = PipelineVersionManager('test-pipeline', self.skill_dir)
+        executor = MigrationExecutor({"status": "active"}, manager)
+        success, message = executor.apply_migration("1.0.0", "2.0.0")
+
+        self.assertFalse(success)
+        self.assertIn("Field status has invalid value: lost", message)
+
+
+class TestMigrationSimulator(PipelineTestCase):
+    """Test dry-run simulation of pipeline updates."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        super().setUp()
+        self._write_migration("1.0.0", "2.0.0", "def migrate(state):\n    state['log'] = ['x'] * 100\n    return state\n")
+        self._write_migration("2.0.0", "3.0.0", "def migrate(state):\n    state['status'] = state.get('status', 'lost')\n    return state\n")
+        (self.versions_dir / '3.0.0' / 'schema.json').write_text(json.dumps(
+            {"fields": {"status": {"type": "string", "enum": ["active"]}}}
+        ))
+        self.states_dir = Path(self.temp_dir) / 'states'
+        self.states_dir.mkdir()
+        for index in range(3):
+            (self.states_dir / f'state-{index}.json').write_text(json.dumps({"status": "active", "index": index}))
+        (self.states_dir / 'current.json').write_text(json.dumps({"version": "3.0.0"}))
+
+    def _snapshot(self):
+        return {path: path.read_bytes() for path in Path(self.temp_dir).rglob('*') if path.is_file()}
+
+    def test_reports_hops_without_writing(self):
+        """Test every hop is measured and validated while no file is created or changed."""
+        before = self._snapshot()
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+
+        report = manager.simulate_update("3.0.0", [self.states_dir], {"memory": {"index": 9}}, workers=2)
+
+        self.assertEqual(self._snapshot(), before)
+        summary = report["summary"]
+        self.assertEqual((summary["ok"], summary["invalid"], summary["skipped"], summary["total"]), (3, 1, 1, 5))
+        self.assertEqual([(hop["from_version"], hop["to_version"], hop["states"]) for hop in report["hops"]],
+                         [("1.0.0", "2.0.0", 4), ("2.0.0", "3.0.0", 4)])
+
+        memory = next(result for result in report["states"] if result["source"] == "memory")
+        first_hop, second_hop = memory["hops"]
+        self.assertGreater(first_hop["size_delta"], 400)
+        self.assertGreater(first_hop["peak_bytes"], 0)
+        self.assertEqual(second_hop["errors"], ["Field status has invalid value: lost"])
+        self.assertEqual(memory["size_after"], memory["size_before"] + first_hop["size_delta"] + second_hop["size_delta"])
+
+        table = MigrationSimulator.format_table(report)
+        self.assertIn("1.0.0 -> 2.0.0", table)
+        self.assertIn("Invalid at 3.0.0: memory: Field status has invalid value: lost", table)
+
+    def test_sample_and_failures(self):
+        """Test sampling limits the states simulated and a failing migration is reported per state."""
+        self._write_migration("2.0.0", "3.0.0", "def migrate(state):\n    raise RuntimeError('boom')\n")
+        manager = PipelineUpdateManager('test-pipeline', self.skill_dir)
+
+        report = manager.simulate_update("3.0.0", [self.states_dir], sample=2, workers=1)
+
+        self.assertEqual(report["summary"]["total"], 2)
+        for result in report["states"]:
+            if result["status"] != "skipped":
+                self.assertEqual(result["status"], "failed")
+                self.assertIn("boom", result["error"])
+                self.assertEqual(len(result["hops"]), 1)
+
+    def test_backup_not_timed_as_first_hop(self):
+        """Test the executor's backup is taken before the first hop's clock starts."""
+        original = MigrationExecutor.create_backup
+
+        def slow_backup(executor):
+            time.sleep(0.2)
+            return original(executor)
+
+        with mock.patch.object(MigrationExecutor, 'create_backup', slow_backup):
+            result = _simulate_state('memory', {"status": "active"}, 'test-pipeline', str(self.skill_dir),
+                                     "1.0.0", ["2.0.0", "3.0.0"], trace_memory=False)
+
+        self.assertEqual(result["status"], "ok", result["error"])
+        self.assertLess(result["hops"][0]["seconds"], 0.2)
+
+
+class TestBackupManager(unittest.TestCase):
+    """Test the chunked, deduplicating backup store."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.backups_dir = Path(self.temp_dir) / 'backups'
+        self.manager = BackupManager(self.backups_dir)
+        self.state = {
+            "version": "1.0.0",
+            "branches": {f"feature-{i}": {"status": "active", "notes": "n" * (i % 40)} for i in range(3000)}
+        }
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Test a backup restores to an equal state, including non-ASCII text."""
+        self.state["owner"] = "Zoë ✓"
+        backup_id = self.manager.create_backup(self.state, {"pipeline": "test"})
+
+        self.assertEqual(self.manager.restore_backup(backup_id), self.state)
+        self.assertEqual(b''.join(self.manager.iter_backup_bytes(backup_id)),
+                         json.dumps(self.state, separators=(',', ':')).encode())
+        self.assertEqual(self.manager.list_backups()[0]["pipeline"], "test")
+        self.assertFalse((self.backups_dir / backup_id / 'state.json').exists())
+
+    def test_near_identical_backups_share_chunks(self):
+        """Test a second backup differing in one branch writes only a few chunks."""
+        self.manager.create_backup(self.state)
+        chunks_before = set(self.manager.store.iter_hashes())
+
+        self.state["branches"]["feature-1500"]["status"] = "merged"
+        backup_id = self.manager.create_backup(self.state)
+        new_chunks = set(self.manager.store.iter_hashes()) - chunks_before
+
+        self.assertLessEqual(len(new_chunks), 2)
+        self.assertEqual(self.manager.restore_backup(backup_id)["branches"]["feature-1500"]["status"], "merged")
+
+    def test_identical_backup_skipped(self):
+        """Test a state whose Merkle hash and metadata match the latest backup is not backed up again."""
+        state_hash = merkle_hash(self.state)
+        first_id = self.manager.create_backup(self.state, {"pipeline": "test"}, state_hash=state_hash)
+
+        self.assertEqual(self.manager.create_backup(self.state, {"pipeline": "test"}, state_hash=state_hash), first_id)
+        self.assertNotEqual(self.manager.create_backup(self.state, {"pipeline": "other"}, state_hash=state_hash), first_id)
+        self.assertEqual(len(self.manager.list_backups()), 2)
+        self.assertEqual(self.manager.list_backups()[0]["state_hash"], state_hash)
+
+    def test_legacy_backup_readable(self):
+        """Test backups written as plain state.json still restore."""
+        legacy_dir = self.backups_dir / 'backup_legacy'
+        legacy_dir.mkdir()
+        (legacy_dir / 'state.json').write_text(json.dumps({"version": "0.9.0"}))
+
+        self.assertEqual(self.manager.restore_backup('backup_legacy'), {"version": "0.9.0"})
+
+    def test_cleanup_collects_unreferenced_chunks(self):
+        """Test cleanup deletes chunks only the removed backups used."""
+        self.manager.create_backup({"only": "old" * 2000})
+        keep_id = self.manager.create_backup(self.state)
+        self.manager.create_backup(self.state)
+
+        self.assertEqual(self.manager.cleanup_old_backups(keep_count=2), 1)
+        self.assertEqual(self.manager.restore_backup(keep_id), self.state)
+        live = set()
+        for backup in self.manager.list_backups():
+            live.update(json.loads((self.backups_dir / backup['backup_id'] / 'manifest.json').read_text())['chunks'])
+        self.assertEqual(set(self.manager.store.iter_hashes()), live)
+
+    def test_garbage_collection_waits_for_backups_in_progress(self):
+        """Test chunks stored for a backup not yet cataloged survive a concurrent collection."""
+        import threading
+        other = BackupManager(self.backups_dir)
+        put = self.manager.store.put
+        collectors = []
+
+        def put_then_collect(data):
+            chunks = put(data)
+            collector = threading.Thread(target=other.collect_garbage)
+            collector.start()
+            collector.join(0.3)
+            collectors.append(collector)
+            return chunks
+
+        with mock.patch.object(self.manager.store, 'put', side_effect=put_then_collect):
+            backup_id = self.manager.create_backup(self.state)
+        collectors[0].join()
+
+        self.assertEqual(BackupManager(self.backups_dir).restore_backup(backup_id), self.state)
+
+    def test_deltas_chain_and_full_snapshots(self):
+        """Test small changes are stored as deltas and restore through the chain."""
+        manager = BackupManager(self.backups_dir, full_every=3)
+        states, ids = [], []
+        for n in range(6):
+            self.state["branches"][f"feature-{n}"]["status"] = "merged"
+            states.append(json.loads(json.dumps(self.state)))
+            ids.append(manager.create_backup(self.state))
+
+        kinds = [(b["kind"], b["depth"]) for b in reversed(manager.list_backups())]
+        self.assertEqual(kinds, [("full", 0), ("delta", 1), ("delta", 2), ("delta", 3), ("full", 0), ("delta", 1)])
+        self.assertLess(manager.list_backups()[0]["stored_size"], 500)
+
+        # A fresh manager has no cached snapshots and replays from disk
+        fresh = BackupManager(self.backups_dir)
+        for backup_id, state in zip(ids, states):
+            self.assertEqual(fresh.restore_backup(backup_id), state)
+
+        restored = fresh.restore_backup(ids[3])
+        restored["branches"].clear()
+        self.assertEqual(fresh.restore_backup(ids[3]), states[3])
+
+    def test_large_change_writes_full_snapshot(self):
+        """Test a delta bigger than the size ratio is written as a full snapshot."""
+        self.manager.create_backup(self.state)
+        backup_id = self.manager.create_backup({"version": "2.0.0", "branches": {}})
+        self.assertEqual(self.manager.list_backups()[0]["kind"], "full")
+        self.assertEqual(self.manager.restore_backup(backup_id), {"version": "2.0.0", "branches": {}})
+
+    def test_pruning_base_rebases_delta(self):
+        """Test retention and deletion turn deltas whose base is removed into full snapshots."""
+        ids = []
+        for n in range(5):
+            self.state["branches"][f"feature-{n}"]["status"] = "merged"
+            ids.append(self.manager.create_backup(self.state))
+        expected = BackupManager(self.backups_dir).restore_backup(ids[-1])
+
+        self.manager.cleanup_old_backups(keep_count=2)
+        self.manager.delete_backup(ids[3])
+
+        fresh = BackupManager(self.backups_dir)
+        self.assertEqual([b["kind"] for b in fresh.list_backups()], ["full"])
+        self.assertEqual(fresh.restore_backup(ids[-1]), expected)
+
+    def test_ids_unique_and_listing_paginated(self):
+        """Test backups in the same second get distinct IDs and list newest first in pages."""
+        ids = [self.manager.create_backup({"version": "1.0.0", "n": n}, {"pipeline": "p"}) for n in range(7)]
+
+        self.assertEqual(len(set(ids)), 7)
+        listed = [backup["backup_id"] for backup in self.manager.list_backups()]
+        self.assertEqual(listed, ids[::-1])
+        self.assertEqual([b["backup_id"] for b in self.manager.list_backups(offset=2, limit=3)], listed[2:5])
+        self.assertEqual(self.manager.list_backups(limit=1)[0]["size"], len('{"version":"1.0.0","n":6}'))
+
+        # A second manager sees the same catalog
+        self.assertEqual(len(BackupManager(self.backups_dir).list_backups()), 7)
+
+    def test_cleanup_keeps_sequence_monotonic(self):
+        """Test retention removes old backups and new IDs never reuse sequence numbers."""
+        ids = [self.manager.create_backup({"n": n}) for n in range(10)]
+
+        self.assertEqual(self.manager.cleanup_old_backups(keep_count=2), 8)
+        self.assertEqual([b["backup_id"] for b in self.manager.list_backups()], ids[:-3:-1])
+        self.assertEqual(sorted(p.name for p in self.backups_dir.iterdir() if p.name.startswith('backup_')),
+                         sorted(ids[-2:]))
+
+        new_id = self.manager.create_backup({"n": 10})
+        self.assertGreater(new_id.rsplit('_', 1)[1], ids[-1].rsplit('_', 1)[1])
+        self.assertFalse(self.manager.delete_backup("backup_missing"))
+        self.assertTrue(self.manager.delete_backup(new_id))
+        self.assertEqual(len(self.manager.list_backups()), 2)
+
+    def test_catalog_rebuilt_from_existing_backups(self):
+        """Test backups made before the catalog existed are cataloged on first use."""
+        for name, timestamp in (("backup_20240101_000000", "2024-01-01T00:00:00"),
+                                ("backup_20240102_000000", "2024-01-02T00:00:00")):
+            backup_dir = Path(self.temp_dir) / 'old' / name
+            backup_dir.mkdir(parents=True)
+            (backup_dir / 'state.json').write_text(json.dumps({"version": "0.9.0"}))
+            (backup_dir / 'metadata.json').write_text(json.dumps({"backup_id": name, "timestamp": timestamp}))
+
+        manager = BackupManager(Path(self.temp_dir) / 'old')
+        self.assertEqual([b["backup_id"] for b in manager.list_backups()],
+                         ["backup_20240102_000000", "backup_20240101_000000"])
+        self.assertEqual(manager.restore_backup("backup_20240101_000000"), {"version": "0.9.0"})
+
+    def test_async_backups_written_in_order(self):
+        """Test background backups snapshot the state, keep submission order and are visible to reads."""
+        futures = []
+        writer_blocked = threading.Event()
+        for index in range(3):
+            state = json.loads(json.dumps(dict(self.state, index=index)))
+            futures.append(self.manager.create_backup_async(state, {"pipeline": "test"}))
+            if index == 0:
+                # Hold the writer so the changes below land before it runs
+                self.manager._writer.submit(writer_blocked.wait)
+            # Changes made after submitting, nested or not, must not leak into the backup
+            state["branches"]["feature-0"]["status"] = "merged"
+            state.clear()
+            state["index"] = -1
+        writer_blocked.set()
+
+        backup_ids = [future.result() for future in futures]
+        self.assertEqual([b["backup_id"] for b in self.manager.list_backups()], backup_ids[::-1])
+        self.assertEqual(self.manager.restore_backup(backup_ids[1]), dict(self.state, index=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ Tests version management, capabilities, compatibility checking, and dependency r
 """
 
 import json
+import operator
 import os
 import tempfile
 import unittest
@@ -18,8 +19,16 @@ from skill_manager import (
     SkillVersionManager,
     SkillRegistry,
     SkillDependencyResolver,
-    SkillCompatibilityChecker
+    SkillCompatibilityChecker,
+    CompatibilityMatrix,
+    SkillLockfile,
+    BulkStateMigrator,
+    RegistryWatcher,
+    ArchivedSkillVersionManager
 )
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+from skill_archive import pack_skills
+from versioning import Version
 
 
 class TestSkillVersionManager(unittest.TestCase):
@@ -81,7 +90,8 @@ class TestSkillVersionManager(unittest.TestCase):
         
         self.assertTrue(manager.check_version_compatibility("2.0.0", ">="))
         self.assertTrue(manager.check_version_compatibility("2.5.0", "=="))
-        self.assertFalse(manager.check_version_compatibility("3.0.0", "<="))
+        self.assertTrue(manager.check_version_compatibility("3.0.0", "<="))
+        self.assertFalse(manager.check_version_compatibility("2.0.0", "<="))
         self.assertTrue(manager.check_version_compatibility("2.0.0", ">"))
         self.assertFalse(manager.check_version_compatibility("2.5.0", ">"))
         self.assertTrue(manager.check_version_compatibility("3.0.0", "<"))
@@ -120,6 +130,73 @@ class TestSkillVersionManager(unittest.TestCase):
         result = manager.find_compatible_version(min_version="1.2.0", max_version="2.0.0")
         self.assertEqual(result, "2.0.0")
 
+    def test_version_neighbours(self):
+        """Test bisect-based latest/next/previous lookups."""
+        for version in ("1.0.0", "1.5.0", "2.0.0", "not-a-version"):
+            (self.versions_dir / version).mkdir()
+        
+        manager = SkillVersionManager(self.skill_name, self.skills_dir)
+        
+        self.assertEqual(manager.available_versions, ["1.0.0", "1.5.0", "2.0.0"])
+        self.assertEqual(manager.latest_version(), "2.0.0")
+        self.assertEqual(manager.next_version("1.0.0"), "1.5.0")
+        self.assertEqual(manager.previous_version("1.5.0"), "1.0.0")
+        self.assertIsNone(manager.next_version("2.0.0"))
+        self.assertEqual(manager.versions_in_range("1.0.0", "2.0.0", include_min=False), ["1.5.0", "2.0.0"])
+
+    def _write_migration(self, from_version, to_version, body):
+        """Helper to write a migration file."""
+        migrations_dir = self.versions_dir / to_version / 'migrations'
+        migrations_dir.mkdir(parents=True, exist_ok=True)
+        migration_file = migrations_dir / f'from_{from_version.replace(".", "_")}.py'
+        migration_file.write_text(body)
+        return migration_file
+
+    def test_get_migration_is_cached(self):
+        """Test migrations are imported once per file revision."""
+        (self.versions_dir / "1.0.0").mkdir()
+        migration_file = self._write_migration(
+            "1.0.0", "2.0.0",
+            "def migrate(state):\n    state['step'] = 1\n    return state\n"
+        )
+        
+        manager = SkillVersionManager(self.skill_name, self.skills_dir)
+        first = manager.get_migration("1.0.0", "2.0.0")
+        self.assertIs(first, SkillVersionManager(self.skill_name, self.skills_dir).get_migration("1.0.0", "2.0.0"))
+        
+        migration_file.write_text("def migrate(state):\n    state['step'] = 2\n    return state\n")
+        os.utime(migration_file, ns=(1, 1))
+        
+        success, result = manager.execute_migration({}, "1.0.0", "2.0.0")
+        self.assertTrue(success)
+        self.assertEqual(result, {"step": 2})
+
+    def test_migration_path_checks_index_only(self):
+        """Test path planning does not import migrations."""
+        (self.versions_dir / "1.0.0").mkdir()
+        self._write_migration("1.0.0", "2.0.0", "raise RuntimeError('must not be imported')\n")
+        
+        manager = SkillVersionManager(self.skill_name, self.skills_dir)
+        
+        self.assertTrue(manager.has_migration("1.0.0", "2.0.0"))
+        self.assertFalse(manager.has_migration("2.0.0", "1.0.0"))
+        self.assertEqual(manager.get_migration_path("1.0.0", "2.0.0"), ["2.0.0"])
+        self.assertIsNone(manager.get_migration("1.0.0", "2.0.0"))
+
+    def test_migration_path_uses_skip_version_edge(self):
+        """Test a direct from_1_0_0 migration in 3.0.0 skips intermediate hops."""
+        for version in ("1.0.0", "2.0.0"):
+            (self.versions_dir / version).mkdir()
+        body = "def migrate(state):\n    return state\n"
+        self._write_migration("1.0.0", "2.0.0", body)
+        self._write_migration("1.0.0", "3.0.0", body)
+        
+        manager = SkillVersionManager(self.skill_name, self.skills_dir)
+        
+        self.assertEqual(manager.get_migration_path("1.0.0", "3.0.0"), ["3.0.0"])
+        with self.assertRaises(ValueError):
+            manager.get_migration_path("2.0.0", "3.0.0")
+
     def test_load_capabilities(self):
         """Test loading capabilities from version directories."""
         # Create version with capabilities
@@ -219,9 +296,7 @@ class TestSkillRegistry(unittest.TestCase):
 
     def test_find_skill_for_capability(self):
         """Test finding skills by capability."""
-        registry = SkillRegistry(self.skills_dir)
-        
-        # Add shared capability to skill-b
+        # Add shared capability to skill-b before the registry reads capabilities
         skill_b_dir = self.skills_dir / "skill-b" / "versions" / "2.1.0"
         capabilities_file = skill_b_dir / 'capabilities.json'
         capabilities = {
@@ -230,6 +305,7 @@ class TestSkillRegistry(unittest.TestCase):
         }
         capabilities_file.write_text(json.dumps(capabilities))
         
+        registry = SkillRegistry(self.skills_dir)
         results = registry.find_skill_for_capability("shared-capability")
         
         self.assertEqual(len(results), 1)
@@ -338,6 +414,65 @@ class TestSkillDependencyResolver(unittest.TestCase):
         self.assertTrue(any("no longer available" in e for e in errors))
 
 
+    def _add_version(self, name, version, dependencies):
+        """Helper to add another version to an existing skill."""
+        versions_dir = self.skills_dir / name / 'versions' / version
+        versions_dir.mkdir(parents=True)
+        (versions_dir / 'capabilities.json').write_text(json.dumps({
+            "capabilities": [f"{name}-capability"],
+            "dependencies": dependencies
+        }))
+
+    def test_resolve_backtracks_past_latest_version(self):
+        """Test a consistent assignment is found when the latest versions conflict."""
+        self._add_version("base-skill", "2.0.0", {})
+        self._add_version("dependent-skill", "2.0.0", {"base-skill": {"max_version": "1.0.0"}})
+        self.registry = SkillRegistry(self.skills_dir)
+        self.resolver = SkillDependencyResolver(self.registry)
+        
+        pipeline_config = {
+            "skills": {
+                "base-skill": {"min_version": "1.0.0"},
+                "dependent-skill": {"min_version": "1.0.0"}
+            }
+        }
+        
+        success, versions, errors = self.resolver.resolve_pipeline_requirements(pipeline_config)
+        
+        self.assertTrue(success, errors)
+        # Either downgrade is consistent; both latest versions together are not
+        self.assertIn(versions, [
+            {"base-skill": "1.0.0", "dependent-skill": "2.0.0"},
+            {"base-skill": "2.0.0", "dependent-skill": "1.0.0"}
+        ])
+
+    def test_resolve_includes_transitive_dependencies(self):
+        """Test dependencies not listed by the pipeline are resolved too."""
+        self._create_skill("top-skill", "1.0.0", {"dependent-skill": {"min_version": "1.0.0"}})
+        self.registry = SkillRegistry(self.skills_dir)
+        self.resolver = SkillDependencyResolver(self.registry)
+        
+        success, versions, errors = self.resolver.resolve_pipeline_requirements({
+            "skills": {"top-skill": {}}
+        })
+        
+        self.assertTrue(success, errors)
+        self.assertEqual(versions, {"top-skill": "1.0.0", "dependent-skill": "1.0.0", "base-skill": "1.0.0"})
+
+    def test_resolve_reports_unsatisfiable_dependency(self):
+        """Test an unsatisfiable dependency bound is reported."""
+        self._add_version("dependent-skill", "2.0.0", {"base-skill": {"min_version": "3.0.0"}})
+        self.registry = SkillRegistry(self.skills_dir)
+        self.resolver = SkillDependencyResolver(self.registry)
+        
+        success, versions, errors = self.resolver.resolve_pipeline_requirements({
+            "skills": {"dependent-skill": {"min_version": "2.0.0"}}
+        })
+        
+        self.assertFalse(success)
+        self.assertTrue(any("No version of base-skill" in e for e in errors))
+
+
 class TestSkillCompatibilityChecker(unittest.TestCase):
     """Test SkillCompatibilityChecker class."""
 
@@ -406,7 +541,7 @@ class TestSkillCompatibilityChecker(unittest.TestCase):
         is_compatible, errors = self.checker.check_pipeline_compatibility("test-pipeline", pipeline_config)
         
         self.assertFalse(is_compatible)
-        self.assertTrue(any("too old" in e for e in errors))
+        self.assertTrue(any("requires version >= 3.0.0, but 2.0.0 is installed" in e for e in errors))
 
     def test_check_skill_breaking_changes(self):
         """Test checking for breaking changes between versions."""
@@ -426,6 +561,7 @@ class TestSkillCompatibilityChecker(unittest.TestCase):
         breaking_file = version_dir / 'breaking_changes.json'
         breaking_changes = ["API change: endpoint /old removed"]
         breaking_file.write_text(json.dumps(breaking_changes))
+        self.registry.reload_skill("test-skill")
         
         changes = self.checker.check_skill_breaking_changes("test-skill", "2.0.0", "3.0.0")
         
@@ -450,5 +586,749 @@ class TestSkillCompatibilityChecker(unittest.TestCase):
         self.assertEqual(report["skills"]["test-skill"]["status"], "compatible")
 
 
+class TestBreakingChangesIndex(unittest.TestCase):
+    """Test BreakingChangesIndex class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skills_dir = Path(self.temp_dir)
+        versions_dir = self.skills_dir / 'test-skill' / 'versions'
+        
+        changes = {
+            "1.0.0": None,
+            "1.1.0": ["Config key renamed"],
+            "2.0.0": {
+                "breaking_changes": ["Python 3.10 required"],
+                "migration_guide": "Upgrade Python"
+            },
+            "2.5.0": None,
+            "3.0.0": [
+                {"description": "REST API removed", "affected_capability": "rest", "migration_hint": "Use gRPC"},
+                "Old flag dropped"
+            ]
+        }
+        for version, breaking in changes.items():
+            version_dir = versions_dir / version
+            version_dir.mkdir(parents=True)
+            if breaking is not None:
+                (version_dir / 'breaking_changes.json').write_text(json.dumps(breaking))
+        (self.skills_dir / 'test-skill' / 'SKILL.md').write_text("# test-skill")
+        
+        self.registry = SkillRegistry(self.skills_dir)
+        self.skill = self.registry.get_skill('test-skill')
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_prefix_offsets(self):
+        """Test offsets count the changes before each version."""
+        index = self.skill.breaking_changes
+        self.assertEqual(index.offsets, [0, 0, 1, 2, 2, 4])
+
+    def test_between_slices_range(self):
+        """Test ranges exclude the start version and include the end version."""
+        index = self.skill.breaking_changes
+        
+        self.assertEqual([e['description'] for e in index.between("1.0.0", "2.0.0")],
+                         ["Config key renamed", "Python 3.10 required"])
+        self.assertEqual(index.between("2.0.0", "2.5.0"), [])
+        self.assertEqual(index.count_between("1.0.0", "3.0.0"), 4)
+        self.assertEqual(index.between("3.0.0", "1.0.0"), [])
+        self.assertEqual(len(index.between("1.5.0", "2.7.0")), 1)
+
+    def test_structured_fields(self):
+        """Test entries carry affected capability and migration hints."""
+        index = self.skill.breaking_changes
+        
+        python, rest, flag = index.between("1.1.0", "3.0.0")
+        self.assertEqual(python['migration_hint'], "Upgrade Python")
+        self.assertEqual(rest, {
+            "version": "3.0.0",
+            "description": "REST API removed",
+            "affected_capability": "rest",
+            "migration_hint": "Use gRPC"
+        })
+        self.assertIsNone(flag['affected_capability'])
+        self.assertEqual(index.affected_capabilities("1.0.0", "3.0.0"), {"rest"})
+
+    def test_checker_uses_index(self):
+        """Test the checker returns descriptions and bulk structured changes."""
+        checker = SkillCompatibilityChecker(self.registry)
+        
+        self.assertEqual(checker.check_skill_breaking_changes("test-skill", "2.0.0", "3.0.0"),
+                         ["REST API removed", "Old flag dropped"])
+        self.assertEqual(checker.check_skill_breaking_changes("test-skill", "1.0.0", "9.0.0"),
+                         ["One or both versions not found"])
+        
+        changes = checker.get_breaking_changes({"test-skill": ("1.0.0", "1.1.0"), "missing": ("1.0.0", "2.0.0")})
+        self.assertEqual(list(changes), ["test-skill"])
+        self.assertEqual(changes["test-skill"][0]["version"], "1.1.0")
+
+
+class TestCompatibilityMatrix(unittest.TestCase):
+    """Test CompatibilityMatrix class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skills_dir = Path(self.temp_dir)
+        
+        self._create_skill("alpha", "1.0.0", ["*"])
+        self._create_skill("alpha", "2.0.0", ["pipeline-a"])
+        self._create_skill("beta", "1.0.0", ["pipeline-b"])
+        
+        self.registry = SkillRegistry(self.skills_dir)
+        self.pipelines = [
+            {"pipeline": "pipeline-a", "skills": {"alpha": {"min_version": "2.0.0"}}},
+            {"pipeline": "pipeline-b", "skills": {"alpha": {"min_version": "1.0.0"}, "beta": {}}},
+            {"pipeline": "pipeline-c", "skills": {"gamma": {}}}
+        ]
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _create_skill(self, name, version, pipelines, current_version="1.0.0"):
+        """Helper to create a skill version."""
+        skill_dir = self.skills_dir / name
+        skill_dir.mkdir(exist_ok=True)
+        (skill_dir / 'config.json').write_text(json.dumps({"version": current_version}))
+        (skill_dir / 'SKILL.md').write_text(f"# {name}")
+        
+        version_dir = skill_dir / 'versions' / version
+        version_dir.mkdir(parents=True)
+        (version_dir / 'capabilities.json').write_text(json.dumps({
+            "capabilities": [f"{name}-capability"],
+            "compatible_pipelines": pipelines
+        }))
+
+    def test_reports_for_all_pipelines(self):
+        """Test reports for many pipelines are built in one pass."""
+        checker = SkillCompatibilityChecker(self.registry)
+        reports = checker.generate_compatibility_reports(self.pipelines, workers=2)
+        
+        self.assertEqual([r["pipeline"] for r in reports], ["pipeline-a", "pipeline-b", "pipeline-c"])
+        self.assertFalse(reports[0]["compatible"])
+        self.assertIn("too old", reports[0]["skills"]["alpha"]["errors"][0])
+        self.assertTrue(reports[1]["compatible"])
+        self.assertEqual(reports[1]["skills"]["alpha"]["update_available"], "2.0.0")
+        self.assertEqual(reports[2]["errors"], ["Skill gamma not found"])
+        
+        matrix = self.registry.get_compatibility_index()
+        self.assertEqual(matrix.compatible_versions("alpha", "pipeline-b"), ["1.0.0"])
+        self.assertEqual(self.registry.get_compatibility_matrix()["beta"], {"1.0.0": ["pipeline-b"]})
+
+    def test_matrix_is_persisted(self):
+        """Test a new registry reuses the persisted matrix without recomputing."""
+        checker = SkillCompatibilityChecker(self.registry)
+        index_file = self.skills_dir / CompatibilityMatrix.INDEX_FILENAME
+        checker.generate_compatibility_report(self.pipelines[0])
+        checker.generate_compatibility_reports(self.pipelines)
+        self.assertFalse(index_file.exists())
+        
+        checker.generate_compatibility_reports(self.pipelines, persist=True)
+        self.assertTrue(index_file.exists())
+        
+        matrix = CompatibilityMatrix(SkillRegistry(self.skills_dir))
+        self.assertEqual(set(matrix.skills), {"alpha", "beta"})
+        self.assertIn("pipeline-b", matrix.rows)
+        self.assertEqual(matrix.refresh(), [])
+
+    def test_incremental_update(self):
+        """Test only a changed skill is recomputed and its rows invalidated."""
+        checker = SkillCompatibilityChecker(self.registry)
+        checker.generate_compatibility_reports(self.pipelines, persist=True)
+        beta_row = self.registry.get_compatibility_index().rows["pipeline-b"]["beta"]
+        
+        (self.skills_dir / 'alpha' / 'config.json').write_text(json.dumps({"version": "2.0.0"}))
+        registry = SkillRegistry(self.skills_dir)
+        matrix = CompatibilityMatrix(registry)
+        
+        self.assertEqual(matrix.refresh(), ["alpha"])
+        self.assertEqual(matrix.skills["alpha"]["current_version"], "2.0.0")
+        self.assertEqual(matrix.rows["pipeline-b"]["beta"], beta_row)
+        
+        self.assertTrue(matrix.report(self.pipelines[0])["compatible"])
+
+
+class TestSkillQueryIndex(unittest.TestCase):
+    """Test SkillQueryIndex bitset queries."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skills_dir = Path(self.temp_dir)
+
+        self._create_version("engineer", "1.0.0", ["rest", "graphql"], {
+            "backend": {"supported": True, "apis": ["rest"]},
+            "ml": {"supported": False, "reason": "Not available"}
+        })
+        self._create_version("engineer", "2.0.0", ["rest", "graphql", "ml"], {
+            "backend": {"supported": True, "apis": ["rest", "grpc"]},
+            "ml": {"supported": True, "frameworks": ["pytorch", "tensorflow"]}
+        })
+        self._create_version("analyst", "1.5.0", ["ml"], {
+            "ml": {"supported": True, "frameworks": ["scikit-learn"]}
+        }, pipelines=["team-pipeline-new-feature"])
+
+        self.registry = SkillRegistry(self.skills_dir)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _create_version(self, name, version, capabilities, domains, pipelines=None):
+        """Helper to create a skill version with capabilities."""
+        skill_dir = self.skills_dir / name
+        (skill_dir / 'versions' / version).mkdir(parents=True)
+        (skill_dir / 'SKILL.md').write_text(f"# {name}")
+        (skill_dir / 'config.json').write_text(json.dumps({"version": version}))
+
+        capabilities_file = skill_dir / 'versions' / version / 'capabilities.json'
+        capabilities_file.write_text(json.dumps({
+            "capabilities": capabilities,
+            "domains": domains,
+            "compatible_pipelines": pipelines or ["*"]
+        }))
+
+    def test_capability_query(self):
+        """Test querying a single capability, with and without prefix."""
+        expected = [("engineer", "1.0.0"), ("engineer", "2.0.0")]
+        self.assertEqual(self.registry.query("capability:rest"), expected)
+        self.assertEqual(self.registry.query("rest"), expected)
+
+    def test_combined_query(self):
+        """Test combining capability, domain feature and version terms."""
+        results = self.registry.query(
+            "capability:rest AND domain.ml.frameworks:pytorch AND version>=2.0.0"
+        )
+        self.assertEqual(results, [("engineer", "2.0.0")])
+
+    def test_unsupported_domain_not_indexed(self):
+        """Test that unsupported domains do not match domain terms."""
+        results = self.registry.query("domain:ml")
+        self.assertEqual(results, [("analyst", "1.5.0"), ("engineer", "2.0.0")])
+
+    def test_or_not_and_parentheses(self):
+        """Test OR, NOT and grouping."""
+        results = self.registry.query("NOT skill:engineer OR (rest AND version < 2.0.0)")
+        self.assertEqual(results, [("analyst", "1.5.0"), ("engineer", "1.0.0")])
+
+    def test_pipeline_query_includes_wildcard(self):
+        """Test pipeline terms match explicit and wildcard compatibility."""
+        self.assertEqual(len(self.registry.query("pipeline:team-pipeline-new-feature")), 3)
+        self.assertEqual(self.registry.query("pipeline:team-pipeline-fix-bug"),
+                         [("engineer", "1.0.0"), ("engineer", "2.0.0")])
+
+    def test_remove_skill_frees_rows(self):
+        """Test removing and re-adding a skill keeps bitsets consistent."""
+        index = self.registry.get_query_index()
+        index.remove_skill("engineer")
+        self.assertEqual(index.query("rest"), [])
+        self.assertEqual(index.query("ml"), [("analyst", "1.5.0")])
+
+        index.add_skill(self.registry.get_skill("engineer"))
+        self.assertEqual(index.query("domain.backend.apis:grpc"), [("engineer", "2.0.0")])
+
+    def test_invalid_query(self):
+        """Test malformed queries raise ValueError."""
+        with self.assertRaises(ValueError):
+            self.registry.query("rest AND (ml")
+        with self.assertRaises(ValueError):
+            self.registry.query("version 2.0.0")
+        with self.assertRaises(ValueError):
+            self.registry.query("version=2.0.0")
+
+    def test_bang_negates(self):
+        """Test ! is NOT rather than being dropped from the query."""
+        self.assertEqual(self.registry.query("!rest"), self.registry.query("NOT rest"))
+        self.assertEqual(self.registry.query("!rest"), [("analyst", "1.5.0")])
+        self.assertEqual(self.registry.query("rest AND !(version != 1.0.0)"), [("engineer", "1.0.0")])
+
+    def test_version_operators(self):
+        """Test every version operator, including versions between and beyond those indexed."""
+        index = self.registry.get_query_index()
+        rows = [row for row in index.rows if row is not None]
+        comparisons = {'>=': operator.ge, '<=': operator.le, '==': operator.eq,
+                       '!=': operator.ne, '>': operator.gt, '<': operator.lt}
+        for symbol, compare in comparisons.items():
+            for bound in ('0.1.0', '1.0.0', '1.2.0', '1.5.0', '2.0.0', '3.0.0'):
+                with self.subTest(operator=symbol, bound=bound):
+                    expected = sorted(row for row in rows if compare(Version.parse(row[1]), Version.parse(bound)))
+                    self.assertEqual(sorted(index.query(f"version{symbol}{bound}")), expected)
+
+        index.remove_skill("analyst")
+        self.assertEqual(index.query("version>=1.5.0"), [("engineer", "2.0.0")])
+
+
+
+class TestSkillLockfile(unittest.TestCase):
+    """Test SkillLockfile class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skills_dir = Path(self.temp_dir) / 'skills'
+        self.pipeline_dir = Path(self.temp_dir) / 'pipeline'
+        self.pipeline_dir.mkdir(parents=True)
+        
+        self._create_skill("base-skill", "1.0.0", {})
+        self._create_skill("base-skill", "2.0.0", {})
+        self._create_skill("dependent-skill", "1.0.0", {
+            "base-skill": {"min_version": "1.0.0", "max_version": "1.9.9"}
+        })
+        
+        self.config_path = self.pipeline_dir / 'config.json'
+        self.config_path.write_text(json.dumps({
+            "pipeline": "test-pipeline",
+            "skills": {
+                "base-skill": {"min_version": "1.0.0"},
+                "dependent-skill": {"min_version": "1.0.0"}
+            }
+        }))
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _create_skill(self, name, version, dependencies):
+        """Helper to create a skill version with dependencies."""
+        skill_dir = self.skills_dir / name
+        skill_dir.mkdir(parents=True, exist_ok=True)
+        (skill_dir / 'config.json').write_text(json.dumps({"version": version}))
+        (skill_dir / 'SKILL.md').write_text(f"# {name}")
+        
+        version_dir = skill_dir / 'versions' / version
+        version_dir.mkdir(parents=True)
+        (version_dir / 'capabilities.json').write_text(json.dumps({
+            "capabilities": [f"{name}-capability"],
+            "domains": {},
+            "dependencies": dependencies
+        }))
+
+    def test_generate_and_verify(self):
+        """Test generating a lock records resolved versions and verifies."""
+        lockfile = SkillLockfile(self.skills_dir, self.config_path)
+        success, versions, errors = lockfile.generate()
+        
+        self.assertTrue(success, errors)
+        self.assertEqual(versions, {"base-skill": "1.0.0", "dependent-skill": "1.0.0"})
+        self.assertEqual(lockfile.lock_path, self.pipeline_dir / 'skills.lock')
+        
+        lock = lockfile.load()
+        self.assertEqual(lock["skills"]["base-skill"]["version"], "1.0.0")
+        self.assertEqual(lockfile.verify(), (True, []))
+
+    def test_resolve_uses_lock_without_resolving(self):
+        """Test resolve returns locked versions without running the resolver."""
+        lockfile = SkillLockfile(self.skills_dir, self.config_path)
+        lockfile.generate()
+        
+        with patch('skill_manager.SkillDependencyResolver') as resolver:
+            success, versions, errors = lockfile.resolve()
+        
+        resolver.assert_not_called()
+        self.assertTrue(success)
+        self.assertEqual(versions["base-skill"], "1.0.0")
+
+    def test_verify_detects_changes(self):
+        """Test verify reports edited skills and config changes."""
+        lockfile = SkillLockfile(self.skills_dir, self.config_path)
+        lockfile.generate()
+        
+        capabilities_file = self.skills_dir / 'base-skill' / 'versions' / '1.0.0' / 'capabilities.json'
+        capabilities_file.write_text(json.dumps({"capabilities": ["changed"]}))
+        is_valid, errors = lockfile.verify()
+        self.assertFalse(is_valid)
+        self.assertIn("base-skill@1.0.0 changed since lock was generated", errors)
+        
+        self.config_path.write_text(json.dumps({"pipeline": "test-pipeline", "skills": {}}))
+        is_valid, errors = lockfile.verify()
+        self.assertIn("Pipeline config changed since lock was generated", errors)
+
+    def test_generate_failure_keeps_lock_unwritten(self):
+        """Test an unresolvable pipeline does not write a lockfile."""
+        self.config_path.write_text(json.dumps({
+            "skills": {"missing-skill": {"min_version": "1.0.0"}}
+        }))
+        lockfile = SkillLockfile(self.skills_dir, self.config_path)
+        success, _, errors = lockfile.generate()
+        
+        self.assertFalse(success)
+        self.assertIn("Skill 'missing-skill' not found", errors)
+        self.assertFalse(lockfile.lock_path.exists())
+
+    def test_capability_dependencies_config(self):
+        """Test team pipeline configs with capabilities.dependencies are normalized."""
+        config = {"capabilities": {"dependencies": {"base-skill": {"min_version": "2.0.0"}}}}
+        requirements = SkillLockfile.pipeline_requirements(config)
+        self.assertEqual(requirements["skills"], {"base-skill": {"min_version": "2.0.0"}})
+
+
+
+class TestBulkStateMigrator(unittest.TestCase):
+    """Test BulkStateMigrator class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skills_dir = Path(self.temp_dir) / 'skills'
+        self.states_dir = Path(self.temp_dir) / 'states'
+        self.states_dir.mkdir()
+        
+        versions_dir = self.skills_dir / 'test-skill' / 'versions'
+        for version in ("1.0.0", "1.5.0", "2.0.0"):
+            (versions_dir / version).mkdir(parents=True)
+        self._write_migration(versions_dir, "1.0.0", "1.5.0",
+                              "def migrate(state):\n    state['hops'] = state.get('hops', []) + ['1.5.0']\n    return state\n")
+        self._write_migration(versions_dir, "1.5.0", "2.0.0",
+                              "def migrate(state):\n"
+                              "    if state.get('broken'):\n"
+                              "        raise RuntimeError('bad state')\n"
+                              "    state['hops'] = state.get('hops', []) + ['2.0.0']\n"
+                              "    return state\n")
+        
+        self.manager = SkillVersionManager('test-skill', self.skills_dir)
+        self.checkpoint = Path(self.temp_dir) / 'checkpoint.json'
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _write_migration(self, versions_dir, from_version, to_version, body):
+        """Helper to write a migration file."""
+        migrations_dir = versions_dir / to_version / 'migrations'
+        migrations_dir.mkdir(parents=True, exist_ok=True)
+        (migrations_dir / f'from_{from_version.replace(".", "_")}.py').write_text(body)
+
+    def _write_state(self, name, version, **extra):
+        """Helper to write a workflow state file."""
+        state_file = self.states_dir / name
+        state_file.write_text(json.dumps({"skills_used": {"test-skill": version}, **extra}))
+        return state_file
+
+    def test_migrates_files_in_parallel(self):
+        """Test files from different source versions are migrated in a pool."""
+        first = self._write_state("a.json", "1.0.0")
+        second = self._write_state("b.json", "1.5.0")
+        current = self._write_state("c.json", "2.0.0")
+        
+        progress = []
+        migrator = BulkStateMigrator(self.manager, "2.0.0", workers=2)
+        summary = migrator.migrate([self.states_dir], on_progress=progress.append)
+        
+        self.assertEqual((summary['migrated'], summary['skipped'], summary['failed']), (2, 1, 0))
+        self.assertEqual(len(progress), 3)
+        
+        state = json.loads(first.read_text())
+        self.assertEqual(state["hops"], ["1.5.0", "2.0.0"])
+        self.assertEqual(state["skills_used"]["test-skill"], "2.0.0")
+        self.assertEqual(json.loads(second.read_text())["hops"], ["2.0.0"])
+        self.assertNotIn("hops", json.loads(current.read_text()))
+
+    def test_failure_is_isolated_and_resumable(self):
+        """Test a failing file leaves others migrated and a rerun skips them."""
+        good = self._write_state("good.json", "1.0.0")
+        bad = self._write_state("bad.json", "1.0.0", broken=True)
+        
+        migrator = BulkStateMigrator(self.manager, "2.0.0", workers=1, checkpoint_path=self.checkpoint)
+        summary = migrator.migrate([good, bad])
+        
+        self.assertEqual(summary['migrated'], 1)
+        self.assertIn("bad state", summary['failures'][str(bad)])
+        self.assertEqual(json.loads(bad.read_text())["skills_used"]["test-skill"], "1.0.0")
+        self.assertTrue(self.checkpoint.exists())
+        
+        bad.write_text(json.dumps({"skills_used": {"test-skill": "1.0.0"}}))
+        summary = BulkStateMigrator(self.manager, "2.0.0", workers=1,
+                                    checkpoint_path=self.checkpoint).migrate([good, bad])
+        
+        self.assertEqual((summary['resumed'], summary['migrated'], summary['failed']), (1, 1, 0))
+        self.assertEqual(json.loads(good.read_text())["hops"], ["1.5.0", "2.0.0"])
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_checkpoint_inside_scanned_directory(self):
+        """Test a checkpoint stored among the state files is not migrated itself."""
+        good = self._write_state("good.json", "1.0.0")
+        self._write_state("bad.json", "1.0.0", broken=True)
+        checkpoint = self.states_dir / 'checkpoint.json'
+        
+        summary = BulkStateMigrator(self.manager, "2.0.0", workers=1,
+                                    checkpoint_path=checkpoint).migrate([self.states_dir])
+        self.assertEqual((summary['migrated'], summary['failed']), (1, 1))
+        self.assertTrue(checkpoint.exists())
+        
+        summary = BulkStateMigrator(self.manager, "2.0.0", workers=1,
+                                    checkpoint_path=checkpoint).migrate([self.states_dir])
+        self.assertEqual((summary['total'], summary['resumed'], summary['failed']), (2, 1, 1))
+        self.assertNotIn(str(checkpoint), summary['failures'])
+        self.assertEqual(json.loads(good.read_text())["hops"], ["1.5.0", "2.0.0"])
+
+    def test_plans_once_per_source_version(self):
+        """Test migration paths are planned once for each distinct source version."""
+        for i in range(5):
+            self._write_state(f"state-{i}.json", "1.0.0")
+        
+        migrator = BulkStateMigrator(self.manager, "2.0.0", workers=1)
+        with patch.object(migrator, 'plan', wraps=migrator.plan) as plan:
+            summary = migrator.migrate([self.states_dir])
+        
+        self.assertEqual(summary['migrated'], 5)
+        plan.assert_called_once_with("1.0.0")
+
+    def test_missing_source_version_uses_default(self):
+        """Test states without a recorded version fail unless a default is given."""
+        state_file = self.states_dir / "legacy.json"
+        state_file.write_text(json.dumps({"phase": "design"}))
+        
+        summary = BulkStateMigrator(self.manager, "2.0.0", workers=1).migrate([state_file])
+        self.assertEqual(summary['failed'], 1)
+        
+        summary = BulkStateMigrator(self.manager, "2.0.0", workers=1,
+                                    default_from_version="1.5.0").migrate([state_file])
+        self.assertEqual(summary['migrated'], 1)
+        self.assertEqual(json.loads(state_file.read_text())["hops"], ["2.0.0"])
+
+
+
+class TestRegistryWatcher(unittest.TestCase):
+    """Test RegistryWatcher class and registry reloads."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skills_dir = Path(self.temp_dir)
+        self._create_version("alpha", "1.0.0", ["rest"])
+        self._create_version("beta", "1.0.0", ["ml"])
+        
+        self.registry = SkillRegistry(self.skills_dir)
+        self.events = []
+        self.registry.add_listener(lambda name, event: self.events.append((name, event)))
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _create_version(self, name, version, capabilities):
+        """Helper to create a skill version."""
+        skill_dir = self.skills_dir / name
+        skill_dir.mkdir(exist_ok=True)
+        (skill_dir / 'SKILL.md').write_text(f"# {name}")
+        version_dir = skill_dir / 'versions' / version
+        version_dir.mkdir(parents=True)
+        (version_dir / 'capabilities.json').write_text(json.dumps({"capabilities": capabilities}))
+
+    def test_reload_skill_updates_indexes(self):
+        """Test reloading one skill refreshes the query index and matrix."""
+        index = self.registry.get_query_index()
+        matrix = self.registry.get_compatibility_index()
+        beta = self.registry.get_skill("beta")
+        
+        self._create_version("alpha", "2.0.0", ["grpc"])
+        self.assertEqual(self.registry.reload_skill("alpha"), "changed")
+        
+        self.assertIs(self.registry.get_skill("beta"), beta)
+        self.assertEqual(self.registry.get_query_index().query("grpc"), [("alpha", "2.0.0")])
+        # The index in use before the reload is swapped out, not mutated
+        self.assertEqual(index.query("grpc"), [])
+        self.assertEqual(matrix.skills["alpha"]["latest_version"], "2.0.0")
+        self.assertEqual(self.events, [("alpha", "changed")])
+
+    def test_reload_while_reading(self):
+        """Test readers on other threads never see the registry mid-reload."""
+        import shutil
+        import threading
+        self.registry.get_query_index()
+        self.registry.get_compatibility_index()
+        stop = threading.Event()
+        errors = []
+        
+        def read():
+            try:
+                while not stop.is_set():
+                    self.registry.find_skill_for_capability("rest")
+                    self.registry.query("rest OR ml OR docs")
+                    self.registry.get_compatibility_matrix()
+            except Exception as e:
+                errors.append(e)
+        
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for i in range(30):
+                self._create_version(f"gamma-{i}", "1.0.0", ["docs"])
+                self.registry.reload_skill(f"gamma-{i}")
+                shutil.rmtree(self.skills_dir / f"gamma-{i}")
+                self.registry.reload_skill(f"gamma-{i}")
+        finally:
+            stop.set()
+            reader.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(self.registry.query("docs"), [])
+
+    def test_poll_detects_added_changed_removed(self):
+        """Test a sweep reloads only the skills that changed."""
+        import shutil
+        watcher = RegistryWatcher(self.registry, debounce=0, use_inotify=False)
+        self.assertEqual(watcher.poll(), {})
+        
+        self._create_version("gamma", "1.0.0", ["docs"])
+        self._create_version("alpha", "1.1.0", ["rest"])
+        shutil.rmtree(self.skills_dir / "beta")
+        
+        self.assertEqual(watcher.poll(), {"alpha": "changed", "beta": "removed", "gamma": "added"})
+        self.assertEqual(self.registry.list_skills(), ["alpha", "gamma"])
+        self.assertIn("1.1.0", self.registry.get_skill("alpha").versions)
+        self.assertEqual(watcher.poll(), {})
+
+    def test_poll_debounces_bursts(self):
+        """Test a skill is reloaded only after its changes settle."""
+        watcher = RegistryWatcher(self.registry, debounce=60, use_inotify=False)
+        self._create_version("alpha", "2.0.0", ["grpc"])
+        
+        self.assertEqual(watcher.poll(), {})
+        self.assertNotIn("2.0.0", self.registry.get_skill("alpha").versions)
+        
+        watcher.debounce = 0
+        self.assertEqual(watcher.poll(), {"alpha": "changed"})
+
+    def test_background_watcher(self):
+        """Test the watcher thread picks up a new version directory."""
+        import threading
+        reloaded = threading.Event()
+        self.registry.add_listener(lambda name, event: reloaded.set())
+        
+        watcher = RegistryWatcher(self.registry, interval=0.05, debounce=0.05)
+        watcher.start()
+        try:
+            self._create_version("beta", "2.0.0", ["ml", "vision"])
+            self.assertTrue(reloaded.wait(5))
+        finally:
+            watcher.stop()
+        
+        self.assertFalse(watcher.running)
+        self.assertEqual(self.registry.get_skill("beta").latest_version(), "2.0.0")
+
+
+
+class TestSkillArchive(unittest.TestCase):
+    """Test loading the registry from a packed skill archive."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.skills_dir = Path(self.temp_dir) / 'skills'
+        self.archive_path = Path(self.temp_dir) / 'skills.zip'
+        
+        skill_dir = self.skills_dir / 'alpha'
+        (skill_dir / 'versions' / '1.0.0').mkdir(parents=True)
+        (skill_dir / 'SKILL.md').write_text("# alpha")
+        (skill_dir / 'config.json').write_text(json.dumps({"version": "1.0.0"}))
+        (skill_dir / 'versions' / '1.0.0' / 'capabilities.json').write_text(json.dumps({"capabilities": ["rest"]}))
+        
+        version_dir = skill_dir / 'versions' / '2.0.0'
+        (version_dir / 'migrations').mkdir(parents=True)
+        (version_dir / 'capabilities.json').write_text(json.dumps({"capabilities": ["rest", "grpc"]}))
+        (version_dir / 'breaking_changes.json').write_text(json.dumps(["REST v1 removed"]))
+        (version_dir / 'migrations' / 'from_1_0_0.py').write_text(
+            "def migrate(state):\n    state['migrated'] = True\n    return state\n"
+        )
+        
+        beta_dir = self.skills_dir / 'beta'
+        (beta_dir / 'versions' / '1.0.0').mkdir(parents=True)
+        (beta_dir / 'SKILL.md').write_text("# beta")
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_archive_matches_directory_registry(self):
+        """Test an archive-backed registry exposes the same metadata."""
+        pack_skills(self.skills_dir, self.archive_path)
+        directory = SkillRegistry(self.skills_dir)
+        archived = SkillRegistry(self.archive_path)
+        
+        self.assertIsNotNone(archived.archive)
+        self.assertEqual(archived.list_skills(), directory.list_skills())
+        alpha = archived.get_skill('alpha')
+        self.assertIsInstance(alpha, ArchivedSkillVersionManager)
+        self.assertEqual(alpha.available_versions, ["1.0.0", "2.0.0"])
+        self.assertEqual(alpha.capabilities, directory.get_skill('alpha').capabilities)
+        self.assertEqual(archived.query("grpc"), [("alpha", "2.0.0")])
+        self.assertEqual(SkillCompatibilityChecker(archived).check_skill_breaking_changes("alpha", "1.0.0", "2.0.0"),
+                         ["REST v1 removed"])
+
+    def test_archive_migrations(self):
+        """Test migrations packed in an archive can be executed."""
+        pack_skills(self.skills_dir, self.archive_path, ['alpha'])
+        registry = SkillRegistry(self.archive_path)
+        alpha = registry.get_skill('alpha')
+        
+        self.assertEqual(registry.list_skills(), ['alpha'])
+        self.assertEqual(alpha.get_migration_path("1.0.0", "2.0.0"), ["2.0.0"])
+        success, state = alpha.execute_migration({}, "1.0.0", "2.0.0")
+        self.assertTrue(success)
+        self.assertEqual(state, {"migrated": True})
+
+    def test_archive_migrations_ignore_planted_cache(self):
+        """Test migrations planted in the cache by someone else are never imported."""
+        import os
+        pack_skills(self.skills_dir, self.archive_path, ['alpha'])
+        planted = "def migrate(state):\n    return {'PWNED': True}\n"
+        
+        with patch('tempfile.tempdir', self.temp_dir):
+            registry = SkillRegistry(self.archive_path)
+            alpha = registry.get_skill('alpha')
+            digest = alpha.entry['digest']
+            
+            # The old shared location, and the user's own cache with a tampered tree
+            shared = Path(self.temp_dir) / 'iflow-skill-archives' / digest / 'versions' / '2.0.0' / 'migrations'
+            own = Path(self.temp_dir) / f'iflow-skill-archives-{os.getuid()}'
+            own.mkdir(mode=0o700)
+            for migrations_dir in (shared, own / digest / 'versions' / '2.0.0' / 'migrations'):
+                migrations_dir.mkdir(parents=True)
+                (migrations_dir / 'from_1_0_0.py').write_text(planted)
+            
+            success, state = alpha.execute_migration({}, "1.0.0", "2.0.0")
+            self.assertTrue(success)
+            self.assertEqual(state, {"migrated": True})
+            self.assertEqual(own.stat().st_mode & 0o777, 0o700)
+            
+            # A cache directory others can write to is not used at all
+            import shutil
+            planted_dir = own / digest
+            shutil.rmtree(planted_dir)
+            planted_dir.mkdir()
+            (planted_dir / 'SKILL.md').write_text("# planted")
+            os.chmod(own, 0o777)
+            alpha = SkillRegistry(self.archive_path).get_skill('alpha')
+            success, state = alpha.execute_migration({}, "1.0.0", "2.0.0")
+            self.assertTrue(success)
+            self.assertEqual(state, {"migrated": True})
+            self.assertEqual((planted_dir / 'SKILL.md').read_text(), "# planted")
+
+    def test_pack_rejects_unknown_skill(self):
+        """Test packing a missing skill raises ValueError and writes nothing."""
+        with self.assertRaises(ValueError):
+            pack_skills(self.skills_dir, self.archive_path, ['missing'])
+        self.assertFalse(self.archive_path.exists())
+
+    def test_watcher_rejects_archive(self):
+        """Test archive-backed registries cannot be watched."""
+        pack_skills(self.skills_dir, self.archive_path)
+        with self.assertRaises(ValueError):
+            RegistryWatcher(SkillRegistry(self.archive_path))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
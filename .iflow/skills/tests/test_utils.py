@@ -0,0 +1,777 @@
+#!/usr/bin/env python3
+"""
+Test suite for shared utilities in utils/.
+Tests versioning, migration indexing, migration planning, inotify and
+skill repositories.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from copy import deepcopy
+from pathlib import Path
+from unittest import mock
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent / 'utils'))
+from versioning import Version, SortedVersions, compare_versions
+from migration_loader import MigrationIndex, load_migration
+from json_migration import DeclarativeMigration, compile_ops, fuse_ops, apply_ops, run_migrations
+from migration_planner import MigrationPlanner
+from inotify import Inotify, inotify_available
+from skill_repository import SkillRepository, SkillRepositoryError
+from chunk_store import ChunkStore, split_chunks
+from backup_catalog import BackupCatalog
+from json_diff import diff, apply_patch
+from cow_state import CowDict, cow, thaw
+from merkle import MerkleHasher, merkle_hash
+from file_transaction import FileTransaction
+
+
+class TestVersion(unittest.TestCase):
+    """Test Version value type."""
+
+    def test_parse_is_interned(self):
+        """Test equal versions parse to the same object."""
+        self.assertIs(Version.parse("1.2.0"), Version.parse("1.2.0"))
+        self.assertIs(Version.parse("1.2"), Version.parse("1.2.0"))
+        self.assertIs(Version(1, 2, 0), Version.parse("1.2.0"))
+
+    def test_ordering(self):
+        """Test total ordering including pre-releases."""
+        ordered = ["1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-beta", "1.0.0-rc.1", "1.0.0", "1.0.1", "1.10.0"]
+        parsed = [Version.parse(v) for v in ordered]
+        self.assertEqual(sorted(reversed(parsed)), parsed)
+        self.assertEqual(compare_versions("1.10.0", "1.9.0"), 1)
+        self.assertEqual(compare_versions("2.0.0", "2.0.0"), 0)
+
+    def test_build_metadata(self):
+        """Test build metadata is kept and breaks ties consistently."""
+        version = Version.parse("3.0.0-rc.1+build.5")
+        self.assertEqual(version.prerelease, ("rc", "1"))
+        self.assertEqual(version.build, ("build", "5"))
+        self.assertEqual(str(version), "3.0.0-rc.1+build.5")
+        self.assertNotEqual(version, Version.parse("3.0.0-rc.1"))
+        self.assertLess(Version.parse("3.0.0-rc.1"), version)
+        self.assertEqual(compare_versions("1.0.0+a", "1.0.0"), 0)
+        self.assertEqual(compare_versions("1.0.0+b", "1.0.0+a"), 0)
+
+    def test_hashable_and_immutable(self):
+        """Test versions work as dict keys and cannot be mutated."""
+        mapping = {Version.parse("1.0.0"): "a"}
+        self.assertEqual(mapping[Version.parse("1.0")], "a")
+        with self.assertRaises(AttributeError):
+            Version.parse("1.0.0").major = 2
+        self.assertIs(pickle.loads(pickle.dumps(Version.parse("1.0.0"))), Version.parse("1.0.0"))
+
+    def test_invalid_version(self):
+        """Test invalid strings raise ValueError."""
+        with self.assertRaises(ValueError):
+            Version.parse("migrations")
+
+
+class TestSortedVersions(unittest.TestCase):
+    """Test SortedVersions bisect queries."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.versions = SortedVersions(["2.0.0", "1.0.0", "1.5.0", "2.5.0"])
+
+    def test_latest_and_earliest(self):
+        """Test min/max lookups."""
+        self.assertEqual(str(self.versions.latest()), "2.5.0")
+        self.assertEqual(str(self.versions.earliest()), "1.0.0")
+        self.assertIsNone(SortedVersions().latest())
+
+    def test_next_and_previous(self):
+        """Test neighbour lookups, including versions not in the array."""
+        self.assertEqual(str(self.versions.next_after("1.0.0")), "1.5.0")
+        self.assertEqual(str(self.versions.next_after("1.7.0")), "2.0.0")
+        self.assertIsNone(self.versions.next_after("2.5.0"))
+        self.assertEqual(str(self.versions.previous_before("2.0.0")), "1.5.0")
+        self.assertIsNone(self.versions.previous_before("1.0.0"))
+
+    def test_ranges(self):
+        """Test inclusive and exclusive range slices."""
+        self.assertEqual([str(v) for v in self.versions.in_range("1.2.0", "2.0.0")], ["1.5.0", "2.0.0"])
+        self.assertEqual([str(v) for v in self.versions.in_range("1.5.0", include_min=False)], ["2.0.0", "2.5.0"])
+        self.assertEqual(str(self.versions.latest_in_range(max_version="1.9.0")), "1.5.0")
+        self.assertIsNone(self.versions.latest_in_range("3.0.0"))
+
+    def test_add_remove_contains(self):
+        """Test membership updates keep the array sorted."""
+        self.versions.add("1.7.0")
+        self.assertIn("1.7.0", self.versions)
+        self.assertEqual(self.versions.index("1.7.0"), 2)
+        self.assertTrue(self.versions.remove("1.7.0"))
+        self.assertNotIn("1.7.0", self.versions)
+        self.assertNotIn("not-a-version", self.versions)
+
+
+class TestMigrationPlanner(unittest.TestCase):
+    """Test MigrationPlanner shortest paths."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.versions_dir = Path(self.temp_dir) / 'versions'
+        for from_version, to_version in [("1.0.0", "2.0.0"), ("2.0.0", "3.0.0"), ("3.0.0", "4.0.0")]:
+            self._add_edge(from_version, to_version)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def _add_edge(self, from_version, to_version):
+        """Helper to create a migration file."""
+        migrations_dir = self.versions_dir / to_version / 'migrations'
+        migrations_dir.mkdir(parents=True, exist_ok=True)
+        (migrations_dir / f'from_{from_version.replace(".", "_")}.py').write_text("def migrate(s):\n    return s\n")
+
+    def _plan(self, planner, from_version, to_version):
+        path = planner.plan(from_version, to_version)
+        return None if path is None else [str(v) for v in path]
+
+    def test_adjacent_hops(self):
+        """Test planning through adjacent versions."""
+        planner = MigrationPlanner(MigrationIndex(self.versions_dir))
+        self.assertEqual(self._plan(planner, "1.0.0", "4.0.0"), ["2.0.0", "3.0.0", "4.0.0"])
+        self.assertEqual(self._plan(planner, "2.0.0", "2.0.0"), [])
+        self.assertIsNone(self._plan(planner, "4.0.0", "1.0.0"))
+
+    def test_skip_version_edge(self):
+        """Test a direct skip-version migration is preferred."""
+        self._add_edge("1.0.0", "3.0.0")
+        planner = MigrationPlanner(MigrationIndex(self.versions_dir))
+        self.assertEqual(self._plan(planner, "1.0.0", "4.0.0"), ["3.0.0", "4.0.0"])
+
+    def test_missing_hop_bypassed(self):
+        """Test a missing intermediate hop is routed around via a skip edge."""
+        shutil.rmtree(self.versions_dir / '3.0.0' / 'migrations')
+        self._add_edge("2.0.0", "4.0.0")
+        planner = MigrationPlanner(MigrationIndex(self.versions_dir))
+        self.assertEqual(self._plan(planner, "1.0.0", "4.0.0"), ["2.0.0", "4.0.0"])
+
+    def test_measured_timings_change_plan(self):
+        """Test measured edge costs override hop counts and invalidate cached plans."""
+        self._add_edge("1.0.0", "3.0.0")
+        planner = MigrationPlanner(MigrationIndex(self.versions_dir))
+        self.assertEqual(self._plan(planner, "1.0.0", "3.0.0"), ["3.0.0"])
+
+        planner.record_timing("1.0.0", "3.0.0", 10.0)
+        planner.record_timing("1.0.0", "2.0.0", 0.1)
+        planner.record_timing("2.0.0", "3.0.0", 0.1)
+        self.assertEqual(self._plan(planner, "1.0.0", "3.0.0"), ["2.0.0", "3.0.0"])
+
+    def test_index_refresh_drops_cached_plans(self):
+        """Test plans cached before an index refresh never use removed migrations."""
+        index = MigrationIndex(self.versions_dir)
+        planner = MigrationPlanner(index)
+        self.assertEqual(self._plan(planner, "1.0.0", "4.0.0"), ["2.0.0", "3.0.0", "4.0.0"])
+
+        shutil.rmtree(self.versions_dir / '3.0.0' / 'migrations')
+        index.refresh()
+        self.assertIsNone(self._plan(planner, "1.0.0", "4.0.0"))
+
+        self._add_edge("2.0.0", "4.0.0")
+        index.refresh()
+        self.assertEqual(self._plan(planner, "1.0.0", "4.0.0"), ["2.0.0", "4.0.0"])
+
+
+
+
+class TestDeclarativeMigration(unittest.TestCase):
+    """Test declarative JSON migrations and op fusion."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.state = {
+            "version": "1.0.0",
+            "legacy": True,
+            "branches": {
+                "feature-a": {"state": "done", "owner": "ana"},
+                "feature-b": {"state": "active"}
+            },
+            "history": [{"kind": "old"}, {"kind": "new"}],
+            "untouched": {"deep": {"payload": [1, 2, 3]}}
+        }
+
+    def test_ops(self):
+        """Test every op kind, including wildcards over maps and lists."""
+        ops = compile_ops([
+            {"op": "rename", "path": "branches.*.state", "to": "status"},
+            {"op": "map-enum", "path": "branches.*.status", "map": {"done": "complete"}},
+            {"op": "set-default", "path": "branches.*.owner", "value": "nobody"},
+            {"op": "map-enum", "path": "history.*.kind", "map": {"old": "legacy"}},
+            {"op": "move", "from": "branches.feature-a.owner", "path": "meta.owner"},
+            {"op": "delete", "path": "legacy"},
+            {"op": "set", "path": "settings.retries", "value": 3}
+        ])
+        result = apply_ops(self.state, ops)
+
+        self.assertEqual(result["branches"]["feature-a"], {"status": "complete"})
+        self.assertEqual(result["branches"]["feature-b"], {"status": "active", "owner": "nobody"})
+        self.assertEqual([h["kind"] for h in result["history"]], ["legacy", "new"])
+        self.assertEqual(result["meta"], {"owner": "ana"})
+        self.assertEqual(result["settings"], {"retries": 3})
+        self.assertNotIn("legacy", result)
+
+    def test_input_untouched_and_subtrees_shared(self):
+        """Test path copying leaves the input intact and shares untouched subtrees."""
+        ops = compile_ops([{"op": "rename", "path": "branches.*.state", "to": "status"}])
+        result = apply_ops(self.state, ops)
+
+        self.assertEqual(self.state["branches"]["feature-a"]["state"], "done")
+        self.assertIs(result["untouched"], self.state["untouched"])
+        self.assertIs(result["history"], self.state["history"])
+        self.assertIsNot(result["branches"], self.state["branches"])
+
+    def test_invalid_ops(self):
+        """Test malformed ops are rejected with ValueError."""
+        for op in ({"op": "explode", "path": "a"},
+                   {"op": "set", "path": "a"},
+                   {"op": "rename", "path": "a", "to": "b.c"},
+                   {"op": "move", "from": "a.*", "path": "b"},
+                   {"op": "delete", "path": "a.*"}):
+            with self.assertRaises(ValueError):
+                compile_ops([op])
+
+    def test_fusion_preserves_result(self):
+        """Test fused ops give the same result as applying hops one by one."""
+        hops = [
+            compile_ops([{"op": "map-enum", "path": "branches.*.state", "map": {"done": "finished"}},
+                         {"op": "set-default", "path": "settings.mode", "value": "fast"}]),
+            compile_ops([{"op": "map-enum", "path": "branches.*.state", "map": {"finished": "complete",
+                                                                                  "active": "open"}},
+                         {"op": "delete", "path": "settings.mode"},
+                         {"op": "set", "path": "schema", "value": "v2"}]),
+            compile_ops([{"op": "map-enum", "path": "schema", "map": {"v2": "v3"}},
+                         {"op": "set-default", "path": "settings.mode", "value": "safe"}])
+        ]
+        fused = fuse_ops([op for hop in hops for op in hop])
+        self.assertLess(len(fused), sum(len(hop) for hop in hops))
+
+        stepwise = self.state
+        for hop in hops:
+            stepwise = apply_ops(stepwise, hop)
+        self.assertEqual(apply_ops(self.state, fused), stepwise)
+        self.assertEqual(stepwise["branches"]["feature-a"]["state"], "complete")
+        self.assertEqual(stepwise["schema"], "v3")
+
+    def test_no_fusion_across_conflicting_rename(self):
+        """Test ops are not fused past a rename touching the same path."""
+        ops = compile_ops([{"op": "set", "path": "a", "value": 1},
+                           {"op": "rename", "path": "b", "to": "a"},
+                           {"op": "set", "path": "a", "value": 2}])
+        self.assertEqual(len(fuse_ops(ops)), 3)
+
+    def test_no_fusion_across_wildcard(self):
+        """Test an op is not moved past a wildcard op that enumerates keys it creates."""
+        ops = compile_ops([{"op": "set", "path": "b.x", "value": 1},
+                           {"op": "set", "path": "*.flag", "value": True},
+                           {"op": "set-default", "path": "b.x", "value": 1}])
+        expected = {"b": {"x": 1, "flag": True}}
+        self.assertEqual(apply_ops({}, ops), expected)
+        self.assertEqual(apply_ops({}, fuse_ops(ops)), expected)
+
+    def test_no_fusion_after_array_delete(self):
+        """Test ops on an array index are not fused with a delete that shifts the array."""
+        state = {"items": ["a", "b", "c"]}
+        for second in ({"op": "set-default", "path": "items.0", "value": "z"},
+                       {"op": "delete", "path": "items.0"}):
+            ops = compile_ops([{"op": "delete", "path": "items.0"}, second])
+            with self.subTest(second=second["op"]):
+                self.assertEqual(apply_ops(state, fuse_ops(ops)), apply_ops(state, ops))
+
+    def test_fusion_matches_stepwise_on_random_ops(self):
+        """Test fused ops match op-by-op application over random ops and states."""
+        import random
+        rng = random.Random(0)
+        keys = ["a", "b", "x", "0", "1"]
+        values = [1, True, "a", "b", {"x": 1}, [1, {"a": 2}]]
+
+        def path(wildcard=True):
+            segments = [rng.choice(keys + ["*"] * wildcard) for _ in range(rng.randint(1, 3))]
+            return ".".join(segments[:-1] + [rng.choice(keys)])
+
+        def state(depth=0):
+            if depth > 2 or rng.random() < 0.3:
+                return rng.choice(values)
+            if rng.random() < 0.3:
+                return [state(depth + 1) for _ in range(rng.randint(0, 3))]
+            return {key: state(depth + 1) for key in rng.sample(keys, rng.randint(0, 3))}
+
+        makers = [
+            lambda: {"op": "set", "path": path(), "value": rng.choice(values)},
+            lambda: {"op": "set-default", "path": path(), "value": rng.choice(values)},
+            lambda: {"op": "rename", "path": path(), "to": rng.choice(["a", "b", "x"])},
+            lambda: {"op": "delete", "path": path()},
+            lambda: {"op": "move", "from": path(False), "path": path(False)},
+            lambda: {"op": "map-enum", "path": path(), "map": {"a": "b", "b": 1}}
+        ]
+        for _ in range(3000):
+            ops = compile_ops([rng.choice(makers)() for _ in range(rng.randint(2, 6))])
+            start = {key: state() for key in rng.sample(keys, rng.randint(0, 4))}
+            self.assertEqual(apply_ops(start, fuse_ops(ops)), apply_ops(start, ops), ops)
+
+    def test_loaded_through_index(self):
+        """Test .json migrations are indexed, loaded and chained with Python ones."""
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            versions_dir = temp_dir / 'versions'
+            for to_version, name, content in [
+                    ("2.0.0", "from_1_0_0.json", json.dumps({"ops": [{"op": "delete", "path": "legacy"}]})),
+                    ("3.0.0", "from_2_0_0.json", json.dumps([{"op": "set", "path": "schema", "value": 3}])),
+                    ("4.0.0", "from_3_0_0.py", "def migrate(s):\n    s['py'] = s['schema']\n    return s\n")]:
+                migrations_dir = versions_dir / to_version / 'migrations'
+                migrations_dir.mkdir(parents=True)
+                (migrations_dir / name).write_text(content)
+
+            index = MigrationIndex(versions_dir)
+            self.assertTrue(index.has_migration("1.0.0", "2.0.0"))
+            migrations = [load_migration(path) for _, _, path in sorted(index.iter_edges())]
+            self.assertIsInstance(migrations[0], DeclarativeMigration)
+
+            groups = []
+            result = run_migrations(self.state, migrations,
+                                    on_group=lambda first, count, seconds: groups.append((first, count)))
+            self.assertEqual(groups, [(0, 2), (2, 1)])
+            self.assertEqual(result["py"], 3)
+            self.assertNotIn("legacy", result)
+            self.assertIn("legacy", self.state)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestChunkStore(unittest.TestCase):
+    """Test content-defined chunking and the compressed chunk store."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.data = "".join(f"line {i} {'x' * (i % 17)}\n" for i in range(20000)).encode()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_split_is_lossless_and_bounded(self):
+        """Test chunks reassemble to the input and respect the maximum size."""
+        data = self.data + b"y" * 200000
+        chunks = list(split_chunks(data, max_size=4096))
+        self.assertEqual(b"".join(chunks), data)
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+
+    def test_insertion_resynchronizes(self):
+        """Test an insertion near the start leaves later chunks unchanged."""
+        before = list(split_chunks(self.data))
+        after = list(split_chunks(b"inserted line\n" + self.data))
+        self.assertGreater(len(set(before) & set(after)), len(before) - 3)
+
+    def test_codecs_and_corruption(self):
+        """Test every codec round-trips and a damaged chunk is rejected."""
+        for compression in ('zlib', 'lzma', 'none'):
+            store = ChunkStore(self.temp_dir / compression, compression)
+            hashes = store.put(self.data)
+            self.assertEqual(store.read(hashes), self.data)
+            self.assertEqual(store.put(self.data), hashes)
+
+        chunk_path = store.chunk_path(hashes[0])
+        chunk_path.write_bytes(chunk_path.read_bytes()[:-1] + b"!")
+        with self.assertRaises(ValueError):
+            store.get(hashes[0])
+
+        with self.assertRaises(ValueError):
+            ChunkStore(self.temp_dir, 'brotli')
+
+
+class TestBackupCatalog(unittest.TestCase):
+    """Test the append-only backup catalog."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.catalog = BackupCatalog(self.temp_dir / 'catalog.jsonl')
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def _add(self, catalog=None):
+        return (catalog or self.catalog).add(lambda seq: {"backup_id": f"b{seq}"})
+
+    def test_incremental_reads_skip_partial_line(self):
+        """Test another writer's appends are picked up, but not a half-written line."""
+        self._add()
+        other = BackupCatalog(self.catalog.path)
+        self.assertEqual(len(other), 1)
+
+        self._add()
+        with open(self.catalog.path, 'ab') as f:
+            f.write(b'{"op":"add","seq":9,"backup_id":"b9"')
+        self.assertEqual([r["backup_id"] for r in other.entries()], ["b2", "b1"])
+
+        with open(self.catalog.path, 'ab') as f:
+            f.write(b'}\n')
+        self.assertEqual(other.entries(limit=1)[0]["backup_id"], "b9")
+
+    def test_compaction_keeps_last_seq(self):
+        """Test compaction drops removed records but never reuses sequence numbers."""
+        for _ in range(6):
+            self._add()
+        self.catalog.remove(["b1", "b2", "b3", "b4", "b5", "b6"])
+
+        self.assertEqual(len(self.catalog.path.read_text().splitlines()), 1)
+        self.assertEqual(self._add(BackupCatalog(self.catalog.path))["seq"], 7)
+
+
+class TestJsonDiff(unittest.TestCase):
+    """Test structural JSON diffs and patch application."""
+
+    def test_round_trip(self):
+        """Test applying a diff reproduces the new document without touching the old one."""
+        old = {"a": 1, "b": {"c": [1, 2, 3], "d": "x"}, "gone": True, "same": {"deep": [1]}}
+        new = {"a": 1.0, "b": {"c": [1, 2], "d": "y"}, "added": {"k": None}, "same": old["same"]}
+        snapshot = json.loads(json.dumps(old))
+
+        patched = apply_patch(old, diff(old, new))
+
+        self.assertEqual(patched, new)
+        self.assertIs(type(patched["a"]), float)
+        self.assertEqual(old, snapshot)
+        self.assertIs(patched["same"], old["same"])
+
+    def test_nested_type_changes(self):
+        """Test 1, 1.0 and True stay distinct inside containers that compare equal."""
+        cases = [
+            ({"a": {"x": True}}, {"a": {"x": 1}}),
+            ({"a": [1, 2]}, {"a": [1.0, 2]}),
+            ([{"n": 0}], [{"n": False}]),
+            ({"a": {"b": [{"c": 1.0}]}}, {"a": {"b": [{"c": 1}]}})
+        ]
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                patched = apply_patch(old, diff(old, new))
+                self.assertEqual(json.dumps(patched), json.dumps(new))
+
+    def test_small_change_small_patch(self):
+        """Test one changed leaf yields one op, and shifted lists are replaced whole."""
+        old = {"branches": {f"b{i}": {"status": "active"} for i in range(100)}}
+        new = json.loads(json.dumps(old))
+        new["branches"]["b50"]["status"] = "merged"
+        self.assertEqual(diff(old, new), [{"op": "set", "path": ["branches", "b50", "status"], "value": "merged"}])
+
+        shifted = diff({"l": list(range(10))}, {"l": [-1] + list(range(10))})
+        self.assertEqual(shifted, [{"op": "set", "path": ["l"], "value": [-1] + list(range(10))}])
+
+    def test_mismatched_patch(self):
+        """Test a patch that does not fit the document raises ValueError."""
+        with self.assertRaises(ValueError):
+            apply_patch({"a": "text"}, [{"op": "set", "path": ["a", "b"], "value": 1}])
+        with self.assertRaises(ValueError):
+            apply_patch({"a": []}, [{"op": "del", "path": ["missing"]}])
+
+    def test_delete_missing_key(self):
+        """Test missing_ok skips deleting absent keys but not out-of-range indexes."""
+        patch = [{"op": "del", "path": ["a", "missing"]}, {"op": "set", "path": ["b"], "value": 1}]
+        self.assertEqual(apply_patch({"a": {}}, patch, missing_ok=True), {"a": {}, "b": 1})
+        with self.assertRaises(ValueError):
+            apply_patch({"a": []}, [{"op": "del", "path": ["a", 0]}], missing_ok=True)
+
+
+class TestCowState(unittest.TestCase):
+    """Test copy-on-write state views."""
+
+    def setUp(self):
+        """Set up a state and a frozen copy to compare against."""
+        self.state = {"version": "1.0.0", "branches": {"a": {"status": "active", "tags": ["x"]}},
+                      "history": [{"n": 0}, {"n": 1}, {"n": 2}], "untouched": {"deep": [1, 2]}}
+        self.snapshot = json.loads(json.dumps(self.state))
+
+    def test_nested_writes_leave_original(self):
+        """Test nested writes copy only their path and share every other subtree."""
+        view = cow(self.state)
+        view["branches"]["a"]["status"] = "merged"
+        view["branches"]["a"]["tags"].append("y")
+        view["branches"]["b"] = {"status": "new"}
+        del view["version"]
+
+        result = thaw(view)
+        self.assertEqual(self.state, self.snapshot)
+        self.assertEqual(result["branches"]["a"], {"status": "merged", "tags": ["x", "y"]})
+        self.assertNotIn("version", result)
+        self.assertIs(result["untouched"], self.state["untouched"])
+        self.assertIs(result["history"], self.state["history"])
+
+    def test_list_shifts_and_detached_items(self):
+        """Test writes through item views survive index shifts and detached items stay separate."""
+        view = cow(self.state)
+        history = view["history"]
+        second = history[1]
+        history.insert(0, {"n": -1})
+        second["n"] = 10
+        popped = history.pop(0)
+        popped["n"] = 99
+        removed = history[0]
+        del history[0]
+        removed["n"] = 42
+
+        self.assertEqual(thaw(view)["history"], [{"n": 10}, {"n": 2}])
+        self.assertEqual(self.state, self.snapshot)
+
+    def test_thaw_and_deepcopy_give_plain_data(self):
+        """Test views stored into plain containers and deep copies come back as plain data."""
+        view = cow(self.state)
+        wrapped = {"branches": view["branches"]}
+        self.assertIsInstance(view, CowDict)
+        self.assertIs(type(thaw(wrapped)["branches"]), dict)
+        self.assertIs(type(deepcopy(view)), dict)
+        self.assertEqual(view, self.snapshot)
+        json.dumps(thaw(wrapped))
+
+
+class TestMerkleHasher(unittest.TestCase):
+    """Test Merkle state hashing."""
+
+    def setUp(self):
+        """Set up a state to hash."""
+        self.state = {"version": "1.0.0", "branches": {f"b{i}": {"status": "active", "tags": [i]} for i in range(50)}}
+
+    def test_content_hash(self):
+        """Test hashes follow content: key order is ignored but value types are not."""
+        self.assertEqual(merkle_hash({"a": 1, "b": [2]}), merkle_hash({"b": [2], "a": 1}))
+        self.assertEqual(merkle_hash(self.state), merkle_hash(json.loads(json.dumps(self.state))))
+        hashes = {merkle_hash({"a": value}) for value in (1, 1.0, True, "1", [1], [[1]], {"1": 1})}
+        self.assertEqual(len(hashes), 7)
+
+    def test_shared_subtrees_reuse_cache(self):
+        """Test hashing a path-copied state revisits only the changed path."""
+        hasher = MerkleHasher()
+        original = hasher.hash(self.state)
+        cached = len(hasher)
+
+        changed = apply_patch(self.state, [{"op": "set", "path": ["branches", "b7", "status"], "value": "merged"}])
+        self.assertNotEqual(hasher.hash(changed), original)
+        self.assertEqual(len(hasher), cached + 3)
+        self.assertEqual(hasher.hash(changed), merkle_hash(changed))
+        self.assertEqual(hasher.hash(self.state), original)
+
+    def test_invalidate_after_in_place_change(self):
+        """Test invalidating a modified path makes in-place changes visible."""
+        hasher = MerkleHasher()
+        original = hasher.hash(self.state)
+        self.state["branches"]["b3"]["tags"].append("x")
+        self.assertEqual(hasher.hash(self.state), original)
+
+        hasher.invalidate(self.state, ["branches", "b3", "tags"])
+        self.assertEqual(hasher.hash(self.state), merkle_hash(self.state))
+        self.assertNotEqual(hasher.hash(self.state), original)
+
+
+class TestFileTransaction(unittest.TestCase):
+    """Test all-or-nothing multi-file replacement."""
+
+    def setUp(self):
+        """Set up two target files."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.journal = self.temp_dir / 'txn.journal'
+        self.first = self.temp_dir / 'first.json'
+        self.second = self.temp_dir / 'second.json'
+        self.first.write_text('"old"')
+        self.second.write_text('"old"')
+
+    def tearDown(self):
+        """Clean up temporary files."""
+        shutil.rmtree(self.temp_dir)
+
+    def _stage(self, transaction):
+        transaction.stage_json(self.first, "new")
+        transaction.stage_json(self.second, "new")
+
+    def test_commit_and_abort(self):
+        """Test committing replaces every file and leaving uncommitted changes nothing."""
+        with FileTransaction(self.journal) as transaction:
+            self._stage(transaction)
+            self.assertEqual(self.first.read_text(), '"old"')
+        self.assertEqual(self.first.read_text(), '"old"')
+
+        with FileTransaction(self.journal) as transaction:
+            self._stage(transaction)
+            transaction.commit()
+        self.assertEqual(json.loads(self.first.read_text()), "new")
+        self.assertEqual(json.loads(self.second.read_text()), "new")
+        self.assertEqual(sorted(p.name for p in self.temp_dir.iterdir()), ['first.json', 'second.json'])
+
+    def test_recover_rolls_forward(self):
+        """Test a commit interrupted between renames is completed by recover()."""
+        real_replace = os.replace
+        calls = []
+
+        def crash_on_second(source, target):
+            calls.append(target)
+            if len(calls) == 3:
+                raise OSError("crash")
+            real_replace(source, target)
+
+        transaction = FileTransaction(self.journal)
+        self._stage(transaction)
+        # The first rename puts the journal in place
+        with mock.patch('os.replace', crash_on_second):
+            with self.assertRaises(OSError):
+                transaction.commit()
+        self.assertTrue(self.journal.exists())
+        self.assertNotEqual(self.first.read_text(), self.second.read_text())
+
+        self.assertTrue(FileTransaction.recover(self.journal))
+        self.assertEqual(json.loads(self.first.read_text()), "new")
+        self.assertEqual(json.loads(self.second.read_text()), "new")
+        self.assertFalse(FileTransaction.recover(self.journal))
+
+    def test_recover_skips_finished_files(self):
+        """Test recovery tolerates staged files and journals another recovery already finished."""
+        staged = FileTransaction.staged_path(self.first)
+        staged.write_text('"new"')
+        self.journal.write_text(json.dumps({'files': [
+            [str(staged), str(self.first)],
+            [str(FileTransaction.staged_path(self.second)), str(self.second)],
+        ]}))
+
+        self.assertTrue(FileTransaction.recover(self.journal))
+        self.assertEqual(json.loads(self.first.read_text()), "new")
+        self.assertEqual(self.second.read_text(), '"old"')
+        self.assertFalse(self.journal.exists())
+        # The journal vanished between the existence check and reading it
+        self.assertFalse(FileTransaction._apply_journal(self.journal, fsync=True))
+
+
+@unittest.skipUnless(inotify_available(), "inotify not available")
+class TestInotify(unittest.TestCase):
+    """Test the ctypes inotify binding."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_reports_created_file(self):
+        """Test creating a file in a watched directory produces an event."""
+        with Inotify() as watcher:
+            wd = watcher.add_watch(self.temp_dir)
+            self.assertEqual(watcher.read(timeout=0), [])
+            
+            (self.temp_dir / "new.json").write_text("{}")
+            events = watcher.read(timeout=1.0)
+        
+        self.assertIn("new.json", [name for _, _, name in events])
+        self.assertTrue(all(event_wd == wd for event_wd, _, _ in events))
+
+    def test_add_watch_missing_directory(self):
+        """Test watching a missing directory raises OSError."""
+        with Inotify() as watcher:
+            with self.assertRaises(OSError):
+                watcher.add_watch(self.temp_dir / "missing")
+
+
+
+class TestSkillRepository(unittest.TestCase):
+    """Test publishing to and syncing from a skill repository."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.source_dir = self.temp_dir / 'source'
+        self.checkout_dir = self.temp_dir / 'checkout'
+        self.repo_dir = self.temp_dir / 'repo'
+        self.checkout_dir.mkdir()
+        
+        for version in ("1.0.0", "2.0.0"):
+            self._write_version("alpha", version, ["rest", version])
+        (self.source_dir / 'alpha' / 'SKILL.md').write_text("# alpha")
+        (self.source_dir / 'alpha' / 'workflow-state.json').write_text("{}")
+        
+        self.repo = SkillRepository(self.repo_dir)
+        self.repo.publish(self.source_dir)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir)
+
+    def _write_version(self, skill, version, capabilities):
+        """Helper to write a version directory in the source tree."""
+        version_dir = self.source_dir / skill / 'versions' / version
+        version_dir.mkdir(parents=True, exist_ok=True)
+        (version_dir / 'capabilities.json').write_text(json.dumps({"capabilities": capabilities}))
+
+    def test_sync_installs_new_skill(self):
+        """Test a first sync installs the skill base and every version."""
+        summary = SkillRepository(f"file://{self.repo_dir}").sync(self.checkout_dir, workers=2)
+        
+        self.assertEqual(summary['failed'], {})
+        self.assertEqual(sorted(summary['synced'], key=str),
+                         [("alpha", "1.0.0"), ("alpha", "2.0.0"), ("alpha", None)])
+        self.assertTrue((self.checkout_dir / 'alpha' / 'SKILL.md').exists())
+        self.assertFalse((self.checkout_dir / 'alpha' / 'workflow-state.json').exists())
+        self.assertTrue((self.checkout_dir / 'alpha' / 'versions' / '2.0.0' / 'capabilities.json').exists())
+
+    def test_sync_copies_only_changed_versions(self):
+        """Test republishing and resyncing only touches changed versions."""
+        self.repo.sync(self.checkout_dir)
+        
+        self._write_version("alpha", "2.0.0", ["rest", "grpc"])
+        self._write_version("alpha", "3.0.0", ["grpc"])
+        self.assertEqual(self.repo.publish(self.source_dir), [("alpha", "2.0.0"), ("alpha", "3.0.0")])
+        
+        summary = SkillRepository(self.repo_dir).sync(self.checkout_dir)
+        self.assertEqual(summary['synced'], [("alpha", "2.0.0"), ("alpha", "3.0.0")])
+        self.assertEqual(summary['unchanged'], 1)
+        
+        installed = self.checkout_dir / 'alpha' / 'versions' / '2.0.0' / 'capabilities.json'
+        self.assertEqual(json.loads(installed.read_text())["capabilities"], ["rest", "grpc"])
+        self.assertEqual(self.repo.sync(self.checkout_dir)['synced'], [])
+
+    def test_unsafe_index_names_are_rejected(self):
+        """Test names from the index that would escape the checkout are rejected before syncing."""
+        index_path = self.repo_dir / 'index.json'
+        published = json.loads(index_path.read_text())
+        alpha = published['skills']['alpha']
+        
+        unsafe = [
+            {'../escape': alpha},
+            {'alpha': dict(alpha, versions={'../../escape': alpha['versions']['1.0.0']})},
+            {'alpha': dict(alpha, base=dict(alpha['base'], archive='/etc/passwd'))},
+        ]
+        for skills in unsafe:
+            with self.subTest(skills=list(skills)):
+                index_path.write_text(json.dumps(dict(published, skills=skills)))
+                with self.assertRaises(SkillRepositoryError):
+                    SkillRepository(self.repo_dir).sync(self.checkout_dir)
+        self.assertFalse((self.temp_dir / 'escape').exists())
+        self.assertEqual(list(self.checkout_dir.iterdir()), [])
+
+    def test_corrupt_archive_is_rejected(self):
+        """Test an archive failing verification leaves the installed version untouched."""
+        self.repo.sync(self.checkout_dir)
+        installed = self.checkout_dir / 'alpha' / 'versions' / '1.0.0' / 'capabilities.json'
+        installed.write_text("local edit")
+        
+        archive = self.repo_dir / 'alpha' / '1.0.0.zip'
+        archive.write_bytes(archive.read_bytes()[:-10])
+        
+        summary = SkillRepository(self.repo_dir).sync(self.checkout_dir)
+        self.assertIn("alpha@1.0.0", summary['failed'])
+        self.assertEqual(installed.read_text(), "local edit")
+
+    def test_unsupported_url(self):
+        """Test non-file URLs are rejected."""
+        with self.assertRaises(SkillRepositoryError):
+            SkillRepository("https://example.com/skills")
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -29,6 +29,79 @@ from .schema_validator import (
     validate_branch_state
 )
 
+from .versioning import (
+    Version,
+    SortedVersions,
+    parse_version,
+    compare_versions
+)
+
+from .migration_loader import (
+    MigrationIndex,
+    load_migration,
+    load_migration_module,
+    uses_copy_on_write,
+    clear_migration_cache
+)
+
+from .migration_planner import MigrationPlanner
+
+from .json_migration import (
+    DeclarativeMigration,
+    compile_ops,
+    fuse_ops,
+    apply_ops,
+    run_migrations
+)
+
+from .content_hash import (
+    hash_bytes,
+    hash_file,
+    hash_directory
+)
+
+from .atomic_file import (
+    atomic_write_bytes,
+    atomic_write_json
+)
+
+from .file_transaction import FileTransaction
+
+from .chunk_store import (
+    ChunkStore,
+    split_chunks
+)
+
+from .cow_state import (
+    CowDict,
+    CowList,
+    cow,
+    thaw
+)
+
+from .merkle import (
+    MerkleHasher,
+    merkle_hash
+)
+
+from .inotify import (
+    Inotify,
+    inotify_available
+)
+
+from .skill_archive import (
+    SkillArchive,
+    pack_skills,
+    is_skill_archive,
+    tree_digest,
+    archive_cache_root
+)
+
+from .skill_repository import (
+    SkillRepository,
+    SkillRepositoryError
+)
+
 __all__ = [
     'GitCommandError',
     'GitCommandTimeout',
@@ -46,5 +119,43 @@ __all__ = [
     'SchemaValidator',
     'SchemaValidationError',
     'validate_workflow_state',
-    'validate_branch_state'
+    'validate_branch_state',
+    'Version',
+    'SortedVersions',
+    'parse_version',
+    'compare_versions',
+    'MigrationIndex',
+    'load_migration',
+    'load_migration_module',
+    'uses_copy_on_write',
+    'clear_migration_cache',
+    'MigrationPlanner',
+    'DeclarativeMigration',
+    'compile_ops',
+    'fuse_ops',
+    'apply_ops',
+    'run_migrations',
+    'hash_bytes',
+    'hash_file',
+    'hash_directory',
+    'atomic_write_bytes',
+    'atomic_write_json',
+    'FileTransaction',
+    'ChunkStore',
+    'split_chunks',
+    'CowDict',
+    'CowList',
+    'cow',
+    'thaw',
+    'MerkleHasher',
+    'merkle_hash',
+    'Inotify',
+    'inotify_available',
+    'SkillArchive',
+    'pack_skills',
+    'is_skill_archive',
+    'tree_digest',
+    'archive_cache_root',
+    'SkillRepository',
+    'SkillRepositoryError'
 ]
\ No newline at end of file
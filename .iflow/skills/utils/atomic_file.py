@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Atomic File Write Utility
+Writes files through a temporary sibling and os.replace, so readers never
+observe a partially written file.
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional, Union
+
+
+# Read once at import: os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_bytes(file_path: Union[str, Path], data: bytes, fsync: bool = True) -> None:
+    """
+    Atomically replace a file with the given bytes.
+
+    Args:
+        file_path: Destination path
+        data: File contents
+        fsync: Flush the file (and its directory) to disk before returning
+    """
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{file_path.name}.', suffix='.tmp', dir=file_path.parent)
+    try:
+        # mkstemp creates 0600 files; keep the existing mode or the umask default
+        os.chmod(temp_path, _target_mode(file_path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync:
+        fsync_directory(file_path.parent)
+
+
+def atomic_write_json(file_path: Union[str, Path], data: Any, indent: Optional[int] = 2,
+                      fsync: bool = True) -> None:
+    """
+    Atomically replace a file with JSON-serialized data.
+
+    Args:
+        file_path: Destination path
+        data: JSON-serializable data
+        indent: JSON indentation (None for compact output)
+        fsync: Flush to disk before returning
+    """
+    atomic_write_bytes(file_path, json.dumps(data, indent=indent).encode(), fsync=fsync)
+
+
+def _target_mode(file_path: Path) -> int:
+    """Permission bits the replaced file should end up with."""
+    try:
+        return os.stat(file_path).st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def fsync_directory(directory: Union[str, Path]) -> None:
+    """Flush a directory entry to disk where the platform supports it."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
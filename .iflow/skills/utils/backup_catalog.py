@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Backup Catalog Utility
+Append-only JSON-lines catalog of backups. Listing reads one file instead of
+every backup's metadata, new lines are read incrementally, and sequence
+numbers are assigned under a file lock so backup IDs never collide.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    from .atomic_file import atomic_write_bytes
+    from .file_lock import FileLock
+except ImportError:
+    from atomic_file import atomic_write_bytes
+    from file_lock import FileLock
+
+
+CATALOG_FORMAT = 1
+
+
+class BackupCatalog:
+    """
+    Catalog of backup records.
+
+    Each line is one JSON record:
+        {"op": "header", "format": 1, "last_seq": N}   written by compaction
+        {"op": "add", "seq": N, "backup_id": ..., ...}
+        {"op": "update", "backup_id": ..., "fields": {...}}
+        {"op": "remove", "backup_id": ...}
+
+    Records are folded in order, so the live set is every added backup not
+    removed later. Sequence numbers only grow, even across removals and
+    compaction.
+    """
+
+    # Rewrite the catalog once removed entries outnumber live ones by this factor
+    COMPACT_RATIO = 2
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(f'.{self.path.name}.lock')
+        self.records: Dict[str, Dict] = {}
+        self.last_seq = 0
+        self._removed = 0
+        self._offset = 0
+        self._inode: Optional[int] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def refresh(self):
+        """Read lines appended since the last refresh; reload after compaction."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            return
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+
+        # A line without its newline is still being written; leave it for later
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._offset += complete
+
+    def _reset(self):
+        self.records = {}
+        self.last_seq = 0
+        self._removed = 0
+        self._offset = 0
+        self._inode = None
+
+    def _apply(self, record: Dict):
+        op = record.get('op')
+        if op == 'header':
+            self.last_seq = max(self.last_seq, record.get('last_seq', 0))
+        elif op == 'add':
+            self.records[record['backup_id']] = record
+            self.last_seq = max(self.last_seq, record['seq'])
+        elif op == 'update':
+            if record['backup_id'] in self.records:
+                self.records[record['backup_id']] = {**self.records[record['backup_id']], **record['fields']}
+        elif op == 'remove':
+            if self.records.pop(record['backup_id'], None) is not None:
+                self._removed += 1
+
+    def _append(self, records: Iterable[Dict]):
+        data = b''.join(json.dumps(record, separators=(',', ':')).encode() + b'\n' for record in records)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def add(self, build: Callable[[int], Dict]) -> Dict:
+        """
+        Append a record with the next sequence number.
+
+        Args:
+            build: Called under the catalog lock with the new sequence
+                number; returns the record (must include backup_id). Work
+                that must happen before the record is visible, such as
+                writing the backup, belongs here.
+
+        Returns:
+            The appended record
+        """
+        with FileLock(self.lock_path):
+            self.refresh()
+            seq = self.last_seq + 1
+            record = {'op': 'add', 'seq': seq, **build(seq)}
+            self._append([record])
+            self.refresh()
+        return record
+
+    def update(self, backup_id: str, fields: Union[Dict, Callable[[], Dict]]) -> bool:
+        """
+        Merge fields into a live record.
+
+        Args:
+            backup_id: Record to update
+            fields: Fields to merge, or a function called under the catalog
+                lock that does the work the update describes and returns them
+
+        Returns:
+            False if the backup is not in the catalog
+        """
+        with FileLock(self.lock_path):
+            self.refresh()
+            if backup_id not in self.records:
+                return False
+            if callable(fields):
+                fields = fields()
+            self._append([{'op': 'update', 'backup_id': backup_id, 'fields': fields}])
+            self.refresh()
+        return True
+
+    @contextmanager
+    def locked(self) -> Iterator['BackupCatalog']:
+        """
+        Hold the catalog lock with records refreshed, so no backup is added,
+        updated or removed meanwhile.
+        """
+        with FileLock(self.lock_path):
+            self.refresh()
+            yield self
+
+    def remove(self, backup_ids: Iterable[str]) -> int:
+        """
+        Record removals in a single append, compacting when worthwhile.
+
+        Returns:
+            Number of live records removed
+        """
+        with FileLock(self.lock_path):
+            self.refresh()
+            removing = [backup_id for backup_id in dict.fromkeys(backup_ids) if backup_id in self.records]
+            if removing:
+                self._append({'op': 'remove', 'backup_id': backup_id} for backup_id in removing)
+                self.refresh()
+                if self._removed > self.COMPACT_RATIO * max(len(self.records), 1):
+                    self._compact()
+        return len(removing)
+
+    def rebuild(self, records: Iterable[Dict]):
+        """Replace the catalog with the given add records (seq assigned in order)."""
+        with FileLock(self.lock_path):
+            self._reset()
+            for seq, record in enumerate(records, start=1):
+                self._apply({**record, 'op': 'add', 'seq': seq})
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the catalog with only live records; call under the lock."""
+        lines = [{'op': 'header', 'format': CATALOG_FORMAT, 'last_seq': self.last_seq}]
+        lines.extend(sorted(self.records.values(), key=lambda record: record['seq']))
+        atomic_write_bytes(self.path, b''.join(
+            json.dumps(record, separators=(',', ':')).encode() + b'\n' for record in lines
+        ))
+        self._reset()
+        self.refresh()
+
+    def get(self, backup_id: str) -> Optional[Dict]:
+        self.refresh()
+        return self.records.get(backup_id)
+
+    def entries(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Live records, newest first.
+
+        Args:
+            offset: Records to skip
+            limit: Maximum records to return (None for all)
+        """
+        self.refresh()
+        # Records are folded in sequence order, so insertion order is age order
+        ordered = list(reversed(self.records.values()))
+        end = None if limit is None else offset + limit
+        return ordered[offset:end]
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self.records)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Chunk Store Utility
+Content-addressed storage for serialized states. Data is split into
+content-defined chunks, each chunk is compressed and stored once under its
+hash, and a stored object is just the list of its chunk hashes.
+"""
+
+import lzma
+import os
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set, Union
+
+try:
+    from .atomic_file import atomic_write_bytes
+    from .content_hash import hash_bytes
+except ImportError:
+    from atomic_file import atomic_write_bytes
+    from content_hash import hash_bytes
+
+
+# One-byte codec tag at the start of every chunk file
+CODECS = {
+    'zlib': (b'z', lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (b'x', lzma.compress, lzma.decompress),
+    'none': (b'n', bytes, bytes),
+}
+_DECODERS = {tag: decompress for tag, _, decompress in CODECS.values()}
+
+MIN_CHUNK_SIZE = 2 * 1024
+MAX_CHUNK_SIZE = 64 * 1024
+# A piece whose CRC has these low bits clear ends a chunk: about one piece in 256
+BOUNDARY_MASK = 0xFF
+
+
+def split_chunks(data: bytes, delimiter: bytes = b'\n', min_size: int = MIN_CHUNK_SIZE,
+                 max_size: int = MAX_CHUNK_SIZE, mask: int = BOUNDARY_MASK) -> Iterator[bytes]:
+    """
+    Split bytes into content-defined chunks at delimiter boundaries.
+
+    The data is scanned in pieces ending with `delimiter` (lines by
+    default; b'}' suits compact JSON). A chunk ends after a piece whose
+    CRC-32 matches the boundary mask, once the chunk holds at least
+    `min_size` bytes, or when it reaches `max_size`. Boundaries depend
+    only on nearby content, so an edit changes the chunks around it and
+    the rest still deduplicate.
+    """
+    start = position = 0
+    length = len(data)
+    while position < length:
+        found = data.find(delimiter, position)
+        line_end = length if found < 0 else found + len(delimiter)
+
+        if line_end - start > max_size:
+            # End the chunk before this piece, or cut an overlong piece itself
+            cut = position if position > start else start + max_size
+            yield data[start:cut]
+            start = position = cut
+            continue
+
+        line_start, position = position, line_end
+        if position - start >= min_size and zlib.crc32(data[line_start:line_end]) & mask == 0:
+            yield data[start:position]
+            start = position
+
+    if start < length:
+        yield data[start:]
+
+
+class ChunkStore:
+    """
+    Compressed, deduplicated chunk storage.
+
+    Chunks live at <root>/<hash[:2]>/<hash>; each file is a codec tag byte
+    followed by the compressed chunk. Chunks are immutable, so existing
+    ones are never rewritten.
+    """
+
+    def __init__(self, root: Union[str, Path], compression: str = 'zlib', durable: bool = True,
+                 delimiter: bytes = b'\n'):
+        """
+        Args:
+            root: Directory holding chunk files
+            compression: 'zlib', 'lzma' or 'none'
+            durable: fsync new chunks before returning from put()
+            delimiter: Piece delimiter for split_chunks
+
+        Raises:
+            ValueError: For an unknown compression
+        """
+        if compression not in CODECS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.root = Path(root)
+        self.compression = compression
+        self.durable = durable
+        self.delimiter = delimiter
+
+    def chunk_path(self, chunk_hash: str) -> Path:
+        return self.root / chunk_hash[:2] / chunk_hash
+
+    def has(self, chunk_hash: str) -> bool:
+        return self.chunk_path(chunk_hash).exists()
+
+    def put(self, data: bytes) -> List[str]:
+        """
+        Store data, writing only chunks that are not already present.
+
+        Returns:
+            Chunk hashes in order
+        """
+        tag, compress, _ = CODECS[self.compression]
+        hashes = []
+        for chunk in split_chunks(data, self.delimiter):
+            chunk_hash = hash_bytes(chunk)
+            if not self.has(chunk_hash):
+                atomic_write_bytes(self.chunk_path(chunk_hash), tag + compress(chunk), fsync=self.durable)
+            hashes.append(chunk_hash)
+        return hashes
+
+    def get(self, chunk_hash: str) -> bytes:
+        """
+        Read and decompress one chunk.
+
+        Raises:
+            FileNotFoundError: If the chunk is missing
+            ValueError: If the chunk is corrupt
+        """
+        with open(self.chunk_path(chunk_hash), 'rb') as f:
+            blob = f.read()
+
+        decompress = _DECODERS.get(blob[:1])
+        if decompress is None:
+            raise ValueError(f"Unknown codec in chunk {chunk_hash}")
+        try:
+            chunk = decompress(blob[1:])
+        except (zlib.error, lzma.LZMAError) as e:
+            raise ValueError(f"Corrupt chunk {chunk_hash}: {e}") from e
+        if hash_bytes(chunk) != chunk_hash:
+            raise ValueError(f"Chunk {chunk_hash} does not match its hash")
+        return chunk
+
+    def iter_data(self, hashes: Iterable[str]) -> Iterator[bytes]:
+        """Yield the chunks of a stored object one at a time."""
+        for chunk_hash in hashes:
+            yield self.get(chunk_hash)
+
+    def read(self, hashes: Iterable[str]) -> bytes:
+        return b''.join(self.iter_data(hashes))
+
+    def iter_hashes(self) -> Iterator[str]:
+        """Yield the hash of every stored chunk."""
+        if not self.root.is_dir():
+            return
+        for prefix in os.scandir(self.root):
+            if prefix.is_dir() and len(prefix.name) == 2:
+                for entry in os.scandir(prefix.path):
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        yield entry.name
+
+    def collect_garbage(self, live: Set[str]) -> int:
+        """
+        Delete chunks not referenced by any live object.
+
+        Returns:
+            Number of chunks deleted
+        """
+        deleted = 0
+        for chunk_hash in list(self.iter_hashes()):
+            if chunk_hash not in live:
+                try:
+                    self.chunk_path(chunk_hash).unlink()
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+        return deleted
+
+    def size(self) -> int:
+        """Total bytes of stored chunk files."""
+        return sum(self.chunk_path(chunk_hash).stat().st_size for chunk_hash in self.iter_hashes())
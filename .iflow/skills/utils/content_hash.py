@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Content Hash Utility
+Computes stable SHA-256 hashes of files and directory trees.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+
+IGNORED_NAMES = frozenset({'__pycache__', '.DS_Store'})
+_CHUNK_SIZE = 1 << 16
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of a byte string."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_tree_files(root: Union[str, Path]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (relative_posix_path, absolute_path) for files under a directory,
+    in a stable sorted order, skipping bytecode caches.
+    """
+    root = str(root)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_NAMES)
+        for filename in sorted(filenames):
+            if filename in IGNORED_NAMES or filename.endswith(('.pyc', '.pyo')):
+                continue
+            absolute = os.path.join(dirpath, filename)
+            relative = os.path.relpath(absolute, root).replace(os.sep, '/')
+            yield relative, absolute
+
+
+def hash_directory(path: Union[str, Path]) -> str:
+    """
+    SHA-256 hex digest of a directory tree.
+
+    The hash covers every file's relative path and contents, so renames,
+    additions, removals and edits all change it. Returns the hash of an
+    empty tree if the directory does not exist.
+    """
+    digest = hashlib.sha256()
+    for relative, absolute in iter_tree_files(path):
+        digest.update(relative.encode())
+        digest.update(b'\0')
+        digest.update(hash_file(absolute).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Copy-on-Write State Utility
+Mutable views over plain JSON states that never modify the underlying
+objects. The first write to a container copies it (and its ancestors), so a
+state can be handed to code that mutates in place while every untouched
+subtree stays shared with the original. Holding on to the original is then
+an O(1) snapshot, and discarding the view is an O(1) rollback.
+
+Views are MutableMapping / MutableSequence objects, not dict or list
+subclasses, and json.dumps does not accept them; call thaw() first.
+"""
+
+from collections.abc import MutableMapping, MutableSequence
+from copy import deepcopy
+from typing import Any, Iterator, Optional, Union
+
+
+class _CowNode:
+    """Shared copy-on-write bookkeeping for dict and list views."""
+
+    __slots__ = ('_data', '_parent', '_key', '_owned', '_children')
+
+    def __init__(self, data, parent: Optional['_CowNode'] = None, key: Any = None):
+        self._data = data
+        self._parent = parent
+        self._key = key
+        self._owned = False
+        self._children = {}
+
+    def _own(self):
+        """Make `_data` private to this view, copying it and relinking ancestors."""
+        if self._owned:
+            return
+        shared = self._data
+        self._data = type(shared)(shared)
+        self._owned = True
+
+        parent = self._parent
+        if parent is None:
+            return
+        parent._own()
+        siblings = parent._data
+        if type(siblings) is dict:
+            if siblings.get(self._key) is shared:
+                siblings[self._key] = self._data
+                return
+        else:
+            # List items may have shifted since this view was created
+            for index, item in enumerate(siblings):
+                if item is shared:
+                    siblings[index] = self._data
+                    self._key = index
+                    return
+        # Removed from the parent meanwhile: later writes only affect this object
+        self._parent = None
+
+    def _wrap(self, key, value):
+        if type(value) is dict or type(value) is list:
+            child = self._children.get(key)
+            if child is None or child._data is not value:
+                child = (CowDict if type(value) is dict else CowList)(value, self, key)
+                self._children[key] = child
+            return child
+        return value
+
+    def __deepcopy__(self, memo):
+        return deepcopy(thaw(self), memo)
+
+    def __copy__(self):
+        return type(self._data)(self._data)
+
+    def __eq__(self, other) -> bool:
+        return thaw(self) == thaw(other)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+
+class CowDict(_CowNode, MutableMapping):
+    """Copy-on-write view of a dict."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self._wrap(key, self._data[key])
+
+    def __setitem__(self, key, value):
+        self._own()
+        self._data[key] = thaw(value)
+        self._children.pop(key, None)
+
+    def __delitem__(self, key):
+        if key not in self._data:
+            raise KeyError(key)
+        self._own()
+        del self._data[key]
+        self._children.pop(key, None)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CowList(_CowNode, MutableSequence):
+    """Copy-on-write view of a list."""
+
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._wrap(i, self._data[i]) for i in range(*index.indices(len(self._data)))]
+        if index < 0:
+            index += len(self._data)
+        return self._wrap(index, self._data[index])
+
+    def __setitem__(self, index, value):
+        self._own()
+        if isinstance(index, slice):
+            self._data[index] = [thaw(item) for item in value]
+            self._children.clear()
+        else:
+            self._data[index] = thaw(value)
+            self._children.pop(index if index >= 0 else index + len(self._data), None)
+
+    def __delitem__(self, index):
+        self._own()
+        del self._data[index]
+        self._children.clear()
+
+    def insert(self, index, value):
+        self._own()
+        self._data.insert(index, thaw(value))
+        self._children.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def cow(state: Union[dict, list]) -> Union[CowDict, CowList]:
+    """Wrap a state in a copy-on-write view; the state itself is never modified."""
+    return CowDict(state) if type(state) is dict else CowList(state)
+
+
+def thaw(value: Any) -> Any:
+    """
+    Turn a view (or a plain value containing views) back into plain JSON data.
+
+    Views are unwrapped in O(1). Plain containers are searched for nested
+    views and rebuilt only where one is found.
+    """
+    if isinstance(value, _CowNode):
+        return value._data
+    if type(value) is dict:
+        for item in value.values():
+            unwrapped = thaw(item)
+            if unwrapped is not item:
+                return {k: thaw(v) for k, v in value.items()}
+        return value
+    if type(value) is list:
+        for item in value:
+            if thaw(item) is not item:
+                return [thaw(v) for v in value]
+        return value
+    return value
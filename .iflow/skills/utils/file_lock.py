@@ -5,6 +5,7 @@ Provides cross-platform file locking to prevent race conditions.
 """
 
 import fcntl
+import json
 import os
 from pathlib import Path
 from typing import Optional, Union, Any
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+File Transaction Utility
+Replaces several files as one unit. New contents are staged next to their
+targets, a journal listing the staged files marks the commit point, and the
+staged files are then renamed into place. A crash before the journal is
+written leaves every target untouched; a crash after it is rolled forward
+by recover().
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    from .atomic_file import atomic_write_json, fsync_directory, _target_mode
+    from .file_lock import FileLock, FileLockError
+except ImportError:
+    from atomic_file import atomic_write_json, fsync_directory, _target_mode
+    from file_lock import FileLock, FileLockError
+
+
+class FileTransaction:
+    """
+    All-or-nothing replacement of a set of files.
+
+    Usage:
+        with FileTransaction(skill_dir / 'update.journal') as txn:
+            txn.stage_json(config_file, config)
+            txn.stage_json(state_file, state)
+            txn.commit()
+
+    Leaving the block without committing discards the staged files. Target
+    files are locked with the locked_file convention (<file>.lock) while
+    they are renamed, so locked readers never see a mix of old and new.
+    Transactions sharing a journal must not run concurrently; callers
+    serialize them with their own lock.
+    """
+
+    def __init__(self, journal_path: Union[str, Path], fsync: bool = True):
+        self.journal_path = Path(journal_path)
+        self.fsync = fsync
+        self.staged: Dict[Path, Path] = {}
+        self.committed = False
+
+    @staticmethod
+    def staged_path(target: Path) -> Path:
+        return target.with_name(f'.{target.name}.staged')
+
+    def stage_bytes(self, path: Union[str, Path], data: bytes):
+        """Write the new contents of a file beside it; the file itself is untouched."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staged = self.staged_path(target)
+        fd = os.open(staged, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, _target_mode(target))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self.staged[target] = staged
+
+    def stage_json(self, path: Union[str, Path], data: Any, indent: Optional[int] = 2):
+        self.stage_bytes(path, json.dumps(data, indent=indent).encode())
+
+    def commit(self):
+        """
+        Replace every target with its staged contents.
+
+        Raises:
+            FileLockError: If a target's lock cannot be acquired
+        """
+        if not self.staged:
+            self.committed = True
+            return
+
+        locks = [FileLock(target.with_suffix(target.suffix + '.lock')) for target in sorted(self.staged)]
+        acquired: List[FileLock] = []
+        try:
+            for lock in locks:
+                if not lock.acquire():
+                    raise FileLockError(f"Failed to acquire lock on {lock.lock_file} within {lock.timeout} seconds")
+                acquired.append(lock)
+            if self.fsync:
+                for directory in {staged.parent for staged in self.staged.values()}:
+                    fsync_directory(directory)
+            # The journal is the commit point: once it exists, recover() finishes the renames
+            atomic_write_json(self.journal_path, {
+                'files': [[str(staged), str(target)] for target, staged in self.staged.items()]
+            }, indent=None, fsync=self.fsync)
+            self._apply_journal(self.journal_path, self.fsync)
+            self.committed = True
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def abort(self):
+        """Discard staged files."""
+        for staged in self.staged.values():
+            try:
+                staged.unlink()
+            except FileNotFoundError:
+                pass
+        self.staged = {}
+
+    def __enter__(self) -> 'FileTransaction':
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        if not self.committed:
+            self.abort()
+
+    @classmethod
+    def recover(cls, journal_path: Union[str, Path], fsync: bool = True) -> bool:
+        """
+        Finish a transaction interrupted after its commit point.
+
+        Returns:
+            True if an interrupted transaction was rolled forward
+        """
+        journal_path = Path(journal_path)
+        if not journal_path.exists():
+            return False
+        return cls._apply_journal(journal_path, fsync)
+
+    @staticmethod
+    def _apply_journal(journal_path: Path, fsync: bool) -> bool:
+        """
+        Rename every staged file in a journal into place, then drop the journal.
+
+        A journal or staged file that is already gone was finished by an
+        earlier or concurrent recovery and is skipped.
+
+        Returns:
+            False if the journal was already gone
+        """
+        try:
+            with open(journal_path, 'r') as f:
+                files = json.load(f)['files']
+        except FileNotFoundError:
+            return False
+        for staged, target in files:
+            try:
+                os.replace(staged, target)
+            except FileNotFoundError:
+                pass
+        if fsync:
+            for directory in {os.path.dirname(target) for _, target in files}:
+                fsync_directory(directory)
+        try:
+            os.unlink(journal_path)
+        except FileNotFoundError:
+            return True
+        if fsync:
+            fsync_directory(journal_path.parent)
+        return True
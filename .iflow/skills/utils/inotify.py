@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Inotify Utility
+Minimal Linux inotify binding through ctypes, used as a wake-up source for
+directory watchers. Callers must fall back to polling when it is unavailable.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+from typing import Dict, List, Optional, Tuple, Union
+
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+DEFAULT_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        library = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(library, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = libc
+    return _libc
+
+
+def inotify_available() -> bool:
+    """Check whether inotify can be used on this platform."""
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        libc = _load_libc()
+        return hasattr(libc, 'inotify_init1')
+    except (OSError, AttributeError):
+        return False
+
+
+class Inotify:
+    """
+    An inotify instance.
+
+    Usage:
+        with Inotify() as watcher:
+            watcher.add_watch('/path/to/dir')
+            for wd, mask, name in watcher.read(timeout=1.0):
+                ...
+    """
+
+    def __init__(self):
+        if not inotify_available():
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self._libc = _load_libc()
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.watches: Dict[int, str] = {}
+
+    def add_watch(self, path: Union[str, os.PathLike], mask: int = DEFAULT_MASK) -> int:
+        """
+        Watch a directory; re-adding an existing path returns its descriptor.
+
+        Raises:
+            OSError: If the watch cannot be added
+        """
+        path = os.fspath(path)
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask | IN_ONLYDIR)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        self.watches[wd] = path
+        return wd
+
+    def read(self, timeout: Optional[float] = None) -> List[Tuple[int, int, str]]:
+        """
+        Wait for events.
+
+        Args:
+            timeout: Seconds to wait (None blocks until an event arrives)
+
+        Returns:
+            List of (watch descriptor, mask, name) events; empty on timeout
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+            offset += length
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        """Release the inotify file descriptor."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+            self.watches.clear()
+
+    def __enter__(self) -> 'Inotify':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+JSON Diff Utility
+Structural diffs between JSON documents, as patches that can be stored and
+replayed. A patch is a list of ops addressed by key paths:
+
+    {"op": "set", "path": ["branches", "feature-x", "status"], "value": "merged"}
+    {"op": "del", "path": ["branches", "old"]}
+    {"op": "splice", "path": ["history"], "start": 12, "items": [...]}
+
+`splice` replaces a list's tail from `start` with `items`, which covers both
+appends and truncation. An empty path addresses the document root.
+"""
+
+import marshal
+from copy import deepcopy
+from typing import Any, Dict, List, Sequence, Union
+
+
+Key = Union[str, int]
+Patch = List[Dict[str, Any]]
+
+
+def diff(old: Any, new: Any) -> Patch:
+    """
+    Compute a patch turning `old` into `new`.
+
+    Subtrees that are the same object are skipped without being compared,
+    so diffing states with structural sharing costs only the changed paths.
+    Other containers are skipped when they are equal as JSON (see
+    _same_json), so 1, 1.0 and True stay distinct at any depth.
+    """
+    patch: Patch = []
+    _diff(old, new, [], patch)
+    return patch
+
+
+def _same_json(old: Any, new: Any) -> bool:
+    """
+    Type-strict equality for values that already compare equal with ==.
+
+    == runs in C but treats 1, 1.0 and True as equal, so the values are
+    also compared marshaled, which runs in C too and keeps those types
+    apart. Format 0 writes no back-references or interning flags, so equal
+    values always marshal to equal bytes. Equal dicts with different key
+    order fail this check and are diffed key by key instead, which finds
+    no changes.
+    """
+    try:
+        return marshal.dumps(old, 0) == marshal.dumps(new, 0)
+    except ValueError:
+        return False
+
+
+def _diff_children(pairs, path: List[Key], patch: Patch):
+    """
+    Diff (key, old, new) children of a container.
+
+    Children that compare equal with == are checked for type changes in
+    one batch, since most of them are unchanged.
+    """
+    equal = []
+    for key, previous, value in pairs:
+        if previous is value:
+            continue
+        if type(previous) is not type(value) or previous != value:
+            _diff(previous, value, path + [key], patch)
+        elif type(value) in (dict, list):
+            equal.append((key, previous, value))
+
+    if equal and not _same_json([item[1] for item in equal], [item[2] for item in equal]):
+        for key, previous, value in equal:
+            _diff(previous, value, path + [key], patch)
+
+
+def _diff(old: Any, new: Any, path: List[Key], patch: Patch):
+    if old is new:
+        return
+
+    if type(old) is dict and type(new) is dict:
+        if old == new and _same_json(old, new):
+            return
+        for key in old:
+            if key not in new:
+                patch.append({'op': 'del', 'path': path + [key]})
+        for key, value in new.items():
+            if key not in old:
+                patch.append({'op': 'set', 'path': path + [key], 'value': value})
+        _diff_children(((key, old[key], value) for key, value in new.items() if key in old), path, patch)
+        return
+
+    if type(old) is list and type(new) is list:
+        if old == new and _same_json(old, new):
+            return
+        mark = len(patch)
+        common = min(len(old), len(new))
+        _diff_children(((index, old[index], new[index]) for index in range(common)), path, patch)
+        if len(old) != len(new):
+            patch.append({'op': 'splice', 'path': path, 'start': common, 'items': new[common:]})
+        # Shifted lists change every item; one replacement is smaller
+        if len(patch) - mark > max(1, len(new) // 2):
+            del patch[mark:]
+            patch.append({'op': 'set', 'path': path, 'value': new})
+        return
+
+    # type() check keeps 1, 1.0 and True distinct, as JSON does
+    if type(old) is not type(new) or old != new:
+        patch.append({'op': 'set', 'path': path, 'value': new})
+
+
+def apply_patch(document: Any, patch: Sequence[Dict[str, Any]], in_place: bool = False,
+                missing_ok: bool = False) -> Any:
+    """
+    Apply a patch.
+
+    Unless `in_place` is set, the document is left untouched: containers on
+    patched paths are copied once and all other subtrees are shared with
+    the result. With `missing_ok`, deleting a dict key that is already
+    absent does nothing instead of failing.
+
+    Returns:
+        The patched document
+
+    Raises:
+        ValueError: If the patch does not match the document
+    """
+    owned = set()
+
+    def own(container):
+        if type(container) not in (dict, list):
+            raise TypeError(f"{type(container).__name__} is not a container")
+        if in_place or id(container) in owned:
+            return container
+        clone = dict(container) if type(container) is dict else list(container)
+        owned.add(id(clone))
+        return clone
+
+    root = document
+    for op in patch:
+        path = op['path']
+        try:
+            if op['op'] == 'set' and not path:
+                root = deepcopy(op['value'])
+                continue
+
+            # Own every container down to the parent (or, for splice, the list itself)
+            depth = len(path) if op['op'] == 'splice' else len(path) - 1
+            root = own(root)
+            container = root
+            for key in path[:depth]:
+                child = own(container[key])
+                container[key] = child
+                container = child
+
+            if op['op'] == 'splice':
+                if type(container) is not list or op['start'] > len(container):
+                    raise ValueError(f"Cannot splice {path} at {op['start']}")
+                container[op['start']:] = deepcopy(op['items'])
+            elif op['op'] == 'set':
+                if type(container) is list and path[-1] >= len(container):
+                    raise ValueError(f"Index out of range at {path}")
+                container[path[-1]] = deepcopy(op['value'])
+            elif op['op'] == 'del':
+                if missing_ok and type(container) is dict and path[-1] not in container:
+                    continue
+                del container[path[-1]]
+            else:
+                raise ValueError(f"Unknown patch op: {op['op']}")
+        except (KeyError, IndexError, TypeError) as e:
+            raise ValueError(f"Patch does not apply at {path}: {e}")
+
+    return root
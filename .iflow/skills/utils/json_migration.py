@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Declarative JSON Migration Utility
+Migrations written as data (versions/<to>/migrations/from_<from>.json) instead
+of Python. Because their effects are known up front, the ops of consecutive
+hops can be fused, and applying them copies only the containers on the paths
+they touch instead of deep-copying the whole state.
+
+File format:
+    {"ops": [
+        {"op": "set-default", "path": "settings.retries", "value": 3},
+        {"op": "set", "path": "schema", "value": 2},
+        {"op": "rename", "path": "branches.*.state", "to": "status"},
+        {"op": "delete", "path": "legacy"},
+        {"op": "move", "from": "meta.owner", "path": "owner"},
+        {"op": "map-enum", "path": "branches.*.status", "map": {"done": "complete"}}
+    ]}
+
+Paths are dot-separated keys; `*` matches every key of an object or item of
+an array, and numeric segments index arrays.
+"""
+
+import json
+import os
+import threading
+import time
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+OPS = ('set-default', 'set', 'rename', 'delete', 'move', 'map-enum')
+WILDCARD = '*'
+
+Op = Dict[str, Any]
+Segments = Tuple[str, ...]
+
+# Process-wide cache: resolved path -> (mtime_ns, size, migration)
+_migration_cache: Dict[str, Tuple[int, int, 'DeclarativeMigration']] = {}
+_cache_lock = threading.Lock()
+
+
+def parse_path(path: Union[str, Sequence[str]]) -> Segments:
+    """Split a dotted path into segments; lists of segments pass through."""
+    segments = tuple(path.split('.')) if isinstance(path, str) else tuple(str(s) for s in path)
+    if not segments or any(segment == '' for segment in segments):
+        raise ValueError(f"Invalid path: {path!r}")
+    return segments
+
+
+def compile_ops(ops: List[Op]) -> List[Op]:
+    """
+    Validate ops and normalize their paths to segment tuples.
+
+    Raises:
+        ValueError: If an op is unknown or malformed
+    """
+    compiled = []
+    for position, op in enumerate(ops):
+        if not isinstance(op, dict) or op.get('op') not in OPS:
+            raise ValueError(f"Op {position}: unknown op {op!r}")
+
+        kind = op['op']
+        try:
+            segments = parse_path(op['path'])
+        except KeyError as e:
+            raise ValueError(f"Op {position} ({kind}): missing 'path'") from e
+
+        if segments[-1] == WILDCARD:
+            raise ValueError(f"Op {position} ({kind}): path cannot end with '*'")
+
+        entry = {'op': kind, 'path': segments}
+        if kind in ('set-default', 'set'):
+            if 'value' not in op:
+                raise ValueError(f"Op {position} ({kind}): missing 'value'")
+            entry['value'] = op['value']
+        elif kind == 'rename':
+            if not isinstance(op.get('to'), str) or '.' in op['to'] or op['to'] == WILDCARD:
+                raise ValueError(f"Op {position} (rename): 'to' must be a single key")
+            entry['to'] = op['to']
+        elif kind == 'move':
+            try:
+                source = parse_path(op['from'])
+            except KeyError as e:
+                raise ValueError(f"Op {position} (move): missing 'from'") from e
+            if WILDCARD in source or WILDCARD in segments:
+                raise ValueError(f"Op {position} (move): paths cannot contain '*'")
+            entry['from'] = source
+        elif kind == 'map-enum':
+            if not isinstance(op.get('map'), dict):
+                raise ValueError(f"Op {position} (map-enum): 'map' must be an object")
+            entry['map'] = dict(op['map'])
+
+        compiled.append(entry)
+    return compiled
+
+
+def _touched(op: Op) -> List[Segments]:
+    """Paths an op reads or writes."""
+    if op['op'] == 'rename':
+        return [op['path'], op['path'][:-1] + (op['to'],)]
+    if op['op'] == 'move':
+        return [op['from'], op['path']]
+    return [op['path']]
+
+
+def _overlaps(a: Segments, b: Segments) -> bool:
+    """Whether one path is a prefix of the other, with '*' matching any key."""
+    # Comparing only the shared prefix is the point, so zip stops at the shorter path
+    return all(x == y or WILDCARD in (x, y) for x, y in zip(a, b, strict=False))
+
+
+def _conflicts(first: Op, second: Op) -> bool:
+    return any(_overlaps(a, b) for a in _touched(first) for b in _touched(second))
+
+
+def _is_index(segment: str) -> bool:
+    """Whether a segment can address an array item."""
+    return segment.lstrip('-').isdigit()
+
+
+def _reorderable(op: Op) -> bool:
+    """
+    Whether an op commutes with every op on a disjoint path.
+
+    A `*` enumerates keys that other ops create or remove, and deleting or
+    moving an array item shifts the items after it, so ops with either kind
+    of segment are only fused with their immediate neighbour.
+    """
+    return not any(segment == WILDCARD or _is_index(segment)
+                   for path in _touched(op) for segment in path)
+
+
+def _fuse_pair(first: Op, second: Op) -> Optional[Op]:
+    """
+    Fuse two ops on the same path when a single op is equivalent.
+
+    Returns:
+        The replacement op, or None if the pair cannot be fused
+    """
+    if first['op'] in ('rename', 'move') or second['op'] in ('rename', 'move') \
+            or first['path'] != second['path']:
+        return None
+
+    kinds = (first['op'], second['op'])
+
+    # Deleting an array item shifts the next one into its place, so a second
+    # op on the same index sees a different item
+    if first['op'] == 'delete' and _is_index(first['path'][-1]):
+        return None
+
+    # A later overwrite or delete makes earlier value changes irrelevant; a
+    # set-default would have created missing parents, so it is kept
+    if second['op'] == 'set':
+        return second
+    if kinds in (('delete', 'delete'), ('map-enum', 'delete')):
+        return second
+    if kinds == ('delete', 'set-default'):
+        return {'op': 'set', 'path': second['path'], 'value': second['value']}
+    if kinds in (('set', 'set-default'), ('set-default', 'set-default')):
+        return first
+
+    if kinds == ('map-enum', 'map-enum'):
+        outer = second['map']
+        composed = {key: outer.get(value, value) if isinstance(value, str) else value
+                    for key, value in first['map'].items()}
+        for key, value in outer.items():
+            composed.setdefault(key, value)
+        return {'op': 'map-enum', 'path': first['path'], 'map': composed}
+
+    if kinds == ('set', 'map-enum'):
+        value = first['value']
+        if isinstance(value, str):
+            value = second['map'].get(value, value)
+        return {'op': 'set', 'path': first['path'], 'value': value}
+
+    return None
+
+
+def fuse_ops(ops: List[Op]) -> List[Op]:
+    """
+    Fuse a compiled op list into an equivalent, usually shorter one.
+
+    Each op is combined with the closest earlier op it conflicts with when
+    the pair has a single-op equivalent. Ops on disjoint paths commute, so
+    the search skips over them, but never past or with an op that is not
+    reorderable.
+    """
+    fused: List[Op] = []
+    for op in ops:
+        while True:
+            index = None
+            for i in range(len(fused) - 1, -1, -1):
+                if _conflicts(fused[i], op):
+                    index = i
+                    break
+                if not (_reorderable(fused[i]) and _reorderable(op)):
+                    break
+            if index is None:
+                break
+            replacement = _fuse_pair(fused[index], op)
+            if replacement is None:
+                break
+            del fused[index]
+            op = replacement
+        fused.append(op)
+    return fused
+
+
+class _Applier:
+    """Applies compiled ops, copying containers on first write when not in place."""
+
+    _MISSING = object()
+
+    def __init__(self, in_place: bool):
+        self.in_place = in_place
+        self._owned = set()
+
+    def own(self, container):
+        """Return a private copy of a container, copying it at most once."""
+        if self.in_place or id(container) in self._owned:
+            return container
+        clone = dict(container) if isinstance(container, dict) else list(container)
+        self._owned.add(id(clone))
+        return clone
+
+    def parents(self, container, segments: Segments, create: bool) -> Iterator[Tuple[Any, Any]]:
+        """Yield (parent, key) pairs for the last segment, owning every container on the way."""
+        if len(segments) == 1:
+            key = self._key(container, segments[0])
+            if key is not self._MISSING:
+                yield container, key
+            return
+
+        head, rest = segments[0], segments[1:]
+        keys = self._wildcard_keys(container) if head == WILDCARD else [self._key(container, head)]
+        for key in keys:
+            if key is self._MISSING:
+                continue
+            child = self._get(container, key)
+            if child is self._MISSING:
+                if not create or not isinstance(container, dict):
+                    continue
+                child = {}
+                self._owned.add(id(child))
+            elif not isinstance(child, (dict, list)):
+                continue
+            else:
+                child = self.own(child)
+            container[key] = child
+            yield from self.parents(child, rest, create)
+
+    def _wildcard_keys(self, container) -> List:
+        return list(container.keys()) if isinstance(container, dict) else list(range(len(container)))
+
+    def _key(self, container, segment: str):
+        if isinstance(container, dict):
+            return segment
+        if isinstance(container, list) and segment.lstrip('-').isdigit():
+            index = int(segment)
+            if -len(container) <= index < len(container):
+                return index
+        return self._MISSING
+
+    def _get(self, container, key):
+        if isinstance(container, dict):
+            return container.get(key, self._MISSING)
+        return container[key]
+
+    def apply(self, root, op: Op):
+        kind = op['op']
+
+        if kind == 'move':
+            value = self._MISSING
+            for parent, key in list(self.parents(root, op['from'], create=False)):
+                if isinstance(parent, dict) and key in parent:
+                    value = parent.pop(key)
+                elif isinstance(parent, list):
+                    value = parent.pop(key)
+            if value is not self._MISSING:
+                for parent, key in self.parents(root, op['path'], create=True):
+                    parent[key] = value
+            return
+
+        create = kind in ('set-default', 'set')
+        for parent, key in list(self.parents(root, op['path'], create=create)):
+            present = key in parent if isinstance(parent, dict) else True
+            if kind == 'set':
+                parent[key] = deepcopy(op['value'])
+            elif kind == 'set-default':
+                if not present:
+                    parent[key] = deepcopy(op['value'])
+            elif not present:
+                continue
+            elif kind == 'delete':
+                del parent[key]
+            elif kind == 'rename':
+                if isinstance(parent, dict):
+                    parent[op['to']] = parent.pop(key)
+            elif kind == 'map-enum':
+                value = parent[key]
+                if isinstance(value, str) and value in op['map']:
+                    parent[key] = op['map'][value]
+
+
+def apply_ops(state: Dict, ops: List[Op], in_place: bool = False) -> Dict:
+    """
+    Apply compiled ops to a state.
+
+    Unless `in_place` is set, the input is left untouched: the root and
+    every container on a written path are copied once, and untouched
+    subtrees are shared between input and result.
+
+    Returns:
+        The migrated state
+    """
+    applier = _Applier(in_place)
+    root = applier.own(state)
+    for op in ops:
+        applier.apply(root, op)
+    return root
+
+
+class DeclarativeMigration:
+    """A migration defined by ops; callable like a Python migration function."""
+
+    def __init__(self, ops: List[Op], source: Optional[Path] = None):
+        """
+        Args:
+            ops: Compiled ops (see compile_ops)
+            source: File the ops were loaded from
+        """
+        self.ops = list(ops)
+        self.source = source
+
+    @classmethod
+    def from_file(cls, migration_file: Path) -> 'DeclarativeMigration':
+        """
+        Load a from_<version>.json migration.
+
+        Raises:
+            ValueError: If the file is not valid JSON or contains invalid ops
+        """
+        try:
+            with open(migration_file, 'r') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid migration {migration_file}: {e}") from e
+
+        ops = data.get('ops') if isinstance(data, dict) else data
+        if not isinstance(ops, list):
+            raise ValueError(f"Invalid migration {migration_file}: expected a list of ops")
+        return cls(compile_ops(ops), Path(migration_file))
+
+    def apply(self, state: Dict, in_place: bool = False) -> Dict:
+        return apply_ops(state, self.ops, in_place=in_place)
+
+    def __call__(self, state: Dict) -> Dict:
+        return self.apply(state)
+
+    def then(self, other: 'DeclarativeMigration') -> 'DeclarativeMigration':
+        """Compose with a following migration, fusing their ops."""
+        return DeclarativeMigration(fuse_ops(self.ops + other.ops))
+
+
+def load_declarative_migration(migration_file: Path) -> DeclarativeMigration:
+    """Load a declarative migration, memoized per file revision."""
+    path = str(Path(migration_file).resolve())
+    stat = os.stat(path)
+
+    with _cache_lock:
+        cached = _migration_cache.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+    migration = DeclarativeMigration.from_file(Path(path))
+    with _cache_lock:
+        _migration_cache[path] = (stat.st_mtime_ns, stat.st_size, migration)
+    return migration
+
+
+def group_migrations(migrations: List[Callable]) -> List[Tuple[int, Callable]]:
+    """
+    Collapse runs of declarative migrations into single fused migrations.
+
+    Returns:
+        (hop_count, migration) pairs in order
+    """
+    groups: List[Tuple[int, Callable]] = []
+    for migration in migrations:
+        if groups and isinstance(migration, DeclarativeMigration) and isinstance(groups[-1][1], DeclarativeMigration):
+            count, previous = groups[-1]
+            groups[-1] = (count + 1, previous.then(migration))
+        else:
+            groups.append((1, migration))
+    return groups
+
+
+def run_migrations(state: Dict, migrations: List[Callable], owned: bool = False,
+                   on_group: Optional[Callable[[int, int, float], None]] = None) -> Dict:
+    """
+    Run a chain of migrations with as little copying as possible.
+
+    Declarative runs are fused and applied with path copying (or in place
+    once the state is private); Python migrations get a deep copy unless
+    the state is already private to this call.
+
+    Args:
+        state: Input state
+        migrations: Migration callables in hop order
+        owned: The caller does not need `state` preserved
+        on_group: Called with (first_hop, hop_count, seconds) after each group
+
+    Returns:
+        The migrated state
+    """
+    first_hop = 0
+    for hop_count, migration in group_migrations(migrations):
+        started = time.perf_counter()
+        if isinstance(migration, DeclarativeMigration):
+            state = migration.apply(state, in_place=owned)
+        else:
+            state = migration(state if owned else deepcopy(state))
+            owned = True
+            if not isinstance(state, dict):
+                raise ValueError("Migration function must return a dictionary")
+        if on_group:
+            on_group(first_hop, hop_count, time.perf_counter() - started)
+        first_hop += hop_count
+    return state
+
+
+def clear_declarative_cache():
+    """Forget all loaded declarative migrations."""
+    with _cache_lock:
+        _migration_cache.clear()
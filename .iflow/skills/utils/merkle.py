@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Merkle Hash Utility
+Content hashes of JSON states computed as a Merkle tree: each dict or list
+is hashed from its scalar items and the hashes of its child containers.
+Subtree hashes are cached by object identity, so hashing a new state that
+shares structure with one hashed before (copy-on-write views, path-copied
+patches) only visits the containers on changed paths.
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, Tuple, Union
+
+
+_CONTAINERS = frozenset({dict, list})
+
+# Clear the cache past this many entries rather than let it pin old states
+DEFAULT_MAX_ENTRIES = 500000
+
+
+class MerkleHasher:
+    """
+    Merkle hasher with cached subtree hashes.
+
+    Cached containers are assumed not to change in place, which holds for
+    states treated as immutable. Code that does mutate a hashed state must
+    call invalidate() with the path it changed before hashing it again.
+
+    Dicts hash the same regardless of key order; 1, 1.0 and True hash
+    differently. A first, uncached hash visits every container in Python
+    and is slower than hashing one serialization; the cache pays off when
+    the same or a derived state is hashed again.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # id -> (container, hex digest); holding the container keeps its id from being reused
+        self._cache: Dict[int, Tuple[Any, str]] = {}
+
+    def hash(self, value: Any) -> str:
+        """Hex digest of a JSON value."""
+        if len(self._cache) > self.max_entries:
+            self._cache.clear()
+        if type(value) in _CONTAINERS:
+            return self._hash(value)
+        return hashlib.sha256(b's' + repr(value).encode()).hexdigest()
+
+    def _hash(self, value: Union[dict, list]) -> str:
+        entry = self._cache.get(id(value))
+        if entry is not None and entry[0] is value:
+            return entry[1]
+
+        # repr() runs in C and keeps 1, 1.0 and True apart. Containers with
+        # only scalar items, the common case, are hashed from their repr
+        # directly; others from their scalar items, the keys (or indexes)
+        # of their child containers, and the children's digests in order.
+        is_dict = type(value) is dict
+        items = value.values() if is_dict else value
+        if _CONTAINERS.isdisjoint(map(type, items)):
+            payload = repr(sorted(value.items())) if is_dict else repr(value)
+        else:
+            scalars = []
+            children = []
+            digests = []
+            cached = self._cache.get
+            for key, item in (sorted(value.items()) if is_dict else enumerate(value)):
+                if type(item) in _CONTAINERS:
+                    entry = cached(id(item))
+                    children.append(key)
+                    digests.append(entry[1] if entry is not None and entry[0] is item else self._hash(item))
+                else:
+                    scalars.append((key, item))
+            payload = ''.join((repr(scalars), repr(children), *digests))
+
+        digest = hashlib.sha256((('d' if is_dict else 'l') + payload).encode()).hexdigest()
+        self._cache[id(value)] = (value, digest)
+        return digest
+
+    def invalidate(self, document: Any, path: Iterable[Union[str, int]] = ()):
+        """
+        Forget cached hashes along a path that was modified in place.
+
+        Every container from the document root down to the value at `path`
+        is forgotten; siblings keep their cached hashes. If the path no
+        longer resolves, the containers up to where it stops are forgotten,
+        which is enough for deletions.
+        """
+        container = document
+        self._forget(container)
+        for key in path:
+            try:
+                container = container[key]
+            except (KeyError, IndexError, TypeError):
+                return
+            self._forget(container)
+
+    def _forget(self, value: Any):
+        entry = self._cache.get(id(value))
+        if entry is not None and entry[0] is value:
+            del self._cache[id(value)]
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def merkle_hash(value: Any) -> str:
+    """Hex digest of a JSON value, without caching."""
+    return MerkleHasher().hash(value)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Migration Loader Utility
+Indexes migration files on disk and loads them through importlib, so
+migrations get normal __pycache__ bytecode caching and are compiled at most
+once per process for each file revision. Declarative from_<version>.json
+migrations are loaded through json_migration.
+"""
+
+import hashlib
+import importlib.machinery
+import importlib.util
+import os
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    from .json_migration import clear_declarative_cache, load_declarative_migration
+    from .versioning import Version
+except ImportError:
+    from json_migration import clear_declarative_cache, load_declarative_migration
+    from versioning import Version
+
+
+# Process-wide cache: resolved migration path -> (mtime_ns, size, module)
+_module_cache: Dict[str, Tuple[int, int, ModuleType]] = {}
+_cache_lock = threading.Lock()
+
+
+def version_from_migration_stem(stem: str) -> Optional[Version]:
+    """
+    Parse the source version encoded in a migration file stem.
+
+    Args:
+        stem: File stem such as "from_1_0_0" or "from_2_0_0_rc_1"
+
+    Returns:
+        Parsed Version, or None if the stem does not encode a version
+    """
+    if not stem.startswith('from_'):
+        return None
+
+    parts = stem[len('from_'):].split('_')
+    release, extra = parts[:3], parts[3:]
+    text = '.'.join(release)
+    if extra:
+        text += '-' + '.'.join(extra)
+
+    try:
+        return Version.parse(text)
+    except ValueError:
+        return None
+
+
+def migration_file_stem(from_version: Union[str, Version]) -> str:
+    """Build the file stem for a migration from `from_version`."""
+    version = Version.parse(from_version)
+    stem = f'from_{version.major}_{version.minor}_{version.patch}'
+    if version.prerelease:
+        stem += '_' + '_'.join(version.prerelease)
+    return stem
+
+
+class MigrationIndex:
+    """
+    Directory index of migration edges.
+
+    Scans versions/<to>/migrations/from_<from>.{py,json} once with os.scandir
+    and answers existence checks from memory without compiling anything.
+    `generation` counts the refreshes that changed the edges, so caches
+    built from the index can tell when they are stale.
+    """
+
+    SUFFIXES = ('.py', '.json')
+
+    def __init__(self, versions_dir: Path):
+        self.versions_dir = versions_dir
+        self.edges: Dict[Tuple[Version, Version], Path] = {}
+        self.generation = 0
+        self.refresh()
+
+    def refresh(self):
+        """Rescan the versions directory."""
+        edges: Dict[Tuple[Version, Version], Path] = {}
+
+        for version_entry in _scandir(self.versions_dir):
+            if not version_entry.is_dir():
+                continue
+            try:
+                to_version = Version.parse(version_entry.name)
+            except ValueError:
+                continue
+
+            migrations_dir = Path(version_entry.path) / 'migrations'
+            for migration_entry in _scandir(migrations_dir):
+                name = migration_entry.name
+                stem, suffix = os.path.splitext(name)
+                if suffix not in self.SUFFIXES or not migration_entry.is_file():
+                    continue
+
+                from_version = version_from_migration_stem(stem)
+                if from_version is None:
+                    continue
+
+                # Prefer the first suffix listed in SUFFIXES when several exist
+                existing = edges.get((from_version, to_version))
+                if existing is not None and self.SUFFIXES.index(existing.suffix) <= self.SUFFIXES.index(suffix):
+                    continue
+                edges[(from_version, to_version)] = migrations_dir / name
+
+        if edges != self.edges:
+            self.edges = edges
+            self.generation += 1
+
+    def has_migration(self, from_version: Union[str, Version], to_version: Union[str, Version]) -> bool:
+        """Check whether a migration file exists for an edge."""
+        return self.get_path(from_version, to_version) is not None
+
+    def get_path(self, from_version: Union[str, Version],
+                 to_version: Union[str, Version]) -> Optional[Path]:
+        """Get the migration file for an edge, if any."""
+        try:
+            key = (Version.parse(from_version), Version.parse(to_version))
+        except ValueError:
+            return None
+        return self.edges.get(key)
+
+    def iter_edges(self) -> Iterator[Tuple[Version, Version, Path]]:
+        """Iterate over (from, to, path) edges."""
+        for (from_version, to_version), path in self.edges.items():
+            yield from_version, to_version, path
+
+    def targets(self) -> List[Version]:
+        """All versions that have at least one incoming migration."""
+        return sorted({to_version for _, to_version in self.edges})
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+
+def load_migration_module(migration_file: Path) -> ModuleType:
+    """
+    Import a migration file, memoized per file revision.
+
+    The module is loaded with SourceFileLoader, which reads and writes
+    bytecode in the usual __pycache__ directory. Subsequent calls return the
+    cached module until the file's mtime or size changes.
+
+    Args:
+        migration_file: Path to the migration .py file
+
+    Returns:
+        Loaded module
+    """
+    path = str(Path(migration_file).resolve())
+    stat = os.stat(path)
+
+    with _cache_lock:
+        cached = _module_cache.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+    module_name = '_iflow_migration_' + hashlib.md5(path.encode()).hexdigest()[:16]
+    loader = importlib.machinery.SourceFileLoader(module_name, path)
+    spec = importlib.util.spec_from_loader(module_name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+
+    with _cache_lock:
+        _module_cache[path] = (stat.st_mtime_ns, stat.st_size, module)
+    return module
+
+
+def load_migration(migration_file: Path) -> Callable:
+    """
+    Load the migration function from a migration file.
+
+    Args:
+        migration_file: Path to the migration .py or .json file
+
+    Returns:
+        The module's `migrate` (or `migrate_state`) function, or a
+        DeclarativeMigration for .json files
+
+    Raises:
+        ValueError: If the module defines no migration function, or the
+            declarative migration is invalid
+    """
+    if Path(migration_file).suffix == '.json':
+        return load_declarative_migration(migration_file)
+
+    module = load_migration_module(migration_file)
+
+    for name in ('migrate', 'migrate_state'):
+        func = getattr(module, name, None)
+        if callable(func):
+            return func
+
+    raise ValueError(f"No migration function found in {migration_file}")
+
+
+def uses_copy_on_write(migration_func: Callable) -> bool:
+    """
+    Whether a Python migration accepts a copy-on-write view of the state.
+
+    A migration module opts in with a module-level `COPY_ON_WRITE = True`.
+    It then receives a CowDict (see cow_state), which is a MutableMapping
+    but not a dict, so isinstance(x, dict), dict.copy() and json.dumps do
+    not work on it. Other migrations receive a plain deep copy.
+    """
+    namespace = getattr(migration_func, '__globals__', None)
+    return bool(namespace and namespace.get('COPY_ON_WRITE', False))
+
+
+def clear_migration_cache():
+    """Forget all loaded migration modules and declarative migrations."""
+    with _cache_lock:
+        _module_cache.clear()
+    clear_declarative_cache()
+
+
+def _scandir(path: Path) -> List[os.DirEntry]:
+    """List a directory, returning nothing if it is missing or not a directory."""
+    try:
+        with os.scandir(path) as entries:
+            return list(entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
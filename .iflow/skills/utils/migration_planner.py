@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Migration Planner Utility
+Finds the cheapest chain of migrations between two versions over the graph
+of versions/<to>/migrations/from_<from> edges, including skip-version edges.
+"""
+
+import heapq
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    from .versioning import Version
+    from .migration_loader import MigrationIndex
+except ImportError:
+    from versioning import Version
+    from migration_loader import MigrationIndex
+
+
+Edge = Tuple[Version, Version]
+
+
+class MigrationPlanner:
+    """
+    Plans migration paths with Dijkstra over migration edges.
+
+    Edge cost is the measured migration time when one has been recorded and
+    one hop otherwise (scaled to the average measured time, so measured and
+    unmeasured edges are comparable). Ties are broken by hop count, so a
+    direct from_1_0_0 migration placed in 3.0.0 beats 1.0.0 -> 2.0.0 -> 3.0.0.
+
+    Plans are cached per (from, to) until the index or timings change; an
+    index refresh that changes its edges is picked up from its generation.
+    """
+
+    SMOOTHING = 0.5
+
+    def __init__(self, index: MigrationIndex):
+        self.index = index
+        self.timings: Dict[Edge, float] = {}
+        self._plans: Dict[Edge, Optional[Tuple[Version, ...]]] = {}
+        self._graph: Optional[Dict[Version, List[Version]]] = None
+        self._generation = index.generation
+        self._lock = threading.Lock()
+
+    def plan(self, from_version: Union[str, Version],
+             to_version: Union[str, Version]) -> Optional[List[Version]]:
+        """
+        Find the cheapest migration path.
+
+        Args:
+            from_version: Starting version
+            to_version: Target version
+
+        Returns:
+            Versions reached by each hop (excluding the start), or None if
+            the target is unreachable
+        """
+        start = Version.parse(from_version)
+        goal = Version.parse(to_version)
+        if start == goal:
+            return []
+
+        with self._lock:
+            if self._generation != self.index.generation:
+                self._generation = self.index.generation
+                self._plans.clear()
+                self._graph = None
+            if (start, goal) in self._plans:
+                cached = self._plans[(start, goal)]
+                return list(cached) if cached is not None else None
+
+            path = self._dijkstra(start, goal)
+            self._plans[(start, goal)] = tuple(path) if path is not None else None
+            return path
+
+    def edge_cost(self, from_version: Version, to_version: Version) -> float:
+        """Cost of a single migration edge."""
+        measured = self.timings.get((from_version, to_version))
+        if measured is not None:
+            return measured
+        if self.timings:
+            return sum(self.timings.values()) / len(self.timings)
+        return 1.0
+
+    def record_timing(self, from_version: Union[str, Version],
+                      to_version: Union[str, Version], seconds: float):
+        """Record a measured migration time, smoothing repeated measurements."""
+        edge = (Version.parse(from_version), Version.parse(to_version))
+        with self._lock:
+            previous = self.timings.get(edge)
+            if previous is None:
+                self.timings[edge] = seconds
+            else:
+                self.timings[edge] = previous + self.SMOOTHING * (seconds - previous)
+            self._plans.clear()
+
+    def invalidate(self):
+        """Drop cached plans and the adjacency graph."""
+        with self._lock:
+            self._plans.clear()
+            self._graph = None
+
+    def _adjacency(self) -> Dict[Version, List[Version]]:
+        if self._graph is None:
+            graph: Dict[Version, List[Version]] = {}
+            for from_version, to_version, _ in self.index.iter_edges():
+                graph.setdefault(from_version, []).append(to_version)
+            self._graph = graph
+        return self._graph
+
+    def _dijkstra(self, start: Version, goal: Version) -> Optional[List[Version]]:
+        graph = self._adjacency()
+        best: Dict[Version, Tuple[float, int]] = {start: (0.0, 0)}
+        previous: Dict[Version, Version] = {}
+        queue: List[Tuple[float, int, Version]] = [(0.0, 0, start)]
+
+        while queue:
+            cost, hops, node = heapq.heappop(queue)
+            if node == goal:
+                break
+            if (cost, hops) > best.get(node, (float('inf'), 0)):
+                continue
+
+            for neighbour in graph.get(node, ()):
+                candidate = (cost + self.edge_cost(node, neighbour), hops + 1)
+                if candidate < best.get(neighbour, (float('inf'), 0)):
+                    best[neighbour] = candidate
+                    previous[neighbour] = node
+                    heapq.heappush(queue, (candidate[0], candidate[1], neighbour))
+
+        if goal not in best:
+            return None
+
+        path = [goal]
+        while path[-1] != start:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return path[1:]
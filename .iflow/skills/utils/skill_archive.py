@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Skill Archive Utility
+Bundles skills into a single zip with a central index.json so a registry can
+load every skill's metadata with one open, instead of opening and parsing
+dozens of small files per skill.
+"""
+
+import io
+import json
+import mmap
+import os
+import re
+import shutil
+import stat
+import tempfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Union
+
+try:
+    from .content_hash import hash_bytes, hash_file, iter_tree_files
+except ImportError:
+    from content_hash import hash_bytes, hash_file, iter_tree_files
+
+
+ARCHIVE_INDEX = 'index.json'
+ARCHIVE_FORMAT = 1
+METADATA_FILES = ('capabilities.json', 'breaking_changes.json')
+_DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def is_skill_archive(path: Union[str, Path]) -> bool:
+    """Check whether a path is a packed skill archive."""
+    path = Path(path)
+    return path.is_file() and zipfile.is_zipfile(path)
+
+
+def build_skill_entry(skill_dir: Path) -> Dict:
+    """
+    Collect the metadata a registry needs for one skill.
+
+    Returns:
+        Dict with current_version and per-version capabilities and
+        breaking changes (None where the file is absent)
+    """
+    current_version = '1.0.0'
+    try:
+        with open(skill_dir / 'config.json', 'r') as f:
+            current_version = json.load(f).get('version', '1.0.0')
+    except (FileNotFoundError, json.JSONDecodeError, IOError, AttributeError):
+        pass
+
+    versions = {}
+    versions_dir = skill_dir / 'versions'
+    if versions_dir.is_dir():
+        for version_dir in sorted(versions_dir.iterdir()):
+            if not version_dir.is_dir():
+                continue
+            metadata = {}
+            for filename in METADATA_FILES:
+                try:
+                    with open(version_dir / filename, 'r') as f:
+                        metadata[filename[:-len('.json')]] = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError, IOError):
+                    metadata[filename[:-len('.json')]] = None
+            versions[version_dir.name] = metadata
+
+    return {'current_version': current_version, 'versions': versions}
+
+
+def tree_digest(root: Union[str, Path]) -> str:
+    """Digest of a skill directory tree, as recorded in an archive index."""
+    return hash_bytes('\n'.join(
+        f'{relative}:{hash_file(absolute)}' for relative, absolute in iter_tree_files(root)
+    ).encode())
+
+
+def archive_cache_root() -> Optional[Path]:
+    """
+    The current user's cache directory for extracted skills.
+
+    The directory is created 0700 in the temp directory. Returns None if it
+    exists but is not a directory owned by this user and closed to everyone
+    else, since its contents could then have been planted.
+    """
+    root = Path(tempfile.gettempdir()) / f'iflow-skill-archives-{os.getuid()}'
+    try:
+        os.mkdir(root, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+
+    info = os.lstat(root)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        return None
+    return root
+
+
+def pack_skills(skills_dir: Path, output_path: Path,
+                skill_names: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Pack skills into a zip archive with a central index.
+
+    Every file of each skill is stored under `<skill>/...`; index.json is
+    written first and holds the parsed metadata and a content digest per
+    skill. The archive is written to a temporary file and moved into place.
+
+    Args:
+        skills_dir: Directory containing skill directories
+        output_path: Archive to write
+        skill_names: Skills to pack (default: every skill in skills_dir)
+
+    Returns:
+        The archive index
+
+    Raises:
+        ValueError: If a requested skill does not exist
+    """
+    if skill_names is None:
+        skill_names = sorted(
+            entry.name for entry in skills_dir.iterdir()
+            if entry.is_dir() and ((entry / 'SKILL.md').exists() or (entry / 'config.json').exists())
+        )
+    else:
+        skill_names = sorted(skill_names)
+        for skill_name in skill_names:
+            if not (skills_dir / skill_name).is_dir():
+                raise ValueError(f"Skill not found: {skill_name}")
+
+    index = {'format': ARCHIVE_FORMAT, 'skills': {}}
+    members = []
+
+    for skill_name in skill_names:
+        skill_dir = skills_dir / skill_name
+        entry = build_skill_entry(skill_dir)
+        for relative, absolute in iter_tree_files(skill_dir):
+            members.append((f'{skill_name}/{relative}', absolute))
+        entry['digest'] = tree_digest(skill_dir)
+        index['skills'][skill_name] = entry
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{output_path.name}.', suffix='.tmp', dir=output_path.parent)
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(ARCHIVE_INDEX, json.dumps(index))
+            for member, absolute in members:
+                archive.write(absolute, member)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    return index
+
+
+class _MappedFile(io.RawIOBase):
+    """Seekable read-only file object over an mmap, as zipfile expects."""
+
+    def __init__(self, mapping: mmap.mmap):
+        self._mapping = mapping
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mapping.seek(offset, whence)
+        return self._mapping.tell()
+
+    def tell(self) -> int:
+        return self._mapping.tell()
+
+    def readinto(self, buffer) -> int:
+        data = self._mapping.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._mapping.read(size if size is not None and size >= 0 else None)
+
+
+class SkillArchive:
+    """
+    Read-only view of a packed skill archive.
+
+    The file is opened once and memory-mapped; zipfile reads the central
+    directory and members straight from the mapping.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._private_cache: Optional[tempfile.TemporaryDirectory] = None
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._zip = zipfile.ZipFile(_MappedFile(self._map))
+            self.index = json.loads(self._zip.read(ARCHIVE_INDEX))
+        except (ValueError, KeyError, zipfile.BadZipFile) as e:
+            self.close()
+            raise ValueError(f"Not a skill archive: {self.path}: {e}")
+
+        if self.index.get('format') != ARCHIVE_FORMAT:
+            self.close()
+            raise ValueError(f"Unsupported skill archive format: {self.index.get('format')}")
+
+        self.skills: Dict[str, Dict] = self.index.get('skills', {})
+
+    def read(self, member: str) -> bytes:
+        """Read a member's bytes; KeyError if it does not exist."""
+        return self._zip.read(member)
+
+    def exists(self, member: str) -> bool:
+        try:
+            self._zip.getinfo(member)
+            return True
+        except KeyError:
+            return False
+
+    def members(self, prefix: str = '') -> List[str]:
+        """Member names starting with a prefix."""
+        return [name for name in self._zip.namelist() if name.startswith(prefix)]
+
+    def extract(self, prefix: str, destination: Path) -> Path:
+        """
+        Extract members under a prefix, keeping their relative paths.
+
+        Returns:
+            The destination directory
+        """
+        destination = Path(destination)
+        for name in self.members(prefix):
+            relative = PurePosixPath(name[len(prefix):].lstrip('/'))
+            if not relative.parts or '..' in relative.parts or name.endswith('/'):
+                continue
+            target = destination.joinpath(*relative.parts)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(self._zip.read(name))
+        return destination
+
+    def extract_skill(self, skill_name: str) -> Path:
+        """
+        Extract a skill's files into the user's cache, once per digest.
+
+        An existing extraction is reused only if its tree still matches the
+        digest in the index, and a fresh one is verified the same way before
+        it is published. If the shared cache directory fails its owner and
+        mode check, the skill is extracted into a private directory that
+        lives as long as the archive.
+
+        Returns:
+            Directory holding the skill's files
+
+        Raises:
+            ValueError: If the index digest is malformed or the extracted
+                files do not match it
+        """
+        digest = self.skills[skill_name].get('digest')
+        if not isinstance(digest, str) or not _DIGEST_PATTERN.fullmatch(digest):
+            raise ValueError(f"Invalid digest for skill {skill_name} in {self.path}")
+
+        cache_root = archive_cache_root()
+        if cache_root is None:
+            if self._private_cache is None:
+                self._private_cache = tempfile.TemporaryDirectory(prefix='iflow-skill-archive-')
+            cache_root = Path(self._private_cache.name)
+
+        cache_dir = cache_root / digest
+        if cache_dir.is_dir() and tree_digest(cache_dir) == digest:
+            return cache_dir
+
+        staging = Path(tempfile.mkdtemp(dir=cache_root))
+        try:
+            self.extract(f'{skill_name}/', staging)
+            if tree_digest(staging) != digest:
+                raise ValueError(f"Skill {skill_name} in {self.path} does not match its digest")
+            # Drop an extraction that no longer matches before publishing ours
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            os.replace(staging, cache_dir)
+        except OSError:
+            # Another process published the same digest first
+            if not (cache_dir.is_dir() and tree_digest(cache_dir) == digest):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return cache_dir
+
+    def close(self):
+        """Release the zip, the mapping, the file and any private cache."""
+        for attribute in ('_zip', '_map', '_file'):
+            handle = getattr(self, attribute, None)
+            if handle is not None:
+                handle.close()
+                setattr(self, attribute, None)
+        if self._private_cache is not None:
+            self._private_cache.cleanup()
+            self._private_cache = None
+
+    def __enter__(self) -> 'SkillArchive':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Skill Repository Utility
+A skill repository is a directory (or file:// URL) holding an index.json of
+skills, versions and content hashes, plus one zip archive per version.
+Checkouts sync from it by copying only versions whose hashes differ.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+try:
+    from .atomic_file import atomic_write_json
+    from .content_hash import hash_directory, hash_file, iter_tree_files
+except ImportError:
+    from atomic_file import atomic_write_json
+    from content_hash import hash_directory, hash_file, iter_tree_files
+
+
+REPOSITORY_INDEX = 'index.json'
+REPOSITORY_FORMAT = 1
+BASE_ARCHIVE = '_skill.zip'
+
+# Top-level skill entries that are local runtime state, never published
+UNPUBLISHED = ('versions', 'backups', 'workflow-state.json', 'branch-states.json')
+
+# Skill names and versions become path components, so nothing else is accepted
+_SKILL_NAME_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9_.-]*')
+_VERSION_PATTERN = re.compile(r'\d+\.\d+\.\d+(?:-[0-9A-Za-z.-]+)?(?:\+[0-9A-Za-z.-]+)?')
+
+
+class SkillRepositoryError(Exception):
+    """Raised when a repository cannot be read or an artifact fails verification."""
+    pass
+
+
+def repository_path(location: Union[str, Path]) -> Path:
+    """
+    Resolve a repository location to a local path.
+
+    Args:
+        location: Directory path or file:// URL
+
+    Raises:
+        SkillRepositoryError: For unsupported URL schemes
+    """
+    text = str(location)
+    if '://' not in text:
+        return Path(text)
+
+    parsed = urlparse(text)
+    if parsed.scheme != 'file':
+        raise SkillRepositoryError(f"Unsupported repository URL: {text}")
+    return Path(url2pathname(parsed.netloc + parsed.path) if parsed.netloc else url2pathname(parsed.path))
+
+
+def _zip_directory(source: Path, archive_path: Path, exclude_top: Iterable[str] = ()):
+    """Zip a directory's files, skipping top-level entries named in exclude_top."""
+    excluded = set(exclude_top)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{archive_path.name}.', suffix='.tmp', dir=archive_path.parent)
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for relative, absolute in iter_tree_files(source):
+                if relative.split('/', 1)[0] in excluded:
+                    continue
+                # Fixed timestamps keep archives byte-identical across publishes
+                info = zipfile.ZipInfo(relative, date_time=(1980, 1, 1, 0, 0, 0))
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(absolute, 'rb') as f:
+                    archive.writestr(info, f.read())
+        os.replace(temp_path, archive_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SkillRepository:
+    """
+    Reader and publisher for a skill repository.
+
+    Layout:
+        index.json                  {"format": 1, "skills": {name: {...}}}
+        <skill>/_skill.zip          skill files outside versions/
+        <skill>/<version>.zip       one version directory
+
+    Each version entry records `hash` (content hash of the version
+    directory), `archive` (path relative to the repository) and
+    `archive_hash` (SHA-256 of the zip file).
+    """
+
+    def __init__(self, location: Union[str, Path]):
+        self.path = repository_path(location)
+        self.index_path = self.path / REPOSITORY_INDEX
+        self.index = self.load_index()
+
+    def load_index(self) -> Dict:
+        """Load the repository index; an absent index is an empty repository."""
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return {'format': REPOSITORY_FORMAT, 'skills': {}}
+        except (json.JSONDecodeError, IOError) as e:
+            raise SkillRepositoryError(f"Cannot read repository index {self.index_path}: {e}")
+
+        if index.get('format') != REPOSITORY_FORMAT:
+            raise SkillRepositoryError(f"Unsupported repository format: {index.get('format')}")
+        self._validate_index(index)
+        return index
+
+    @staticmethod
+    def _validate_index(index: Dict):
+        """
+        Reject an index whose names or archive paths could point outside the
+        repository or a checkout.
+
+        Raises:
+            SkillRepositoryError: On the first unsafe skill name, version or
+                archive path
+        """
+        for skill_name, skill_entry in index.get('skills', {}).items():
+            if not _SKILL_NAME_PATTERN.fullmatch(skill_name):
+                raise SkillRepositoryError(f"Invalid skill name in repository index: {skill_name!r}")
+
+            entries = [skill_entry['base']] if skill_entry.get('base') else []
+            for version, entry in skill_entry.get('versions', {}).items():
+                if not _VERSION_PATTERN.fullmatch(version):
+                    raise SkillRepositoryError(f"Invalid version for {skill_name} in repository index: {version!r}")
+                entries.append(entry)
+
+            for entry in entries:
+                archive = PurePosixPath(entry.get('archive', ''))
+                if not archive.parts or archive.is_absolute() or '..' in archive.parts:
+                    raise SkillRepositoryError(f"Invalid archive path for {skill_name}: {entry.get('archive')!r}")
+
+    @property
+    def skills(self) -> Dict[str, Dict]:
+        return self.index.setdefault('skills', {})
+
+    def publish(self, skills_dir: Path, skill_names: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+        """
+        Publish skills from a skills directory, archiving only changed versions.
+
+        Returns:
+            (skill, version) pairs whose archives were written
+        """
+        if skill_names is None:
+            skill_names = sorted(
+                entry.name for entry in skills_dir.iterdir()
+                if entry.is_dir() and ((entry / 'SKILL.md').exists() or (entry / 'config.json').exists())
+            )
+
+        published = []
+        for skill_name in skill_names:
+            skill_dir = skills_dir / skill_name
+            if not _SKILL_NAME_PATTERN.fullmatch(skill_name) or not skill_dir.is_dir():
+                raise SkillRepositoryError(f"Skill not found: {skill_name}")
+
+            skill_entry = self.skills.setdefault(skill_name, {'versions': {}})
+            base_archive = self.path / skill_name / BASE_ARCHIVE
+            _zip_directory(skill_dir, base_archive, exclude_top=UNPUBLISHED)
+            skill_entry['base'] = {
+                'archive': f'{skill_name}/{BASE_ARCHIVE}',
+                'archive_hash': hash_file(base_archive)
+            }
+
+            versions_dir = skill_dir / 'versions'
+            version_dirs = sorted(
+                p for p in versions_dir.iterdir() if p.is_dir() and _VERSION_PATTERN.fullmatch(p.name)
+            ) if versions_dir.is_dir() else []
+            for version_dir in version_dirs:
+                content_hash = hash_directory(version_dir)
+                existing = skill_entry['versions'].get(version_dir.name)
+                if existing and existing['hash'] == content_hash:
+                    continue
+
+                relative = f'{skill_name}/{version_dir.name}.zip'
+                _zip_directory(version_dir, self.path / relative)
+                skill_entry['versions'][version_dir.name] = {
+                    'hash': content_hash,
+                    'archive': relative,
+                    'archive_hash': hash_file(self.path / relative)
+                }
+                published.append((skill_name, version_dir.name))
+
+        atomic_write_json(self.index_path, self.index)
+        return published
+
+    def plan_sync(self, skills_dir: Path,
+                  skill_names: Optional[Iterable[str]] = None) -> List[Tuple[str, Optional[str]]]:
+        """
+        Find what needs copying into a skills directory.
+
+        Returns:
+            (skill, version) pairs that are missing or differ locally; a
+            version of None means the skill itself is not installed
+        """
+        selected = self.skills if skill_names is None else {
+            name: self.skills[name] for name in skill_names if name in self.skills
+        }
+
+        plan = []
+        for skill_name, skill_entry in sorted(selected.items()):
+            skill_dir = skills_dir / skill_name
+            if not skill_dir.is_dir() and skill_entry.get('base'):
+                plan.append((skill_name, None))
+
+            for version, entry in sorted(skill_entry.get('versions', {}).items()):
+                version_dir = skill_dir / 'versions' / version
+                if not version_dir.is_dir() or hash_directory(version_dir) != entry['hash']:
+                    plan.append((skill_name, version))
+        return plan
+
+    def sync(self, skills_dir: Path, skill_names: Optional[Iterable[str]] = None,
+             workers: Optional[int] = None) -> Dict:
+        """
+        Copy new or changed versions into a skills directory in parallel.
+
+        Every archive is verified against its recorded hash before
+        extraction, and every extracted directory against its content hash
+        before it replaces the installed version.
+
+        Returns:
+            Summary with `synced` (skill, version) pairs, `failed`
+            {"skill@version": error} and `unchanged` count
+        """
+        if skill_names is not None:
+            skill_names = list(skill_names)
+        plan = self.plan_sync(skills_dir, skill_names)
+        total_versions = sum(
+            len(entry.get('versions', {})) for name, entry in self.skills.items()
+            if skill_names is None or name in skill_names
+        )
+
+        # Skill bases first, so version directories land inside an installed skill
+        bases = [item for item in plan if item[1] is None]
+        versions = [item for item in plan if item[1] is not None]
+
+        synced, failed = [], {}
+        for stage in (bases, versions):
+            if not stage:
+                continue
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for (skill_name, version), error in zip(stage, executor.map(
+                        lambda item: self._install(skills_dir, *item), stage)):
+                    if error:
+                        failed[f"{skill_name}@{version or 'base'}"] = error
+                    else:
+                        synced.append((skill_name, version))
+
+        return {
+            'synced': synced,
+            'failed': failed,
+            'unchanged': total_versions - len(versions)
+        }
+
+    def _install(self, skills_dir: Path, skill_name: str, version: Optional[str]) -> Optional[str]:
+        """Install a skill base or one version; returns an error message or None."""
+        skill_entry = self.skills[skill_name]
+        entry = skill_entry['base'] if version is None else skill_entry['versions'][version]
+        archive_path = self.path / entry['archive']
+
+        try:
+            if hash_file(archive_path) != entry['archive_hash']:
+                return f"Archive hash mismatch for {entry['archive']}"
+
+            if version is None:
+                target = skills_dir / skill_name
+            else:
+                target = skills_dir / skill_name / 'versions' / version
+            target.parent.mkdir(parents=True, exist_ok=True)
+
+            staging = Path(tempfile.mkdtemp(prefix=f'.{target.name}.', dir=target.parent))
+            try:
+                with zipfile.ZipFile(archive_path) as archive:
+                    for name in archive.namelist():
+                        if name.startswith('/') or '..' in name.split('/'):
+                            return f"Unsafe path in {entry['archive']}: {name}"
+                    archive.extractall(staging)
+
+                if version is not None and hash_directory(staging) != entry['hash']:
+                    return f"Content hash mismatch for {skill_name}@{version}"
+
+                self._swap(staging, target)
+            finally:
+                if staging.exists():
+                    shutil.rmtree(staging, ignore_errors=True)
+        except (OSError, zipfile.BadZipFile) as e:
+            return str(e)
+
+        return None
+
+    @staticmethod
+    def _swap(staging: Path, target: Path):
+        """Replace target with staging, keeping the old directory until the rename succeeds."""
+        if not target.exists():
+            os.rename(staging, target)
+            return
+
+        retired = target.with_name(f'.{target.name}.old')
+        if retired.exists():
+            shutil.rmtree(retired)
+        os.rename(target, retired)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            os.rename(retired, target)
+            raise
+        shutil.rmtree(retired, ignore_errors=True)
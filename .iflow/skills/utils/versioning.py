@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Semantic Version Utility
+Provides an interned, totally ordered version type and sorted version arrays
+with bisect-based range queries.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+_VERSION_PATTERN = re.compile(
+    r'^v?(?P<release>\d+(?:\.\d+){0,2})'
+    r'(?:-(?P<prerelease>[0-9A-Za-z.-]+))?'
+    r'(?:\+(?P<build>[0-9A-Za-z.-]+))?$'
+)
+
+
+class Version:
+    """
+    Immutable semantic version.
+
+    Instances are interned: parsing the same string, or two strings with the
+    same canonical form ("1.2" and "1.2.0"), returns the same object, so
+    equality checks on hot paths are usually identity checks.
+
+    Ordering follows semver precedence (pre-releases sort before their
+    release). Build metadata does not affect precedence but is used as a
+    final tie-breaker so that ordering stays consistent with equality.
+    """
+
+    __slots__ = ('major', 'minor', 'patch', 'prerelease', 'build', '_precedence', '_key', '_text')
+
+    _parse_cache: Dict[str, 'Version'] = {}
+    _intern_cache: Dict[Tuple, 'Version'] = {}
+
+    def __new__(cls, major: int, minor: int = 0, patch: int = 0,
+                prerelease: Tuple[str, ...] = (), build: Tuple[str, ...] = ()):
+        identity = (major, minor, patch, tuple(prerelease), tuple(build))
+        existing = cls._intern_cache.get(identity)
+        if existing is not None:
+            return existing
+
+        if prerelease:
+            prerelease_key = (0, tuple(
+                (0, int(part), '') if part.isdigit() else (1, 0, part)
+                for part in prerelease
+            ))
+        else:
+            prerelease_key = (1, ())
+
+        instance = super().__new__(cls)
+        object.__setattr__(instance, 'major', major)
+        object.__setattr__(instance, 'minor', minor)
+        object.__setattr__(instance, 'patch', patch)
+        object.__setattr__(instance, 'prerelease', tuple(prerelease))
+        object.__setattr__(instance, 'build', tuple(build))
+        object.__setattr__(instance, '_precedence', (major, minor, patch, prerelease_key))
+        object.__setattr__(instance, '_key', instance._precedence + (tuple(build),))
+        object.__setattr__(instance, '_text', None)
+
+        cls._intern_cache[identity] = instance
+        return instance
+
+    @classmethod
+    def parse(cls, value: Union[str, 'Version']) -> 'Version':
+        """
+        Parse a version string into an interned Version.
+
+        Args:
+            value: Version string such as "2.0.0", "1.2", "3.0.0-rc.1+build.5"
+
+        Returns:
+            Interned Version instance
+
+        Raises:
+            ValueError: If the string is not a valid version
+        """
+        if isinstance(value, Version):
+            return value
+
+        cached = cls._parse_cache.get(value)
+        if cached is not None:
+            return cached
+
+        match = _VERSION_PATTERN.match(value.strip()) if isinstance(value, str) else None
+        if not match:
+            raise ValueError(f"Invalid version: {value!r}")
+
+        release = [int(part) for part in match.group('release').split('.')]
+        release += [0] * (3 - len(release))
+        prerelease = tuple(match.group('prerelease').split('.')) if match.group('prerelease') else ()
+        build = tuple(match.group('build').split('.')) if match.group('build') else ()
+
+        version = cls(release[0], release[1], release[2], prerelease, build)
+        cls._parse_cache[value] = version
+        return version
+
+    @property
+    def release(self) -> Tuple[int, int, int]:
+        """The (major, minor, patch) tuple."""
+        return (self.major, self.minor, self.patch)
+
+    @property
+    def is_prerelease(self) -> bool:
+        return bool(self.prerelease)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Version instances are immutable")
+
+    def __reduce__(self):
+        return (Version, (self.major, self.minor, self.patch, self.prerelease, self.build))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __lt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key < other._key
+
+    def __le__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key <= other._key
+
+    def __gt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key > other._key
+
+    def __ge__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self._key >= other._key
+
+    def __str__(self):
+        if self._text is None:
+            text = f"{self.major}.{self.minor}.{self.patch}"
+            if self.prerelease:
+                text += '-' + '.'.join(self.prerelease)
+            if self.build:
+                text += '+' + '.'.join(self.build)
+            object.__setattr__(self, '_text', text)
+        return self._text
+
+    def __repr__(self):
+        return f"Version('{self}')"
+
+
+def parse_version(version_str: Union[str, Version]) -> Version:
+    """Parse a version string into an interned Version."""
+    return Version.parse(version_str)
+
+
+def compare_versions(v1: Union[str, Version], v2: Union[str, Version]) -> int:
+    """
+    Compare two versions by semver precedence, ignoring build metadata.
+
+    Returns -1 if v1 < v2, 0 if equal, 1 if v1 > v2.
+    """
+    key1 = Version.parse(v1)._precedence
+    key2 = Version.parse(v2)._precedence
+
+    if key1 < key2:
+        return -1
+    elif key1 > key2:
+        return 1
+    else:
+        return 0
+
+
+class SortedVersions:
+    """
+    Pre-sorted array of versions answering range queries by bisection.
+
+    Usage:
+        versions = SortedVersions(['1.0.0', '2.0.0', '1.5.0'])
+        versions.latest()                    # Version('2.0.0')
+        versions.next_after('1.0.0')         # Version('1.5.0')
+        versions.in_range('1.2.0', '2.0.0')  # [Version('1.5.0'), Version('2.0.0')]
+    """
+
+    def __init__(self, versions: Iterable[Union[str, Version]] = ()):
+        self.versions: List[Version] = sorted({Version.parse(v) for v in versions})
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def __iter__(self) -> Iterator[Version]:
+        return iter(self.versions)
+
+    def __contains__(self, version) -> bool:
+        try:
+            version = Version.parse(version)
+        except ValueError:
+            return False
+        index = bisect_left(self.versions, version)
+        return index < len(self.versions) and self.versions[index] == version
+
+    def add(self, version: Union[str, Version]) -> Version:
+        """Insert a version, keeping the array sorted."""
+        version = Version.parse(version)
+        index = bisect_left(self.versions, version)
+        if index == len(self.versions) or self.versions[index] != version:
+            self.versions.insert(index, version)
+        return version
+
+    def remove(self, version: Union[str, Version]) -> bool:
+        """Remove a version if present."""
+        version = Version.parse(version)
+        index = bisect_left(self.versions, version)
+        if index < len(self.versions) and self.versions[index] == version:
+            del self.versions[index]
+            return True
+        return False
+
+    def index(self, version: Union[str, Version]) -> int:
+        """Position of a version in the sorted array; ValueError if absent."""
+        version = Version.parse(version)
+        index = bisect_left(self.versions, version)
+        if index < len(self.versions) and self.versions[index] == version:
+            return index
+        raise ValueError(f"Version {version} not available")
+
+    def latest(self) -> Optional[Version]:
+        return self.versions[-1] if self.versions else None
+
+    def earliest(self) -> Optional[Version]:
+        return self.versions[0] if self.versions else None
+
+    def next_after(self, version: Union[str, Version]) -> Optional[Version]:
+        """Smallest available version strictly greater than `version`."""
+        index = bisect_right(self.versions, Version.parse(version))
+        return self.versions[index] if index < len(self.versions) else None
+
+    def previous_before(self, version: Union[str, Version]) -> Optional[Version]:
+        """Largest available version strictly less than `version`."""
+        index = bisect_left(self.versions, Version.parse(version))
+        return self.versions[index - 1] if index > 0 else None
+
+    def in_range(self, min_version: Optional[Union[str, Version]] = None,
+                 max_version: Optional[Union[str, Version]] = None,
+                 include_min: bool = True, include_max: bool = True) -> List[Version]:
+        """Versions within [min_version, max_version] (bounds optional)."""
+        return self.versions[self._lower(min_version, include_min):self._upper(max_version, include_max)]
+
+    def latest_in_range(self, min_version: Optional[Union[str, Version]] = None,
+                        max_version: Optional[Union[str, Version]] = None) -> Optional[Version]:
+        """Latest version within [min_version, max_version], or None."""
+        lower = self._lower(min_version, True)
+        upper = self._upper(max_version, True)
+        return self.versions[upper - 1] if upper > lower else None
+
+    def _lower(self, version, inclusive: bool) -> int:
+        if version is None:
+            return 0
+        version = Version.parse(version)
+        return bisect_left(self.versions, version) if inclusive else bisect_right(self.versions, version)
+
+    def _upper(self, version, inclusive: bool) -> int:
+        if version is None:
+            return len(self.versions)
+        version = Version.parse(version)
+        return bisect_right(self.versions, version) if inclusive else bisect_left(self.versions, version)